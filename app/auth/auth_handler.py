@@ -4,8 +4,8 @@ from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
 from app.core.config import settings
-from app.core.redis import redis_client
-from redis.exceptions import RedisError
+from app.core.redis import async_redis_client, redis_client
+from app.auth.revocation import revocation_list
 
 # Leemos la clave y algoritmo desde settings (que los toma del .env)
 SECRET_KEY = settings.SECRET_KEY
@@ -15,37 +15,52 @@ REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
 
 
 def create_access_token(data: dict) -> str:
-    """Genera un token JWT firmado con la clave secreta."""
+    """Genera un token JWT firmado con la clave secreta y un jti para poder revocarlo."""
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def create_refresh_token(data: dict) -> str:
-    """Genera un refresh token JWT y lo registra en Redis."""
+def token_claims(user) -> dict:
+    """
+    Claims de identidad de los tokens de `user`. "ver" es su token_version:
+    al incrementarla (invalidate_user_tokens) dejan de valer todos los tokens
+    emitidos antes, sin tocar Redis.
+    """
+    return {"sub": user.email, "user_id": user.id, "ver": user.token_version or 0}
+
+
+def invalidate_user_tokens(user) -> None:
+    """Invalida todos los access/refresh tokens del usuario (se aplica al hacer commit)."""
+    user.token_version = (user.token_version or 0) + 1
+
+
+def token_version_matches(payload: dict, token_version: int) -> bool:
+    # Tokens emitidos antes de existir el claim: versión 0
+    return payload.get("ver", 0) == token_version
+
+
+def refresh_token_key(jti: str) -> str:
+    """
+    Única clave por refresh token: refresh_token:{jti} -> user_id.
+    Mientras exista el token es canjeable; la escriben SessionService al
+    crear/rotar la sesión y revoke_refresh_token la borra.
+    """
+    return f"refresh_token:{jti}"
+
+
+def issue_refresh_token(data: dict) -> tuple[str, str]:
+    """
+    Genera un refresh token JWT con un JTI único y devuelve (token, jti).
+    No lo registra en Redis: lo hace SessionService al crear o rotar la sesión,
+    en el mismo round trip que el resto de claves de la sesión.
+    """
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    
-    # Añadimos un identificador único (JTI) para rastrearlo
     jti = str(uuid.uuid4())
     to_encode.update({"exp": expire, "jti": jti, "type": "refresh"})
-    
-    # Store in Redis: refresh_token:{jti} -> user_id
-    user_id = data.get("user_id") or data.get("sub")
-    try:
-        redis_client.setex(
-            f"refresh_token:{jti}",
-            timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
-            str(user_id)
-        )
-    except RedisError as e:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Servicio de sesiones no disponible. Inténtalo de nuevo más tarde."
-        ) from e
-    
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM), jti
 
 
 def verify_token(token: str) -> dict | None:
@@ -57,70 +72,134 @@ def verify_token(token: str) -> dict | None:
         return None
 
 
-def decode_access_token(token: str) -> dict:
-    """Decodifica un JWT. Lanza HTTP 401 si el token es inválido o expirado o revocado."""
-    
-    # 3.3 Verificación en Blacklist (Opcional - Enterprise)
-    if redis_client.exists(f"blacklist:{token}"):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Access token revocado o sesión cerrada",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
+def _decode_access_claims(token: str) -> dict:
+    """Firma, expiración y tipo del access token (sin Redis)."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        if payload.get("type") == "refresh":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="No se puede usar un refresh token como access token",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido o expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if payload.get("type") == "refresh":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No se puede usar un refresh token como access token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
 
 
-def decode_refresh_token(token: str) -> dict:
-    """Decodifica el refresh token y verifica su validez usando Redis."""
+def _raise_revoked() -> None:
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Access token revocado o sesión cerrada",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def decode_access_token(token: str) -> dict:
+    """Decodifica un JWT. Lanza HTTP 401 si el token es inválido o expirado o revocado."""
+    payload = _decode_access_claims(token)
+    # Revocación por jti (logout). Sin jti: tokens emitidos antes, revocados
+    # con blacklist:{token}; desaparecen al expirar (ACCESS_TOKEN_EXPIRE_MINUTES).
+    jti = payload.get("jti")
+    revoked = revocation_list.is_revoked(jti) if jti else redis_client.exists(f"blacklist:{token}")
+    if revoked:
+        _raise_revoked()
+    return payload
+
+
+async def decode_access_token_async(token: str) -> dict:
+    """decode_access_token para endpoints async: si hay que consultar Redis no ocupa un hilo."""
+    payload = _decode_access_claims(token)
+    jti = payload.get("jti")
+    if jti:
+        revoked = await revocation_list.is_revoked_async(jti)
+    else:
+        revoked = await async_redis_client.exists(f"blacklist:{token}")
+    if revoked:
+        _raise_revoked()
+    return payload
+
+
+def revoke_access_token(token: str) -> None:
+    """Revoca un access token hasta su expiración (revoked:{jti} en Redis + copias locales)."""
+    payload = verify_token(token)
+    if payload is None:
+        return
+    if payload.get("jti"):
+        revocation_list.revoke(payload["jti"], int(payload["exp"]))
+    else:
+        ttl = int(payload["exp"] - datetime.now(timezone.utc).timestamp())
+        if ttl > 0:
+            redis_client.set(f"blacklist:{token}", "revoked", ex=ttl)
+
+
+async def revoke_access_token_async(token: str) -> None:
+    payload = verify_token(token)
+    if payload is None:
+        return
+    if payload.get("jti"):
+        await revocation_list.revoke_async(payload["jti"], int(payload["exp"]))
+    else:
+        ttl = int(payload["exp"] - datetime.now(timezone.utc).timestamp())
+        if ttl > 0:
+            await async_redis_client.set(f"blacklist:{token}", "revoked", ex=ttl)
+
+
+def decode_refresh_token_claims(token: str) -> dict:
+    """Valida firma, expiración, tipo y jti del refresh token sin consultar Redis."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        if payload.get("type") != "refresh":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token no es un refresh token",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-            
-        jti = payload.get("jti")
-        if not jti:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Refresh token malformado (sin jti)",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-            
-        # Verify in Redis
-        user_id = redis_client.get(f"refresh_token:{jti}")
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Refresh token revocado o expirado",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-            
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Refresh token inválido o expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if payload.get("type") != "refresh":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token no es un refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not payload.get("jti"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token malformado (sin jti)",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+
+def _raise_refresh_revoked() -> None:
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token revocado o expirado",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def decode_refresh_token(token: str) -> dict:
+    """Decodifica el refresh token y verifica su validez usando Redis."""
+    payload = decode_refresh_token_claims(token)
+    if not redis_client.get(refresh_token_key(payload["jti"])):
+        _raise_refresh_revoked()
+    return payload
+
+
+async def decode_refresh_token_async(token: str) -> dict:
+    payload = decode_refresh_token_claims(token)
+    if not await async_redis_client.get(refresh_token_key(payload["jti"])):
+        _raise_refresh_revoked()
+    return payload
 
 def revoke_refresh_token(jti: str) -> None:
     """Revoca un refresh token eliminándolo de Redis."""
-    redis_client.delete(f"refresh_token:{jti}")
+    redis_client.delete(refresh_token_key(jti))
+
+
+async def revoke_refresh_token_async(jti: str) -> None:
+    await async_redis_client.delete(refresh_token_key(jti))
@@ -1,59 +1,53 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-import bcrypt
-import hashlib
-import json
 from app.db.session import get_db
 from app.models.user import User
+from app.services.user_cache import UserPrincipal
+from app.auth.password_hasher import password_hasher
 from app.auth.auth_handler import (
     create_access_token, 
     decode_access_token, 
-    create_refresh_token, 
-    decode_refresh_token, 
-    revoke_refresh_token,
-    SECRET_KEY,
-    ALGORITHM,
+    issue_refresh_token, 
+    decode_refresh_token_async,
+    decode_refresh_token_claims,
+    revoke_refresh_token_async,
+    revoke_access_token_async,
+    token_claims,
+    token_version_matches,
+    invalidate_user_tokens,
     REFRESH_TOKEN_EXPIRE_DAYS
 )
-from app.schemas import UserCreate, UserLogin, RefreshTokenRequest
+from app.schemas import UserCreate, UserLogin, RefreshTokenRequest, PasswordChange
 from app.models.session import SessionOut
 from datetime import datetime, timedelta, timezone
-from jose import jwt
-from app.core.redis import redis_client
-from app.services.session_service import SessionService
+from redis.exceptions import RedisError
+from app.core.redis import async_redis_client, redis_client
+from app.services.session_service import AsyncSessionService, SessionService
 from app.utils.device import extract_ip, extract_user_agent, generate_device_id
 
 session_service = SessionService(redis_client)
+# Endpoints que solo usan Redis: async, sin hilo del threadpool
+async_session_service = AsyncSessionService(async_redis_client)
 
 # Reutilizamos el oauth2_scheme centralizado de core/dependencies.
 # Un unico candado en Swagger, esquema OAuth2PasswordBearer consistente en toda la API.
-from app.core.dependencies import oauth2_scheme, get_current_user
+from app.core.dependencies import oauth2_scheme, get_current_user_async, get_current_user_model
 
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-def prepare_password(password: str) -> bytes:
-    """
-    Pre-hashea la contraseña con SHA256 para evitar el límite de 72 bytes de bcrypt.
-    Retorna bytes para usar directamente con bcrypt.
-    """
-    return hashlib.sha256(password.encode('utf-8')).digest()
-
 def hash_password(password: str) -> str:
-    """Hashea la contraseña usando bcrypt con pre-hash SHA256"""
-    prepared = prepare_password(password)
-    salt = bcrypt.gensalt(rounds=12)
-    hashed = bcrypt.hashpw(prepared, salt)
-    return hashed.decode('utf-8')
+    """Hashea la contraseña usando bcrypt con pre-hash SHA256 (en el pool de procesos)"""
+    return password_hasher.hash(password)
 
 def verify_password(password: str, hashed: str) -> bool:
-    """Verifica la contraseña contra el hash almacenado"""
-    prepared = prepare_password(password)
-    return bcrypt.checkpw(prepared, hashed.encode('utf-8'))
+    """Verifica la contraseña contra el hash almacenado (en el pool de procesos)"""
+    return password_hasher.verify(password, hashed)
 
 @router.post("/register")
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+def register_user(user: UserCreate, db: Session = Depends(get_db, scope="function")):
     # Validar longitud mínima de contraseña
     if len(user.password) < 8:
         raise HTTPException(
@@ -61,12 +55,15 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
             detail="La contraseña debe tener al menos 8 caracteres"
         )
     
-    existing_email = db.query(User).filter(User.email == user.email).first()
-    if existing_email:
+    password_hasher.ensure_capacity()
+
+    # Una sola consulta para los dos campos únicos
+    taken = db.query(User.email, User.username).filter(
+        or_(User.email == user.email, User.username == user.username)
+    ).limit(2).all()
+    if any(row.email == user.email for row in taken):
         raise HTTPException(status_code=400, detail="Email ya está registrado")
-        
-    existing_username = db.query(User).filter(User.username == user.username).first()
-    if existing_username:
+    if taken:
         raise HTTPException(status_code=400, detail="Nombre de usuario ya está registrado")
 
     # Hashear contraseña
@@ -79,8 +76,7 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         role="user"  # Asignar explícitamente rol de usuario normal
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    db.flush()
     
     return {
         "message": "Usuario creado exitosamente",
@@ -93,6 +89,8 @@ def _authenticate_and_create_tokens(email: str, password: str, request: Request,
     Lógica interna compartida entre /auth/login (JSON) y /auth/token (form-data).
     Valida credenciales, genera tokens, crea sesión en Redis.
     """
+    # Con el pool de bcrypt lleno se rechaza sin consultar la BD
+    password_hasher.ensure_capacity()
     user = db.query(User).filter(User.email == email).first()
     if not user:
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
@@ -101,26 +99,34 @@ def _authenticate_and_create_tokens(email: str, password: str, request: Request,
     if not verify_password(password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
 
-    access_token = create_access_token({"sub": user.email,"user_id": user.id})
-    refresh_token = create_refresh_token({"sub": user.email,"user_id": user.id})
+    return _create_tokens(user, request)
 
-    # Integramos session service
-    payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-    jti = payload.get("jti")
-    
+
+def _create_tokens(user: User, request: Request) -> dict:
+    """Emite access + refresh token para `user` y abre la sesión de este dispositivo."""
+    access_token = create_access_token(token_claims(user))
+    refresh_token, jti = issue_refresh_token(token_claims(user))
+
+    # La sesión registra también el refresh token (refresh_token:{jti}) en el mismo pipeline
     ip = extract_ip(request)
     ua = extract_user_agent(request)
     device_id = generate_device_id(request)
     expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     
-    session_service.create_session(
-        user_id=user.id,
-        device_id=device_id,
-        jti=jti,
-        ip=ip,
-        user_agent=ua,
-        expires_at=expires_at
-    )
+    try:
+        session_service.create_session(
+            user_id=user.id,
+            device_id=device_id,
+            jti=jti,
+            ip=ip,
+            user_agent=ua,
+            expires_at=expires_at
+        )
+    except RedisError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servicio de sesiones no disponible. Inténtalo de nuevo más tarde."
+        ) from e
 
     return {
         "access_token": access_token,
@@ -133,7 +139,7 @@ def _authenticate_and_create_tokens(email: str, password: str, request: Request,
 def login_user(
     request: Request, 
     login_data: UserLogin, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """Login con JSON body — usado por el frontend."""
     return _authenticate_and_create_tokens(
@@ -148,7 +154,7 @@ def login_user(
 def login_for_swagger(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """
     Endpoint compatible con OAuth2/Swagger para obtener token via form-data.
@@ -163,45 +169,57 @@ def login_for_swagger(
 
 
 @router.post("/refresh")
-def refresh_token(request_data: RefreshTokenRequest, request: Request, db: Session = Depends(get_db)):
+def refresh_token(request_data: RefreshTokenRequest, request: Request, db: Session = Depends(get_db, scope="function")):
     """
     Endpoint para renovar el access_token y rotar el refresh_token.
     """
-    payload = decode_refresh_token(request_data.refresh_token)
+    # Solo firma/expiración aquí: la validez en Redis la comprueba la rotación atómica
+    payload = decode_refresh_token_claims(request_data.refresh_token)
     
     user_id = payload.get("user_id")
-    email = payload.get("sub")
     
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=401, detail="Usuario no encontrado")
+    # Logout global / cambio de contraseña o de rol posterior a este token
+    if not token_version_matches(payload, user.token_version or 0):
+        raise HTTPException(status_code=401, detail="Sesión cerrada: vuelve a iniciar sesión")
         
     jti = payload.get("jti")
-    # Revocar el refresh token actual por seguridad
-    revoke_refresh_token(jti)
     
-    new_access_token = create_access_token({"sub": email, "user_id": user_id})
-    new_refresh_token = create_refresh_token({"sub": email, "user_id": user_id})
-    
-    new_payload = jwt.decode(new_refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-    new_jti = new_payload.get("jti")
+    new_access_token = create_access_token(token_claims(user))
+    new_refresh_token, new_jti = issue_refresh_token(token_claims(user))
     
     ip = extract_ip(request)
     ua = extract_user_agent(request)
     device_id = generate_device_id(request)
     new_expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     
-    updated = session_service.update_jti_for_session(
-        user_id=user_id,
-        device_id=device_id,
-        old_jti=jti,
-        new_jti=new_jti,
-        new_expires_at=new_expires_at,
-        current_ip=ip,
-        current_user_agent=ua
-    )
-    if not updated:
-        revoke_refresh_token(new_jti)
+    # Revoca el jti actual y registra el nuevo en un único script atómico (token rotation)
+    try:
+        result = session_service.rotate_refresh_token(
+            user_id=user_id,
+            device_id=device_id,
+            old_jti=jti,
+            new_jti=new_jti,
+            new_expires_at=new_expires_at,
+            current_ip=ip,
+            current_user_agent=ua
+        )
+    except RedisError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servicio de sesiones no disponible. Inténtalo de nuevo más tarde."
+        ) from e
+
+    if result == "revoked":
+        raise HTTPException(status_code=401, detail="Refresh token revocado o expirado")
+    if result == "reused":
+        raise HTTPException(
+            status_code=401,
+            detail="Token comprometido o previamente usado. Sesión terminada por seguridad."
+        )
+    if result != "ok":
         raise HTTPException(status_code=401, detail="Sesión inválida, expirada o robada.")
     
     return {
@@ -211,33 +229,32 @@ def refresh_token(request_data: RefreshTokenRequest, request: Request, db: Sessi
     }
 
 @router.post("/logout")
-def logout(
+async def logout(
     request_data: RefreshTokenRequest,
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user_async),
     token: str = Depends(oauth2_scheme),
 ):
     """
     Cierra la sesión revocando el refresh token en Redis.
-    Y añade el access_token al blacklist.
+    Y revoca el access_token (por jti) hasta que expire.
     """
-    payload = decode_refresh_token(request_data.refresh_token)
+    payload = await decode_refresh_token_async(request_data.refresh_token)
     jti = payload.get("jti")
 
     device_id = generate_device_id(request)
 
-    revoke_refresh_token(jti)
-    session_service.delete_session(current_user.id, device_id)
-    
-    # 3.3 Blacklist de access_token (opcional enterprise level)
-    # TTL aproximado para no acumular basura (los access tokens viven menos p.ej. 30min o 1 d).
-    redis_client.setex(f"blacklist:{token}", timedelta(minutes=60), "revoked")
-    
+    await revoke_refresh_token_async(jti)
+    await async_session_service.delete_session(current_user.id, device_id)
+
+    # 3.3 Revocación del access_token por jti hasta su expiración
+    await revoke_access_token_async(token)
+
     return {"message": "Cierre de sesión exitoso"}
     
     
 @router.get("/me")
-def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: UserPrincipal = Depends(get_current_user_async)):
     """Retorna los datos del usuario autenticado."""
     return {
         "id": current_user.id,
@@ -246,47 +263,80 @@ def get_me(current_user: User = Depends(get_current_user)):
     }
 
 
+@router.put("/password")
+def change_password(
+    payload: PasswordChange,
+    request: Request,
+    current_user: User = Depends(get_current_user_model),
+    db: Session = Depends(get_db, scope="function"),
+):
+    """
+    Cambia la contraseña e invalida todos los tokens y sesiones del usuario.
+    Devuelve tokens nuevos para este dispositivo.
+    """
+    if not verify_password(payload.current_password, current_user.hashed_password):
+        raise HTTPException(status_code=401, detail="Contraseña actual incorrecta")
+
+    current_user.hashed_password = hash_password(payload.new_password)
+    invalidate_user_tokens(current_user)
+    db.flush()
+    session_service.close_all_sessions(current_user.id)
+    return _create_tokens(current_user, request)
+
+
 # --- SESSION ENDPOINTS ---
 
 @router.get("/sessions")
-def get_sessions(request: Request, current_user: User = Depends(get_current_user)):
+async def get_sessions(request: Request, current_user: UserPrincipal = Depends(get_current_user_async)):
     current_device_id = generate_device_id(request)
     
-    sessions = session_service.get_sessions(current_user.id)
+    sessions = await async_session_service.get_sessions(current_user.id)
     session_outs = [SessionOut.from_redis_hash(s, current_device_id) for s in sessions]
     return {"sessions": session_outs}
 
 @router.get("/sessions/me", response_model=SessionOut)
-def get_current_session(request: Request, current_user: User = Depends(get_current_user)):
+async def get_current_session(request: Request, current_user: UserPrincipal = Depends(get_current_user_async)):
     device_id = generate_device_id(request)
     
-    key = session_service._session_key(current_user.id, device_id)
-    raw = session_service.redis.get(key)
-    
-    if not raw:
+    session_data = await async_session_service.get_session(current_user.id, device_id)
+    if not session_data:
         raise HTTPException(status_code=404, detail="Sesión no encontrada o ha expirado")
         
-    session_data = json.loads(raw)
     return SessionOut.from_redis_hash(session_data, current_device_id=device_id)
 
+@router.delete("/sessions")
+def delete_all_sessions(
+    current_user: User = Depends(get_current_user_model),
+    db: Session = Depends(get_db, scope="function"),
+):
+    """
+    Cierra la sesión en todos los dispositivos (incluido este): incrementa la
+    token_version del usuario, lo que invalida al instante todos sus access y
+    refresh tokens.
+    """
+    invalidate_user_tokens(current_user)
+    db.flush()
+    deleted = session_service.close_all_sessions(current_user.id)
+    return {"message": "Sesiones cerradas en todos los dispositivos", "deleted_devices": deleted}
+
 @router.delete("/sessions/terminate-others")
-def delete_all_other_sessions(request: Request, current_user: User = Depends(get_current_user)):
+async def delete_all_other_sessions(request: Request, current_user: UserPrincipal = Depends(get_current_user_async)):
     device_id = generate_device_id(request)
     
-    deleted = session_service.delete_all_except(current_user.id, keep_device_id=device_id)
+    deleted = await async_session_service.delete_all_except(current_user.id, keep_device_id=device_id)
     return {"message": "Sesiones de otros dispositivos cerradas", "deleted_devices": deleted}
 
 @router.delete("/sessions/{device_id}")
-def delete_session_by_device(device_id: str, current_user: User = Depends(get_current_user)):
-    success = session_service.delete_session(current_user.id, device_id)
+async def delete_session_by_device(device_id: str, current_user: UserPrincipal = Depends(get_current_user_async)):
+    success = await async_session_service.delete_session(current_user.id, device_id)
     if not success:
         raise HTTPException(status_code=404, detail="Sesión no encontrada")
     return {"message": "Sesión cerrada exitosamente"}
 
 @router.get("/sessions/metrics")
-def get_session_metrics(current_user: User = Depends(get_current_user)):
+async def get_session_metrics(current_user: UserPrincipal = Depends(get_current_user_async)):
     """
     Endpoint de auditoria. Devuelve métricas calculadas sobre todas las sesiones.
     """
-    metrics = session_service.get_metrics_for_user(current_user.id)
+    metrics = await async_session_service.get_metrics_for_user(current_user.id)
     return metrics
@@ -0,0 +1,115 @@
+# app/auth/password_hasher.py
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+import bcrypt
+from app.core.config import settings
+from app.exceptions.auth_exceptions import PasswordHasherBusy
+
+
+def prepare_password(password: str) -> bytes:
+    """
+    Pre-hashea la contraseña con SHA256 para evitar el límite de 72 bytes de bcrypt.
+    Retorna bytes para usar directamente con bcrypt.
+    """
+    return hashlib.sha256(password.encode('utf-8')).digest()
+
+
+# Se ejecutan en los procesos del pool: funciones de módulo (serializables)
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(prepare_password(password), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(prepare_password(password), hashed.encode('utf-8'))
+
+
+class PasswordHasher:
+    """
+    bcrypt fuera del threadpool compartido y del GIL: cada hash/verificación
+    (~250 ms de CPU con 12 rondas) se ejecuta en un pool de procesos acotado.
+
+    Control de admisión: como mucho `workers + queue_size` operaciones en
+    curso; la siguiente recibe PasswordHasherBusy (503) al momento en lugar de
+    esperar. Así una ráfaga de logins no puede ocupar más de ese número de
+    hilos del threadpool de AnyIO ni retrasar al resto de endpoints.
+
+    Los procesos se crean con "spawn" e importan el módulo principal: los
+    scripts que usen el pool necesitan `if __name__ == "__main__":` (uvicorn
+    y gunicorn ya lo cumplen). Con workers=0 se ejecuta en el hilo que llama
+    (tests, scripts).
+    """
+
+    def __init__(self, workers: int = settings.BCRYPT_WORKERS, queue_size: int = settings.BCRYPT_QUEUE_SIZE,
+                 rounds: int = settings.BCRYPT_ROUNDS, nice: int = settings.BCRYPT_NICE):
+        self.workers = workers
+        self.rounds = rounds
+        self.nice = nice
+        self.capacity = max(workers, 1) + queue_size
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Perezoso y con "spawn": un fork de un proceso con hilos (uvicorn,
+        # suscripciones a Redis) puede heredar locks tomados.
+        with self._lock:
+            if self._executor is None:
+                # Prioridad de CPU menor que la API: si comparten núcleos, los
+                # logins se ralentizan antes que el resto de endpoints.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=os.nice, initargs=(self.nice,),
+                )
+            return self._executor
+
+    def ensure_capacity(self) -> None:
+        """Rechazo anticipado (antes de consultar la BD) si el pool ya está lleno."""
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self.in_flight += 1
+        try:
+            if self.workers <= 0:
+                return fn(*args)
+            future: Future = self._pool().submit(fn, *args)
+            return future.result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "capacity": self.capacity, "in_flight": self.in_flight,
+                "rejected": self.rejected}
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password, self.rounds)
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._run(_verify, password, hashed)
+
+    def start(self) -> None:
+        """Arranca los procesos del pool antes de la primera petición."""
+        if self.workers > 0:
+            pool = self._pool()
+            for future in [pool.submit(_verify, "", _hash("", 4)) for _ in range(self.workers)]:
+                future.result()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,171 @@
+# app/auth/revocation.py
+import logging
+import threading
+import time
+from typing import Optional
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis import async_redis_client, redis_client
+
+logger = logging.getLogger(__name__)
+
+REVOKED_PREFIX = "revoked:"
+REVOCATION_CHANNEL = "access_revoked"
+
+
+def revoked_access_key(jti: str) -> str:
+    """revoked:{jti} -> "1", con TTL = vida restante del access token."""
+    return f"{REVOKED_PREFIX}{jti}"
+
+
+class RevocationList:
+    """
+    Copia local (por worker) de los access tokens revocados y aún no
+    expirados: {jti: exp}. Con la copia sincronizada, el caso habitual
+    ("no revocado") se responde sin ir a Redis.
+
+    Sincronización: al arrancar se suscribe a REVOCATION_CHANNEL y después
+    carga las claves revoked:* con SCAN (son pocas: solo viven lo que un
+    access token). Mientras no está sincronizada (arranque, Redis caído,
+    suscripción perdida) cada comprobación consulta Redis, nunca se da por
+    válido un token sin verificarlo.
+    """
+
+    def __init__(self, redis=redis_client, async_redis=async_redis_client,
+                 enabled: bool = settings.ACCESS_REVOCATION_LOCAL_CACHE):
+        self.redis = redis
+        # Para los endpoints async: la comprobación sin sincronizar y revoke_async
+        self.async_redis = async_redis
+        self.enabled = enabled
+        self._revoked: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.local_checks = 0
+        self.redis_checks = 0
+
+    @property
+    def synced(self) -> bool:
+        return self._synced.is_set()
+
+    def _add(self, jti: str, exp: int) -> None:
+        with self._lock:
+            self._revoked[jti] = exp
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        with self._lock:
+            for jti in [jti for jti, exp in self._revoked.items() if exp <= now]:
+                del self._revoked[jti]
+
+    def is_revoked(self, jti: str) -> bool:
+        if self._synced.is_set():
+            self.local_checks += 1
+            return jti in self._revoked
+        self.redis_checks += 1
+        return bool(self.redis.exists(revoked_access_key(jti)))
+
+    async def is_revoked_async(self, jti: str) -> bool:
+        if self._synced.is_set():
+            self.local_checks += 1
+            return jti in self._revoked
+        self.redis_checks += 1
+        return bool(await self.async_redis.exists(revoked_access_key(jti)))
+
+    def _queue_revoke(self, pipe, jti: str, exp: int, ttl: int) -> None:
+        pipe.set(revoked_access_key(jti), 1, ex=ttl)
+        pipe.publish(REVOCATION_CHANNEL, f"{jti}:{exp}")
+
+    def revoke(self, jti: str, exp: int) -> None:
+        """Revoca hasta `exp` (epoch) en Redis, en este worker y en el resto."""
+        ttl = int(exp - time.time())
+        if ttl <= 0:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        self._queue_revoke(pipe, jti, exp, ttl)
+        pipe.execute()
+        self._add(jti, exp)
+
+    async def revoke_async(self, jti: str, exp: int) -> None:
+        ttl = int(exp - time.time())
+        if ttl <= 0:
+            return
+        pipe = self.async_redis.pipeline(transaction=False)
+        self._queue_revoke(pipe, jti, exp, ttl)
+        await pipe.execute()
+        self._add(jti, exp)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._revoked)
+        return {
+            "synced": self.synced,
+            "revoked_tokens": size,
+            "local_checks": self.local_checks,
+            "redis_checks": self.redis_checks,
+        }
+
+    # -----------------------------
+    # Sincronización con Redis
+    # -----------------------------
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="access-revocation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._synced.clear()
+
+    def _load(self) -> None:
+        revoked = {}
+        now = time.time()
+        keys = []
+        for key in self.redis.scan_iter(match=f"{REVOKED_PREFIX}*", count=1000):
+            keys.append(key)
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.ttl(key)
+        for key, ttl in zip(keys, pipe.execute()):
+            if ttl > 0:
+                revoked[key[len(REVOKED_PREFIX):]] = int(now + ttl) + 1
+        with self._lock:
+            # Lo recibido por pub/sub durante la carga se conserva
+            self._revoked.update(revoked)
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                # Primero la suscripción y luego la carga: no se pierde nada entre ambas
+                pubsub.subscribe(REVOCATION_CHANNEL)
+                self._load()
+                self._synced.set()
+                last_purge = time.monotonic()
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1)
+                    if message is not None:
+                        jti, _, exp = message["data"].rpartition(":")
+                        self._add(jti, int(exp))
+                    if time.monotonic() - last_purge > 60:
+                        self._purge_expired()
+                        last_purge = time.monotonic()
+            except RedisError:
+                logger.warning("Suscripción de revocaciones caída; consultando Redis hasta resincronizar",
+                               exc_info=True)
+                self._synced.clear()
+                self._stop.wait(1)
+            finally:
+                try:
+                    pubsub.close()
+                except RedisError:
+                    pass
+
+
+revocation_list = RevocationList()
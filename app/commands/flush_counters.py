@@ -0,0 +1,38 @@
+"""
+Vuelca a la BD los contadores write-behind pendientes en Redis.
+
+Uso:
+    python -m app.commands.flush_counters
+    python -m app.commands.flush_counters --reconcile
+
+La API ya los vuelca en segundo plano (COUNTER_FLUSH_INTERVAL_SECONDS); este
+comando sirve para vaciarlos antes de un mantenimiento. --reconcile recalcula
+después likes_count y comments_count desde las tablas de likes y comentarios
+(descontando los deltas aún pendientes en Redis), p. ej. tras una caída entre
+el commit de un like y su HINCRBY.
+"""
+import argparse
+from app.db.session import SessionLocal
+from app.services.counter_service import CounterService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reconcile", action="store_true", help="Recalcular los contadores desde SQL")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        service = CounterService(db)
+        print(f"Posts actualizados: {service.flush()}")
+        if args.reconcile:
+            if service.reconcile():
+                print("Contadores recalculados desde likes y comentarios")
+            else:
+                print("Otro proceso está volcando los contadores; vuelve a intentarlo")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
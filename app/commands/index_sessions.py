@@ -0,0 +1,26 @@
+"""
+Construye el índice de sesiones por usuario (user_sessions:{user_id}) en Redis.
+
+Uso:
+    python -m app.commands.index_sessions
+
+Necesario una sola vez al desplegar el índice: las sesiones creadas antes no
+aparecen en GET /auth/sessions ni se cierran con terminate-others hasta
+indexarlas. Recorre las claves session:* con SCAN; es idempotente.
+"""
+import argparse
+from app.core.redis import redis_client
+from app.services.session_service import SessionService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    indexed = SessionService(redis_client).rebuild_index(args.batch_size)
+    print(f"Sesiones indexadas: {indexed}")
+
+
+if __name__ == "__main__":
+    main()
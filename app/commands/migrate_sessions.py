@@ -0,0 +1,87 @@
+"""
+Migra las sesiones JSON de Redis al formato hash compacto.
+
+Uso:
+    python -m app.commands.migrate_sessions
+    python -m app.commands.migrate_sessions --dry-run
+
+Convierte cada session:{user_id}:{device_id} que siga siendo un string JSON
+en un hash con campos cortos (SessionService.compact), conservando su TTL, y
+la añade al índice user_sessions:{user_id}. Unifica las claves del jti: solo
+queda refresh_token:{jti} y se borran las claves refresh_jti:* duplicadas.
+Es idempotente; ejecutarlo al desplegar, antes de arrancar la nueva versión
+(que ya no lee sesiones JSON).
+"""
+import argparse
+import json
+from datetime import datetime, timezone
+from app.core.redis import redis_client
+from app.services.session_service import SessionService
+
+
+def _migrate_batch(service: SessionService, keys: list[str], dry_run: bool) -> int:
+    redis = service.redis
+    pipe = redis.pipeline(transaction=False)
+    for key in keys:
+        pipe.type(key)
+        pipe.ttl(key)
+    results = pipe.execute()
+    legacy = [(key, ttl) for key, key_type, ttl in zip(keys, results[::2], results[1::2])
+              if key_type == "string" and ttl > 0]
+    if not legacy:
+        return 0
+
+    raws = redis.mget([key for key, _ in legacy])
+    now = datetime.now(timezone.utc).timestamp()
+    pipe = redis.pipeline(transaction=False)
+    migrated = 0
+    for (key, ttl), raw in zip(legacy, raws):
+        if not raw:
+            continue
+        session = json.loads(raw)
+        _, user_id, device_id = key.split(":", 2)
+        migrated += 1
+        if dry_run:
+            continue
+        pipe.delete(key)
+        pipe.hset(key, mapping=service.compact(session))
+        pipe.expire(key, ttl)
+        service._index_session(pipe, int(user_id), device_id,
+                               datetime.fromtimestamp(now + ttl, timezone.utc), ttl)
+    pipe.execute()
+    return migrated
+
+
+def migrate(service: SessionService, batch_size: int, dry_run: bool = False) -> tuple[int, int]:
+    redis = service.redis
+    migrated = 0
+    batch = []
+    for key in redis.scan_iter(match="session:*", count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            migrated += _migrate_batch(service, batch, dry_run)
+            batch = []
+    if batch:
+        migrated += _migrate_batch(service, batch, dry_run)
+
+    # refresh_jti:{jti} duplicaba refresh_token:{jti} (mismo jti, mismo TTL)
+    removed = 0
+    for key in redis.scan_iter(match="refresh_jti:*", count=batch_size):
+        removed += 1
+        if not dry_run:
+            redis.unlink(key)
+    return migrated, removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Solo contar, sin escribir")
+    args = parser.parse_args()
+
+    migrated, removed = migrate(SessionService(redis_client), args.batch_size, args.dry_run)
+    print(f"Sesiones migradas: {migrated}; claves refresh_jti eliminadas: {removed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Reconstruye los timelines del feed en Redis desde la base de datos.
+
+Uso:
+    python -m app.commands.rebuild_timelines --user-id 1 --user-id 2
+    python -m app.commands.rebuild_timelines --all
+    python -m app.commands.rebuild_timelines --all --refresh-pulled
+
+Los timelines fríos o expulsados también se reconstruyen solos en la primera
+lectura de /posts/feed; este comando sirve para precalentarlos (p. ej. tras
+un FLUSHALL o un cambio de TIMELINE_MAX_LENGTH). --refresh-pulled recalcula
+antes qué autores están en modo pull (tras cambiar FEED_PULL_FOLLOWER_THRESHOLD
+o perder los datos de Redis: la marca no se recalcula sola al publicar).
+"""
+import argparse
+from app.db.session import SessionLocal
+from app.models import Follow
+from app.services.timeline_service import TimelineService
+
+BATCH_SIZE = 1000
+
+
+def _all_follower_ids(db):
+    last_id = 0
+    while True:
+        rows = (
+            db.query(Follow.follower_id)
+            .filter(Follow.follower_id > last_id)
+            .distinct()
+            .order_by(Follow.follower_id)
+            .limit(BATCH_SIZE)
+            .all()
+        )
+        if not rows:
+            return
+        for (follower_id,) in rows:
+            yield follower_id
+        last_id = rows[-1][0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--user-id", type=int, action="append", dest="user_ids")
+    group.add_argument("--all", action="store_true", help="Todos los usuarios que siguen a alguien")
+    parser.add_argument("--refresh-pulled", action="store_true", help="Recalcular los autores en modo pull")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        service = TimelineService(db)
+        if args.refresh_pulled:
+            pulled = service.refresh_pulled_authors()
+            print(f"Autores en modo pull: {len(pulled)}")
+        user_ids = _all_follower_ids(db) if args.all else args.user_ids
+        rebuilt = 0
+        for user_id in user_ids:
+            service.rebuild(user_id)
+            rebuilt += 1
+        print(f"Timelines reconstruidos: {rebuilt}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
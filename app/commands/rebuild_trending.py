@@ -0,0 +1,32 @@
+"""
+Recalcula el ranking "trending" de Redis desde la base de datos.
+
+Uso:
+    python -m app.commands.rebuild_trending
+
+La aplicación ya lo hace al arrancar y cada TRENDING_REBUILD_INTERVAL_SECONDS
+(TrendingRebuilder); este comando sirve para forzarlo o para lanzarlo por cron
+con el intervalo a 0. Mueve el epoch de los scores a "ahora", descarta los
+posts fuera de TRENDING_WINDOW_HOURS y corrige la deriva de las
+actualizaciones incrementales. Mientras el ranking no exista order=trending
+se sirve con la aproximación SQL.
+"""
+import argparse
+from app.db.session import SessionLocal
+from app.services.trending_service import TrendingService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        ranked = TrendingService(db).rebuild()
+        print(f"Posts en el ranking trending: {ranked}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,106 @@ class Settings:
     PROJECT_NAME: str = "DevCommunity"
     PROJECT_VERSION: str = "0.1.0"
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./devcommunity.db")
+    # Perfil de SQLite (ver app/db/sqlite.py): "performance" aplica WAL,
+    # synchronous=NORMAL, busy_timeout, mmap, caché y temp_store en memoria
+    # al abrir cada conexión; "default" no toca los PRAGMAs.
+    SQLITE_PROFILE: str = os.getenv("SQLITE_PROFILE", "performance")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+    # Pool de conexiones síncrono (PostgreSQL): conexiones abiertas, extra
+    # temporales y segundos de espera por una conexión antes de fallar.
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # Con SQLite el pool mantiene abiertas SQLITE_POOL_SIZE conexiones (una por
+    # hilo del threadpool, 40 por defecto) y no limita las extra: ver engine_options.
+    SQLITE_POOL_SIZE: int = int(os.getenv("SQLITE_POOL_SIZE", "40"))
+    # Cola de un solo escritor para SQLite: likes y comentarios se ejecutan en
+    # un hilo con su propia conexión que agrupa hasta SQLITE_WRITE_BATCH_SIZE
+    # operaciones en una transacción (un commit) en vez de competir por el
+    # bloqueo de escritura. Espera hasta SQLITE_WRITE_BATCH_WAIT_MS a que se
+    # llene el lote.
+    SQLITE_WRITE_QUEUE_ENABLED: bool = os.getenv("SQLITE_WRITE_QUEUE_ENABLED", "false").lower() == "true"
+    SQLITE_WRITE_BATCH_SIZE: int = int(os.getenv("SQLITE_WRITE_BATCH_SIZE", "64"))
+    SQLITE_WRITE_BATCH_WAIT_MS: float = float(os.getenv("SQLITE_WRITE_BATCH_WAIT_MS", "2"))
+    # Stack async opcional (AsyncSession + aiosqlite/asyncpg) para las lecturas
+    # de posts y los endpoints de mensajes y notificaciones. La URL async se
+    # deriva de DATABASE_URL si no se indica (sqlite+aiosqlite / postgresql+asyncpg).
+    ASYNC_DB_ENABLED: bool = os.getenv("ASYNC_DB_ENABLED", "false").lower() == "true"
+    ASYNC_DATABASE_URL: str | None = os.getenv("ASYNC_DATABASE_URL")
+    # Instrumentación SQL por petición (app/db/query_stats.py): sentencias,
+    # tiempo en BD y sentencias repetidas. Una misma sentencia ejecutada
+    # SQL_N_PLUS_ONE_THRESHOLD veces en una petición se registra como posible
+    # N+1; las que tardan SQL_SLOW_QUERY_MS o más se registran con su EXPLAIN.
+    # DEBUG=true añade las cabeceras X-DB-* a las respuestas.
+    SQL_INSTRUMENTATION_ENABLED: bool = os.getenv("SQL_INSTRUMENTATION_ENABLED", "true").lower() == "true"
+    SQL_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+    SQL_SLOW_QUERY_MS: float = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+    DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
+    # Métricas Prometheus en GET /metrics (requiere prometheus_client). Con
+    # varios workers de uvicorn, PROMETHEUS_MULTIPROC_DIR debe apuntar a un
+    # directorio vacío compartido por todos. Los gauges de threadpool, pools
+    # de conexiones y bcrypt se muestrean cada METRICS_SAMPLE_INTERVAL_SECONDS.
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_SAMPLE_INTERVAL_SECONDS: float = float(os.getenv("METRICS_SAMPLE_INTERVAL_SECONDS", "1"))
     # Clave secreta para firmar JWT.
     # OBLIGATORIA: debe definirse en el .env. Si falta, la app falla de forma visible y segura.
     SECRET_KEY: str = os.environ["SECRET_KEY"]
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # Timeouts de Redis (segundos): conexión y lectura/escritura de un comando.
+    REDIS_CONNECT_TIMEOUT: float = float(os.getenv("REDIS_CONNECT_TIMEOUT", "2"))
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+    # Pool del cliente asíncrono: conexiones máximas por worker y segundos que
+    # una petición espera a que quede una libre antes de fallar.
+    REDIS_ASYNC_MAX_CONNECTIONS: int = int(os.getenv("REDIS_ASYNC_MAX_CONNECTIONS", "64"))
+    REDIS_ASYNC_POOL_TIMEOUT: float = float(os.getenv("REDIS_ASYNC_POOL_TIMEOUT", "2"))
+    # Timelines del feed en Redis (fan-out on write).
+    # FEED_TIMELINES_ENABLED=false fuerza siempre la consulta SQL del feed.
+    FEED_TIMELINES_ENABLED: bool = os.getenv("FEED_TIMELINES_ENABLED", "true").lower() == "true"
+    TIMELINE_MAX_LENGTH: int = int(os.getenv("TIMELINE_MAX_LENGTH", "800"))
+    TIMELINE_TTL_SECONDS: int = int(os.getenv("TIMELINE_TTL_SECONDS", str(7 * 24 * 3600)))
+    # Feed híbrido: autores con al menos este número de seguidores no hacen fan-out;
+    # sus posts se leen ("pull") de su lista reciente y se mezclan al leer el feed.
+    FEED_PULL_FOLLOWER_THRESHOLD: int = int(os.getenv("FEED_PULL_FOLLOWER_THRESHOLD", "10000"))
+    # Posts recientes por autor que se guardan y se consideran en la mezcla.
+    FEED_PULL_MERGE_DEPTH: int = int(os.getenv("FEED_PULL_MERGE_DEPTH", "200"))
+    # Ranking "trending": (peso base + likes*W + comentarios*W) con decaimiento
+    # exponencial por antigüedad del post (vida media en horas).
+    TRENDING_HALF_LIFE_HOURS: float = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+    TRENDING_POST_WEIGHT: float = float(os.getenv("TRENDING_POST_WEIGHT", "1"))
+    TRENDING_LIKE_WEIGHT: float = float(os.getenv("TRENDING_LIKE_WEIGHT", "1"))
+    TRENDING_COMMENT_WEIGHT: float = float(os.getenv("TRENDING_COMMENT_WEIGHT", "2"))
+    TRENDING_MAX_POSTS: int = int(os.getenv("TRENDING_MAX_POSTS", "1000"))
+    TRENDING_WINDOW_HOURS: int = int(os.getenv("TRENDING_WINDOW_HOURS", "168"))
+    # Recalculo periódico del ranking (epoch, ventana y deriva) en un hilo de
+    # cada worker; uno solo por intervalo gracias a un lock en Redis. 0 lo
+    # desactiva (p. ej. si se lanza app.commands.rebuild_trending por cron).
+    TRENDING_REBUILD_INTERVAL_SECONDS: float = float(os.getenv("TRENDING_REBUILD_INTERVAL_SECONDS", "3600"))
+    # Contadores write-behind (likes_count / comments_count): deltas en Redis
+    # volcados a la BD por un hilo en segundo plano cada N segundos.
+    COUNTERS_WRITE_BEHIND: bool = os.getenv("COUNTERS_WRITE_BEHIND", "true").lower() == "true"
+    COUNTER_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("COUNTER_FLUSH_INTERVAL_SECONDS", "1"))
+    # Gateway en tiempo real (WebSocket/SSE): eventos pendientes por conexión
+    # antes de desconectar a un cliente lento, y intervalo del heartbeat.
+    REALTIME_QUEUE_SIZE: int = int(os.getenv("REALTIME_QUEUE_SIZE", "100"))
+    REALTIME_HEARTBEAT_SECONDS: float = float(os.getenv("REALTIME_HEARTBEAT_SECONDS", "25"))
+    # Caché por worker del usuario autenticado (get_current_user): entradas
+    # máximas (LRU) y segundos de vida. 0 desactiva la caché.
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    USER_CACHE_TTL_SECONDS: float = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+    # Copia local por worker de los access tokens revocados (sincronizada por
+    # pub/sub): el caso "no revocado" no consulta Redis en cada petición.
+    ACCESS_REVOCATION_LOCAL_CACHE: bool = os.getenv("ACCESS_REVOCATION_LOCAL_CACHE", "true").lower() == "true"
+    # bcrypt en un pool de procesos: procesos, operaciones en cola antes de
+    # responder 503, rondas (coste) de bcrypt y nice de los procesos.
+    # BCRYPT_WORKERS=0 lo ejecuta en línea.
+    BCRYPT_WORKERS: int = int(os.getenv("BCRYPT_WORKERS", "2"))
+    BCRYPT_QUEUE_SIZE: int = int(os.getenv("BCRYPT_QUEUE_SIZE", "8"))
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    BCRYPT_NICE: int = int(os.getenv("BCRYPT_NICE", "10"))
     # IPs de proxies/load-balancers de confianza (separadas por coma en la env var).
     # Solo estas IPs pueden propagar X-Forwarded-For de forma válida.
     # Ejemplo: TRUSTED_PROXIES="10.0.0.1,10.0.0.2"
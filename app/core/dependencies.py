@@ -1,30 +1,19 @@
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.session import SessionLocal, get_db
 from app.models.user import User
-from app.auth.auth_handler import decode_access_token
+from app.auth.auth_handler import decode_access_token, decode_access_token_async, token_version_matches
+from app.services.user_cache import UserPrincipal, user_cache
 
 # OAuth2PasswordBearer: esquema estándar para APIs con JWT + sesiones.
 # tokenUrl le indica a Swagger dónde obtener el token.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    Dependencia que extrae y valida el JWT del header Authorization.
-    - Verifica firma, expiración Y el blacklist de Redis (tokens revocados por logout).
-    - 401 si el token falta, es inválido, expiró o fue revocado.
-    - 404 si el usuario del token ya no existe en la BD.
-    """
-    # decode_access_token ya verifica: firma, expiración, tipo y blacklist de Redis.
-    # Lanza HTTP 401 automáticamente si cualquiera de esas validaciones falla.
-    payload = decode_access_token(token)
-
+def _token_subject(payload: dict) -> str:
     email: str | None = payload.get("sub")
     if email is None:
         raise HTTPException(
@@ -32,18 +21,106 @@ def get_current_user(
             detail="No autenticado: token inválido o expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return email
+
 
+def _load_principal(email: str, db: Session) -> UserPrincipal:
+    """Principal desde la BD (fallo de caché); lo guarda en la caché del worker."""
+    generation = user_cache.generation
     user = db.query(User).filter(User.email == email).first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario no encontrado"
         )
+    principal = UserPrincipal.from_user(user)
+    user_cache.put(principal, generation)
+    return principal
+
+
+def _load_principal_in_new_session(email: str) -> UserPrincipal:
+    with SessionLocal() as db:
+        return _load_principal(email, db)
+
+
+def _check_token_version(payload: dict, principal: UserPrincipal) -> UserPrincipal:
+    if not token_version_matches(payload, principal.token_version):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sesión cerrada: vuelve a iniciar sesión",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
+
+
+def resolve_principal(payload: dict, db: Session) -> UserPrincipal:
+    """
+    Usuario de un access token ya decodificado: desde la caché del worker o,
+    si no está, desde la BD. 401 si el token es de una versión anterior
+    (token_version incrementada: logout global, cambio de contraseña o de rol).
+    """
+    email = _token_subject(payload)
+    principal = user_cache.get(email) or _load_principal(email, db)
+    return _check_token_version(payload, principal)
+
 
+async def resolve_principal_async(payload: dict) -> UserPrincipal:
+    """
+    resolve_principal desde el event loop: con el usuario en caché no hay
+    I/O; solo un fallo de caché consulta la BD en el threadpool.
+    """
+    email = _token_subject(payload)
+    principal = user_cache.get(email)
+    if principal is None:
+        principal = await run_in_threadpool(_load_principal_in_new_session, email)
+    return _check_token_version(payload, principal)
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db, scope="function")
+) -> UserPrincipal:
+    """
+    Dependencia que extrae y valida el JWT del header Authorization.
+    - Verifica firma, expiración Y la revocación por logout (jti).
+    - 401 si el token falta, es inválido, expiró, fue revocado o su versión
+      ya no es la del usuario.
+    - 404 si el usuario del token ya no existe en la BD.
+    Devuelve un UserPrincipal (id, email, username, role) cacheado por worker;
+    solo consulta la BD si no está en caché. Para el objeto ORM completo usar
+    get_current_user_model.
+    """
+    # decode_access_token ya verifica: firma, expiración, tipo y revocación (jti).
+    # Lanza HTTP 401 automáticamente si cualquiera de esas validaciones falla.
+    payload = decode_access_token(token)
+    return resolve_principal(payload, db)
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme)) -> UserPrincipal:
+    """
+    get_current_user para endpoints `async def` que solo usan Redis: no abre
+    sesión de BD ni ocupa un hilo del threadpool salvo en un fallo de caché.
+    Mismas validaciones y errores que get_current_user.
+    """
+    payload = await decode_access_token_async(token)
+    return await resolve_principal_async(payload)
+
+
+def get_current_user_model(
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: Session = Depends(get_db, scope="function")
+) -> User:
+    """Usuario autenticado como objeto ORM (se carga solo en los endpoints que lo piden)."""
+    user = current_user.load(db)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado"
+        )
     return user
 
 
-def admin_only(current_user: User = Depends(get_current_user)) -> User:
+def admin_only(current_user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
     """
     Dependencia que exige que el usuario autenticado tenga rol 'admin'.
     - 403 si el usuario no es admin.
@@ -7,6 +7,7 @@ def app_exception_handler(request: Request, exc: AppException):
         status_code=exc.status_code,
         content={
             "detail": exc.message
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
@@ -0,0 +1,326 @@
+import asyncio
+import logging
+import os
+import time
+import anyio.to_thread
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from redis.exceptions import RedisError
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.db.query_stats import current_query_stats
+
+logger = logging.getLogger(__name__)
+
+# prometheus_client solo es necesario con METRICS_ENABLED=true: este módulo
+# únicamente se importa en ese caso. Con PROMETHEUS_MULTIPROC_DIR cada worker
+# escribe sus valores en ficheros mmap propios (sin coordinación entre
+# procesos) y GET /metrics los agrega; los gauges "livesum" suman los
+# workers vivos.
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta", ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso", multiprocess_mode="livesum",
+)
+# Contadores (no histogramas): una escritura por petición; la media por
+# petición sale de dividir entre http_request_duration_seconds_count
+REQUEST_DB_STATEMENTS = Counter(
+    "http_request_db_statements", "Sentencias SQL de las peticiones", ["method", "route"],
+)
+REQUEST_DB_TIME = Counter(
+    "http_request_db_seconds", "Tiempo en BD de las peticiones", ["method", "route"],
+)
+REQUEST_N_PLUS_ONE = Counter(
+    "http_requests_n_plus_one_total", "Peticiones con una sentencia repetida (posible N+1)", ["method", "route"],
+)
+THREADPOOL_BUSY = Gauge(
+    "threadpool_threads_busy", "Hilos del threadpool de AnyIO ocupados", multiprocess_mode="livesum",
+)
+THREADPOOL_SIZE = Gauge(
+    "threadpool_threads_total", "Hilos máximos del threadpool de AnyIO", multiprocess_mode="livesum",
+)
+THREADPOOL_WAITING = Gauge(
+    "threadpool_tasks_waiting", "Tareas esperando un hilo del threadpool", multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUT = Histogram(
+    "db_pool_checkout_seconds", "Espera para obtener una conexión del pool", ["engine"],
+    buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out", "Conexiones del pool en uso", ["engine"], multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Conexiones permanentes del pool", ["engine"], multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Conexiones extra del pool abiertas", ["engine"], multiprocess_mode="livesum",
+)
+REDIS_LATENCY = Histogram(
+    "redis_command_duration_seconds", "Latencia de los comandos de Redis", ["client", "command"],
+    buckets=FAST_BUCKETS,
+)
+REDIS_ERRORS = Counter(
+    "redis_command_errors_total", "Comandos de Redis fallidos", ["client", "command", "error"],
+)
+BCRYPT_IN_FLIGHT = Gauge(
+    "bcrypt_operations_in_flight", "Hash/verificaciones de bcrypt en curso o en cola", multiprocess_mode="livesum",
+)
+BCRYPT_QUEUE_DEPTH = Gauge(
+    "bcrypt_queue_depth", "Operaciones de bcrypt esperando un proceso libre", multiprocess_mode="livesum",
+)
+BCRYPT_REJECTED = Counter(
+    "bcrypt_rejected_total", "Logins/registros rechazados con 503 por el control de admisión",
+)
+
+# Engines instrumentados, por nombre (etiqueta "engine"), para el sampler
+_engines: dict[str, Engine] = {}
+
+
+class MetricsMiddleware:
+    """
+    Latencia por ruta (plantilla, no la URL: cardinalidad acotada), peticiones
+    en curso y, si QueryStatsMiddleware la envuelve, sentencias y tiempo en BD
+    de cada petición. ASGI puro: solo observa el status de la respuesta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # Series ya resueltas por etiquetas: labels() valida y toma un lock en
+        # cada llamada. Solo se accede desde el event loop.
+        self._latency: dict[tuple, object] = {}
+        self._db: dict[tuple, tuple] = {}
+
+    def _latency_series(self, method: str, route: str, status: int):
+        key = (method, route, status)
+        series = self._latency.get(key)
+        if series is None:
+            series = self._latency[key] = REQUEST_LATENCY.labels(method, route, str(status))
+        return series
+
+    def _db_series(self, method: str, route: str) -> tuple:
+        key = (method, route)
+        series = self._db.get(key)
+        if series is None:
+            series = self._db[key] = (
+                REQUEST_DB_STATEMENTS.labels(method, route),
+                REQUEST_DB_TIME.labels(method, route),
+                REQUEST_N_PLUS_ONE.labels(method, route),
+            )
+        return series
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            method = scope["method"]
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            self._latency_series(method, route, status).observe(time.perf_counter() - started)
+            stats = current_query_stats.get()
+            if stats is not None and stats.statements:
+                statements, db_time, n_plus_one = self._db_series(method, route)
+                statements.inc(stats.statements)
+                db_time.inc(stats.duration)
+                if stats.suspected_n_plus_one():
+                    n_plus_one.inc()
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Histograma de espera del pool de `engine`; el sampler publica su ocupación."""
+    pool = engine.pool
+    connect = pool.connect
+    checkout = DB_POOL_CHECKOUT.labels(name)
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            checkout.observe(time.perf_counter() - started)
+
+    # Pool no tiene evento previo al checkout: se cronometra la llamada
+    pool.connect = timed_connect
+    _engines[name] = engine
+
+
+def _redis_latency(name: str):
+    """Serie de latencia por comando de un cliente, resuelta una vez por comando."""
+    cache = {}
+
+    def series(command: str):
+        latency = cache.get(command)
+        if latency is None:
+            # Carrera benigna entre hilos: labels() devuelve la misma serie
+            latency = cache[command] = REDIS_LATENCY.labels(name, command)
+        return latency
+
+    return series
+
+
+def instrument_redis(client, name: str) -> None:
+    """Latencia y errores por comando de un cliente de Redis (síncrono); los pipelines cuentan como PIPELINE."""
+    execute_command = client.execute_command
+    pipeline_factory = client.pipeline
+    latency = _redis_latency(name)
+
+    def timed_execute_command(*args, **options):
+        command = str(args[0]).upper()
+        started = time.perf_counter()
+        try:
+            return execute_command(*args, **options)
+        except RedisError as exc:
+            REDIS_ERRORS.labels(name, command, type(exc).__name__).inc()
+            raise
+        finally:
+            latency(command).observe(time.perf_counter() - started)
+
+    def pipeline(*args, **kwargs):
+        pipe = pipeline_factory(*args, **kwargs)
+        execute = pipe.execute
+
+        def timed_execute(*exec_args, **exec_kwargs):
+            started = time.perf_counter()
+            try:
+                return execute(*exec_args, **exec_kwargs)
+            except RedisError as exc:
+                REDIS_ERRORS.labels(name, "PIPELINE", type(exc).__name__).inc()
+                raise
+            finally:
+                latency("PIPELINE").observe(time.perf_counter() - started)
+
+        pipe.execute = timed_execute
+        return pipe
+
+    client.execute_command = timed_execute_command
+    client.pipeline = pipeline
+
+
+def instrument_async_redis(client, name: str) -> None:
+    """Como instrument_redis para un cliente de redis.asyncio."""
+    execute_command = client.execute_command
+    pipeline_factory = client.pipeline
+    latency = _redis_latency(name)
+
+    async def timed_execute_command(*args, **options):
+        command = str(args[0]).upper()
+        started = time.perf_counter()
+        try:
+            return await execute_command(*args, **options)
+        except RedisError as exc:
+            REDIS_ERRORS.labels(name, command, type(exc).__name__).inc()
+            raise
+        finally:
+            latency(command).observe(time.perf_counter() - started)
+
+    def pipeline(*args, **kwargs):
+        pipe = pipeline_factory(*args, **kwargs)
+        execute = pipe.execute
+
+        async def timed_execute(*exec_args, **exec_kwargs):
+            started = time.perf_counter()
+            try:
+                return await execute(*exec_args, **exec_kwargs)
+            except RedisError as exc:
+                REDIS_ERRORS.labels(name, "PIPELINE", type(exc).__name__).inc()
+                raise
+            finally:
+                latency("PIPELINE").observe(time.perf_counter() - started)
+
+        pipe.execute = timed_execute
+        return pipe
+
+    client.execute_command = timed_execute_command
+    client.pipeline = pipeline
+
+
+class MetricsSampler:
+    """
+    Publica cada `interval` segundos los gauges que no cambian en un punto
+    concreto del código: threadpool de AnyIO, ocupación de los pools de
+    conexiones y cola de bcrypt. Corre en el event loop (el limitador de
+    AnyIO solo se puede consultar desde él), fuera del camino de las peticiones.
+    """
+
+    def __init__(self, password_hasher, interval: float = settings.METRICS_SAMPLE_INTERVAL_SECONDS):
+        self.password_hasher = password_hasher
+        self.interval = interval
+        self._rejected = password_hasher.rejected
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.sample()
+            except Exception:
+                logger.warning("No se pudieron muestrear las métricas", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def sample(self) -> None:
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+        THREADPOOL_SIZE.set(limiter.total_tokens)
+        THREADPOOL_WAITING.set(limiter.statistics().tasks_waiting)
+
+        for name, engine in _engines.items():
+            pool = engine.pool
+            # QueuePool; SingletonThreadPool/StaticPool no informan de todo
+            if hasattr(pool, "checkedout"):
+                DB_POOL_CHECKED_OUT.labels(name).set(pool.checkedout())
+            if hasattr(pool, "size"):
+                DB_POOL_SIZE.labels(name).set(pool.size())
+            if hasattr(pool, "overflow"):
+                DB_POOL_OVERFLOW.labels(name).set(max(pool.overflow(), 0))
+
+        stats = self.password_hasher.stats()
+        BCRYPT_IN_FLIGHT.set(stats["in_flight"])
+        BCRYPT_QUEUE_DEPTH.set(max(stats["in_flight"] - max(stats["workers"], 1), 0))
+        if stats["rejected"] > self._rejected:
+            BCRYPT_REJECTED.inc(stats["rejected"] - self._rejected)
+        self._rejected = stats["rejected"]
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Exposición en formato texto de Prometheus (agregando los workers en modo multiproceso)."""
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead() -> None:
+    """Al parar el worker: sus gauges "livesum" dejan de contar en el agregado."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,70 @@
+import logging
+from starlette.datastructures import MutableHeaders
+from app.core.config import settings
+from app.db.query_stats import RequestQueryStats, current_query_stats, query_stats_registry
+
+logger = logging.getLogger(__name__)
+
+
+def route_label(scope) -> str | None:
+    """Método y plantilla de la ruta ("GET /posts/{post_id}"); None si ninguna coincidió."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return f"{scope['method']} {path}" if path else None
+
+
+class QueryStatsMiddleware:
+    """
+    Instrumentación SQL por petición (ASGI puro, sin envolver la respuesta).
+
+    Abre unas RequestQueryStats para la petición y, al empezar la respuesta
+    (el commit de get_db ya se ha hecho), acumula los totales de la ruta en
+    query_stats_registry y registra como posible N+1 cada sentencia repetida
+    SQL_N_PLUS_ONE_THRESHOLD veces. Con `headers` (DEBUG) añade X-DB-Statements,
+    X-DB-Time-Ms, X-DB-Slow-Queries y X-DB-N-Plus-One a la respuesta.
+    """
+
+    def __init__(self, app, headers: bool = settings.DEBUG, threshold: int = settings.SQL_N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.headers = headers
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = current_query_stats.set(stats)
+        finished = False
+
+        def finish() -> list:
+            nonlocal finished
+            finished = True
+            suspects = stats.suspected_n_plus_one(self.threshold)
+            label = route_label(scope)
+            if label is None:
+                return suspects
+            query_stats_registry.record(label, stats, len(suspects))
+            for statement, count in suspects:
+                logger.warning("Posible N+1 en %s: %s ejecuciones de %s", label, count, statement[:500])
+            return suspects
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start" and not finished:
+                suspects = finish()
+                if self.headers:
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Statements"] = str(stats.statements)
+                    headers["X-DB-Time-Ms"] = f"{stats.duration * 1000:.2f}"
+                    headers["X-DB-Slow-Queries"] = str(stats.slow_queries)
+                    headers["X-DB-N-Plus-One"] = str(len(suspects))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            # Excepción sin respuesta (la genera ServerErrorMiddleware, por fuera)
+            if not finished:
+                finish()
+            current_query_stats.reset(token)
@@ -1,5 +1,25 @@
 from redis import Redis
+from redis.asyncio import BlockingConnectionPool as AsyncBlockingConnectionPool, Redis as AsyncRedis
 from app.core.config import settings
 
 # Single Redis client instance shared across the application
-redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+redis_client = Redis.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+)
+
+# Cliente asíncrono: gateway en tiempo real (pub/sub) y endpoints async que
+# solo usan Redis (sesiones, logout, revocación). Pool acotado: con todas las
+# conexiones ocupadas se espera hasta REDIS_ASYNC_POOL_TIMEOUT en lugar de
+# abrir conexiones sin límite.
+async_redis_pool = AsyncBlockingConnectionPool.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    max_connections=settings.REDIS_ASYNC_MAX_CONNECTIONS,
+    timeout=settings.REDIS_ASYNC_POOL_TIMEOUT,
+    socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+)
+async_redis_client = AsyncRedis(connection_pool=async_redis_pool)
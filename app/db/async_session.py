@@ -0,0 +1,68 @@
+import logging
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.core.config import settings
+from app.db.session import ASYNC_AFTER_COMMIT_KEY, SQLALCHEMY_DATABASE_URL, SessionLocal
+from app.db.query_stats import install_query_instrumentation
+from app.db.sqlite import install_sqlite_profile
+
+logger = logging.getLogger(__name__)
+
+# Driver async por dialecto. aiosqlite/asyncpg son dependencias opcionales:
+# este módulo solo se importa con ASYNC_DB_ENABLED=true (o desde los benchmarks).
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL con el driver async de su dialecto (sqlite:/// -> sqlite+aiosqlite:///)."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"Sin driver async para {parsed.get_backend_name()}; define ASYNC_DATABASE_URL")
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_database_url(SQLALCHEMY_DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+# Mismos PRAGMAs que el engine síncrono (aiosqlite abre conexiones sqlite3)
+install_sqlite_profile(async_engine.sync_engine)
+install_query_instrumentation(async_engine.sync_engine)
+
+# sync_session_class: las AsyncSession envuelven la misma clase de sesión que
+# SessionLocal, así que los listeners registrados sobre ella (run_after_commit,
+# invalidación de la caché de usuarios) funcionan igual en el stack async.
+# expire_on_commit=False es obligatorio: un atributo expirado se recargaría
+# con una consulta implícita, que en una AsyncSession no está permitida.
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    sync_session_class=SessionLocal.class_,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+async def get_async_db():
+    """
+    Unidad de trabajo por petición, igual que get_db pero con AsyncSession:
+    los repositorios async solo hacen flush() y aquí se hace un único commit.
+    Declarar con Depends(get_async_db, scope="function").
+    """
+    db = AsyncSessionLocal()
+    try:
+        yield db
+        await db.commit()
+        # Efectos externos async (publicar en Redis) solo si el commit se hizo
+        callbacks = db.info.pop(ASYNC_AFTER_COMMIT_KEY, [])
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
+    for callback in callbacks:
+        # Como run_commit_callbacks: el commit ya se hizo, un efecto fallido no es un error de la petición
+        try:
+            await callback()
+        except Exception:
+            logger.exception("Error en un efecto tras el commit")
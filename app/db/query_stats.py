@@ -0,0 +1,142 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Listas IN (...) y VALUES (...) expandidas: mismo patrón con cualquier número de parámetros
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+# Las sentencias salen de la caché de compilación de SQLAlchemy: se repiten
+# los mismos textos y la normalización se hace una vez por cada uno
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """Sentencia normalizada: sin saltos de línea y con las listas de parámetros colapsadas."""
+    return _PARAM_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class RequestQueryStats:
+    """Sentencias SQL de una petición: número, tiempo total en BD y repeticiones por sentencia."""
+
+    __slots__ = ("statements", "duration", "slow_queries", "fingerprints")
+
+    def __init__(self):
+        self.statements = 0
+        self.duration = 0.0
+        self.slow_queries = 0
+        self.fingerprints: Counter = Counter()
+
+    def suspected_n_plus_one(self, threshold: int = settings.SQL_N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int]]:
+        """
+        Sentencias ejecutadas `threshold` veces o más: la misma consulta con
+        distintos parámetros en una sola petición suele ser una relación
+        cargada de forma perezosa dentro de un bucle.
+        """
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count >= threshold]
+
+
+# Estadísticas de la petición en curso. El objeto es mutable y las copias del
+# contexto (threadpool de FastAPI, greenlets de AsyncSession, cola de
+# escritura) comparten la misma instancia.
+current_query_stats: ContextVar[RequestQueryStats | None] = ContextVar("current_query_stats", default=None)
+
+
+class QueryStatsRegistry:
+    """Totales por ruta de las peticiones instrumentadas en este worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: dict[str, dict] = {}
+
+    def record(self, route: str, stats: RequestQueryStats, suspects: int) -> None:
+        with self._lock:
+            totals = self._routes.get(route)
+            if totals is None:
+                totals = self._routes[route] = {
+                    "requests": 0, "statements": 0, "db_time_ms": 0.0,
+                    "max_statements": 0, "slow_queries": 0, "n_plus_one_requests": 0,
+                }
+            totals["requests"] += 1
+            totals["statements"] += stats.statements
+            totals["db_time_ms"] += stats.duration * 1000
+            totals["max_statements"] = max(totals["max_statements"], stats.statements)
+            totals["slow_queries"] += stats.slow_queries
+            totals["n_plus_one_requests"] += 1 if suspects else 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                route: {
+                    **totals,
+                    "db_time_ms": round(totals["db_time_ms"], 2),
+                    "avg_statements": round(totals["statements"] / totals["requests"], 2),
+                }
+                for route, totals in sorted(self._routes.items())
+            }
+
+
+query_stats_registry = QueryStatsRegistry()
+
+
+def _explain(conn, statement: str, parameters) -> list[str]:
+    # Con el cursor del driver: la consulta del plan no pasa por los eventos
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(conn, statement: str, parameters, elapsed: float) -> None:
+    plan = None
+    if statement.lstrip().upper().startswith(_EXPLAINABLE):
+        try:
+            plan = _explain(conn, statement, parameters)
+        except Exception:
+            logger.debug("No se pudo obtener el EXPLAIN de una consulta lenta", exc_info=True)
+    logger.warning(
+        "Consulta lenta (%.1f ms): %s | parámetros: %r%s",
+        elapsed * 1000, fingerprint(statement), parameters,
+        "".join(f"\n    {line}" for line in plan) if plan else "",
+    )
+
+
+def install_query_instrumentation(engine: Engine) -> None:
+    """
+    Cuenta y cronometra cada sentencia de `engine` en las estadísticas de la
+    petición en curso y registra las que superan SQL_SLOW_QUERY_MS con su plan
+    (también fuera de una petición: hilos en segundo plano, comandos).
+    """
+    if not settings.SQL_INSTRUMENTATION_ENABLED:
+        return
+    slow_threshold = settings.SQL_SLOW_QUERY_MS / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # En el contexto de ejecución: si la sentencia falla no queda nada pendiente
+        context._query_stats_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_stats_started
+        slow = elapsed >= slow_threshold
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.duration += elapsed
+            stats.fingerprints[fingerprint(statement)] += 1
+            stats.slow_queries += slow
+        if slow and not executemany:
+            _log_slow_query(conn, statement, parameters, elapsed)
@@ -0,0 +1,145 @@
+import re
+from sqlalchemy import text, func, literal_column, table, column
+from sqlalchemy.engine import Connection, Engine
+
+# Índice full-text de posts:
+# - SQLite: tabla virtual FTS5 "external content" sobre posts, sincronizada por triggers.
+# - PostgreSQL: columna tsvector generada (STORED) + índice GIN.
+# En ambos casos la sincronización en create/update/delete la hace la propia BD,
+# así que PostRepository no necesita tocar el índice manualmente.
+
+FTS_TABLE = "posts_fts"
+PG_SEARCH_COLUMN = "search_vector"
+MAX_SEARCH_TERMS = 8
+
+posts_fts = table(FTS_TABLE, column("rowid"))
+
+_SQLITE_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content,
+        content='posts', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON posts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON posts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, content ON posts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+]
+
+# 'simple' porque el contenido mezcla español e inglés (sin stemming por idioma).
+# El título pesa más (A) que el cuerpo (B) en el ranking.
+_POSTGRES_DDL = [
+    f"""
+    ALTER TABLE posts ADD COLUMN IF NOT EXISTS {PG_SEARCH_COLUMN} tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(content, '')), 'B')
+    ) STORED
+    """,
+    f"CREATE INDEX IF NOT EXISTS ix_posts_{PG_SEARCH_COLUMN} ON posts USING GIN ({PG_SEARCH_COLUMN})",
+]
+
+
+def supports_fulltext(dialect_name: str) -> bool:
+    return dialect_name in ("sqlite", "postgresql")
+
+
+def install_post_search(engine: Engine) -> None:
+    """
+    Crea (idempotente) el índice full-text de posts para el dialecto del engine.
+    Si la tabla FTS5 se crea sobre una BD con posts existentes, se reconstruye.
+    """
+    with engine.begin() as conn:
+        create_post_search(conn)
+
+
+def create_post_search(conn: Connection) -> None:
+    """install_post_search dentro de una transacción ya abierta (migraciones)."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        existed = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        ).first()
+        for statement in _SQLITE_DDL:
+            conn.execute(text(statement))
+        if not existed:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    elif dialect == "postgresql":
+        for statement in _POSTGRES_DDL:
+            conn.execute(text(statement))
+
+
+def drop_post_search(conn: Connection) -> None:
+    """Elimina el índice full-text de posts (downgrade de la migración que lo crea)."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        for suffix in ("ai", "ad", "au"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+    elif dialect == "postgresql":
+        conn.execute(text(f"DROP INDEX IF EXISTS ix_posts_{PG_SEARCH_COLUMN}"))
+        conn.execute(text(f"ALTER TABLE posts DROP COLUMN IF EXISTS {PG_SEARCH_COLUMN}"))
+
+
+def _search_terms(search: str) -> list[str]:
+    # Solo palabras: evita que comillas, '*', '-', ':' o '&' del usuario
+    # se interpreten como sintaxis de FTS5 / tsquery.
+    return re.findall(r"\w+", search.lower())[:MAX_SEARCH_TERMS]
+
+
+def build_match_query(search: str, dialect_name: str) -> str | None:
+    """
+    Convierte el texto del buscador en una consulta full-text con prefijos
+    (búsqueda mientras se escribe). Todos los términos son obligatorios (AND).
+    Devuelve None si el texto no contiene ningún término indexable.
+    """
+    terms = _search_terms(search)
+    if not terms:
+        return None
+    if dialect_name == "postgresql":
+        return " & ".join(f"{term}:*" for term in terms)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def apply_post_search(query, post_model, search: str, dialect_name: str):
+    """
+    Filtra `query` (sobre Post) por el índice full-text.
+    Devuelve (query, rank), donde `rank` es una expresión ordenable ascendente
+    (mejor coincidencia primero) o None si el dialecto no tiene índice.
+    """
+    match = build_match_query(search, dialect_name) if supports_fulltext(dialect_name) else None
+    if match is None:
+        return None, None
+
+    if dialect_name == "sqlite":
+        query = (
+            query.join(posts_fts, posts_fts.c.rowid == post_model.id)
+            .filter(literal_column(FTS_TABLE).op("MATCH")(match))
+        )
+        # bm25(): valores más bajos = más relevantes. El título pesa 10x.
+        rank = func.bm25(literal_column(FTS_TABLE), 10.0, 1.0)
+        return query, rank
+
+    search_vector = literal_column(f"posts.{PG_SEARCH_COLUMN}")
+    ts_query = func.to_tsquery("simple", match)
+    query = query.filter(search_vector.op("@@")(ts_query))
+    # ts_rank_cd es el equivalente más cercano a BM25 en PostgreSQL (mayor = mejor).
+    rank = -func.ts_rank_cd(search_vector, ts_query)
+    return query, rank
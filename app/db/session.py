@@ -1,18 +1,85 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import logging
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 from app.db.base import Base
+from app.db.query_stats import install_query_instrumentation
+from app.db.sqlite import engine_options, install_sqlite_profile
+
+logger = logging.getLogger(__name__)
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+# PRAGMAs de SQLITE_PROFILE en cada conexión (solo SQLite)
+install_sqlite_profile(engine)
+# Sentencias y tiempo en BD por petición, posibles N+1 y consultas lentas
+install_query_instrumentation(engine)
+# expire_on_commit=False: tras el commit de la petición los objetos se siguen
+# serializando sin volver a consultar la BD.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+AFTER_COMMIT_KEY = "after_commit_callbacks"
+# Corrutinas a esperar tras el commit de una AsyncSession (ver get_async_db)
+ASYNC_AFTER_COMMIT_KEY = "async_after_commit_callbacks"
+
+
+def run_after_commit(db: Session, callback) -> None:
+    """
+    Ejecuta `callback` cuando la transacción de `db` se confirme (se descarta
+    si hace rollback). Para efectos externos (p. ej. publicar eventos en
+    Redis) que no deben verse si la petición acaba fallando.
+    """
+    db.info.setdefault(AFTER_COMMIT_KEY, []).append(callback)
+
+
+def run_after_commit_async(db, callback) -> None:
+    """
+    Como run_after_commit para una AsyncSession: `callback` es una función
+    async que get_async_db espera tras el commit, sin bloquear el event loop.
+    """
+    db.info.setdefault(ASYNC_AFTER_COMMIT_KEY, []).append(callback)
+
+
+def run_commit_callbacks(callbacks: list) -> None:
+    """
+    Ejecuta los efectos de una transacción ya confirmada. Un efecto que falla
+    se registra y no impide los demás: los datos ya están guardados y la
+    petición no debe devolver un error por ello.
+    """
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception:
+            logger.exception("Error en un efecto tras el commit")
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _run_after_commit_callbacks(session: Session) -> None:
+    run_commit_callbacks(session.info.pop(AFTER_COMMIT_KEY, []))
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_after_commit_callbacks(session: Session) -> None:
+    session.info.pop(AFTER_COMMIT_KEY, None)
+    session.info.pop(ASYNC_AFTER_COMMIT_KEY, None)
+
 
 def get_db():
+    """
+    Unidad de trabajo por petición: los repositorios solo hacen flush() y aquí
+    se hace un único commit al terminar el endpoint. Cualquier excepción
+    (AppException, HTTPException...) deshace la transacción completa.
+
+    Se declara con Depends(get_db, scope="function") para que el commit ocurra
+    antes de enviar la respuesta: si falla, el cliente recibe el error.
+    """
     db = SessionLocal()
     try:
         yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
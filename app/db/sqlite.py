@@ -0,0 +1,76 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from app.core.config import settings
+
+# Perfiles de SQLite (SQLITE_PROFILE):
+# - "default": sin PRAGMAs (journal de rollback, synchronous=FULL).
+# - "performance": WAL (los lectores no bloquean al escritor ni al revés),
+#   synchronous=NORMAL (sin fsync por commit; en WAL sigue siendo consistente
+#   ante un crash, solo se pueden perder los últimos commits ante un corte de
+#   luz), busy_timeout para esperar al escritor en vez de fallar con
+#   "database is locked", mmap, caché de páginas y temporales en memoria.
+SQLITE_PROFILES = ("default", "performance")
+
+
+def sqlite_pragmas(profile: str) -> list[str]:
+    """PRAGMAs que se aplican al abrir cada conexión con el perfil `profile`."""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"SQLITE_PROFILE desconocido: {profile!r} (opciones: {', '.join(SQLITE_PROFILES)})")
+    if profile == "default":
+        return []
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        # Negativo: tamaño en KiB en vez de en páginas
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def is_memory_database(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:" or database.startswith("file::memory:")
+
+
+def engine_options(url: str) -> dict:
+    """
+    Argumentos de create_engine según el dialecto.
+
+    SQLite no tiene límite de conexiones en servidor, así que su pool no
+    limita las extra (max_overflow=-1): una petición síncrona conserva su
+    conexión mientras espera un hilo del threadpool para serializar la
+    respuesta, y con un pool limitado bastaba con más peticiones en vuelo que
+    conexiones + hilos para que todos los hilos esperasen una conexión y
+    ninguna se liberase hasta el timeout del pool. Las BD en memoria usan
+    SingletonThreadPool, sin pool que dimensionar.
+    """
+    if make_url(url).get_backend_name() != "sqlite":
+        return {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+        }
+    options = {"connect_args": {"check_same_thread": False}}
+    if not is_memory_database(url):
+        options.update(pool_size=settings.SQLITE_POOL_SIZE, max_overflow=-1)
+    return options
+
+
+def install_sqlite_profile(engine: Engine, profile: str = settings.SQLITE_PROFILE) -> None:
+    """Aplica los PRAGMAs del perfil en cada conexión nueva de `engine` (no hace nada fuera de SQLite)."""
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(profile)
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
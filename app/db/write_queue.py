@@ -0,0 +1,171 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextvars import copy_context
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.query_stats import install_query_instrumentation
+from app.db.session import AFTER_COMMIT_KEY, SQLALCHEMY_DATABASE_URL, SessionLocal, engine, run_commit_callbacks
+from app.db.sqlite import install_sqlite_profile, is_memory_database
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class SQLiteWriteQueue:
+    """
+    Cola de un solo escritor para SQLite.
+
+    SQLite admite un único escritor a la vez: con muchas peticiones escribiendo
+    (likes, comentarios) cada una espera al bloqueo de escritura con
+    busy_timeout y hace su propio commit. Aquí un hilo con su propia conexión
+    ejecuta las operaciones encoladas en lotes: hasta `batch_size` por
+    transacción (BEGIN IMMEDIATE ... un único COMMIT), cada una en su SAVEPOINT
+    para que un error (404, like duplicado...) solo deshaga esa operación.
+    Los resultados y excepciones llegan al llamante tras el commit del lote.
+    """
+
+    def __init__(
+        self,
+        url: str = SQLALCHEMY_DATABASE_URL,
+        batch_size: int = settings.SQLITE_WRITE_BATCH_SIZE,
+        batch_wait_ms: float = settings.SQLITE_WRITE_BATCH_WAIT_MS,
+        profile: str = settings.SQLITE_PROFILE,
+    ):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self.engine = self._create_engine(url, profile)
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    @staticmethod
+    def _create_engine(url: str, profile: str):
+        writer = create_engine(url, connect_args={"check_same_thread": False}, pool_size=1, max_overflow=0)
+        install_sqlite_profile(writer, profile)
+        install_query_instrumentation(writer)
+
+        @event.listens_for(writer, "connect")
+        def _disable_driver_transactions(dbapi_connection, connection_record):
+            # pysqlite no emite BEGIN hasta el primer INSERT/UPDATE y no soporta
+            # SAVEPOINT así: las transacciones las abre el evento "begin"
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(writer, "begin")
+        def _begin_immediate(conn):
+            # Reserva el bloqueo de escritura al empezar el lote, no a mitad
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+        return writer
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Ejecuta lo que quede en la cola y detiene el hilo."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        self.engine.dispose()
+
+    def submit(self, fn) -> Future:
+        """Encola `fn(session)`; el Future se resuelve tras el commit de su lote."""
+        future = Future()
+        # fn se ejecuta con el contexto del llamante: sus sentencias cuentan
+        # en las estadísticas SQL de la petición que la encoló
+        self._queue.put((fn, copy_context(), future))
+        return future
+
+    def run(self, fn):
+        """Como submit, esperando el resultado (o relanzando la excepción de `fn`)."""
+        return self.submit(fn).result()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._execute(batch)
+
+    def _execute(self, batch: list) -> None:
+        outcomes = []
+        db = SessionLocal(bind=self.engine)
+        try:
+            for fn, context, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                callbacks = db.info.setdefault(AFTER_COMMIT_KEY, [])
+                registered = len(callbacks)
+                savepoint = db.begin_nested()
+                try:
+                    result = context.run(fn, db)
+                    savepoint.commit()
+                    outcomes.append((future, result, None))
+                except Exception as exc:
+                    savepoint.rollback()
+                    # Los efectos tras el commit de la operación deshecha no se ejecutan
+                    del callbacks[registered:]
+                    outcomes.append((future, None, exc))
+            # Los efectos se ejecutan fuera del commit: un fallo en ellos no
+            # convierte en error una escritura ya confirmada
+            callbacks = db.info.pop(AFTER_COMMIT_KEY, [])
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.exception("Error confirmando un lote de %s escrituras", len(batch))
+            outcomes = [(future, None, exc) for _, _, future in batch if future.running()]
+            callbacks = []
+        finally:
+            db.close()
+
+        # Antes de resolver los Futures: al volver, el llamante ve sus efectos
+        run_commit_callbacks(callbacks)
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+
+# Solo con SQLite en fichero: en memoria cada conexión tendría otra BD
+write_queue = (
+    SQLiteWriteQueue()
+    if settings.SQLITE_WRITE_QUEUE_ENABLED
+    and engine.dialect.name == "sqlite"
+    and not is_memory_database(SQLALCHEMY_DATABASE_URL)
+    else None
+)
+
+
+def run_write(db: Session, fn):
+    """
+    Ejecuta `fn(session)` en la cola de un solo escritor si está activa; si no,
+    con `db`, dentro de la unidad de trabajo de la petición (commit en get_db).
+    Con la cola la operación ya está confirmada al volver y los objetos ORM
+    devueltos están desligados: `fn` debe cargar lo que se vaya a serializar.
+    """
+    if write_queue is None or not write_queue.running:
+        return fn(db)
+    return write_queue.run(fn)
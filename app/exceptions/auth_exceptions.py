@@ -0,0 +1,9 @@
+from app.exceptions.base import AppException
+
+class PasswordHasherBusy(AppException):
+    def __init__(self):
+        super().__init__(
+            message="Demasiados inicios de sesión en curso. Inténtalo de nuevo en unos segundos.",
+            status_code=503
+        )
+        self.headers = {"Retry-After": "1"}
@@ -0,0 +1,9 @@
+from app.exceptions.base import AppException
+
+
+class InvalidCursor(AppException):
+    def __init__(self):
+        super().__init__(
+            message="Cursor de paginacion invalido o no corresponde al orden solicitado",
+            status_code=400
+        )
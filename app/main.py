@@ -1,7 +1,17 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from app.auth import auth_routes
-from app.db.base import Base
-from app.db.session import engine
+from app.auth.revocation import revocation_list
+from app.auth.password_hasher import password_hasher
+from app.db.write_queue import write_queue
+from app.core.config import settings
+from app.core.middleware import QueryStatsMiddleware
+from app.core.redis import async_redis_pool
+from app.services.counter_service import CounterFlusher
+from app.services.realtime_service import realtime_hub
+from app.services.trending_service import TrendingRebuilder
+from app.services.user_cache import user_cache
 from app.models import user, post, comment, like, follows, notification, saved_post, conversation
 from app.routers import (
     post_router,
@@ -12,12 +22,61 @@ from app.routers import (
     notification_router,
     saved_router,
     message_router,
+    realtime_router,
 )
 from app.exceptions.base import AppException
 from app.core.exceptions_handlers import app_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="DevCommunity API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Volcado periódico de los contadores write-behind (likes/comentarios)
+    flusher = CounterFlusher() if settings.COUNTERS_WRITE_BEHIND else None
+    if flusher:
+        flusher.start()
+    # Recalculo periódico del ranking trending (epoch, ventana y deriva)
+    rebuilder = TrendingRebuilder() if settings.TRENDING_REBUILD_INTERVAL_SECONDS > 0 else None
+    if rebuilder:
+        rebuilder.start()
+    # Invalidaciones de la caché de usuarios publicadas por otros workers
+    user_cache.start()
+    # Copia local de los access tokens revocados
+    revocation_list.start()
+    # Procesos de bcrypt arrancados antes del primer login
+    await run_in_threadpool(password_hasher.start)
+    # Cola de un solo escritor de SQLite (likes y comentarios)
+    if write_queue:
+        write_queue.start()
+    # Gauges de threadpool, pools de conexiones y bcrypt para /metrics
+    sampler = None
+    if settings.METRICS_ENABLED:
+        from app.core.metrics import MetricsSampler
+        sampler = MetricsSampler(password_hasher)
+        sampler.start()
+    yield
+    if sampler:
+        from app.core.metrics import mark_worker_dead
+        await sampler.stop()
+        mark_worker_dead()
+    if write_queue:
+        await run_in_threadpool(write_queue.stop)
+    if rebuilder:
+        rebuilder.stop()
+    if flusher:
+        flusher.stop()
+    user_cache.stop()
+    revocation_list.stop()
+    password_hasher.stop()
+    # Cierra la suscripción pub/sub del worker y las conexiones WebSocket/SSE
+    await realtime_hub.stop()
+    await async_redis_pool.disconnect()
+    if settings.ASYNC_DB_ENABLED:
+        from app.db.async_session import async_engine
+        await async_engine.dispose()
+
+
+app = FastAPI(title="DevCommunity API", version="0.1.0", lifespan=lifespan)
 
 # Configurar CORS
 app.add_middleware(
@@ -28,12 +87,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Crear tablas en la base de datos
-Base.metadata.create_all(bind=engine)
+# Métricas Prometheus (opcional, requiere prometheus_client): latencia por
+# ruta, peticiones en curso, pools de conexiones y comandos de Redis. Se añade
+# antes que QueryStatsMiddleware para quedar dentro y leer sus estadísticas.
+if settings.METRICS_ENABLED:
+    from app.core.metrics import MetricsMiddleware, instrument_async_redis, instrument_engine, instrument_redis
+    from app.core.redis import async_redis_client, redis_client
+    from app.db.session import engine
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine, "sync")
+    if write_queue:
+        instrument_engine(write_queue.engine, "sqlite_writer")
+    if settings.ASYNC_DB_ENABLED:
+        from app.db.async_session import async_engine
+        instrument_engine(async_engine.sync_engine, "async")
+    instrument_redis(redis_client, "sync")
+    instrument_async_redis(async_redis_client, "async")
+
+# Sentencias SQL, tiempo en BD y posibles N+1 por petición (cabeceras X-DB-* con DEBUG)
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    app.add_middleware(QueryStatsMiddleware)
+
+# El esquema (tablas, índices y el índice full-text de posts) lo gestionan
+# las migraciones de Alembic: `alembic upgrade head` antes de arrancar.
 
 # Handler genérico para todas las AppException y sus subclases (PostNotFound, ForbiddenAction, etc.)
 app.add_exception_handler(AppException, app_exception_handler)
 
+# Stack async (opcional): requiere aiosqlite o asyncpg, por eso sus routers
+# solo se importan si está activado. Sustituyen a los síncronos equivalentes.
+if settings.ASYNC_DB_ENABLED:
+    from app.routers import async_post_router, async_message_router, async_notification_router
+    post_router, message_router, notification_router = (
+        async_post_router, async_message_router, async_notification_router
+    )
+
 # Rutas
 app.include_router(auth_routes.router)
 app.include_router(post_router.router)
@@ -44,6 +132,10 @@ app.include_router(admin_routes.router)
 app.include_router(notification_router.router)
 app.include_router(saved_router.router)
 app.include_router(message_router.router)
+app.include_router(realtime_router.router)
+if settings.METRICS_ENABLED:
+    from app.routers import metrics_router
+    app.include_router(metrics_router.router)
 
 
 
@@ -2,8 +2,11 @@ from app.models.post import Post
 
 def map_post_to_response(
     post: Post,
-    liked_by_me: bool
+    liked_by_me: bool,
+    pending_counts: dict | None = None
 ) -> dict:
+    # Deltas de contadores aún no volcados a la BD (ver CounterService)
+    pending_counts = pending_counts or {}
 
     return {
         "id": post.id,
@@ -12,7 +15,7 @@ def map_post_to_response(
         "image_url": post.image_url,
         "created_at": post.created_at,
         "author": post.author,
-        "likes_count": post.likes_count,
-        "comments_count": post.comments_count,
+        "likes_count": post.likes_count + pending_counts.get("likes_count", 0),
+        "comments_count": post.comments_count + pending_counts.get("comments_count", 0),
         "liked_by_me": liked_by_me,
     }
@@ -1,6 +1,7 @@
 # app/models/comment.py
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -13,9 +14,18 @@ class Comment(Base):
     author_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # created_at desde la app, con el mismo formato que el parámetro del cursor
+    # (CURRENT_TIMESTAMP en SQLite no lleva microsegundos y rompe los empates)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relaciones
     author = relationship("User", back_populates="comments")
     post = relationship("Post", back_populates="comments")
+
+    # updated_at lo genera la BD: se recupera con RETURNING en el mismo UPDATE
+    # en lugar de un SELECT posterior.
+    __mapper_args__ = {"eager_defaults": True}
+
+    # Comentarios de un post en orden cronológico; `id` desempata el cursor (created_at, id)
+    __table_args__ = (Index("ix_comments_post_id_created_at_id", "post_id", "created_at", "id"),)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, Text, Boolean, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, Text, Boolean, DateTime, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -13,6 +13,13 @@ class Conversation(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     last_message_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+    # Desnormalizados para servir la bandeja de entrada en una sola consulta.
+    # last_message_id no lleva FK: messages ya referencia a conversations y
+    # los mensajes solo se borran junto con su conversación.
+    last_message_id = Column(Integer, nullable=True)
+    user1_unread_count = Column(Integer, default=0, nullable=False)
+    user2_unread_count = Column(Integer, default=0, nullable=False)
+
     user1 = relationship("User", foreign_keys=[user1_id])
     user2 = relationship("User", foreign_keys=[user2_id])
     messages = relationship(
@@ -21,9 +28,17 @@ class Conversation(Base):
         cascade="all, delete-orphan",
         order_by="Message.created_at.asc()",
     )
+    last_message = relationship(
+        "Message",
+        primaryjoin="foreign(Conversation.last_message_id) == Message.id",
+        viewonly=True,
+    )
 
     __table_args__ = (
         UniqueConstraint("user1_id", "user2_id", name="unique_conversation_users"),
+        # Bandeja de entrada por participante en orden (last_message_at, id) DESC
+        Index("ix_conversations_user1_last_message", "user1_id", "last_message_at", "id"),
+        Index("ix_conversations_user2_last_message", "user2_id", "last_message_at", "id"),
     )
 
 
@@ -39,3 +54,10 @@ class Message(Base):
 
     conversation = relationship("Conversation", back_populates="messages")
     sender = relationship("User", foreign_keys=[sender_id])
+
+    __table_args__ = (
+        # Historial de una conversación en orden cronológico
+        Index("ix_messages_conversation_id_created_at", "conversation_id", "created_at"),
+        # Marcar como leídos los mensajes recibidos en una conversación
+        Index("ix_messages_conversation_id_sender_id_is_read", "conversation_id", "sender_id", "is_read"),
+    )
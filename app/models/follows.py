@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, Index, UniqueConstraint
 from app.db.base import Base
 
 class Follow(Base):
@@ -8,4 +8,8 @@ class Follow(Base):
     follower_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     followed_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
 
-    __table_args__ = (UniqueConstraint("follower_id", "followed_id", name="unique_follow"),)
+    __table_args__ = (
+        UniqueConstraint("follower_id", "followed_id", name="unique_follow"),
+        # Seguidores de un usuario (fan-out, listados): unique_follow empieza por follower_id
+        Index("ix_follows_followed_id", "followed_id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -12,4 +12,8 @@ class Like(Base):
     user = relationship("User", back_populates="likes")
     post = relationship("Post", back_populates="likes")
 
-    __table_args__ = (UniqueConstraint("user_id", "post_id", name="unique_like"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "post_id", name="unique_like"),
+        # Likes de un post (recuento, borrado en cascada): unique_like empieza por user_id
+        Index("ix_likes_post_id", "post_id"),
+    )
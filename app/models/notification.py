@@ -1,4 +1,4 @@
-﻿from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum as SAEnum
+﻿from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Enum as SAEnum
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from datetime import datetime
@@ -26,3 +26,8 @@ class Notification(Base):
     recipient = relationship("User", foreign_keys=[recipient_id])
     actor     = relationship("User", foreign_keys=[actor_id])
     post      = relationship("Post", foreign_keys=[post_id])
+
+    # Notificaciones de un usuario y recuento/marcado de no leídas
+    __table_args__ = (
+        Index("ix_notifications_recipient_id_is_read_created_at", "recipient_id", "is_read", "created_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from datetime import datetime
@@ -20,6 +20,8 @@ class Post(Base):
 
     likes_count = Column(Integer, default=0, nullable=False)
     comments_count = Column(Integer, default=0, nullable=False)
+    # Último lote de contadores write-behind aplicado a la fila (ver CounterService.flush)
+    counters_batch = Column(String(32), nullable=True)
 
 
     # ÚNICA relación con User
@@ -32,3 +34,13 @@ class Post(Base):
     likes = relationship("Like", back_populates="post", cascade="all, delete-orphan")
     saved_posts = relationship("SavedPost", back_populates="post", cascade="all, delete-orphan")
 
+    # Índices de las claves de ordenación usadas por la paginación por cursor
+    __table_args__ = (
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_likes_count_created_at_id", "likes_count", "created_at", "id"),
+        Index("ix_posts_comments_count_created_at_id", "comments_count", "created_at", "id"),
+        # Posts de un autor (filtro author_id, timelines) en el mismo orden
+        Index("ix_posts_author_id_created_at_id", "author_id", "created_at", "id"),
+        # Feed y timelines: posts de los autores seguidos por id DESC
+        Index("ix_posts_author_id_id", "author_id", "id"),
+    )
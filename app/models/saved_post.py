@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -17,4 +17,6 @@ class SavedPost(Base):
 
     __table_args__ = (
         UniqueConstraint("user_id", "post_id", name="unique_saved_post"),
+        # Guardados de un usuario, más recientes primero
+        Index("ix_saved_posts_user_id_saved_at", "user_id", "saved_at"),
     )
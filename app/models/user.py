@@ -15,6 +15,8 @@ class User(Base):
     posts = relationship("Post", back_populates="author", cascade="all, delete")
     likes = relationship("Like", back_populates="user", cascade="all, delete-orphan")
     role = Column(String, default="user")  # "user" o "admin"
+    # Se incrementa para invalidar todos los tokens emitidos (claim "ver")
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     comments = relationship("Comment", back_populates="author", cascade="all, delete")
     saved_posts = relationship("SavedPost", back_populates="user", cascade="all, delete-orphan")
 
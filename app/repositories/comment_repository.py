@@ -1,4 +1,6 @@
-from sqlalchemy.orm import Session
+from datetime import datetime
+from sqlalchemy import exists, select, tuple_
+from sqlalchemy.orm import Session, selectinload
 from app.models.comment import Comment
 from app.models.post import Post
 
@@ -9,8 +11,38 @@ class CommentRepository:
     def get_by_id(self, comment_id: int):
         return self.db.query(Comment).filter(Comment.id == comment_id).first()
 
-    def get_by_post_id(self, post_id: int):
-        return self.db.query(Comment).filter(Comment.post_id == post_id).all()
+    def post_exists(self, post_id: int) -> bool:
+        return self.db.scalar(select(exists().where(Post.id == post_id)))
+
+    def get_post_counters(self, post_id: int):
+        """
+        id, comments_count y counters_batch del post (None si no existe), sin
+        cargar la fila completa: el total sale del contador, no de un COUNT(*).
+        """
+        return self.db.execute(
+            select(Post.id, Post.comments_count, Post.counters_batch).where(Post.id == post_id)
+        ).first()
+
+    def get_page_by_post_id(
+        self,
+        post_id: int,
+        limit: int,
+        after: tuple[datetime, int] | None = None
+    ) -> list[Comment]:
+        """
+        Comentarios de un post en orden (created_at, id) ascendente, a partir
+        de la clave `after` (keyset, índice post_id, created_at, id). Los
+        autores se cargan en una sola consulta: el mapper los lee de cada
+        comentario.
+        """
+        query = (
+            self.db.query(Comment)
+            .options(selectinload(Comment.author))
+            .filter(Comment.post_id == post_id)
+        )
+        if after:
+            query = query.filter(tuple_(Comment.created_at, Comment.id) > tuple_(*after))
+        return query.order_by(Comment.created_at.asc(), Comment.id.asc()).limit(limit).all()
 
     def create(self, content: str, author_id: int, post_id: int):
         new_comment = Comment(
@@ -19,16 +51,14 @@ class CommentRepository:
             post_id=post_id
         )
         self.db.add(new_comment)
-        self.db.commit()
-        self.db.refresh(new_comment)
+        self.db.flush()
         return new_comment
 
     def update(self, comment: Comment, content: str):
         comment.content = content
-        self.db.commit()
-        self.db.refresh(comment)
+        self.db.flush()
         return comment
 
     def delete(self, comment: Comment):
         self.db.delete(comment)
-        self.db.commit()
+        self.db.flush()
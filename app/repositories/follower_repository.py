@@ -1,5 +1,7 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from app.models.follows import Follow
+from app.models.user import User
 
 class FollowerRepository:
     def __init__(self, db: Session):
@@ -14,18 +16,32 @@ class FollowerRepository:
     def create(self, follower_id: int, followed_id: int):
         new_follow = Follow(follower_id=follower_id, followed_id=followed_id)
         self.db.add(new_follow)
-        self.db.commit()
+        self.db.flush()
         return new_follow
 
     def delete(self, follow: Follow):
         self.db.delete(follow)
-        self.db.commit()
+        self.db.flush()
 
-    def get_followers(self, user_id: int):
-        return self.db.query(Follow).filter(Follow.followed_id == user_id).all()
+    def get_followers(self, user_id: int) -> list[User]:
+        """Usuarios que siguen a `user_id` (los más recientes primero), en una sola consulta."""
+        return (
+            self.db.query(User)
+            .join(Follow, Follow.follower_id == User.id)
+            .filter(Follow.followed_id == user_id)
+            .order_by(Follow.id.desc())
+            .all()
+        )
 
-    def get_following(self, user_id: int):
-        return self.db.query(Follow).filter(Follow.follower_id == user_id).all()
+    def get_following(self, user_id: int) -> list[User]:
+        """Usuarios a los que sigue `user_id` (los más recientes primero), en una sola consulta."""
+        return (
+            self.db.query(User)
+            .join(Follow, Follow.followed_id == User.id)
+            .filter(Follow.follower_id == user_id)
+            .order_by(Follow.id.desc())
+            .all()
+        )
 
     def get_followed_ids(self, user_id: int) -> list[int]:
         results = (
@@ -34,4 +50,24 @@ class FollowerRepository:
             .all()
         )
         return [r[0] for r in results]
-        
\ No newline at end of file
+
+    def get_follower_ids(self, user_id: int) -> list[int]:
+        results = (
+            self.db.query(Follow.follower_id)
+            .filter(Follow.followed_id == user_id)
+            .all()
+        )
+        return [r[0] for r in results]
+
+    def count_followers(self, user_id: int) -> int:
+        return self.db.query(func.count(Follow.id)).filter(Follow.followed_id == user_id).scalar()
+
+    def get_ids_with_min_followers(self, min_followers: int) -> list[int]:
+        results = (
+            self.db.query(Follow.followed_id)
+            .group_by(Follow.followed_id)
+            .having(func.count(Follow.id) >= min_followers)
+            .all()
+        )
+        return [r[0] for r in results]
+
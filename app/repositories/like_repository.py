@@ -28,12 +28,12 @@ class LikeRepository:
     def create(self, post_id: int, user_id: int):
         like = Like(user_id=user_id, post_id=post_id)
         self.db.add(like)
-        self.db.commit()
+        self.db.flush()
         return like
 
     def delete(self, like: Like):
         self.db.delete(like)
-        self.db.commit()
+        self.db.flush()
 
     def get_liked_post_ids(self, user_id: int, post_ids: list[int]):
         results = (
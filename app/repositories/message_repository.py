@@ -1,10 +1,49 @@
 from datetime import datetime
-from sqlalchemy import or_
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import or_, func, case, select, tuple_, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload, joinedload
 from app.models.conversation import Conversation, Message
 from app.models.user import User
 
 
+def inbox_candidates(user_id: int, size: int, after: tuple[datetime, int] | None):
+    """
+    Subconsulta con los ids candidatos a una página de la bandeja: los `size`
+    primeros por cada lado de la conversación (índice userN_id, last_message_at, id).
+    """
+    sides = []
+    for column in (Conversation.user1_id, Conversation.user2_id):
+        side = select(Conversation.id).where(column == user_id)
+        if after:
+            side = side.where(tuple_(Conversation.last_message_at, Conversation.id) < tuple_(*after))
+        sides.append(
+            side.order_by(Conversation.last_message_at.desc(), Conversation.id.desc())
+            .limit(size)
+            .subquery()
+        )
+    return union_all(*[select(side.c.id) for side in sides]).subquery()
+
+
+def total_unread_expression(user_id: int):
+    """Suma de los contadores de no leídos de `user_id` en sus conversaciones."""
+    return (
+        select(
+            func.sum(
+                case(
+                    (Conversation.user1_id == user_id, Conversation.user1_unread_count),
+                    else_=Conversation.user2_unread_count,
+                )
+            )
+        )
+        .where(
+            or_(
+                Conversation.user1_id == user_id,
+                Conversation.user2_id == user_id,
+            )
+        )
+    )
+
+
 class MessageRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -48,32 +87,35 @@ class MessageRepository:
             last_message_at=now,
         )
         self.db.add(conv)
-        self.db.commit()
-        self.db.refresh(conv)
-        return (
-            self.db.query(Conversation)
-            .options(
-                selectinload(Conversation.user1),
-                selectinload(Conversation.user2),
-            )
-            .filter(Conversation.id == conv.id)
-            .first()
-        )
+        self.db.flush()
+        # user1/user2 se resuelven desde el identity map (ya cargados por el servicio)
+        return conv
+
+    def get_user_conversations(
+        self,
+        user_id: int,
+        size: int,
+        after: tuple[datetime, int] | None = None
+    ) -> list[Conversation]:
+        """
+        Página de la bandeja de entrada en orden (last_message_at, id) DESC,
+        con el otro usuario y el último mensaje cargados en la misma consulta.
 
-    def get_user_conversations(self, user_id: int) -> list[Conversation]:
+        Cada participante tiene su índice (userN_id, last_message_at, id): se
+        toman los `size` primeros de cada lado y se mezclan, así el coste no
+        depende del número total de conversaciones del usuario.
+        """
+        candidate_ids = inbox_candidates(user_id, size, after)
         return (
             self.db.query(Conversation)
+            .join(candidate_ids, Conversation.id == candidate_ids.c.id)
             .options(
-                selectinload(Conversation.user1),
-                selectinload(Conversation.user2),
+                joinedload(Conversation.user1),
+                joinedload(Conversation.user2),
+                joinedload(Conversation.last_message),
             )
-            .filter(
-                or_(
-                    Conversation.user1_id == user_id,
-                    Conversation.user2_id == user_id,
-                )
-            )
-            .order_by(Conversation.last_message_at.desc())
+            .order_by(Conversation.last_message_at.desc(), Conversation.id.desc())
+            .limit(size)
             .all()
         )
 
@@ -93,41 +135,145 @@ class MessageRepository:
         items = query.offset((page - 1) * size).limit(size).all()
         return total, items
 
-    def get_last_message(self, conv_id: int) -> Message | None:
-        return (
-            self.db.query(Message)
-            .filter(Message.conversation_id == conv_id)
-            .order_by(Message.created_at.desc())
-            .first()
+    def count_total_unread(self, user_id: int) -> int:
+        """Suma de los contadores de no leídos del usuario (sin recorrer los mensajes)."""
+        total = self.db.scalar(total_unread_expression(user_id))
+        return total or 0
+
+    def create_message(self, conv: Conversation, sender_id: int, content: str) -> Message:
+        now = datetime.utcnow()
+        message = Message(
+            conversation_id=conv.id,
+            sender_id=sender_id,
+            content=content,
+            is_read=False,
+            created_at=now,
+            # El remitente es uno de los participantes, ya cargados con la conversación
+            sender=conv.user1 if sender_id == conv.user1_id else conv.user2,
         )
+        self.db.add(message)
+        self.db.flush()
 
-    def count_unread_in_conversation(self, conv_id: int, user_id: int) -> int:
-        return (
+        conv.last_message_at = now
+        conv.last_message_id = message.id
+        # Incremento atómico (UPDATE ... SET n = n + 1) del contador del destinatario
+        if sender_id == conv.user1_id:
+            conv.user2_unread_count = Conversation.user2_unread_count + 1
+        else:
+            conv.user1_unread_count = Conversation.user1_unread_count + 1
+        self.db.flush()
+        return message
+
+    def mark_messages_as_read(self, conv: Conversation, user_id: int) -> int:
+        updated = (
             self.db.query(Message)
             .filter(
-                Message.conversation_id == conv_id,
+                Message.conversation_id == conv.id,
                 Message.sender_id != user_id,
                 Message.is_read == False,
             )
-            .count()
+            .update({"is_read": True})
         )
+        if user_id == conv.user1_id:
+            conv.user1_unread_count = 0
+        else:
+            conv.user2_unread_count = 0
+        self.db.flush()
+        return updated
 
-    def count_total_unread(self, user_id: int) -> int:
-        return (
-            self.db.query(Message)
-            .join(Conversation, Message.conversation_id == Conversation.id)
-            .filter(
-                or_(
-                    Conversation.user1_id == user_id,
-                    Conversation.user2_id == user_id,
-                ),
-                Message.sender_id != user_id,
-                Message.is_read == False,
+
+class AsyncMessageRepository:
+    """MessageRepository con AsyncSession (stack async); mismas consultas en estilo select()."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_user_by_id(self, user_id: int) -> User | None:
+        return await self.db.get(User, user_id)
+
+    async def get_conversation_by_id(self, conv_id: int) -> Conversation | None:
+        return await self.db.scalar(
+            select(Conversation)
+            .options(
+                selectinload(Conversation.user1),
+                selectinload(Conversation.user2),
             )
-            .count()
+            .where(Conversation.id == conv_id)
         )
 
-    def create_message(self, conv: Conversation, sender_id: int, content: str) -> Message:
+    async def find_conversation_between(self, user_a_id: int, user_b_id: int) -> Conversation | None:
+        u1, u2 = min(user_a_id, user_b_id), max(user_a_id, user_b_id)
+        return await self.db.scalar(
+            select(Conversation)
+            .options(
+                selectinload(Conversation.user1),
+                selectinload(Conversation.user2),
+            )
+            .where(
+                Conversation.user1_id == u1,
+                Conversation.user2_id == u2,
+            )
+        )
+
+    async def create_conversation(self, user_a_id: int, user_b_id: int) -> Conversation:
+        u1, u2 = min(user_a_id, user_b_id), max(user_a_id, user_b_id)
+        now = datetime.utcnow()
+        conv = Conversation(
+            user1_id=u1,
+            user2_id=u2,
+            created_at=now,
+            last_message_at=now,
+        )
+        self.db.add(conv)
+        await self.db.flush()
+        # Sin carga perezosa en async: los participantes se cargan explícitamente
+        await self.db.refresh(conv, ["user1", "user2"])
+        return conv
+
+    async def get_user_conversations(
+        self,
+        user_id: int,
+        size: int,
+        after: tuple[datetime, int] | None = None
+    ) -> list[Conversation]:
+        """Igual que MessageRepository.get_user_conversations."""
+        candidate_ids = inbox_candidates(user_id, size, after)
+        result = await self.db.scalars(
+            select(Conversation)
+            .join(candidate_ids, Conversation.id == candidate_ids.c.id)
+            .options(
+                joinedload(Conversation.user1),
+                joinedload(Conversation.user2),
+                joinedload(Conversation.last_message),
+            )
+            .order_by(Conversation.last_message_at.desc(), Conversation.id.desc())
+            .limit(size)
+        )
+        return list(result)
+
+    async def get_messages_by_conversation(
+        self,
+        conv_id: int,
+        page: int,
+        size: int,
+    ) -> tuple[int, list[Message]]:
+        condition = Message.conversation_id == conv_id
+        total = await self.db.scalar(select(func.count(Message.id)).where(condition))
+        items = await self.db.scalars(
+            select(Message)
+            .options(selectinload(Message.sender))
+            .where(condition)
+            .order_by(Message.created_at.asc())
+            .offset((page - 1) * size)
+            .limit(size)
+        )
+        return total, list(items)
+
+    async def count_total_unread(self, user_id: int) -> int:
+        total = await self.db.scalar(total_unread_expression(user_id))
+        return total or 0
+
+    async def create_message(self, conv: Conversation, sender_id: int, content: str) -> Message:
         now = datetime.utcnow()
         message = Message(
             conversation_id=conv.id,
@@ -135,28 +281,35 @@ class MessageRepository:
             content=content,
             is_read=False,
             created_at=now,
+            # El remitente es uno de los participantes, ya cargados con la conversación
+            sender=conv.user1 if sender_id == conv.user1_id else conv.user2,
         )
-        conv.last_message_at = now
         self.db.add(message)
-        self.db.commit()
-        self.db.refresh(message)
-        # Reload with sender
-        return (
-            self.db.query(Message)
-            .options(selectinload(Message.sender))
-            .filter(Message.id == message.id)
-            .first()
-        )
+        await self.db.flush()
 
-    def mark_messages_as_read(self, conv_id: int, user_id: int) -> int:
-        updated = (
-            self.db.query(Message)
-            .filter(
-                Message.conversation_id == conv_id,
+        conv.last_message_at = now
+        conv.last_message_id = message.id
+        # Incremento atómico (UPDATE ... SET n = n + 1) del contador del destinatario
+        if sender_id == conv.user1_id:
+            conv.user2_unread_count = Conversation.user2_unread_count + 1
+        else:
+            conv.user1_unread_count = Conversation.user1_unread_count + 1
+        await self.db.flush()
+        return message
+
+    async def mark_messages_as_read(self, conv: Conversation, user_id: int) -> int:
+        result = await self.db.execute(
+            update(Message)
+            .where(
+                Message.conversation_id == conv.id,
                 Message.sender_id != user_id,
                 Message.is_read == False,
             )
-            .update({"is_read": True})
+            .values(is_read=True)
         )
-        self.db.commit()
-        return updated
+        if user_id == conv.user1_id:
+            conv.user1_unread_count = 0
+        else:
+            conv.user2_unread_count = 0
+        await self.db.flush()
+        return result.rowcount
@@ -1,4 +1,6 @@
-﻿from sqlalchemy.orm import Session, selectinload
+﻿from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from app.models.notification import Notification, NotificationType
 
 
@@ -20,8 +22,7 @@ class NotificationRepository:
             post_id=post_id,
         )
         self.db.add(notif)
-        self.db.commit()
-        self.db.refresh(notif)
+        self.db.flush()
         return notif
 
     def get_by_recipient(
@@ -58,8 +59,7 @@ class NotificationRepository:
 
     def mark_as_read(self, notification: Notification) -> Notification:
         notification.is_read = True
-        self.db.commit()
-        self.db.refresh(notification)
+        self.db.flush()
         return notification
 
     def mark_all_as_read(self, recipient_id: int) -> int:
@@ -72,5 +72,68 @@ class NotificationRepository:
             )
             .update({"is_read": True})
         )
-        self.db.commit()
         return updated
+
+
+class AsyncNotificationRepository:
+    """Consultas de NotificationRepository para los endpoints del stack async."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_by_recipient(
+        self,
+        recipient_id: int,
+        page: int,
+        size: int
+    ) -> tuple[int, list[Notification]]:
+        condition = Notification.recipient_id == recipient_id
+        total = await self.db.scalar(select(func.count(Notification.id)).where(condition))
+        items = await self.db.scalars(
+            select(Notification)
+            .options(
+                selectinload(Notification.actor),
+                selectinload(Notification.post),
+            )
+            .where(condition)
+            .order_by(Notification.created_at.desc())
+            .offset((page - 1) * size)
+            .limit(size)
+        )
+        return total, list(items)
+
+    async def get_by_id(self, notification_id: int) -> Notification | None:
+        # actor y post se mapean en la respuesta: sin carga perezosa en async
+        return await self.db.scalar(
+            select(Notification)
+            .options(
+                selectinload(Notification.actor),
+                selectinload(Notification.post),
+            )
+            .where(Notification.id == notification_id)
+        )
+
+    async def count_unread(self, recipient_id: int) -> int:
+        return await self.db.scalar(
+            select(func.count(Notification.id)).where(
+                Notification.recipient_id == recipient_id,
+                Notification.is_read == False,
+            )
+        )
+
+    async def mark_as_read(self, notification: Notification) -> Notification:
+        notification.is_read = True
+        await self.db.flush()
+        return notification
+
+    async def mark_all_as_read(self, recipient_id: int) -> int:
+        """Marca todas las no leidas como leidas y retorna la cantidad actualizada."""
+        result = await self.db.execute(
+            update(Notification)
+            .where(
+                Notification.recipient_id == recipient_id,
+                Notification.is_read == False,
+            )
+            .values(is_read=True)
+        )
+        return result.rowcount
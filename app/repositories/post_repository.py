@@ -1,13 +1,132 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import or_, func
+from sqlalchemy import or_, func, select, tuple_, DateTime
 from app.models.post import Post
 from app.models.like import Like
+from app.models.follows import Follow
+from app.db.search import apply_post_search
+from app.exceptions.pagination_exceptions import InvalidCursor
+from app.utils.pagination import encode_cursor, decode_cursor
 from datetime import date, datetime, time, timedelta
 
-class PostRepository:
-    def __init__(self, db: Session):
+# Clave de ordenación (keyset) por tipo de orden, siempre descendente.
+# `id` desempata para que el orden sea total y el cursor no repita ni salte filas.
+ORDER_KEYS = {
+    "recent": (Post.created_at, Post.id),
+    "most_liked": (Post.likes_count, Post.created_at, Post.id),
+    "most_commented": (Post.comments_count, Post.created_at, Post.id),
+    # Feed cronológico: el mismo orden que los timelines de Redis (score = id
+    # del post), así un cursor sirve en las dos rutas aunque created_at no sea
+    # monótono con el id (posts importados, relojes desajustados).
+    "feed": (Post.id,),
+}
+
+class BasePostRepository:
+    """Construcción de consultas y cursores comunes a PostRepository y AsyncPostRepository."""
+
+    def __init__(self, db):
         self.db = db
 
+    def _apply_filters(self, query, search, author_id, from_date, to_date, since_hours):
+        """Aplica los filtros de búsqueda/autor/fechas. Devuelve (query, search_rank)."""
+        if author_id:
+            query = query.filter(Post.author_id == author_id)
+
+        search_rank = None
+        if search:
+            # Índice full-text (FTS5 / tsvector). ILIKE solo como respaldo para
+            # dialectos sin índice o búsquedas sin términos indexables.
+            dialect_name = self.db.get_bind().dialect.name
+            fts_query, search_rank = apply_post_search(query, Post, search, dialect_name)
+            if fts_query is not None:
+                query = fts_query
+            else:
+                query = query.filter(
+                    or_(
+                        Post.title.ilike(f"%{search}%"),
+                        Post.content.ilike(f"%{search}%")
+                    )
+                )
+
+        if from_date:
+            start_datetime = datetime.combine(from_date, time.min)
+            query = query.filter(Post.created_at >= start_datetime)
+
+        if to_date:
+            end_datetime = datetime.combine(to_date, time.max)
+            query = query.filter(Post.created_at <= end_datetime)
+
+        if since_hours:
+            start_datetime = datetime.utcnow() - timedelta(hours=since_hours)
+            query = query.filter(Post.created_at >= start_datetime)
+
+        return query, search_rank
+
+    def _page_query(self, query, order: str, page: int, size: int, cursor: str | None, search_rank=None):
+        """
+        Ordena y limita `query` (Query o Select) para una página de `size` + 1
+        filas (la extra indica si hay página siguiente sin COUNT). Devuelve
+        (query, key_order); key_order es None en orden por relevancia, que no
+        admite cursor.
+        """
+        if order == "relevance" and search_rank is not None:
+            # El ranking BM25 no es una columna indexable: solo modo por página.
+            if cursor:
+                raise InvalidCursor()
+            query = (
+                query.order_by(search_rank, Post.created_at.desc(), Post.id.desc())
+                .offset((page - 1) * size)
+                .limit(size)
+            )
+            return query, None
+
+        key_order = order if order in ORDER_KEYS else "recent"
+        columns = ORDER_KEYS[key_order]
+        query = query.order_by(*[column.desc() for column in columns])
+
+        if cursor:
+            values = self.decode_keyset(cursor, key_order)
+            query = query.filter(tuple_(*columns) < tuple_(*values))
+        else:
+            query = query.offset((page - 1) * size)
+        return query.limit(size + 1), key_order
+
+    def _split_page(self, rows: list[Post], size: int, key_order: str | None):
+        """(posts, next_cursor) a partir de las filas de _page_query."""
+        posts = rows[:size]
+        if key_order is None:
+            return posts, None
+        next_cursor = self.make_cursor(posts[-1], key_order) if len(rows) > size else None
+        return posts, next_cursor
+
+    @staticmethod
+    def _feed_order(order: str) -> str:
+        """En el feed, "recent" usa la clave de los timelines (id) en lugar de (created_at, id)."""
+        return "feed" if order == "recent" else order
+
+    @staticmethod
+    def make_cursor(post: Post, order: str) -> str:
+        """Cursor opaco que apunta justo después de `post` en el orden indicado."""
+        columns = ORDER_KEYS[order]
+        return encode_cursor(order, [getattr(post, column.key) for column in columns])
+
+    @staticmethod
+    def decode_keyset(cursor: str, order: str) -> list:
+        """Valores de la clave de ordenación codificados en `cursor` (InvalidCursor si no es válido)."""
+        columns = ORDER_KEYS[order]
+        values = decode_cursor(cursor, order, len(columns))
+        try:
+            return [
+                datetime.fromisoformat(value) if isinstance(column.type, DateTime) else int(value)
+                for column, value in zip(columns, values)
+            ]
+        except (TypeError, ValueError):
+            raise InvalidCursor()
+
+
+class PostRepository(BasePostRepository):
+    db: Session
+
     def create(self, title: str, content: str, image_url: str, author_id: int):
         new_post = Post(
             title=title,
@@ -16,8 +135,7 @@ class PostRepository:
             author_id=author_id
         )
         self.db.add(new_post)
-        self.db.commit()
-        self.db.refresh(new_post)
+        self.db.flush()
         return new_post
 
     def get_by_id(self, post_id: int, include_relations: bool = True):
@@ -38,45 +156,60 @@ class PostRepository:
         from_date: date | None = None,
         to_date: date | None = None,
         since_hours: int | None = None,
-        order: str = "recent"
+        order: str = "recent",
+        cursor: str | None = None,
+        include_total: bool = True
     ):
         query = self.db.query(Post).options(selectinload(Post.author))
+        query, search_rank = self._apply_filters(query, search, author_id, from_date, to_date, since_hours)
+        return self._paginate(query, order, page, size, cursor, include_total, search_rank)
 
-        if author_id:
-            query = query.filter(Post.author_id == author_id)
-
-        if search:
-            query = query.filter(
-                or_(
-                    Post.title.ilike(f"%{search}%"),
-                    Post.content.ilike(f"%{search}%")
-                )
-            )
-
-        if from_date:
-            start_datetime = datetime.combine(from_date, time.min)
-            query = query.filter(Post.created_at >= start_datetime)
+    def filter_ids(
+        self,
+        post_ids: list[int],
+        search: str | None = None,
+        author_id: int | None = None,
+        from_date: date | None = None,
+        to_date: date | None = None,
+        since_hours: int | None = None
+    ) -> set[int]:
+        """Subconjunto de `post_ids` que cumple los filtros del listado."""
+        if not post_ids:
+            return set()
+        query = self.db.query(Post.id).filter(Post.id.in_(post_ids))
+        query, _ = self._apply_filters(query, search, author_id, from_date, to_date, since_hours)
+        return {post_id for (post_id,) in query.all()}
 
-        if to_date:
-            end_datetime = datetime.combine(to_date, time.max)
-            query = query.filter(Post.created_at <= end_datetime)
+    def get_by_ids(self, post_ids: list[int]) -> list[Post]:
+        """Hidrata varios posts (con autor) en una sola consulta, respetando el orden de `post_ids`."""
+        if not post_ids:
+            return []
+        posts = (
+            self.db.query(Post)
+            .options(selectinload(Post.author))
+            .filter(Post.id.in_(post_ids))
+            .all()
+        )
+        by_id = {post.id: post for post in posts}
+        return [by_id[post_id] for post_id in post_ids if post_id in by_id]
 
-        if since_hours:
-            start_datetime = datetime.utcnow() - timedelta(hours=since_hours)
-            query = query.filter(Post.created_at >= start_datetime)
+    def get_recent_ids_by_authors(self, author_ids: list[int], limit: int) -> list[int]:
+        """Ids de los posts más recientes de `author_ids` en orden de id DESC (el de los timelines)."""
+        if not author_ids:
+            return []
+        rows = (
+            self.db.query(Post.id)
+            .filter(Post.author_id.in_(author_ids))
+            .order_by(Post.id.desc())
+            .limit(limit)
+            .all()
+        )
+        return [r[0] for r in rows]
 
-        total = query.count()
-        
-        # Aplicar ordenamiento
-        if order == "most_liked":
-            query = query.order_by(Post.likes_count.desc(), Post.created_at.desc())
-        elif order == "most_commented":
-            query = query.order_by(Post.comments_count.desc(), Post.created_at.desc())
-        else:  # "recent" por defecto
-            query = query.order_by(Post.created_at.desc())
-        
-        posts = query.offset((page - 1) * size).limit(size).all()
-        return total, posts
+    def count_by_authors(self, author_ids: list[int]) -> int:
+        if not author_ids:
+            return 0
+        return self.db.query(func.count(Post.id)).filter(Post.author_id.in_(author_ids)).scalar()
 
     def get_user_liked_posts(self, post_ids: list[int], user_id: int):
         user_likes = (
@@ -93,32 +226,157 @@ class PostRepository:
         post.title = title
         post.content = content
         post.image_url = image_url
-        self.db.commit()
-        self.db.refresh(post)
+        self.db.flush()
         return post
 
     def delete(self, post: Post):
         self.db.delete(post)
-        self.db.commit()
+        self.db.flush()
 
 
-    def get_feed_posts(self, followed_ids: list[int], page: int, size: int, order: str = "recent"):
+    def get_feed_posts(
+        self,
+        followed_ids: list[int],
+        page: int,
+        size: int,
+        order: str = "recent",
+        cursor: str | None = None,
+        include_total: bool = True
+    ):
         query = self.db.query(Post).options(selectinload(Post.author)).filter(
             Post.author_id.in_(followed_ids)
         )
-        
-        # Aplicar ordenamiento
-        if order == "most_liked":
-            query = query.order_by(Post.likes_count.desc(), Post.created_at.desc())
-        elif order == "most_commented":
-            query = query.order_by(Post.comments_count.desc(), Post.created_at.desc())
-        else:  # "recent" por defecto
-            query = query.order_by(Post.created_at.desc())
+        return self._paginate(query, self._feed_order(order), page, size, cursor, include_total)
+
+    def _paginate(
+        self,
+        query,
+        order: str,
+        page: int,
+        size: int,
+        cursor: str | None,
+        include_total: bool,
+        search_rank=None
+    ):
+        """
+        Pagina `query` y devuelve (total, posts, next_cursor).
+        - Con `cursor`: keyset pagination (WHERE clave < cursor), coste independiente
+          de la profundidad gracias a los índices sobre la clave de ordenación.
+        - Sin `cursor`: modo clásico por `page` (OFFSET), por compatibilidad.
+        El COUNT solo se ejecuta si `include_total` es True.
+        """
+        total = query.count() if include_total else None
+        page_query, key_order = self._page_query(query, order, page, size, cursor, search_rank)
+        posts, next_cursor = self._split_page(page_query.all(), size, key_order)
+        return total, posts, next_cursor
+
+
+class AsyncPostRepository(BasePostRepository):
+    """
+    Lecturas de posts con AsyncSession (stack async). Mismas consultas que
+    PostRepository en estilo select(); las relaciones se cargan siempre con
+    selectinload porque una carga perezosa no está permitida en async.
+    """
+    db: AsyncSession
+
+    async def get_by_id(self, post_id: int) -> Post | None:
+        return await self.db.scalar(
+            select(Post).options(selectinload(Post.author)).where(Post.id == post_id)
+        )
+
+    async def get_paginated_posts(
+        self,
+        page: int,
+        size: int,
+        search: str | None = None,
+        author_id: int | None = None,
+        from_date: date | None = None,
+        to_date: date | None = None,
+        since_hours: int | None = None,
+        order: str = "recent",
+        cursor: str | None = None,
+        include_total: bool = True
+    ):
+        query = select(Post).options(selectinload(Post.author))
+        query, search_rank = self._apply_filters(query, search, author_id, from_date, to_date, since_hours)
+        return await self._paginate(query, order, page, size, cursor, include_total, search_rank)
+
+    async def filter_ids(
+        self,
+        post_ids: list[int],
+        search: str | None = None,
+        author_id: int | None = None,
+        from_date: date | None = None,
+        to_date: date | None = None,
+        since_hours: int | None = None
+    ) -> set[int]:
+        """Subconjunto de `post_ids` que cumple los filtros del listado."""
+        if not post_ids:
+            return set()
+        query = select(Post.id).where(Post.id.in_(post_ids))
+        query, _ = self._apply_filters(query, search, author_id, from_date, to_date, since_hours)
+        return set(await self.db.scalars(query))
+
+    async def get_by_ids(self, post_ids: list[int]) -> list[Post]:
+        """Hidrata varios posts (con autor) en una sola consulta, respetando el orden de `post_ids`."""
+        if not post_ids:
+            return []
+        posts = await self.db.scalars(
+            select(Post).options(selectinload(Post.author)).where(Post.id.in_(post_ids))
+        )
+        by_id = {post.id: post for post in posts}
+        return [by_id[post_id] for post_id in post_ids if post_id in by_id]
 
-        total = query.count()
+    async def count_feed(self, user_id: int) -> int:
+        """Posts de las cuentas que sigue `user_id`."""
+        return await self.db.scalar(
+            select(func.count(Post.id)).where(Post.author_id.in_(self._followed_ids(user_id)))
+        )
 
-        posts = query.offset((page - 1) * size).limit(size).all()
+    async def get_user_liked_posts(self, post_ids: list[int], user_id: int) -> set[int]:
+        if not post_ids:
+            return set()
+        return set(await self.db.scalars(
+            select(Like.post_id).where(
+                Like.post_id.in_(post_ids),
+                Like.user_id == user_id
+            )
+        ))
 
-        return total, posts
+    async def get_feed_posts(
+        self,
+        user_id: int,
+        page: int,
+        size: int,
+        order: str = "recent",
+        cursor: str | None = None,
+        include_total: bool = True
+    ):
+        # Subconsulta en lugar de cargar antes los ids seguidos: un round trip menos
+        query = select(Post).options(selectinload(Post.author)).where(
+            Post.author_id.in_(self._followed_ids(user_id))
+        )
+        return await self._paginate(query, self._feed_order(order), page, size, cursor, include_total)
 
+    @staticmethod
+    def _followed_ids(user_id: int):
+        return select(Follow.followed_id).where(Follow.follower_id == user_id)
 
+    async def _paginate(
+        self,
+        query,
+        order: str,
+        page: int,
+        size: int,
+        cursor: str | None,
+        include_total: bool,
+        search_rank=None
+    ):
+        """Igual que PostRepository._paginate: (total, posts, next_cursor)."""
+        total = None
+        if include_total:
+            total = await self.db.scalar(select(func.count()).select_from(query.subquery()))
+        page_query, key_order = self._page_query(query, order, page, size, cursor, search_rank)
+        rows = list(await self.db.scalars(page_query))
+        posts, next_cursor = self._split_page(rows, size, key_order)
+        return total, posts, next_cursor
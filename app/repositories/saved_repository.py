@@ -25,13 +25,12 @@ class SavedRepository:
     def create(self, post_id: int, user_id: int) -> SavedPost:
         saved_post = SavedPost(user_id=user_id, post_id=post_id)
         self.db.add(saved_post)
-        self.db.commit()
-        self.db.refresh(saved_post)
+        self.db.flush()
         return saved_post
 
     def delete(self, saved_post: SavedPost) -> None:
         self.db.delete(saved_post)
-        self.db.commit()
+        self.db.flush()
 
     def get_saved_posts_paginated(self, user_id: int, page: int, size: int) -> tuple[int, list[Post]]:
         query = (
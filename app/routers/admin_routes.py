@@ -3,7 +3,10 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.models.user import User
+from app.services.user_cache import UserPrincipal, user_cache
 from app.core.dependencies import admin_only
+from app.db.query_stats import query_stats_registry
+from app.auth.auth_handler import invalidate_user_tokens
 from app.core.redis import redis_client
 from app.services.session_service import SessionService
 from app.schemas.user_schema import UserRole
@@ -14,8 +17,8 @@ router = APIRouter(prefix="/admin", tags=["Admin"])
 
 @router.get("/users")
 def get_all_users(
-    db: Session = Depends(get_db),
-    current_admin: User = Depends(admin_only)
+    db: Session = Depends(get_db, scope="function"),
+    current_admin: UserPrincipal = Depends(admin_only)
 ):
     return db.query(User).all()
 
@@ -24,8 +27,8 @@ def get_all_users(
 def update_role(
     user_id: int,
     role: UserRole,
-    db: Session = Depends(get_db),
-    current_admin: User = Depends(admin_only)
+    db: Session = Depends(get_db, scope="function"),
+    current_admin: UserPrincipal = Depends(admin_only)
 ):
     user = db.query(User).filter(User.id == user_id).first()
 
@@ -33,16 +36,18 @@ def update_role(
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
     user.role = role.value  # persiste el string "user" / "admin"
-    db.commit()
-    db.refresh(user)
+    # Los tokens emitidos con el rol anterior dejan de valer
+    invalidate_user_tokens(user)
+    db.flush()
+    session_service.close_all_sessions(user.id)
 
     return {"message": "Rol actualizado", "user": user}
 
 @router.get("/users/{user_id}/sessions/metrics")
 def get_user_metrics_admin(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_admin: User = Depends(admin_only)
+    db: Session = Depends(get_db, scope="function"),
+    current_admin: UserPrincipal = Depends(admin_only)
 ):
     """
     5.5 - Endpoint administrativo extendido.
@@ -54,3 +59,15 @@ def get_user_metrics_admin(
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
         
     return session_service.get_metrics_for_user(user_id)
+
+
+@router.get("/user-cache")
+def get_user_cache_stats(current_admin: UserPrincipal = Depends(admin_only)):
+    """Aciertos/fallos de la caché de usuarios autenticados de este worker."""
+    return user_cache.stats()
+
+
+@router.get("/query-stats")
+def get_query_stats(current_admin: UserPrincipal = Depends(admin_only)):
+    """Sentencias SQL, tiempo en BD, consultas lentas y posibles N+1 por ruta en este worker."""
+    return query_stats_registry.snapshot()
@@ -0,0 +1,106 @@
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.async_session import get_async_db
+from app.services.user_cache import UserPrincipal
+from app.core.dependencies import get_current_user_async
+from app.services.message_service import AsyncMessageService
+from app.schemas.message_schema import (
+    MessageCreate,
+    MessageResponse,
+    ConversationResponse,
+    PaginatedConversations,
+    PaginatedMessages,
+    UnreadMessagesCountResponse,
+    MarkReadResponse,
+)
+
+# Mensajes con el stack async (ASYNC_DB_ENABLED): mismas rutas que message_router.
+router = APIRouter(prefix="/messages", tags=["Messages"])
+
+
+# async def: una dependencia síncrona se ejecutaría en el threadpool
+async def get_async_message_service(db: AsyncSession = Depends(get_async_db, scope="function")):
+    return AsyncMessageService(db)
+
+
+# Cantidad total de mensajes no leidos
+@router.get("/unread-count", response_model=UnreadMessagesCountResponse)
+async def get_unread_count(
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncMessageService = Depends(get_async_message_service),
+):
+    return await service.get_unread_count(current_user)
+
+
+# Listar las conversaciones del usuario (paginación por cursor sobre last_message_at)
+@router.get("/conversations", response_model=PaginatedConversations)
+async def get_conversations(
+    size: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="Cursor opaco devuelto en next_cursor"),
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncMessageService = Depends(get_async_message_service),
+):
+    return await service.get_conversations(current_user, size, cursor)
+
+
+# Iniciar u obtener conversacion existente con un usuario
+@router.post(
+    "/conversations/{user_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=ConversationResponse,
+)
+async def get_or_create_conversation(
+    user_id: int,
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncMessageService = Depends(get_async_message_service),
+):
+    return await service.get_or_create_conversation(current_user, user_id)
+
+
+# Obtener mensajes paginados de una conversacion
+@router.get("/conversations/{conv_id}/messages", response_model=PaginatedMessages)
+async def get_messages_subpath(
+    conv_id: int,
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=100),
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncMessageService = Depends(get_async_message_service),
+):
+    return await service.get_messages(conv_id, current_user, page=page, size=size)
+
+
+# Obtener mensajes paginados de una conversacion (ruta directa /conversations/{conv_id})
+@router.get("/conversations/{conv_id}", response_model=PaginatedMessages)
+async def get_messages(
+    conv_id: int,
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=100),
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncMessageService = Depends(get_async_message_service),
+):
+    return await service.get_messages(conv_id, current_user, page=page, size=size)
+
+
+# Enviar mensaje en una conversacion
+@router.post(
+    "/conversations/{conv_id}/send",
+    status_code=status.HTTP_201_CREATED,
+    response_model=MessageResponse,
+)
+async def send_message(
+    conv_id: int,
+    payload: MessageCreate,
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncMessageService = Depends(get_async_message_service),
+):
+    return await service.send_message(conv_id, current_user, payload.content)
+
+
+# Marcar mensajes de una conversacion como leidos
+@router.patch("/conversations/{conv_id}/read", response_model=MarkReadResponse)
+async def mark_as_read(
+    conv_id: int,
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncMessageService = Depends(get_async_message_service),
+):
+    return await service.mark_as_read(conv_id, current_user)
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.async_session import get_async_db
+from app.services.user_cache import UserPrincipal
+from app.core.dependencies import get_current_user_async
+from app.services.notification_service import AsyncNotificationService
+from app.schemas.notification_schema import (
+    NotificationResponse,
+    PaginatedNotifications,
+    UnreadCountResponse,
+)
+
+# Notificaciones con el stack async (ASYNC_DB_ENABLED): mismas rutas que notification_router.
+router = APIRouter(prefix="/notifications", tags=["Notifications"])
+
+
+# async def: una dependencia síncrona se ejecutaría en el threadpool
+async def get_async_notification_service(db: AsyncSession = Depends(get_async_db, scope="function")):
+    return AsyncNotificationService(db)
+
+
+# Listar mis notificaciones (paginadas)
+@router.get("/", response_model=PaginatedNotifications)
+async def get_my_notifications(
+    page: int = Query(1, ge=1),
+    size: int = Query(15, ge=1, le=50),
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncNotificationService = Depends(get_async_notification_service),
+):
+    return await service.get_my_notifications(current_user, page, size)
+
+
+# Cantidad de notificaciones no leidas (badge del sidebar)
+@router.get("/unread-count", response_model=UnreadCountResponse)
+async def get_unread_count(
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncNotificationService = Depends(get_async_notification_service),
+):
+    return await service.get_unread_count(current_user)
+
+
+# Marcar todas como leidas
+@router.patch("/read-all")
+async def mark_all_as_read(
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncNotificationService = Depends(get_async_notification_service),
+):
+    return await service.mark_all_as_read(current_user)
+
+
+# Marcar una notificacion como leida
+@router.patch("/{notification_id}/read", response_model=NotificationResponse)
+async def mark_as_read(
+    notification_id: int,
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncNotificationService = Depends(get_async_notification_service),
+):
+    return await service.mark_as_read(notification_id, current_user)
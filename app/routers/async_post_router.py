@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.async_session import get_async_db
+from app.services.user_cache import UserPrincipal
+from app.schemas import PostResponse, PaginatedPosts
+from app.core.dependencies import get_current_user_async
+from datetime import date
+from app.services.post_service import AsyncPostService
+from app.routers import post_router
+
+# Posts con el stack async (ASYNC_DB_ENABLED): sustituye a post_router. Las
+# lecturas son async; las escrituras se toman tal cual de post_router.
+router = APIRouter(prefix="/posts", tags=["Posts"])
+
+
+# async def: una dependencia síncrona se ejecutaría en el threadpool
+async def get_async_post_service(db: AsyncSession = Depends(get_async_db, scope="function")):
+    return AsyncPostService(db)
+
+
+# Obtener posts (con paginación + búsqueda)
+@router.get("/", response_model=PaginatedPosts)
+async def get_posts(
+    page: int = Query(1, ge=1),
+    limit: int | None = Query(None, ge=1, le=50),
+    size: int = Query(10, ge=1, le=50),
+    order: str = Query("recent", pattern="^(recent|most_liked|most_commented|relevance|trending)$"),
+    search: str | None = Query(None),
+    author_id: int | None = Query(None),
+    from_date: date | None = Query(None),
+    to_date: date | None = Query(None),
+    since_hours: int | None = Query(None),
+    cursor: str | None = Query(None, description="Cursor opaco devuelto en next_cursor (keyset pagination)"),
+    include_total: bool | None = Query(None, description="Calcular total/total_pages (por defecto solo en modo page)"),
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncPostService = Depends(get_async_post_service)
+):
+    return await service.get_posts(
+        page=page,
+        limit=limit if limit is not None else size,
+        search=search,
+        author_id=author_id,
+        from_date=from_date,
+        to_date=to_date,
+        since_hours=since_hours,
+        current_user=current_user,
+        order=order,
+        cursor=cursor,
+        include_total=include_total
+    )
+
+
+@router.get("/feed", response_model=PaginatedPosts)
+async def get_feed(
+    page: int = Query(1, ge=1),
+    limit: int | None = Query(None, ge=1, le=50),
+    size: int = Query(10, ge=1, le=50),
+    order: str = Query("recent", pattern="^(recent|most_liked|most_commented)$"),
+    cursor: str | None = Query(None, description="Cursor opaco devuelto en next_cursor (keyset pagination)"),
+    include_total: bool | None = Query(None, description="Calcular total/total_pages (por defecto solo en modo page)"),
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncPostService = Depends(get_async_post_service)
+):
+    actual_size = limit if limit is not None else size
+    return await service.get_feed(current_user.id, page, actual_size, order, cursor, include_total)
+
+
+# Obtener post por id
+@router.get("/{post_id}", response_model=PostResponse)
+async def get_post(
+    post_id: int,
+    current_user: UserPrincipal = Depends(get_current_user_async),
+    service: AsyncPostService = Depends(get_async_post_service)
+):
+    return await service.get_post(post_id, current_user)
+
+
+# Resto de rutas (crear, editar, borrar, admin): las síncronas de post_router
+_async_routes = {(route.path, frozenset(route.methods)) for route in router.routes}
+router.routes.extend(
+    route for route in post_router.router.routes
+    if (route.path, frozenset(route.methods)) not in _async_routes
+)
@@ -1,16 +1,16 @@
-from fastapi import APIRouter, Depends, status, Response
+from fastapi import APIRouter, Depends, Query, status, Response
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
-from app.schemas import CommentCreate, CommentResponse, CommentUpdate
+from app.schemas import CommentCreate, CommentResponse, CommentUpdate, PaginatedComments
 from app.core.dependencies import get_current_user
-from app.models.user import User
+from app.services.user_cache import UserPrincipal
 from app.services.comment_service import CommentService
 from app.mappers.comment_mapper import map_comment_to_response
 
 router = APIRouter(prefix="/comments", tags=["Comments"])
 
-def get_comment_service(db: Session = Depends(get_db)):
+def get_comment_service(db: Session = Depends(get_db, scope="function")):
     return CommentService(db)
 
 # Crear comentario
@@ -18,22 +18,26 @@ def get_comment_service(db: Session = Depends(get_db)):
 def create_comment(
     post_id: int,
     comment: CommentCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: CommentService = Depends(get_comment_service)
 ):
     new_comment = service.create_comment(post_id, comment, current_user)
     return map_comment_to_response(new_comment)
 
 
-# Obtener comentarios de un post (requiere autenticación)
-@router.get("/post/{post_id}", response_model=list[CommentResponse])
+# Obtener comentarios de un post en orden cronológico (paginación por cursor, requiere autenticación)
+@router.get("/post/{post_id}", response_model=PaginatedComments)
 def get_comments(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    size: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="Cursor opaco devuelto en next_cursor"),
+    include_total: bool = Query(False, description="Incluir el total de comentarios del post"),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: CommentService = Depends(get_comment_service)
 ):
-    comments = service.get_comments_by_post(post_id)
-    return [map_comment_to_response(comment) for comment in comments]
+    page = service.get_comments_by_post(post_id, size, cursor, include_total)
+    page["items"] = [map_comment_to_response(comment) for comment in page["items"]]
+    return page
 
 
 # Editar comentario (solo dueño)
@@ -41,7 +45,7 @@ def get_comments(
 def update_comment(
     comment_id: int,
     comment: CommentUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: CommentService = Depends(get_comment_service)
 ):
     updated_comment = service.update_comment(comment_id, comment, current_user)
@@ -52,7 +56,7 @@ def update_comment(
 @router.delete("/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_comment(
     comment_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: CommentService = Depends(get_comment_service)
 ):
     service.delete_comment(comment_id, current_user)
@@ -1,14 +1,14 @@
 from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.models.user import User
+from app.services.user_cache import UserPrincipal
 from app.core.dependencies import get_current_user
 from app.services.message_service import MessageService
 from app.schemas.message_schema import (
     MessageCreate,
     MessageResponse,
     ConversationResponse,
-    ConversationListItem,
+    PaginatedConversations,
     PaginatedMessages,
     UnreadMessagesCountResponse,
     MarkReadResponse,
@@ -17,26 +17,28 @@ from app.schemas.message_schema import (
 router = APIRouter(prefix="/messages", tags=["Messages"])
 
 
-def get_message_service(db: Session = Depends(get_db)):
+def get_message_service(db: Session = Depends(get_db, scope="function")):
     return MessageService(db)
 
 
 # Cantidad total de mensajes no leidos
 @router.get("/unread-count", response_model=UnreadMessagesCountResponse)
 def get_unread_count(
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: MessageService = Depends(get_message_service),
 ):
     return service.get_unread_count(current_user)
 
 
-# Listar todas las conversaciones del usuario
-@router.get("/conversations", response_model=list[ConversationListItem])
+# Listar las conversaciones del usuario (paginación por cursor sobre last_message_at)
+@router.get("/conversations", response_model=PaginatedConversations)
 def get_conversations(
-    current_user: User = Depends(get_current_user),
+    size: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="Cursor opaco devuelto en next_cursor"),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: MessageService = Depends(get_message_service),
 ):
-    return service.get_conversations(current_user)
+    return service.get_conversations(current_user, size, cursor)
 
 
 # Iniciar u obtener conversacion existente con un usuario
@@ -47,7 +49,7 @@ def get_conversations(
 )
 def get_or_create_conversation(
     user_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: MessageService = Depends(get_message_service),
 ):
     return service.get_or_create_conversation(current_user, user_id)
@@ -59,7 +61,7 @@ def get_messages_subpath(
     conv_id: int,
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: MessageService = Depends(get_message_service),
 ):
     return service.get_messages(conv_id, current_user, page=page, size=size)
@@ -71,7 +73,7 @@ def get_messages(
     conv_id: int,
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: MessageService = Depends(get_message_service),
 ):
     return service.get_messages(conv_id, current_user, page=page, size=size)
@@ -86,7 +88,7 @@ def get_messages(
 def send_message(
     conv_id: int,
     payload: MessageCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: MessageService = Depends(get_message_service),
 ):
     return service.send_message(conv_id, current_user, payload.content)
@@ -96,7 +98,7 @@ def send_message(
 @router.patch("/conversations/{conv_id}/read", response_model=MarkReadResponse)
 def mark_as_read(
     conv_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: MessageService = Depends(get_message_service),
 ):
     return service.mark_as_read(conv_id, current_user)
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+from app.core.metrics import render_metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+# Exposición para Prometheus (sin autenticación: restringir el acceso en el
+# proxy o la red; no incluye datos de usuarios)
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
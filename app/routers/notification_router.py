@@ -1,7 +1,7 @@
 ﻿from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.models.user import User
+from app.services.user_cache import UserPrincipal
 from app.core.dependencies import get_current_user
 from app.services.notification_service import NotificationService
 from app.schemas.notification_schema import (
@@ -13,7 +13,7 @@ from app.schemas.notification_schema import (
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
 
-def get_notification_service(db: Session = Depends(get_db)):
+def get_notification_service(db: Session = Depends(get_db, scope="function")):
     return NotificationService(db)
 
 
@@ -22,7 +22,7 @@ def get_notification_service(db: Session = Depends(get_db)):
 def get_my_notifications(
     page: int = Query(1, ge=1),
     size: int = Query(15, ge=1, le=50),
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: NotificationService = Depends(get_notification_service),
 ):
     return service.get_my_notifications(current_user, page, size)
@@ -31,7 +31,7 @@ def get_my_notifications(
 # Cantidad de notificaciones no leidas (badge del sidebar)
 @router.get("/unread-count", response_model=UnreadCountResponse)
 def get_unread_count(
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: NotificationService = Depends(get_notification_service),
 ):
     return service.get_unread_count(current_user)
@@ -40,7 +40,7 @@ def get_unread_count(
 # Marcar todas como leidas
 @router.patch("/read-all")
 def mark_all_as_read(
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: NotificationService = Depends(get_notification_service),
 ):
     return service.mark_all_as_read(current_user)
@@ -50,7 +50,7 @@ def mark_all_as_read(
 @router.patch("/{notification_id}/read", response_model=NotificationResponse)
 def mark_as_read(
     notification_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: NotificationService = Depends(get_notification_service),
 ):
     return service.mark_as_read(notification_id, current_user)
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, run_after_commit
 from app.models.user import User
+from app.services.user_cache import UserPrincipal, user_cache
 from app.schemas import PostCreate, PostResponse, PaginatedPosts
 from app.core.dependencies import get_current_user, admin_only
 from datetime import date
@@ -9,14 +10,14 @@ from app.services.post_service import PostService
 
 router = APIRouter(prefix="/posts", tags=["Posts"])
 
-def get_post_service(db: Session = Depends(get_db)):
+def get_post_service(db: Session = Depends(get_db, scope="function")):
     return PostService(db)
 
 # Crear post 
 @router.post("/", response_model=PostResponse)
 def create_post(
     post: PostCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: PostService = Depends(get_post_service)
 ):
     return service.create_post(post, current_user)
@@ -27,13 +28,15 @@ def get_posts(
     page: int = Query(1, ge=1),
     limit: int | None = Query(None, ge=1, le=50),
     size: int = Query(10, ge=1, le=50),
-    order: str = Query("recent", pattern="^(recent|most_liked|most_commented)$"),
+    order: str = Query("recent", pattern="^(recent|most_liked|most_commented|relevance|trending)$"),
     search: str | None = Query(None),
     author_id: int | None = Query(None),
     from_date: date | None = Query(None),
     to_date: date | None = Query(None),
     since_hours: int | None = Query(None),
-    current_user: User = Depends(get_current_user),
+    cursor: str | None = Query(None, description="Cursor opaco devuelto en next_cursor (keyset pagination)"),
+    include_total: bool | None = Query(None, description="Calcular total/total_pages (por defecto solo en modo page)"),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: PostService = Depends(get_post_service)
 ):
     return service.get_posts(
@@ -45,7 +48,9 @@ def get_posts(
         to_date=to_date,
         since_hours=since_hours,
         current_user=current_user,
-        order=order
+        order=order,
+        cursor=cursor,
+        include_total=include_total
     )
 
 @router.get("/feed", response_model=PaginatedPosts)
@@ -54,17 +59,19 @@ def get_feed(
     limit: int | None = Query(None, ge=1, le=50),
     size: int = Query(10, ge=1, le=50),
     order: str = Query("recent", pattern="^(recent|most_liked|most_commented)$"),
-    current_user: User = Depends(get_current_user),
+    cursor: str | None = Query(None, description="Cursor opaco devuelto en next_cursor (keyset pagination)"),
+    include_total: bool | None = Query(None, description="Calcular total/total_pages (por defecto solo en modo page)"),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: PostService = Depends(get_post_service)
 ):
     actual_size = limit if limit is not None else size
-    return service.get_feed(current_user.id, page, actual_size, order)
+    return service.get_feed(current_user.id, page, actual_size, order, cursor, include_total)
 
 # Obtener post por id
 @router.get("/{post_id}", response_model=PostResponse)
 def get_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: PostService = Depends(get_post_service)
 ):
     return service.get_post(post_id, current_user)
@@ -74,7 +81,7 @@ def get_post(
 def update_post(
     post_id: int,
     post: PostCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: PostService = Depends(get_post_service)
 ):
     return service.update_post(post_id, post, current_user)
@@ -83,16 +90,19 @@ def update_post(
 @router.delete("/{post_id}")
 def delete_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: PostService = Depends(get_post_service)
 ):
     return service.delete_post(post_id, current_user)
 
 # ADMIN: Corregir roles de usuarios (DEBUG)
 @router.post("/admin/fix-roles")
-def fix_user_roles(current_user: User = Depends(admin_only), db: Session = Depends(get_db)):
+def fix_user_roles(current_user: UserPrincipal = Depends(admin_only), db: Session = Depends(get_db, scope="function")):
+    fixed = [email for (email,) in db.query(User.email).filter(User.role == None)]
     db.query(User).filter(User.role == None).update({User.role: "user"})
-    db.commit()
+    # El update() masivo no pasa por el flush: invalidar la caché a mano
+    if fixed:
+        run_after_commit(db, lambda: user_cache.publish_invalidation(fixed))
     all_users = db.query(User).all()
     return {
         "message": "Roles corregidos",
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from redis.exceptions import RedisError
+from app.auth.auth_handler import decode_access_token_async
+from app.core.config import settings
+from app.core.dependencies import resolve_principal_async
+from app.services.realtime_service import realtime_hub, RealtimePublisher, OVERFLOW
+
+router = APIRouter(prefix="/realtime", tags=["Realtime"])
+
+# En SSE el token puede ir en el header (fetch) o en ?token= (EventSource no admite headers)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token", auto_error=False)
+
+# Códigos de cierre del WebSocket (rango 4000-4999 reservado a la aplicación)
+WS_CLOSE_UNAUTHORIZED = 4401
+WS_CLOSE_TOKEN_EXPIRED = 4403
+WS_CLOSE_SLOW_CONSUMER = 4408
+
+
+async def _authenticate(token: str | None) -> dict:
+    """Valida el access token (firma, expiración, revocación y versión) sin bloquear el event loop."""
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No autenticado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    payload = await decode_access_token_async(token)
+    await resolve_principal_async(payload)
+    return payload
+
+
+def _seconds_left(payload: dict) -> float:
+    return payload["exp"] - time.time()
+
+
+def _hello() -> str:
+    # Identifica el worker que atiende la conexión (diagnóstico y prueba de carga)
+    return RealtimePublisher.encode("hello", {"worker": realtime_hub.worker_id})
+
+
+# Eventos en tiempo real por WebSocket: ws://.../realtime/ws?token=<access_token>
+@router.websocket("/ws")
+async def realtime_websocket(websocket: WebSocket, token: str | None = Query(None)):
+    try:
+        payload = await _authenticate(token)
+    except HTTPException:
+        await websocket.close(code=WS_CLOSE_UNAUTHORIZED)
+        return
+
+    user_id = payload["user_id"]
+    try:
+        queue = await realtime_hub.connect(user_id)
+    except RedisError:
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        return
+
+    async def receive():
+        # El cliente no envía nada; leer solo sirve para detectar el cierre
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    async def send():
+        while True:
+            timeout = min(settings.REALTIME_HEARTBEAT_SECONDS, _seconds_left(payload))
+            if timeout <= 0:
+                await websocket.close(code=WS_CLOSE_TOKEN_EXPIRED)
+                return
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                await websocket.send_text('{"type": "ping"}')
+                continue
+            if event is OVERFLOW:
+                await websocket.close(code=WS_CLOSE_SLOW_CONSUMER)
+                return
+            await websocket.send_text(event)
+
+    tasks = []
+    try:
+        await websocket.accept()
+        await websocket.send_text(_hello())
+        tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await realtime_hub.disconnect(user_id, queue)
+
+
+# Alternativa SSE (text/event-stream) para clientes sin WebSocket
+@router.get("/events")
+async def realtime_events(
+    request: Request,
+    token: str | None = Query(None),
+    header_token: str | None = Depends(optional_oauth2_scheme),
+):
+    payload = await _authenticate(token or header_token)
+    user_id = payload["user_id"]
+    try:
+        queue = await realtime_hub.connect(user_id)
+    except RedisError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servicio de eventos no disponible. Inténtalo de nuevo más tarde.",
+        )
+
+    async def stream():
+        try:
+            yield f"retry: 3000\ndata: {_hello()}\n\n"
+            while not await request.is_disconnected():
+                timeout = min(settings.REALTIME_HEARTBEAT_SECONDS, _seconds_left(payload))
+                if timeout <= 0:
+                    yield "event: token_expired\ndata: {}\n\n"
+                    return
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    # Comentario SSE: mantiene viva la conexión a través de proxies
+                    yield ": ping\n\n"
+                    continue
+                if event is OVERFLOW:
+                    return
+                yield f"data: {event}\n\n"
+        finally:
+            await realtime_hub.disconnect(user_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
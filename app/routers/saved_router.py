@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.models.user import User
+from app.services.user_cache import UserPrincipal
 from app.core.dependencies import get_current_user
 from app.services.saved_service import SavedService
 from app.schemas.saved_schema import (
@@ -13,7 +13,7 @@ from app.schemas.saved_schema import (
 router = APIRouter(prefix="/saved", tags=["Saved Posts"])
 
 
-def get_saved_service(db: Session = Depends(get_db)):
+def get_saved_service(db: Session = Depends(get_db, scope="function")):
     return SavedService(db)
 
 
@@ -21,7 +21,7 @@ def get_saved_service(db: Session = Depends(get_db)):
 @router.post("/{post_id}", status_code=status.HTTP_201_CREATED, response_model=SaveActionResponse)
 def save_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: SavedService = Depends(get_saved_service),
 ):
     return service.save_post(post_id, current_user)
@@ -31,7 +31,7 @@ def save_post(
 @router.delete("/{post_id}", status_code=status.HTTP_200_OK, response_model=SaveActionResponse)
 def unsave_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: SavedService = Depends(get_saved_service),
 ):
     return service.unsave_post(post_id, current_user)
@@ -42,7 +42,7 @@ def unsave_post(
 def get_saved_posts(
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=50),
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: SavedService = Depends(get_saved_service),
 ):
     return service.get_saved_posts(current_user, page=page, size=size)
@@ -52,7 +52,7 @@ def get_saved_posts(
 @router.get("/{post_id}/check", response_model=SavedCheckResponse)
 def check_post_saved(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     service: SavedService = Depends(get_saved_service),
 ):
     return service.check_saved(post_id, current_user)
@@ -1,6 +1,6 @@
-from app.schemas.user_schema import UserCreate, UserLogin, UserResponse, UserPublicResponse, RefreshTokenRequest
+from app.schemas.user_schema import UserCreate, UserLogin, UserResponse, UserPublicResponse, RefreshTokenRequest, PasswordChange
 from app.schemas.post_schema import PostCreate, PostResponse, PaginatedPosts
-from app.schemas.comment_schema import CommentCreate, CommentResponse, CommentUpdate
+from app.schemas.comment_schema import CommentCreate, CommentResponse, CommentUpdate, PaginatedComments
 from app.schemas.notification_schema import NotificationResponse, PaginatedNotifications, UnreadCountResponse
 from app.schemas.saved_schema import SaveActionResponse, SavedCheckResponse, PaginatedSaved
 from app.schemas.message_schema import (
@@ -9,6 +9,7 @@ from app.schemas.message_schema import (
     LastMessageSummary,
     ConversationResponse,
     ConversationListItem,
+    PaginatedConversations,
     PaginatedMessages,
     UnreadMessagesCountResponse,
     MarkReadResponse,
@@ -14,6 +14,12 @@ class CommentResponse(BaseModel):
     updated_at: datetime | None = None
 
     model_config = ConfigDict(from_attributes=True)
-        
+
+class PaginatedComments(BaseModel):
+    size: int
+    total: int | None = None
+    items: list[CommentResponse]
+    next_cursor: str | None = None
+
 class CommentUpdate(BaseModel):
     content: str
@@ -52,6 +52,12 @@ class ConversationListItem(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PaginatedConversations(BaseModel):
+    size: int
+    items: list[ConversationListItem]
+    next_cursor: str | None = None
+
+
 class PaginatedMessages(BaseModel):
     page: int
     size: int
@@ -42,10 +42,11 @@ class PostResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 class PaginatedPosts(BaseModel):
-    page: int
+    page: int | None = None
     size: int
-    total: int
-    total_pages: int
+    total: int | None = None
+    total_pages: int | None = None
     items: list[PostResponse]
+    next_cursor: str | None = None
 
     model_config = ConfigDict(from_attributes=True)
@@ -22,6 +22,11 @@ class RefreshTokenRequest(BaseModel):
     """Esquema para la solicitud de un nuevo refresh token."""
     refresh_token: str
 
+class PasswordChange(BaseModel):
+    """Esquema para el cambio de contraseña del usuario autenticado."""
+    current_password: str = Field(..., min_length=8, max_length=72)
+    new_password: str = Field(..., min_length=8, max_length=72)
+
 class UserResponse(BaseModel):
     """Esquema para la respuesta de la API al devolver datos de usuario."""
     id: int
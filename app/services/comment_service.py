@@ -1,19 +1,34 @@
 from sqlalchemy.orm import Session
 from app.repositories.comment_repository import CommentRepository
 from app.models.post import Post
-from app.models.user import User
+from app.services.user_cache import UserPrincipal
 from app.exceptions.comment_exceptions import CommentNotFound, ForbiddenCommentAction
 from app.exceptions.post_exceptions import PostNotFound
+from app.exceptions.pagination_exceptions import InvalidCursor
+from app.utils.pagination import encode_cursor, decode_cursor
+from datetime import datetime
 from app.schemas import CommentCreate, CommentUpdate
 from app.services.notification_service import NotificationService
+from app.services.trending_service import TrendingService
+from app.services.counter_service import CounterService
+from app.db.write_queue import run_write
 
 class CommentService:
     def __init__(self, db: Session):
         self.db = db
         self.repository = CommentRepository(db)
         self.notification_service = NotificationService(db)
+        self.trending_service = TrendingService(db)
+        self.counter_service = CounterService(db)
 
-    def create_comment(self, post_id: int, comment_data: CommentCreate, current_user: User):
+    # Crear y borrar comentarios pasa por la cola de un solo escritor si está activa
+    def create_comment(self, post_id: int, comment_data: CommentCreate, current_user: UserPrincipal):
+        return run_write(self.db, lambda db: CommentService(db)._create_comment(post_id, comment_data, current_user))
+
+    def delete_comment(self, comment_id: int, current_user: UserPrincipal):
+        return run_write(self.db, lambda db: CommentService(db)._delete_comment(comment_id, current_user))
+
+    def _create_comment(self, post_id: int, comment_data: CommentCreate, current_user: UserPrincipal):
         # Validar si el post existe. Lo hacemos a través del db central (o podríamos tener un PostRepository)
         post = self.db.query(Post).filter(Post.id == post_id).first()
         if not post:
@@ -25,27 +40,63 @@ class CommentService:
             post_id=post_id
         )
         
-        po = self.db.query(Post).filter(Post.id == post_id).with_for_update().first()
-        if po:
-            po.comments_count += 1
-            self.db.commit()
-
         # Notificar al autor del post
-        self.notification_service.notify_comment(
-            post_author_id=post.author_id,
-            actor_id=current_user.id,
-            post_id=post_id,
-        )
+        self.notification_service.notify_comment(post=post, actor=current_user)
 
+        self.counter_service.increment(post_id, "comments_count")
+        self.trending_service.record_comment(post)
+
+        # Autor cargado antes de volver: con la cola de escritura la sesión se
+        # cierra antes de serializar la respuesta
+        new_comment.author
         return new_comment
 
-    def get_comments_by_post(self, post_id: int):
-        post = self.db.query(Post).filter(Post.id == post_id).first()
-        if not post:
-            raise PostNotFound()
-        return self.repository.get_by_post_id(post_id)
+    def get_comments_by_post(
+        self,
+        post_id: int,
+        size: int,
+        cursor: str | None = None,
+        include_total: bool = False
+    ) -> dict:
+        # El contador del post sirve a la vez de total y de comprobación de existencia
+        if include_total:
+            post = self.repository.get_post_counters(post_id)
+            if post is None:
+                raise PostNotFound()
+            # Columna + deltas write-behind aún no volcados, como en GET /posts/
+            pending = self.counter_service.get_pending([post]).get(post_id, {})
+            total = post.comments_count + pending.get("comments_count", 0)
+        else:
+            total = None
+            if not self.repository.post_exists(post_id):
+                raise PostNotFound()
+
+        after = self._decode_comments_cursor(cursor) if cursor else None
+        # Una fila extra para saber si hay página siguiente
+        comments = self.repository.get_page_by_post_id(post_id, size + 1, after)
+        page = comments[:size]
+
+        next_cursor = None
+        if len(comments) > size:
+            last = page[-1]
+            next_cursor = encode_cursor("comments", [last.created_at, last.id])
+
+        return {
+            "size": size,
+            "total": total,
+            "items": page,
+            "next_cursor": next_cursor,
+        }
 
-    def update_comment(self, comment_id: int, comment_data: CommentUpdate, current_user: User):
+    @staticmethod
+    def _decode_comments_cursor(cursor: str) -> tuple[datetime, int]:
+        created_at, comment_id = decode_cursor(cursor, "comments", 2)
+        try:
+            return datetime.fromisoformat(created_at), int(comment_id)
+        except (TypeError, ValueError):
+            raise InvalidCursor()
+
+    def update_comment(self, comment_id: int, comment_data: CommentUpdate, current_user: UserPrincipal):
         comment = self.repository.get_by_id(comment_id)
         if not comment:
             raise CommentNotFound()
@@ -55,7 +106,7 @@ class CommentService:
             
         return self.repository.update(comment, comment_data.content)
 
-    def delete_comment(self, comment_id: int, current_user: User):
+    def _delete_comment(self, comment_id: int, current_user: UserPrincipal):
         comment = self.repository.get_by_id(comment_id)
         if not comment:
             raise CommentNotFound()
@@ -66,7 +117,8 @@ class CommentService:
         post_id = comment.post_id
         self.repository.delete(comment)
         
-        po = self.db.query(Post).filter(Post.id == post_id).with_for_update().first()
-        if po and po.comments_count > 0:
-            po.comments_count -= 1
-            self.db.commit()
+        self.counter_service.increment(post_id, "comments_count", -1)
+
+        post = self.db.query(Post).filter(Post.id == post_id).first()
+        if post:
+            self.trending_service.record_comment(post, delta=-1)
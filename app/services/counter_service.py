@@ -0,0 +1,344 @@
+import logging
+import threading
+import uuid
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.orm import Session
+from redis.exceptions import RedisError, ResponseError
+from app.core.config import settings
+from app.core.redis import redis_client, async_redis_client
+from app.db.session import SessionLocal, run_after_commit
+from app.models.comment import Comment
+from app.models.like import Like
+from app.models.post import Post
+
+logger = logging.getLogger(__name__)
+
+# Deltas pendientes por post y contador: campo "{post_id}:{columna}" -> delta
+PENDING_KEY = "counters:pending"
+# Lote que se está volcando a la BD (el flusher lo mueve aquí con RENAME)
+FLUSHING_KEY = "counters:flushing"
+# Id del lote en curso: el UPDATE lo guarda en posts.counters_batch
+FLUSHING_ID_KEY = "counters:flushing_id"
+FLUSH_LOCK_KEY = "counters:flush_lock"
+FLUSH_LOCK_TTL = 30
+COUNTER_COLUMNS = ("likes_count", "comments_count")
+
+# Toma el lote a volcar y devuelve su id (nil si no hay deltas). Un lote
+# interrumpido se reanuda con su id; si no, los pendientes pasan a ser el lote
+# con el id nuevo.
+#   KEYS: pendientes, lote, id del lote    ARGV: id nuevo
+TAKE_BATCH_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    local batch_id = redis.call('GET', KEYS[3])
+    if batch_id then
+        return batch_id
+    end
+elseif redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+else
+    return false
+end
+redis.call('SET', KEYS[3], ARGV[1])
+return ARGV[1]
+"""
+
+# Borra el lote si sigue siendo el indicado en ARGV[1]
+#   KEYS: lote, id del lote
+FINISH_BATCH_SCRIPT = """
+if redis.call('GET', KEYS[2]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1], KEYS[2])
+end
+return 0
+"""
+
+# Renovar y liberar el lock solo si sigue siendo nuestro (token en ARGV[1])
+RENEW_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class CounterService:
+    """
+    Contadores write-behind de posts (likes_count, comments_count).
+
+    Un like/comentario solo hace HINCRBY del delta en Redis; el flusher
+    aplica los deltas acumulados en lote (UPDATE ... SET likes_count =
+    likes_count + n) sin bloquear la fila del post en cada petición. Las
+    lecturas suman a la columna los deltas aún no volcados.
+    Si Redis falla (o COUNTERS_WRITE_BEHIND=false) el incremento se hace
+    directamente en SQL con un UPDATE atómico.
+
+    La fila del like/comentario y el delta no se guardan de forma atómica: el
+    HINCRBY va tras el commit, así que si el proceso muere entre ambos (o
+    fallan Redis y el UPDATE de respaldo) el delta se pierde. La fila es la
+    fuente de verdad y reconcile() corrige esa deriva.
+    """
+
+    def __init__(self, db: Session | None, redis=redis_client, async_redis=async_redis_client):
+        self.db = db
+        self.redis = redis
+        self.async_redis = async_redis
+
+    @staticmethod
+    def _field(post_id: int, column: str) -> str:
+        return f"{post_id}:{column}"
+
+    # -----------------------------
+    # Escritura
+    # -----------------------------
+    def increment(self, post_id: int, column: str, delta: int = 1) -> int:
+        """
+        Suma `delta` al contador. Con write-behind el HINCRBY se hace tras el
+        commit de la transacción (si se deshace, el contador no cambia) y se
+        devuelve `delta`, que las lecturas de esta petición aún no ven; sin
+        write-behind el UPDATE va en la misma transacción y se devuelve 0.
+        Un delta perdido entre el commit y el HINCRBY lo corrige reconcile().
+        """
+        if settings.COUNTERS_WRITE_BEHIND:
+            run_after_commit(self.db, lambda: self._add_pending(post_id, column, delta))
+            return delta
+
+        self._update_column(self.db, post_id, column, delta)
+        return 0
+
+    def _add_pending(self, post_id: int, column: str, delta: int) -> None:
+        try:
+            self.redis.hincrby(PENDING_KEY, self._field(post_id, column), delta)
+            return
+        except RedisError:
+            logger.warning("Contador %s del post %s aplicado en SQL (Redis no disponible)",
+                           column, post_id, exc_info=True)
+        # La fila ya está confirmada: el delta va en su propia transacción
+        with SessionLocal() as db:
+            self._update_column(db, post_id, column, delta)
+            db.commit()
+
+    @staticmethod
+    def _update_column(db: Session, post_id: int, column: str, delta: int) -> None:
+        db.execute(
+            update(Post)
+            .where(Post.id == post_id)
+            .values({column: getattr(Post, column) + delta})
+        )
+
+    # -----------------------------
+    # Lectura
+    # -----------------------------
+    def get_pending(self, posts: list[Post]) -> dict[int, dict[str, int]]:
+        """
+        Deltas aún no volcados de `posts` (pendientes + lote en curso), en un
+        round trip. El lote en curso no se suma a los posts cuya fila ya lo
+        tiene aplicado (counters_batch).
+        """
+        if not posts or not settings.COUNTERS_WRITE_BEHIND:
+            return {}
+        fields = self._fields(posts)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hmget(PENDING_KEY, fields)
+            pipe.hmget(FLUSHING_KEY, fields)
+            pipe.get(FLUSHING_ID_KEY)
+            pending, flushing, batch_id = pipe.execute()
+        except RedisError:
+            logger.warning("No se pudieron leer los contadores pendientes", exc_info=True)
+            return {}
+        return self._sum_pending(fields, pending, flushing, self._applied(posts, batch_id))
+
+    async def get_pending_async(self, posts: list[Post]) -> dict[int, dict[str, int]]:
+        """get_pending con el cliente async (stack async, no requiere sesión de BD)."""
+        if not posts or not settings.COUNTERS_WRITE_BEHIND:
+            return {}
+        fields = self._fields(posts)
+        try:
+            pipe = self.async_redis.pipeline(transaction=False)
+            pipe.hmget(PENDING_KEY, fields)
+            pipe.hmget(FLUSHING_KEY, fields)
+            pipe.get(FLUSHING_ID_KEY)
+            pending, flushing, batch_id = await pipe.execute()
+        except RedisError:
+            logger.warning("No se pudieron leer los contadores pendientes", exc_info=True)
+            return {}
+        return self._sum_pending(fields, pending, flushing, self._applied(posts, batch_id))
+
+    def _fields(self, posts: list[Post]) -> list[str]:
+        return [self._field(post.id, column) for post in posts for column in COUNTER_COLUMNS]
+
+    @staticmethod
+    def _applied(posts: list[Post], batch_id: str | None) -> set[int]:
+        """Posts cuya fila ya incluye el lote en curso (volcado confirmado, lote aún sin borrar)."""
+        if batch_id is None:
+            return set()
+        return {post.id for post in posts if post.counters_batch == batch_id}
+
+    @staticmethod
+    def _sum_pending(fields: list[str], pending: list, flushing: list, applied: set[int]) -> dict[int, dict[str, int]]:
+        result = {}
+        for field, a, b in zip(fields, pending, flushing):
+            post_id, column = field.split(":")
+            delta = int(a or 0) + (0 if int(post_id) in applied else int(b or 0))
+            if delta:
+                result.setdefault(int(post_id), {})[column] = delta
+        return result
+
+    def current(self, post: Post, column: str) -> int:
+        """Valor actual de un contador: columna en BD + delta pendiente."""
+        return getattr(post, column) + self.get_pending([post]).get(post.id, {}).get(column, 0)
+
+    # -----------------------------
+    # Volcado a la BD
+    # -----------------------------
+    def flush(self) -> int:
+        """
+        Aplica los deltas pendientes en un único UPDATE por lotes (executemany).
+        Un solo flusher a la vez (lock en Redis). Si un volcado anterior se
+        interrumpió, su lote (FLUSHING_KEY) se aplica antes de tomar uno nuevo.
+
+        Aplicar un lote es idempotente: el UPDATE guarda el id del lote en
+        posts.counters_batch y no toca las filas que ya lo tienen, así que
+        reintentar un lote tras un fallo entre el commit y el borrado del lote
+        en Redis no suma dos veces. Devuelve el número de posts del lote.
+        """
+        token = uuid.uuid4().hex
+        if not self.redis.set(FLUSH_LOCK_KEY, token, nx=True, ex=FLUSH_LOCK_TTL):
+            return 0
+        try:
+            return self._flush_batch(token)
+        finally:
+            self.redis.register_script(RELEASE_LOCK_SCRIPT)(keys=[FLUSH_LOCK_KEY], args=[token])
+
+    def _flush_batch(self, token: str) -> int:
+        """Volcado de un lote con el lock (`token`) ya tomado."""
+        batch_id = self.redis.register_script(TAKE_BATCH_SCRIPT)(
+            keys=[PENDING_KEY, FLUSHING_KEY, FLUSHING_ID_KEY], args=[uuid.uuid4().hex]
+        )
+        if batch_id is None:
+            return 0
+
+        rows = {}
+        for field, delta in self.redis.hgetall(FLUSHING_KEY).items():
+            post_id, column = field.split(":")
+            row = rows.setdefault(
+                int(post_id), {"b_id": int(post_id), "b_batch": batch_id, "b_likes": 0, "b_comments": 0}
+            )
+            row["b_likes" if column == "likes_count" else "b_comments"] += int(delta)
+
+        if rows:
+            # Leer el lote pudo tardar: seguir solo si el lock sigue siendo nuestro
+            if not self.redis.register_script(RENEW_LOCK_SCRIPT)(keys=[FLUSH_LOCK_KEY],
+                                                                 args=[token, FLUSH_LOCK_TTL]):
+                logger.warning("Lock de volcado de contadores perdido; el lote %s queda para el siguiente",
+                               batch_id)
+                return 0
+            posts = Post.__table__
+            self.db.execute(
+                update(posts)
+                .where(posts.c.id == bindparam("b_id"))
+                .where(or_(posts.c.counters_batch.is_(None), posts.c.counters_batch != bindparam("b_batch")))
+                .values(
+                    likes_count=posts.c.likes_count + bindparam("b_likes"),
+                    comments_count=posts.c.comments_count + bindparam("b_comments"),
+                    counters_batch=bindparam("b_batch"),
+                ),
+                list(rows.values()),
+            )
+            self.db.commit()
+        self.redis.register_script(FINISH_BATCH_SCRIPT)(keys=[FLUSHING_KEY, FLUSHING_ID_KEY], args=[batch_id])
+        return len(rows)
+
+    def reconcile(self) -> bool:
+        """
+        Recalcula likes_count/comments_count desde las tablas de likes y
+        comentarios: corrige la deriva de un delta perdido entre el commit de
+        la fila y su HINCRBY.
+
+        Con el lock de volcado, vuelca primero el lote en curso y en la misma
+        pasada descuenta de cada post los deltas que siguen pendientes en
+        Redis, así columna + pendientes = filas. Un like confirmado cuyo
+        HINCRBY llega justo durante la pasada (milisegundos) se contaría dos
+        veces; fuera de ese instante el resultado es exacto. Devuelve False si
+        otro proceso tiene el lock.
+        """
+        if not settings.COUNTERS_WRITE_BEHIND:
+            self._recount({})
+            return True
+
+        token = uuid.uuid4().hex
+        if not self.redis.set(FLUSH_LOCK_KEY, token, nx=True, ex=FLUSH_LOCK_TTL):
+            return False
+        try:
+            self._flush_batch(token)
+            if self.redis.exists(FLUSHING_KEY):
+                # El lote no se pudo aplicar (lock perdido): sus deltas no están ni en la columna ni en pendientes
+                return False
+            pending = {}
+            for field, delta in self.redis.hgetall(PENDING_KEY).items():
+                post_id, column = field.split(":")
+                row = pending.setdefault(int(post_id), {"b_id": int(post_id), "b_likes": 0, "b_comments": 0})
+                row["b_likes" if column == "likes_count" else "b_comments"] += int(delta)
+            # Un volcado concurrente (lock caducado) sumaría a la columna deltas ya descontados
+            if not self.redis.register_script(RENEW_LOCK_SCRIPT)(keys=[FLUSH_LOCK_KEY],
+                                                                 args=[token, FLUSH_LOCK_TTL]):
+                return False
+            self._recount(pending)
+            return True
+        finally:
+            self.redis.register_script(RELEASE_LOCK_SCRIPT)(keys=[FLUSH_LOCK_KEY], args=[token])
+
+    def _recount(self, pending: dict[int, dict]) -> None:
+        """Contadores = filas reales - deltas `pending` (filas b_id/b_likes/b_comments), en una transacción."""
+        likes = select(func.count(Like.id)).where(Like.post_id == Post.id).scalar_subquery()
+        comments = select(func.count(Comment.id)).where(Comment.post_id == Post.id).scalar_subquery()
+        self.db.execute(update(Post).values(likes_count=likes, comments_count=comments))
+        if pending:
+            posts = Post.__table__
+            self.db.execute(
+                update(posts)
+                .where(posts.c.id == bindparam("b_id"))
+                .values(
+                    likes_count=posts.c.likes_count - bindparam("b_likes"),
+                    comments_count=posts.c.comments_count - bindparam("b_comments"),
+                ),
+                list(pending.values()),
+            )
+        self.db.commit()
+
+
+class CounterFlusher:
+    """Hilo en segundo plano que vuelca los contadores cada `interval` segundos."""
+
+    def __init__(self, interval: float = settings.COUNTER_FLUSH_INTERVAL_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="counter-flusher", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self.interval + 5)
+        # Último volcado para no dejar deltas pendientes al apagar
+        self._flush_once()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._flush_once()
+
+    def _flush_once(self) -> None:
+        db = SessionLocal()
+        try:
+            CounterService(db).flush()
+        except Exception:
+            db.rollback()
+            logger.exception("Error volcando los contadores de posts")
+        finally:
+            db.close()
@@ -3,14 +3,18 @@ from app.repositories.follower_repository import FollowerRepository
 from fastapi import HTTPException
 from app.models.user import User
 from app.services.notification_service import NotificationService
+from app.services.user_cache import UserPrincipal
+from app.services.timeline_service import TimelineService
 
 class FollowerService:
     def __init__(self, db: Session):
         self.db = db
         self.repository = FollowerRepository(db)
         self.notification_service = NotificationService(db)
+        self.timeline_service = TimelineService(db)
 
-    def follow_user(self, follower_id: int, followed_id: int):
+    def follow_user(self, current_user: UserPrincipal, followed_id: int):
+        follower_id = current_user.id
         if follower_id == followed_id:
             raise HTTPException(status_code=400, detail="You cannot follow yourself")
             
@@ -23,21 +27,21 @@ class FollowerService:
             raise HTTPException(status_code=400, detail="Already following this user")
 
         result = self.repository.create(follower_id, followed_id)
+        self.timeline_service.add_author(follower_id, followed_id)
 
         # Notificar al usuario seguido
-        self.notification_service.notify_follow(
-            followed_id=followed_id,
-            follower_id=follower_id,
-        )
+        self.notification_service.notify_follow(followed_id=followed_id, follower=current_user)
 
         return result
 
-    def unfollow_user(self, follower_id: int, followed_id: int):
+    def unfollow_user(self, current_user: UserPrincipal, followed_id: int):
+        follower_id = current_user.id
         follow = self.repository.get_follow(follower_id, followed_id)
         if not follow:
             raise HTTPException(status_code=404, detail="Not following this user")
             
         self.repository.delete(follow)
+        self.timeline_service.remove_author(follower_id, followed_id)
         return {"message": "Unfollowed successfully"}
         
     def get_followers(self, user_id: int):
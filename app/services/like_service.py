@@ -3,54 +3,58 @@ from app.repositories.like_repository import LikeRepository
 from app.models.post import Post
 from fastapi import HTTPException
 from app.services.notification_service import NotificationService
+from app.services.user_cache import UserPrincipal
+from app.services.trending_service import TrendingService
+from app.services.counter_service import CounterService
+from app.db.write_queue import run_write
 
 class LikeService:
     def __init__(self, db: Session):
         self.db = db
         self.repository = LikeRepository(db)
         self.notification_service = NotificationService(db)
+        self.trending_service = TrendingService(db)
+        self.counter_service = CounterService(db)
 
-    def like_post(self, post_id: int, user_id: int):
+    # Likes y unlikes pasan por la cola de un solo escritor si está activa
+    def like_post(self, post_id: int, current_user: UserPrincipal):
+        return run_write(self.db, lambda db: LikeService(db)._like_post(post_id, current_user))
+
+    def unlike_post(self, post_id: int, current_user: UserPrincipal):
+        return run_write(self.db, lambda db: LikeService(db)._unlike_post(post_id, current_user))
+
+    def _like_post(self, post_id: int, current_user: UserPrincipal):
         post = self.db.query(Post).filter(Post.id == post_id).first()
         if not post:
             raise HTTPException(status_code=404, detail="Post not found")
             
-        existing_like = self.repository.get_like(post_id, user_id)
+        existing_like = self.repository.get_like(post_id, current_user.id)
         if existing_like:
             raise HTTPException(status_code=400, detail="You already liked this post")
             
-        self.repository.create(post_id, user_id)
-        
-        po = self.db.query(Post).filter(Post.id == post_id).with_for_update().first()
-        if po:
-            po.likes_count += 1
-            self.db.commit()
-            self.db.refresh(po)
-            post = po
+        self.repository.create(post_id, current_user.id)
 
         # Notificar al autor del post
-        self.notification_service.notify_like(
-            post_author_id=post.author_id,
-            actor_id=user_id,
-            post_id=post_id,
-        )
+        self.notification_service.notify_like(post=post, actor=current_user)
 
-        return {"liked": True, "likes_count": post.likes_count}
+        # Contador write-behind y ranking: en Redis tras el commit de la transacción.
+        # `pending` es el delta que las lecturas aún no ven hasta entonces.
+        pending = self.counter_service.increment(post_id, "likes_count")
+        self.trending_service.record_like(post)
 
-    def unlike_post(self, post_id: int, user_id: int):
-        like = self.repository.get_like(post_id, user_id)
+        return {"liked": True, "likes_count": self.counter_service.current(post, "likes_count") + pending}
+
+    def _unlike_post(self, post_id: int, current_user: UserPrincipal):
+        like = self.repository.get_like(post_id, current_user.id)
         if not like:
             raise HTTPException(status_code=404, detail="Like not found")
             
         self.repository.delete(like)
-        
-        po = self.db.query(Post).filter(Post.id == post_id).with_for_update().first()
-        if po and po.likes_count > 0:
-            po.likes_count -= 1
-            self.db.commit()
-            self.db.refresh(po)
-            post = po
-        else:
-            post = po if po else None
-            
-        return {"liked": False, "likes_count": post.likes_count if post else 0}
+        pending = self.counter_service.increment(post_id, "likes_count", -1)
+
+        post = self.db.query(Post).filter(Post.id == post_id).first()
+        if not post:
+            return {"liked": False, "likes_count": 0}
+
+        self.trending_service.record_like(post, delta=-1)
+        return {"liked": False, "likes_count": self.counter_service.current(post, "likes_count") + pending}
@@ -1,7 +1,12 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.repositories.message_repository import MessageRepository
+from app.repositories.message_repository import MessageRepository, AsyncMessageRepository
+from app.services.realtime_service import RealtimePublisher
 from app.models.conversation import Message
-from app.models.user import User
+from app.services.user_cache import UserPrincipal
+from app.exceptions.pagination_exceptions import InvalidCursor
+from app.utils.pagination import encode_cursor, decode_cursor
+from datetime import datetime
 from app.exceptions.message_exceptions import (
     ConversationNotFound,
     ForbiddenConversationAction,
@@ -14,8 +19,9 @@ class MessageService:
     def __init__(self, db: Session):
         self.db = db
         self.repository = MessageRepository(db)
+        self.publisher = RealtimePublisher()
 
-    def get_or_create_conversation(self, current_user: User, target_user_id: int) -> dict:
+    def get_or_create_conversation(self, current_user: UserPrincipal, target_user_id: int) -> dict:
         if current_user.id == target_user_id:
             raise CannotMessageSelf()
 
@@ -27,7 +33,11 @@ class MessageService:
         if not conv:
             conv = self.repository.create_conversation(current_user.id, target_user_id)
 
-        other_user = conv.user2 if conv.user1_id == current_user.id else conv.user1
+        return self._map_conversation(conv, current_user.id)
+
+    @staticmethod
+    def _map_conversation(conv, user_id: int) -> dict:
+        other_user = conv.user2 if conv.user1_id == user_id else conv.user1
         return {
             "id": conv.id,
             "user1_id": conv.user1_id,
@@ -41,14 +51,21 @@ class MessageService:
             "last_message_at": conv.last_message_at,
         }
 
-    def get_conversations(self, current_user: User) -> list[dict]:
-        conversations = self.repository.get_user_conversations(current_user.id)
-        items = []
+    def get_conversations(self, current_user: UserPrincipal, size: int, cursor: str | None = None) -> dict:
+        after = self._decode_inbox_cursor(cursor) if cursor else None
+        # Una fila extra para saber si hay página siguiente
+        conversations = self.repository.get_user_conversations(current_user.id, size + 1, after)
+        return self._inbox_page(conversations, current_user.id, size)
 
-        for conv in conversations:
-            other_user = conv.user2 if conv.user1_id == current_user.id else conv.user1
-            last_msg = self.repository.get_last_message(conv.id)
-            unread_count = self.repository.count_unread_in_conversation(conv.id, current_user.id)
+    @staticmethod
+    def _inbox_page(conversations: list, user_id: int, size: int) -> dict:
+        page = conversations[:size]
+
+        items = []
+        for conv in page:
+            is_user1 = conv.user1_id == user_id
+            other_user = conv.user2 if is_user1 else conv.user1
+            last_msg = conv.last_message
 
             items.append({
                 "id": conv.id,
@@ -64,14 +81,31 @@ class MessageService:
                     "is_read": last_msg.is_read,
                     "created_at": last_msg.created_at,
                 } if last_msg else None,
-                "unread_count": unread_count,
+                "unread_count": conv.user1_unread_count if is_user1 else conv.user2_unread_count,
                 "created_at": conv.created_at,
                 "last_message_at": conv.last_message_at,
             })
 
-        return items
+        next_cursor = None
+        if len(conversations) > size:
+            last = page[-1]
+            next_cursor = encode_cursor("inbox", [last.last_message_at, last.id])
+
+        return {
+            "size": size,
+            "items": items,
+            "next_cursor": next_cursor,
+        }
 
-    def get_messages(self, conv_id: int, current_user: User, page: int, size: int) -> dict:
+    @staticmethod
+    def _decode_inbox_cursor(cursor: str) -> tuple[datetime, int]:
+        last_message_at, conv_id = decode_cursor(cursor, "inbox", 2)
+        try:
+            return datetime.fromisoformat(last_message_at), int(conv_id)
+        except (TypeError, ValueError):
+            raise InvalidCursor()
+
+    def get_messages(self, conv_id: int, current_user: UserPrincipal, page: int, size: int) -> dict:
         conv = self.repository.get_conversation_by_id(conv_id)
         if not conv:
             raise ConversationNotFound()
@@ -80,9 +114,13 @@ class MessageService:
             raise ForbiddenConversationAction()
 
         total, messages = self.repository.get_messages_by_conversation(conv_id, page, size)
+        return self._messages_page(total, messages, page, size)
+
+    @classmethod
+    def _messages_page(cls, total: int, messages: list[Message], page: int, size: int) -> dict:
         total_pages = (total + size - 1) // size if size > 0 else 0
 
-        items = [self._map_message(m) for m in messages]
+        items = [cls._map_message(m) for m in messages]
 
         return {
             "page": page,
@@ -92,7 +130,7 @@ class MessageService:
             "items": items,
         }
 
-    def send_message(self, conv_id: int, current_user: User, content: str) -> dict:
+    def send_message(self, conv_id: int, current_user: UserPrincipal, content: str) -> dict:
         conv = self.repository.get_conversation_by_id(conv_id)
         if not conv:
             raise ConversationNotFound()
@@ -101,9 +139,12 @@ class MessageService:
             raise ForbiddenConversationAction()
 
         message = self.repository.create_message(conv, current_user.id, content.strip())
-        return self._map_message(message)
+        data = self._map_message(message)
+        # A ambos participantes: el remitente puede tener otras pestañas/dispositivos abiertos
+        self.publisher.publish_after_commit(self.db, (conv.user1_id, conv.user2_id), "message.new", data)
+        return data
 
-    def mark_as_read(self, conv_id: int, current_user: User) -> dict:
+    def mark_as_read(self, conv_id: int, current_user: UserPrincipal) -> dict:
         conv = self.repository.get_conversation_by_id(conv_id)
         if not conv:
             raise ConversationNotFound()
@@ -111,10 +152,10 @@ class MessageService:
         if current_user.id not in (conv.user1_id, conv.user2_id):
             raise ForbiddenConversationAction()
 
-        updated_count = self.repository.mark_messages_as_read(conv_id, current_user.id)
+        updated_count = self.repository.mark_messages_as_read(conv, current_user.id)
         return {"marked_as_read": updated_count}
 
-    def get_unread_count(self, current_user: User) -> dict:
+    def get_unread_count(self, current_user: UserPrincipal) -> dict:
         count = self.repository.count_total_unread(current_user.id)
         return {"unread_count": count}
 
@@ -133,3 +174,61 @@ class MessageService:
                 "email": m.sender.email,
             },
         }
+
+
+class AsyncMessageService:
+    """MessageService sobre AsyncMessageRepository (stack async). Mismas respuestas y errores."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.repository = AsyncMessageRepository(db)
+        self.publisher = RealtimePublisher()
+
+    async def get_or_create_conversation(self, current_user: UserPrincipal, target_user_id: int) -> dict:
+        if current_user.id == target_user_id:
+            raise CannotMessageSelf()
+
+        target_user = await self.repository.get_user_by_id(target_user_id)
+        if not target_user:
+            raise UserNotFoundForMessage()
+
+        conv = await self.repository.find_conversation_between(current_user.id, target_user_id)
+        if not conv:
+            conv = await self.repository.create_conversation(current_user.id, target_user_id)
+
+        return MessageService._map_conversation(conv, current_user.id)
+
+    async def get_conversations(self, current_user: UserPrincipal, size: int, cursor: str | None = None) -> dict:
+        after = MessageService._decode_inbox_cursor(cursor) if cursor else None
+        conversations = await self.repository.get_user_conversations(current_user.id, size + 1, after)
+        return MessageService._inbox_page(conversations, current_user.id, size)
+
+    async def _get_participant_conversation(self, conv_id: int, current_user: UserPrincipal):
+        conv = await self.repository.get_conversation_by_id(conv_id)
+        if not conv:
+            raise ConversationNotFound()
+
+        if current_user.id not in (conv.user1_id, conv.user2_id):
+            raise ForbiddenConversationAction()
+        return conv
+
+    async def get_messages(self, conv_id: int, current_user: UserPrincipal, page: int, size: int) -> dict:
+        await self._get_participant_conversation(conv_id, current_user)
+        total, messages = await self.repository.get_messages_by_conversation(conv_id, page, size)
+        return MessageService._messages_page(total, messages, page, size)
+
+    async def send_message(self, conv_id: int, current_user: UserPrincipal, content: str) -> dict:
+        conv = await self._get_participant_conversation(conv_id, current_user)
+        message = await self.repository.create_message(conv, current_user.id, content.strip())
+        data = MessageService._map_message(message)
+        self.publisher.publish_after_commit_async(self.db, (conv.user1_id, conv.user2_id), "message.new", data)
+        return data
+
+    async def mark_as_read(self, conv_id: int, current_user: UserPrincipal) -> dict:
+        conv = await self._get_participant_conversation(conv_id, current_user)
+        updated_count = await self.repository.mark_messages_as_read(conv, current_user.id)
+        return {"marked_as_read": updated_count}
+
+    async def get_unread_count(self, current_user: UserPrincipal) -> dict:
+        count = await self.repository.count_total_unread(current_user.id)
+        return {"unread_count": count}
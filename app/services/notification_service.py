@@ -1,7 +1,11 @@
-﻿from sqlalchemy.orm import Session
-from app.repositories.notification_repository import NotificationRepository
+﻿from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.repositories.notification_repository import NotificationRepository, AsyncNotificationRepository
+from app.services.realtime_service import RealtimePublisher
 from app.models.notification import Notification, NotificationType
+from app.models.post import Post
 from app.models.user import User
+from app.services.user_cache import UserPrincipal
 from app.exceptions.notification_exceptions import NotificationNotFound, ForbiddenNotificationAction
 
 
@@ -9,51 +13,67 @@ class NotificationService:
     def __init__(self, db: Session):
         self.db = db
         self.repository = NotificationRepository(db)
+        self.publisher = RealtimePublisher()
 
     # ── Helpers internos (llamados desde otros servicios) ────────
 
-    def notify_like(self, post_author_id: int, actor_id: int, post_id: int):
+    def notify_like(self, post: Post, actor: UserPrincipal):
         """Crea una notificacion de like. No notifica si el actor es el autor."""
-        if post_author_id == actor_id:
+        if post.author_id == actor.id:
             return
-        self.repository.create(
-            recipient_id=post_author_id,
-            actor_id=actor_id,
+        notif = self.repository.create(
+            recipient_id=post.author_id,
+            actor_id=actor.id,
             notification_type=NotificationType.like,
-            post_id=post_id,
+            post_id=post.id,
         )
+        self._publish(notif, actor, post)
 
-    def notify_comment(self, post_author_id: int, actor_id: int, post_id: int):
+    def notify_comment(self, post: Post, actor: UserPrincipal):
         """Crea una notificacion de comentario. No notifica si el actor es el autor."""
-        if post_author_id == actor_id:
+        if post.author_id == actor.id:
             return
-        self.repository.create(
-            recipient_id=post_author_id,
-            actor_id=actor_id,
+        notif = self.repository.create(
+            recipient_id=post.author_id,
+            actor_id=actor.id,
             notification_type=NotificationType.comment,
-            post_id=post_id,
+            post_id=post.id,
         )
+        self._publish(notif, actor, post)
 
-    def notify_follow(self, followed_id: int, follower_id: int):
+    def notify_follow(self, followed_id: int, follower: UserPrincipal):
         """Crea una notificacion de nuevo seguidor."""
-        self.repository.create(
+        notif = self.repository.create(
             recipient_id=followed_id,
-            actor_id=follower_id,
+            actor_id=follower.id,
             notification_type=NotificationType.follow,
         )
+        self._publish(notif, follower)
+
+    def _publish(self, notif: Notification, actor: UserPrincipal, post: Post | None = None):
+        """
+        Envía la notificación al canal en tiempo real del destinatario tras el
+        commit. El actor y el post los pasa el llamante (ya los tiene): sin
+        cargar las relaciones de la notificación recién creada.
+        """
+        data = self._payload(notif, actor, post.title if post else None)
+        self.publisher.publish_after_commit(self.db, (notif.recipient_id,), "notification.new", data)
 
     # ── Endpoints del usuario ────────────────────────────────────
 
-    def get_my_notifications(self, current_user: User, page: int, size: int):
+    def get_my_notifications(self, current_user: UserPrincipal, page: int, size: int):
         total, notifications = self.repository.get_by_recipient(
             recipient_id=current_user.id,
             page=page,
             size=size,
         )
+        return self._page(total, notifications, page, size)
 
+    @classmethod
+    def _page(cls, total: int, notifications: list[Notification], page: int, size: int) -> dict:
         total_pages = (total + size - 1) // size if size > 0 else 0
 
-        items = [self._map(n) for n in notifications]
+        items = [cls._map(n) for n in notifications]
 
         return {
             "page": page,
@@ -63,11 +83,11 @@ class NotificationService:
             "items": items,
         }
 
-    def get_unread_count(self, current_user: User):
+    def get_unread_count(self, current_user: UserPrincipal):
         count = self.repository.count_unread(current_user.id)
         return {"unread_count": count}
 
-    def mark_as_read(self, notification_id: int, current_user: User):
+    def mark_as_read(self, notification_id: int, current_user: UserPrincipal):
         notif = self.repository.get_by_id(notification_id)
         if not notif:
             raise NotificationNotFound()
@@ -76,24 +96,61 @@ class NotificationService:
         updated = self.repository.mark_as_read(notif)
         return self._map(updated)
 
-    def mark_all_as_read(self, current_user: User):
+    def mark_all_as_read(self, current_user: UserPrincipal):
         updated_count = self.repository.mark_all_as_read(current_user.id)
         return {"marked_as_read": updated_count}
 
     # ── Mapper interno ───────────────────────────────────────────
 
+    @classmethod
+    def _map(cls, n: Notification) -> dict:
+        return cls._payload(n, n.actor, n.post.title if n.post else None)
+
     @staticmethod
-    def _map(n: Notification) -> dict:
+    def _payload(n: Notification, actor: User | UserPrincipal, post_title: str | None) -> dict:
         return {
             "id":         n.id,
             "type":       n.type.value if hasattr(n.type, "value") else n.type,
             "is_read":    n.is_read,
             "created_at": n.created_at,
             "post_id":    n.post_id,
-            "post_title": n.post.title if n.post else None,
+            "post_title": post_title,
             "actor": {
-                "id":       n.actor.id,
-                "username": n.actor.username,
-                "email":    n.actor.email,
+                "id":       actor.id,
+                "username": actor.username,
+                "email":    actor.email,
             },
         }
+
+
+class AsyncNotificationService:
+    """Endpoints del usuario de NotificationService sobre AsyncSession (stack async)."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.repository = AsyncNotificationRepository(db)
+
+    async def get_my_notifications(self, current_user: UserPrincipal, page: int, size: int):
+        total, notifications = await self.repository.get_by_recipient(
+            recipient_id=current_user.id,
+            page=page,
+            size=size,
+        )
+        return NotificationService._page(total, notifications, page, size)
+
+    async def get_unread_count(self, current_user: UserPrincipal):
+        count = await self.repository.count_unread(current_user.id)
+        return {"unread_count": count}
+
+    async def mark_as_read(self, notification_id: int, current_user: UserPrincipal):
+        notif = await self.repository.get_by_id(notification_id)
+        if not notif:
+            raise NotificationNotFound()
+        if notif.recipient_id != current_user.id:
+            raise ForbiddenNotificationAction()
+        updated = await self.repository.mark_as_read(notif)
+        return NotificationService._map(updated)
+
+    async def mark_all_as_read(self, current_user: UserPrincipal):
+        updated_count = await self.repository.mark_all_as_read(current_user.id)
+        return {"marked_as_read": updated_count}
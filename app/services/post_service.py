@@ -1,11 +1,19 @@
+import math
 from sqlalchemy.orm import Session
-from app.repositories.post_repository import PostRepository
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.repositories.post_repository import PostRepository, AsyncPostRepository
 from app.repositories.like_repository import LikeRepository
-from app.models.user import User
+from app.services.user_cache import UserPrincipal
 from app.schemas import PostCreate
 from app.exceptions.post_exceptions import PostNotFound, ForbiddenAction
 from app.mappers.post_mapper import map_post_to_response
 from app.repositories.follower_repository import FollowerRepository
+from app.services.timeline_service import TimelineService, AsyncTimelineService
+from app.services.trending_service import TrendingService
+from app.services.counter_service import CounterService
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.exceptions.pagination_exceptions import InvalidCursor
+from app.core.config import settings
 from datetime import date
 
 
@@ -15,14 +23,20 @@ class PostService:
         self.repository = PostRepository(db)
         self.like_repository = LikeRepository(db)
         self.follower_repository = FollowerRepository(db)
+        self.timeline_service = TimelineService(db)
+        self.trending_service = TrendingService(db)
+        self.counter_service = CounterService(db)
 
-    def create_post(self, post_data: PostCreate, current_user: User):
+    def create_post(self, post_data: PostCreate, current_user: UserPrincipal):
         new_post = self.repository.create(
             title=post_data.title,
             content=post_data.content,
             image_url=post_data.image_url,
             author_id=current_user.id
         )
+        # Fan-out on write hacia los timelines de los seguidores
+        self.timeline_service.fan_out_post(current_user.id, new_post.id)
+        self.trending_service.record_post(new_post)
         return map_post_to_response(new_post, liked_by_me=False)
 
     def get_posts(
@@ -34,12 +48,28 @@ class PostService:
         from_date: date | None,
         to_date: date | None,
         since_hours: int | None,
-        current_user: User,
-        order: str = "recent"
+        current_user: UserPrincipal,
+        order: str = "recent",
+        cursor: str | None = None,
+        include_total: bool | None = None
     ):
         filter_author_id = author_id
-            
-        total, posts = self.repository.get_paginated_posts(
+        # En modo cursor el total es opcional (evita un COUNT por página).
+        if include_total is None:
+            include_total = cursor is None
+
+        if order == "trending":
+            trending_page = self._get_trending_posts(
+                page, limit, search, author_id, from_date, to_date, since_hours,
+                current_user, cursor, include_total
+            )
+            if trending_page is not None:
+                return trending_page
+            # Ranking no disponible: aproximación en SQL (más likes dentro de la ventana)
+            order = "most_liked"
+            since_hours = since_hours or settings.TRENDING_WINDOW_HOURS
+
+        total, posts, next_cursor = self.repository.get_paginated_posts(
             page=page,
             size=limit,
             search=search,
@@ -47,31 +77,87 @@ class PostService:
             from_date=from_date,
             to_date=to_date,
             since_hours=since_hours,
-            order=order
+            order=order,
+            cursor=cursor,
+            include_total=include_total
         )
 
         post_ids = [post.id for post in posts]
         liked_post_ids = self.repository.get_user_liked_posts(post_ids, current_user.id)
+        posts_data = self._map_posts(posts, liked_post_ids)
+        
+        return self._page_response(posts_data, total, page, limit, cursor, next_cursor)
 
-        posts_data = [
-            map_post_to_response(
-                post,
-                liked_by_me=post.id in liked_post_ids,
+    def _get_trending_posts(
+        self,
+        page: int,
+        size: int,
+        search: str | None,
+        author_id: int | None,
+        from_date: date | None,
+        to_date: date | None,
+        since_hours: int | None,
+        current_user: UserPrincipal,
+        cursor: str | None,
+        include_total: bool
+    ):
+        """
+        Página del ranking trending de Redis: lectura por keyset + hidratación
+        en lote. El cursor guarda (score, id, epoch) del último post: los
+        scores cambian con cada like, así que una posición en el ranking
+        duplicaría o saltaría posts entre páginas. Devuelve None si el ranking
+        no está disponible.
+        """
+        after, skip = self._trending_position(page, size, cursor)
+        if any((search, author_id, from_date, to_date, since_hours)):
+            # Con filtros: se filtra en SQL el ranking completo (acotado por
+            # TRENDING_MAX_POSTS) y se pagina en memoria.
+            ranking = self.trending_service.ranking()
+            if ranking is None:
+                return None
+            entries, epoch = ranking
+            matching = self.repository.filter_ids(
+                [post_id for post_id, _ in entries], search, author_id, from_date, to_date, since_hours
             )
-            for post in posts
-        ]
-        
-        total_pages = (total + limit - 1) // limit  # Redondea hacia arriba
-        
-        return {
-            "page": page,
-            "size": limit,
-            "total": total,
-            "total_pages": total_pages,
-            "items": posts_data
-        }
+            entries = [entry for entry in entries if entry[0] in matching]
+            total = len(entries) if include_total else None
+            entries = self.trending_service.entries_after(entries, after, epoch)[skip:skip + size + 1]
+        else:
+            ranked_page = self.trending_service.read_page(size + 1, skip, after, include_total)
+            if ranked_page is None:
+                return None
+            entries, epoch, total = ranked_page
+
+        has_more = len(entries) > size
+        entries = entries[:size]
+        posts = self.repository.get_by_ids([post_id for post_id, _ in entries])
+        liked_post_ids = self.repository.get_user_liked_posts([p.id for p in posts], current_user.id)
+        items = self._map_posts(posts, liked_post_ids)
+        next_cursor = self._trending_cursor(entries[-1], epoch) if has_more else None
+        return self._page_response(items, total, page, size, cursor, next_cursor)
+
+    @staticmethod
+    def _trending_position(page: int, size: int, cursor: str | None) -> tuple:
+        """(after, skip): detrás de qué entrada del ranking, o desde qué posición, empieza la página."""
+        if not cursor:
+            return None, (page - 1) * size
+        score, post_id, epoch = decode_cursor(cursor, "trending", 3)
+        if not (isinstance(score, str) and isinstance(epoch, str) and isinstance(post_id, int)):
+            raise InvalidCursor()
+        try:
+            valid = math.isfinite(float(score)) and math.isfinite(float(epoch))
+        except ValueError:
+            valid = False
+        if not valid:
+            raise InvalidCursor()
+        return (score, post_id, epoch), 0
+
+    @staticmethod
+    def _trending_cursor(entry: tuple, epoch: str) -> str:
+        post_id, score = entry
+        return encode_cursor("trending", [score, post_id, epoch])
 
-    def get_post(self, post_id: int, current_user: User):
+    def get_post(self, post_id: int, current_user: UserPrincipal):
         post = self.repository.get_by_id(post_id, include_relations=True)
         if not post:
             raise PostNotFound()
@@ -81,9 +167,9 @@ class PostService:
 
         liked_by_me = self.like_repository.is_post_liked_by_user(post.id, current_user.id)
 
-        return map_post_to_response(post, liked_by_me)
+        return map_post_to_response(post, liked_by_me, self.counter_service.get_pending([post]).get(post.id))
 
-    def update_post(self, post_id: int, post_data: PostCreate, current_user: User):
+    def update_post(self, post_id: int, post_data: PostCreate, current_user: UserPrincipal):
         post = self.repository.get_by_id(post_id, include_relations=True)
         if not post:
             raise PostNotFound()
@@ -95,9 +181,13 @@ class PostService:
         
         liked_by_me = any(like.user_id == current_user.id for like in updated_post.likes)
 
-        return map_post_to_response(updated_post, liked_by_me=liked_by_me)
+        return map_post_to_response(
+            updated_post,
+            liked_by_me=liked_by_me,
+            pending_counts=self.counter_service.get_pending([post]).get(post.id)
+        )
 
-    def delete_post(self, post_id: int, current_user: User):
+    def delete_post(self, post_id: int, current_user: UserPrincipal):
         post = self.repository.get_by_id(post_id, include_relations=False)
         if not post:
             raise PostNotFound()
@@ -105,26 +195,46 @@ class PostService:
         if post.author_id != current_user.id and current_user.role != "admin":
             raise ForbiddenAction()
 
+        author_id = post.author_id
         self.repository.delete(post)
+        self.timeline_service.remove_post(author_id, post_id)
+        self.trending_service.remove_post(post_id)
         return {"message": "Post eliminado"}
 
 
 
 
-    def get_feed(self, current_user_id: int, page: int, size: int, order: str = "recent"):
+    def get_feed(
+        self,
+        current_user_id: int,
+        page: int,
+        size: int,
+        order: str = "recent",
+        cursor: str | None = None,
+        include_total: bool | None = None
+    ):
+        if include_total is None:
+            include_total = cursor is None
+
+        # Ruta rápida: timeline precalculado en Redis (solo orden cronológico).
+        # Devuelve None si Redis no está disponible o la página no está en el timeline.
+        if order == "recent" and settings.FEED_TIMELINES_ENABLED:
+            timeline_page = self._get_feed_from_timeline(current_user_id, page, size, cursor, include_total)
+            if timeline_page is not None:
+                return timeline_page
+
         followed_ids = self.follower_repository.get_followed_ids(current_user_id)
 
         if not followed_ids:
-            return {
-                "items": [],
-                "total": 0,
-                "page": page,
-                "size": size,
-                "total_pages": 0
-            }
-
-        total, posts = self.repository.get_feed_posts(
-            followed_ids=followed_ids, page=page, size=size, order=order
+            return self._page_response([], 0 if include_total else None, page, size, cursor, None)
+
+        total, posts, next_cursor = self.repository.get_feed_posts(
+            followed_ids=followed_ids,
+            page=page,
+            size=size,
+            order=order,
+            cursor=cursor,
+            include_total=include_total
         )
 
         post_ids = [p.id for p in posts]
@@ -133,20 +243,244 @@ class PostService:
             user_id=current_user_id, post_ids=post_ids
         )
 
-        items = [
+        items = self._map_posts(posts, liked_ids)
+
+        return self._page_response(items, total, page, size, cursor, next_cursor)
+
+    def _get_feed_from_timeline(
+        self,
+        current_user_id: int,
+        page: int,
+        size: int,
+        cursor: str | None,
+        include_total: bool
+    ):
+        after_id = self.repository.decode_keyset(cursor, "feed")[0] if cursor else None
+        timeline_page = self.timeline_service.read_page(current_user_id, page, size, after_id)
+        if timeline_page is None:
+            return None
+
+        post_ids, has_more, total = timeline_page
+        posts = self.repository.get_by_ids(post_ids)
+
+        if include_total and total is None:
+            # Timeline recortado: el total exacto solo lo conoce SQL
+            followed_ids = self.follower_repository.get_followed_ids(current_user_id)
+            total = self.repository.count_by_authors(followed_ids)
+        elif not include_total:
+            total = None
+
+        liked_ids = self.like_repository.get_liked_post_ids(
+            user_id=current_user_id, post_ids=[p.id for p in posts]
+        )
+        items = self._map_posts(posts, liked_ids)
+        next_cursor = self.repository.make_cursor(posts[-1], "feed") if has_more and posts else None
+        return self._page_response(items, total, page, size, cursor, next_cursor)
+
+    def _map_posts(self, posts: list, liked_ids: set[int]) -> list[dict]:
+        """Mapea una página de posts sumando los contadores pendientes (un round trip a Redis)."""
+        pending = self.counter_service.get_pending(posts)
+        return [
             map_post_to_response(
                 post,
                 liked_by_me=post.id in liked_ids,
+                pending_counts=pending.get(post.id),
             )
             for post in posts
         ]
 
-        total_pages = (total + size - 1) // size if size > 0 else 0
-
+    @staticmethod
+    def _page_response(
+        items: list,
+        total: int | None,
+        page: int,
+        size: int,
+        cursor: str | None,
+        next_cursor: str | None
+    ) -> dict:
+        total_pages = (total + size - 1) // size if total is not None and size > 0 else None  # Redondea hacia arriba
         return {
             "items": items,
             "total": total,
-            "page": page,
+            # En modo cursor el número de página no tiene sentido
+            "page": page if cursor is None else None,
             "size": size,
-            "total_pages": total_pages
+            "total_pages": total_pages,
+            "next_cursor": next_cursor
         }
+
+
+class AsyncPostService:
+    """
+    Lecturas de posts del stack async (listado, trending, feed y detalle):
+    SQL con AsyncSession y Redis con el cliente async, sin ocupar hilos del
+    threadpool. Mismas respuestas que PostService; las escrituras (crear,
+    editar, borrar) siguen en PostService.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.repository = AsyncPostRepository(db)
+        self.timeline_service = AsyncTimelineService(db)
+        self.trending_service = TrendingService(None)
+        self.counter_service = CounterService(None)
+
+    async def get_posts(
+        self,
+        page: int,
+        limit: int,
+        search: str | None,
+        author_id: int | None,
+        from_date: date | None,
+        to_date: date | None,
+        since_hours: int | None,
+        current_user: UserPrincipal,
+        order: str = "recent",
+        cursor: str | None = None,
+        include_total: bool | None = None
+    ):
+        if include_total is None:
+            include_total = cursor is None
+
+        if order == "trending":
+            trending_page = await self._get_trending_posts(
+                page, limit, search, author_id, from_date, to_date, since_hours,
+                current_user, cursor, include_total
+            )
+            if trending_page is not None:
+                return trending_page
+            order = "most_liked"
+            since_hours = since_hours or settings.TRENDING_WINDOW_HOURS
+
+        total, posts, next_cursor = await self.repository.get_paginated_posts(
+            page=page,
+            size=limit,
+            search=search,
+            author_id=author_id,
+            from_date=from_date,
+            to_date=to_date,
+            since_hours=since_hours,
+            order=order,
+            cursor=cursor,
+            include_total=include_total
+        )
+        liked_post_ids = await self.repository.get_user_liked_posts([post.id for post in posts], current_user.id)
+        posts_data = await self._map_posts(posts, liked_post_ids)
+        return PostService._page_response(posts_data, total, page, limit, cursor, next_cursor)
+
+    async def _get_trending_posts(
+        self,
+        page: int,
+        size: int,
+        search: str | None,
+        author_id: int | None,
+        from_date: date | None,
+        to_date: date | None,
+        since_hours: int | None,
+        current_user: UserPrincipal,
+        cursor: str | None,
+        include_total: bool
+    ):
+        """Igual que PostService._get_trending_posts."""
+        after, skip = PostService._trending_position(page, size, cursor)
+        if any((search, author_id, from_date, to_date, since_hours)):
+            ranking = await self.trending_service.ranking_async()
+            if ranking is None:
+                return None
+            entries, epoch = ranking
+            matching = await self.repository.filter_ids(
+                [post_id for post_id, _ in entries], search, author_id, from_date, to_date, since_hours
+            )
+            entries = [entry for entry in entries if entry[0] in matching]
+            total = len(entries) if include_total else None
+            entries = self.trending_service.entries_after(entries, after, epoch)[skip:skip + size + 1]
+        else:
+            ranked_page = await self.trending_service.read_page_async(size + 1, skip, after, include_total)
+            if ranked_page is None:
+                return None
+            entries, epoch, total = ranked_page
+
+        has_more = len(entries) > size
+        entries = entries[:size]
+        posts = await self.repository.get_by_ids([post_id for post_id, _ in entries])
+        liked_post_ids = await self.repository.get_user_liked_posts([p.id for p in posts], current_user.id)
+        items = await self._map_posts(posts, liked_post_ids)
+        next_cursor = PostService._trending_cursor(entries[-1], epoch) if has_more else None
+        return PostService._page_response(items, total, page, size, cursor, next_cursor)
+
+    async def get_post(self, post_id: int, current_user: UserPrincipal):
+        post = await self.repository.get_by_id(post_id)
+        if not post:
+            raise PostNotFound()
+
+        if post.author_id != current_user.id and current_user.role != "admin":
+            raise ForbiddenAction()
+
+        items = await self._map_posts([post], await self.repository.get_user_liked_posts([post.id], current_user.id))
+        return items[0]
+
+    async def get_feed(
+        self,
+        current_user_id: int,
+        page: int,
+        size: int,
+        order: str = "recent",
+        cursor: str | None = None,
+        include_total: bool | None = None
+    ):
+        if include_total is None:
+            include_total = cursor is None
+
+        if order == "recent" and settings.FEED_TIMELINES_ENABLED:
+            timeline_page = await self._get_feed_from_timeline(current_user_id, page, size, cursor, include_total)
+            if timeline_page is not None:
+                return timeline_page
+
+        total, posts, next_cursor = await self.repository.get_feed_posts(
+            user_id=current_user_id,
+            page=page,
+            size=size,
+            order=order,
+            cursor=cursor,
+            include_total=include_total
+        )
+        liked_ids = await self.repository.get_user_liked_posts([p.id for p in posts], current_user_id)
+        items = await self._map_posts(posts, liked_ids)
+        return PostService._page_response(items, total, page, size, cursor, next_cursor)
+
+    async def _get_feed_from_timeline(
+        self,
+        current_user_id: int,
+        page: int,
+        size: int,
+        cursor: str | None,
+        include_total: bool
+    ):
+        after_id = self.repository.decode_keyset(cursor, "feed")[0] if cursor else None
+        timeline_page = await self.timeline_service.read_page(current_user_id, page, size, after_id)
+        if timeline_page is None:
+            return None
+
+        post_ids, has_more, total = timeline_page
+        posts = await self.repository.get_by_ids(post_ids)
+
+        if include_total and total is None:
+            total = await self.repository.count_feed(current_user_id)
+        elif not include_total:
+            total = None
+
+        liked_ids = await self.repository.get_user_liked_posts([p.id for p in posts], current_user_id)
+        items = await self._map_posts(posts, liked_ids)
+        next_cursor = self.repository.make_cursor(posts[-1], "feed") if has_more and posts else None
+        return PostService._page_response(items, total, page, size, cursor, next_cursor)
+
+    async def _map_posts(self, posts: list, liked_ids: set[int]) -> list[dict]:
+        pending = await self.counter_service.get_pending_async(posts)
+        return [
+            map_post_to_response(
+                post,
+                liked_by_me=post.id in liked_ids,
+                pending_counts=pending.get(post.id),
+            )
+            for post in posts
+        ]
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import uuid
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis import redis_client, async_redis_client
+from app.db.session import run_after_commit, run_after_commit_async
+
+logger = logging.getLogger(__name__)
+
+USER_CHANNEL_PREFIX = "realtime:user:"
+# Señal para el consumidor: su cola se desbordó y debe cerrar la conexión
+OVERFLOW = None
+
+
+def user_channel(user_id: int) -> str:
+    return f"{USER_CHANNEL_PREFIX}{user_id}"
+
+
+class RealtimePublisher:
+    """
+    Publica eventos en el canal pub/sub de cada usuario. Cualquier worker
+    con una conexión abierta de ese usuario (WebSocket o SSE) lo recibe.
+    """
+
+    def __init__(self, redis=redis_client, async_redis=async_redis_client):
+        self.redis = redis
+        self.async_redis = async_redis
+
+    @staticmethod
+    def encode(event_type: str, data) -> str:
+        return json.dumps({"type": event_type, "data": jsonable_encoder(data)})
+
+    def publish(self, user_ids, event_type: str, data) -> None:
+        """Publica el mismo evento a varios usuarios en un round trip."""
+        payload = self.encode(event_type, data)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id in set(user_ids):
+                pipe.publish(user_channel(user_id), payload)
+            pipe.execute()
+        except RedisError:
+            # Tiempo real best-effort: el dato ya está en la BD
+            logger.warning("No se pudo publicar el evento %s", event_type, exc_info=True)
+
+    def publish_after_commit(self, db: Session, user_ids, event_type: str, data) -> None:
+        """Publica cuando la transacción de la petición se confirme."""
+        user_ids = list(user_ids)
+        run_after_commit(db, lambda: self.publish(user_ids, event_type, data))
+
+    async def publish_async(self, user_ids, event_type: str, data) -> None:
+        payload = self.encode(event_type, data)
+        try:
+            pipe = self.async_redis.pipeline(transaction=False)
+            for user_id in set(user_ids):
+                pipe.publish(user_channel(user_id), payload)
+            await pipe.execute()
+        except RedisError:
+            logger.warning("No se pudo publicar el evento %s", event_type, exc_info=True)
+
+    def publish_after_commit_async(self, db, user_ids, event_type: str, data) -> None:
+        """publish_after_commit para una AsyncSession (stack async, ver get_async_db)."""
+        user_ids = list(user_ids)
+        run_after_commit_async(db, lambda: self.publish_async(user_ids, event_type, data))
+
+
+class RealtimeHub:
+    """
+    Reparto de eventos a las conexiones de este worker.
+
+    Una sola conexión pub/sub por proceso: se suscribe al canal de un usuario
+    al abrir su primera conexión y se desuscribe al cerrar la última. Cada
+    conexión tiene una cola acotada; si un cliente lento la llena se le
+    desconecta en lugar de acumular memoria.
+    """
+
+    def __init__(self, redis=async_redis_client, queue_size: int = settings.REALTIME_QUEUE_SIZE):
+        self.redis = redis
+        self.queue_size = queue_size
+        self.worker_id = uuid.uuid4().hex
+        self._connections: dict[int, set[asyncio.Queue]] = {}
+        self._pubsub = None
+        self._reader = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(queues) for queues in self._connections.values())
+
+    @property
+    def user_count(self) -> int:
+        return len(self._connections)
+
+    async def _start(self) -> None:
+        await self._subscribe_all()
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def stop(self) -> None:
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        if self._pubsub:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        for queues in self._connections.values():
+            for queue in queues:
+                self._close(queue)
+        self._connections.clear()
+
+    async def connect(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        async with self._lock:
+            if self._reader is None:
+                await self._start()
+            queues = self._connections.setdefault(user_id, set())
+            if not queues:
+                await self._pubsub.subscribe(user_channel(user_id))
+            queues.add(queue)
+        return queue
+
+    async def disconnect(self, user_id: int, queue: asyncio.Queue) -> None:
+        async with self._lock:
+            queues = self._connections.get(user_id)
+            if not queues:
+                return
+            queues.discard(queue)
+            if not queues:
+                del self._connections[user_id]
+                if self._pubsub:
+                    await self._pubsub.unsubscribe(user_channel(user_id))
+
+    def dispatch(self, user_id: int, payload: str) -> None:
+        for queue in self._connections.get(user_id, ()):
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                logger.warning("Cliente lento del usuario %s desconectado", user_id)
+                self._close(queue)
+
+    @staticmethod
+    def _close(queue: asyncio.Queue) -> None:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(OVERFLOW)
+
+    async def _subscribe_all(self) -> None:
+        self._pubsub = self.redis.pubsub()
+        # Canal propio del worker: mantiene la conexión suscrita aunque no
+        # haya usuarios, para que el bucle de lectura no termine.
+        await self._pubsub.subscribe(f"realtime:worker:{self.worker_id}",
+                                     *(user_channel(user_id) for user_id in self._connections))
+
+    async def _read_loop(self) -> None:
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except (RedisError, OSError):
+                logger.warning("Conexión pub/sub perdida, reconectando", exc_info=True)
+                await self._reconnect()
+                continue
+            if message and message["type"] == "message":
+                channel = message["channel"]
+                if channel.startswith(USER_CHANNEL_PREFIX):
+                    self.dispatch(int(channel[len(USER_CHANNEL_PREFIX):]), message["data"])
+
+    async def _reconnect(self) -> None:
+        """Reintenta cada segundo y vuelve a suscribir los canales de las conexiones abiertas."""
+        while True:
+            await asyncio.sleep(1)
+            try:
+                await self._pubsub.aclose()
+            except (RedisError, OSError):
+                pass
+            async with self._lock:
+                try:
+                    await self._subscribe_all()
+                    return
+                except (RedisError, OSError):
+                    logger.warning("Redis sigue sin estar disponible para pub/sub")
+
+
+# Un hub por proceso (worker de uvicorn)
+realtime_hub = RealtimeHub()
@@ -2,10 +2,11 @@ from sqlalchemy.orm import Session
 from app.repositories.saved_repository import SavedRepository
 from app.repositories.like_repository import LikeRepository
 from app.models.post import Post
-from app.models.user import User
+from app.services.user_cache import UserPrincipal
 from app.exceptions.post_exceptions import PostNotFound
 from app.exceptions.saved_exceptions import PostAlreadySaved, PostNotSaved
 from app.mappers.post_mapper import map_post_to_response
+from app.services.counter_service import CounterService
 
 
 class SavedService:
@@ -13,8 +14,9 @@ class SavedService:
         self.db = db
         self.repository = SavedRepository(db)
         self.like_repository = LikeRepository(db)
+        self.counter_service = CounterService(db)
 
-    def save_post(self, post_id: int, current_user: User) -> dict:
+    def save_post(self, post_id: int, current_user: UserPrincipal) -> dict:
         post = self.db.query(Post).filter(Post.id == post_id).first()
         if not post:
             raise PostNotFound()
@@ -29,7 +31,7 @@ class SavedService:
             "message": "Post guardado correctamente"
         }
 
-    def unsave_post(self, post_id: int, current_user: User) -> dict:
+    def unsave_post(self, post_id: int, current_user: UserPrincipal) -> dict:
         saved_entry = self.repository.get_saved(post_id, current_user.id)
         if not saved_entry:
             raise PostNotSaved()
@@ -40,7 +42,7 @@ class SavedService:
             "message": "Post eliminado de guardados"
         }
 
-    def get_saved_posts(self, current_user: User, page: int = 1, size: int = 10) -> dict:
+    def get_saved_posts(self, current_user: UserPrincipal, page: int = 1, size: int = 10) -> dict:
         total, posts = self.repository.get_saved_posts_paginated(
             user_id=current_user.id,
             page=page,
@@ -53,10 +55,13 @@ class SavedService:
             post_ids=post_ids
         )
 
+        pending = self.counter_service.get_pending(posts)
+
         items = [
             map_post_to_response(
                 post,
-                liked_by_me=post.id in liked_ids
+                liked_by_me=post.id in liked_ids,
+                pending_counts=pending.get(post.id)
             )
             for post in posts
         ]
@@ -71,7 +76,7 @@ class SavedService:
             "items": items
         }
 
-    def check_saved(self, post_id: int, current_user: User) -> dict:
+    def check_saved(self, post_id: int, current_user: UserPrincipal) -> dict:
         is_saved = self.repository.is_post_saved_by_user(post_id, current_user.id)
         return {
             "is_saved": is_saved,
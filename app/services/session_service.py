@@ -1,11 +1,121 @@
 from typing import Optional
 from datetime import datetime, timezone
-import json
-from fastapi import HTTPException, status
+import logging
+import time
+from redis.exceptions import RedisError
+from app.auth.auth_handler import refresh_token_key
 from app.utils.device import parse_user_agent
 
-
-class SessionService:
+logger = logging.getLogger(__name__)
+
+# Formato compacto de la sesión (hash session:{user_id}:{device_id}).
+# Nombre largo (el que ven SessionOut y las métricas) -> campo en Redis.
+# user_id/device_id salen de la clave; las fechas se guardan como epoch (s).
+SESSION_FIELDS = {
+    "jti": "j",
+    "os": "os",
+    "browser": "br",
+    "device_type": "dt",
+    "trust_level": "tl",
+    "initial_ip": "ip0",
+    "initial_user_agent": "ua0",
+    "last_ip": "ip",
+    "last_user_agent": "ua",
+    "last_access": "la",
+    "first_refresh_at": "fr",
+    "last_refresh_at": "lr",
+    "refresh_count": "rc",
+    "failed_refresh_attempts": "ff",
+    "country": "co",
+    "city": "ci",
+    "login_method": "lm",
+    "device_trust_score": "dts",
+    "session_quality_score": "qs",
+    "created_at": "ca",
+    "expires_at": "ea",
+}
+TIMESTAMP_FIELDS = {"last_access", "first_refresh_at", "last_refresh_at", "created_at", "expires_at"}
+INT_FIELDS = {"refresh_count", "failed_refresh_attempts", "device_trust_score", "session_quality_score"}
+# Valores por defecto: no se guardan mientras no cambien
+SESSION_DEFAULTS = {
+    "first_refresh_at": None,
+    "last_refresh_at": None,
+    "refresh_count": 0,
+    "failed_refresh_attempts": 0,
+    "country": "Unknown",
+    "city": "Unknown",
+    "login_method": "password",
+    "session_quality_score": 100,
+}
+
+# Rotación atómica del refresh token en un solo round trip. Comprueba que el
+# jti viejo sigue vivo y coincide con el de la sesión, lo sustituye por el
+# nuevo, actualiza la auditoría y renueva los TTL. Dos refresh concurrentes
+# con el mismo token no pueden ganar ambos: el segundo ve el jti ya borrado.
+# Solo se escriben los campos que cambian (HSET/HINCRBY). La IP y el
+# User-Agent iniciales (ip0/ua0) se guardan la primera vez que cambian.
+#   KEYS: sesión, refresh_token:{viejo}, refresh_token:{nuevo}, índice del usuario
+#   ARGV: jti viejo, jti nuevo, device_id, user_id, ip, user_agent,
+#         ahora (epoch), expires_at (epoch), ttl
+ROTATE_REFRESH_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return 'revoked'
+end
+redis.call('DEL', KEYS[2])
+
+local session = redis.call('HMGET', KEYS[1], 'j', 'ip', 'ua', 'qs')
+if not session[1] then
+    return 'no_session'
+end
+
+if session[1] ~= ARGV[1] then
+    -- Token de una rotación anterior: posible robo, se cierra la sesión
+    redis.call('DEL', KEYS[1], 'refresh_token:' .. session[1])
+    redis.call('ZREM', KEYS[4], ARGV[3])
+    return 'reused'
+end
+
+local score = tonumber(session[4]) or 100
+if session[2] ~= ARGV[5] then
+    score = math.max(0, score - 20)
+    redis.call('HINCRBY', KEYS[1], 'ff', 1)
+    redis.call('HSETNX', KEYS[1], 'ip0', session[2])
+    redis.call('HSET', KEYS[1], 'ip', ARGV[5], 'qs', score)
+end
+if session[3] ~= ARGV[6] then
+    score = math.max(0, score - 40)
+    redis.call('HINCRBY', KEYS[1], 'ff', 1)
+    redis.call('HSETNX', KEYS[1], 'ua0', session[3])
+    redis.call('HSET', KEYS[1], 'ua', ARGV[6], 'qs', score)
+end
+
+redis.call('HSET', KEYS[1], 'j', ARGV[2], 'ea', ARGV[8], 'la', ARGV[7], 'lr', ARGV[7])
+redis.call('HSETNX', KEYS[1], 'fr', ARGV[7])
+redis.call('HINCRBY', KEYS[1], 'rc', 1)
+
+local ttl = tonumber(ARGV[9])
+redis.call('EXPIRE', KEYS[1], ttl)
+redis.call('SET', KEYS[3], ARGV[4], 'EX', ttl)
+redis.call('ZADD', KEYS[4], ARGV[8], ARGV[3])
+redis.call('EXPIRE', KEYS[4], ttl, 'NX')
+redis.call('EXPIRE', KEYS[4], ttl, 'GT')
+return 'ok'
+"""
+
+
+def _epoch(value: str) -> int:
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+def _iso(value: str) -> str:
+    return datetime.fromtimestamp(int(value), timezone.utc).isoformat()
+
+
+class BaseSessionService:
+    """
+    Claves, formato y reglas de las sesiones, sin I/O: lo comparten
+    SessionService (cliente síncrono) y AsyncSessionService (redis.asyncio).
+    """
 
     def __init__(self, redis_client):
         self.redis = redis_client
@@ -16,8 +126,195 @@ class SessionService:
     def _session_key(self, user_id: int, device_id: str) -> str:
         return f"session:{user_id}:{device_id}"
 
-    def _jti_key(self, jti: str) -> str:
-        return f"refresh_jti:{jti}"
+    def _index_key(self, user_id: int) -> str:
+        # Índice de sesiones del usuario: ZSET device_id -> timestamp de expiración
+        return f"user_sessions:{user_id}"
+
+    def _index_session(self, pipe, user_id: int, device_id: str, expires_at: datetime, ttl: int):
+        """Añade/actualiza la sesión en el índice y alarga su TTL al de la sesión más longeva."""
+        index = self._index_key(user_id)
+        pipe.zadd(index, {device_id: expires_at.timestamp()})
+        # NX pone el primer TTL; GT solo lo alarga (una clave sin TTL cuenta como infinita para GT)
+        pipe.expire(index, ttl, nx=True)
+        pipe.expire(index, ttl, gt=True)
+
+    # -----------------------------
+    # Formato compacto <-> sesión completa
+    # -----------------------------
+    @staticmethod
+    def compact(session: dict) -> dict:
+        """Campos del hash a partir de una sesión completa (omite defaults y derivables)."""
+        fields = {}
+        for name, field in SESSION_FIELDS.items():
+            value = session.get(name)
+            if value is None or SESSION_DEFAULTS.get(name) == value:
+                continue
+            if name in TIMESTAMP_FIELDS:
+                value = _epoch(value)
+            fields[field] = value
+        # La IP/User-Agent inicial solo se guarda si difiere de la última
+        for initial, last in (("ip0", "ip"), ("ua0", "ua")):
+            if fields.get(initial) == fields.get(last):
+                fields.pop(initial, None)
+        return fields
+
+    @staticmethod
+    def expand(user_id: int, device_id: str, fields: dict) -> dict:
+        """Sesión completa (mismo formato que antes: SessionOut, métricas) desde el hash."""
+        session = {
+            "session_id": f"{user_id}:{device_id}",
+            "user_id": user_id,
+            "device_id": device_id,
+        }
+        for name, field in SESSION_FIELDS.items():
+            value = fields.get(field)
+            if value is None:
+                session[name] = SESSION_DEFAULTS.get(name)
+            elif name in TIMESTAMP_FIELDS:
+                session[name] = _iso(value)
+            elif name in INT_FIELDS:
+                session[name] = int(value)
+            else:
+                session[name] = value
+        session["initial_ip"] = session["initial_ip"] or session["last_ip"]
+        session["initial_user_agent"] = session["initial_user_agent"] or session["last_user_agent"]
+        return session
+
+    def _expand_indexed(self, user_id: int, device_ids: list[str], hashes: list[dict]) -> tuple[list[dict], list[str]]:
+        """Sesiones de los hashes leídos y device_id del índice cuya clave ya no existe."""
+        sessions = []
+        missing = []
+        for device_id, fields in zip(device_ids, hashes):
+            if fields:
+                sessions.append(self.expand(user_id, device_id, fields))
+            else:
+                missing.append(device_id)
+        return sessions, missing
+
+    # -----------------------------
+    # 4.4 - Helper Semantic Labels
+    # -----------------------------
+    def _calculate_device_type(self, os_name: str, browser: str) -> str:
+        mobile_os = ["Android", "iOS"]
+        if os_name in mobile_os:
+            return "mobile"
+        if os_name in ["Windows", "Mac OS", "Linux", "Mac OS X"]:
+            return "desktop"
+        return "unknown"
+
+    def _calculate_trust_level(self, ip: str, is_known_ip: bool = False) -> str:
+        """
+        Calcula trust_level alto si la IP se encuentra en las 3 más frecuentes/recientes,
+        'medium' si no. (Mockup funcional preparatorio).
+        """
+        return "high" if is_known_ip else "medium"
+
+    # -----------------------------
+    # Borrado de sesiones (comandos en un pipeline)
+    # -----------------------------
+    def _queue_delete(self, pipe, user_id: int, sessions: list[dict]) -> list[str]:
+        """Encola el borrado de `sessions` (hash, refresh token e índice) y devuelve sus device_id."""
+        device_ids = [session["device_id"] for session in sessions]
+        for session in sessions:
+            pipe.delete(self._session_key(user_id, session["device_id"]))
+            if session["jti"]:
+                pipe.delete(refresh_token_key(session["jti"]))
+        pipe.zrem(self._index_key(user_id), *device_ids)
+        return device_ids
+
+    # -----------------------------
+    # Fase 5 - Auditoría y Métricas Empresariales
+    # -----------------------------
+    @staticmethod
+    def summarize_metrics(sessions: list[dict]) -> dict:
+        """
+        Retorna un hash comprensible con toda la analítica consolidada de las sesiones
+        del usuario. Cumple la funcionalidad de Fase 5 para el dashboard de auditoría y admin.
+        """
+        metrics = {
+            "active_sessions_count": len(sessions),
+            "total_refreshes": 0,
+            "failed_refresh_attempts": 0,
+            "top_browsers": {},
+            "top_os": {},
+            "locations": {},
+            "suspicious_sessions": []
+        }
+
+        for s in sessions:
+            metrics["total_refreshes"] += s.get("refresh_count", 0)
+            metrics["failed_refresh_attempts"] += s.get("failed_refresh_attempts", 0)
+            
+            browser = s.get("browser", "Unknown")
+            metrics["top_browsers"][browser] = metrics["top_browsers"].get(browser, 0) + 1
+            
+            os = s.get("os", "Unknown")
+            metrics["top_os"][os] = metrics["top_os"].get(os, 0) + 1
+            
+            loc = s.get("country", "Unknown")
+            metrics["locations"][loc] = metrics["locations"].get(loc, 0) + 1
+            
+            # --- 5.3 Regla de Sesiones Sospechosas ---
+            reasons = []
+            if s.get("failed_refresh_attempts", 0) >= 3:
+                reasons.append("many_failed_refresh")
+            if s.get("device_trust_score", 100) <= 30:
+                reasons.append("low_trust_score")
+            if s.get("session_quality_score", 100) <= 40:
+                reasons.append("low_quality_score")
+            
+            if s.get("initial_ip") != s.get("last_ip"):
+                reasons.append("ip_changed_across_refreshes")
+            if s.get("initial_user_agent") != s.get("last_user_agent"):
+                reasons.append("user_agent_changed")
+                
+            # Flooding temporal (Ej: más de 20 refreshes en los primeros 10 minutos de vida)
+            created_at = datetime.fromisoformat(s.get("created_at"))
+            minutes_alive = max(1.0, (datetime.now(timezone.utc) - created_at).total_seconds() / 60.0)
+            refresh_rate = s.get("refresh_count", 0) / minutes_alive
+            if refresh_rate > 2.0:  # arbitrary threshold
+                reasons.append("high_token_refresh_rate (token-flood)")
+
+            if reasons:
+                metrics["suspicious_sessions"].append({
+                    "device_id": s.get("device_id"),
+                    "reasons": reasons
+                })
+                
+        return metrics
+
+
+class SessionService(BaseSessionService):
+
+    def __init__(self, redis_client):
+        super().__init__(redis_client)
+        # EVALSHA con recarga automática del script si Redis no lo tiene en caché
+        self._rotate_refresh = self.redis.register_script(ROTATE_REFRESH_SCRIPT)
+
+    def get_session(self, user_id: int, device_id: str) -> Optional[dict]:
+        fields = self.redis.hgetall(self._session_key(user_id, device_id))
+        return self.expand(user_id, device_id, fields) if fields else None
+
+    def _load_indexed(self, user_id: int) -> list[dict]:
+        """
+        Sesiones vivas del usuario vía su índice: O(sesiones del usuario), sin KEYS.
+        Poda de forma perezosa los miembros expirados o cuya clave ya no existe.
+        """
+        index = self._index_key(user_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zremrangebyscore(index, "-inf", time.time())
+        pipe.zrange(index, 0, -1)
+        _, device_ids = pipe.execute()
+        if not device_ids:
+            return []
+
+        pipe = self.redis.pipeline(transaction=False)
+        for device_id in device_ids:
+            pipe.hgetall(self._session_key(user_id, device_id))
+        sessions, missing = self._expand_indexed(user_id, device_ids, pipe.execute())
+        if missing:
+            self.redis.zrem(index, *missing)
+        return sessions
 
     # -----------------------------
     # 1. Crear Sesión
@@ -75,46 +372,59 @@ class SessionService:
         ttl = int((expires_at - datetime.now(timezone.utc)).total_seconds())
         if ttl <= 0: return None
 
-        self.redis.set(key, json.dumps(session_data), ex=ttl)
-        self.redis.set(self._jti_key(jti), device_id, ex=ttl)
+        # Sesión, refresh token e índice en un único round trip. DEL antes del
+        # HSET: un nuevo login en el mismo dispositivo no hereda campos viejos.
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(key)
+        pipe.hset(key, mapping=self.compact(session_data))
+        pipe.expire(key, ttl)
+        pipe.set(refresh_token_key(jti), str(user_id), ex=ttl)
+        self._index_session(pipe, user_id, device_id, expires_at, ttl)
+        pipe.execute()
 
         return session_data
 
-    # -----------------------------
-    # 4.4 - Helper Semantic Labels
-    # -----------------------------
-    def _calculate_device_type(self, os_name: str, browser: str) -> str:
-        mobile_os = ["Android", "iOS"]
-        if os_name in mobile_os:
-            return "mobile"
-        if os_name in ["Windows", "Mac OS", "Linux", "Mac OS X"]:
-            return "desktop"
-        return "unknown"
-
-    def _calculate_trust_level(self, ip: str, is_known_ip: bool = False) -> str:
+    def rebuild_index(self, batch_size: int = 1000) -> int:
         """
-        Calcula trust_level alto si la IP se encuentra en las 3 más frecuentes/recientes,
-        'medium' si no. (Mockup funcional preparatorio).
+        Indexa las sesiones creadas antes de existir user_sessions:{user_id}.
+        Recorre el keyspace con SCAN (incremental, no bloquea Redis como KEYS);
+        solo para la migración, nunca en el camino de una petición.
         """
-        return "high" if is_known_ip else "medium"
+        indexed = 0
+        keys = []
+        for key in self.redis.scan_iter(match="session:*", count=batch_size):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                indexed += self._index_existing(keys)
+                keys = []
+        if keys:
+            indexed += self._index_existing(keys)
+        return indexed
+
+    def _index_existing(self, keys: list[str]) -> int:
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.ttl(key)
+        ttls = pipe.execute()
+
+        now = datetime.now(timezone.utc)
+        pipe = self.redis.pipeline(transaction=False)
+        indexed = 0
+        for key, ttl in zip(keys, ttls):
+            if ttl <= 0:
+                continue
+            _, user_id, device_id = key.split(":", 2)
+            expires_at = datetime.fromtimestamp(now.timestamp() + ttl, timezone.utc)
+            self._index_session(pipe, int(user_id), device_id, expires_at, ttl)
+            indexed += 1
+        pipe.execute()
+        return indexed
 
     # -----------------------------
     # 2. Obtener todas las sesiones de un usuario
     # -----------------------------
     def get_sessions(self, user_id: int):
-        pattern = f"session:{user_id}:*"
-        keys = self.redis.keys(pattern)
-
-        sessions = []
-        for key in keys:
-            raw = self.redis.get(key)
-            if raw:
-                sessions.append(json.loads(raw))
-            else:
-                # Cleanup huérfanas/expiradas (3.2)
-                self.redis.delete(key)
-
-        return sessions
+        return self._load_indexed(user_id)
 
     # -----------------------------
     # 3. Eliminar una sesión
@@ -122,101 +432,51 @@ class SessionService:
     def delete_session(self, user_id: int, device_id: str):
         key = self._session_key(user_id, device_id)
 
-        raw = self.redis.get(key)
-        if not raw:
+        jti = self.redis.hget(key, SESSION_FIELDS["jti"])
+        if not jti:
             return False
 
-        session = json.loads(raw)
-        jti = session.get("jti")
-
-        self.redis.delete(key)
-        if jti:
-            self.redis.delete(self._jti_key(jti))
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(key)
+        pipe.delete(refresh_token_key(jti))
+        pipe.zrem(self._index_key(user_id), device_id)
+        pipe.execute()
 
         return True
 
     # -----------------------------
     # 4. Eliminar todas las sesiones excepto la actual
     # -----------------------------
-    def delete_all_except(self, user_id: int, keep_device_id: str):
-        pattern = f"session:{user_id}:*"
-        keys = self.redis.keys(pattern)
-
-        deleted = []
-
-        for key in keys:
-            k_str = key if isinstance(key, str) else key.decode()
-            
-            if k_str.endswith(f":{keep_device_id}"):
-                continue
-
-            raw = self.redis.get(key)
-            if raw:
-                session = json.loads(raw)
-                jti = session.get("jti")
-
-                self.redis.delete(key)
-                if jti:
-                    self.redis.delete(self._jti_key(jti))
-
-                deleted.append(session["device_id"])
-
+    def delete_all_except(self, user_id: int, keep_device_id: Optional[str]):
+        """Cierra todas las sesiones del usuario salvo la de `keep_device_id` (None: todas)."""
+        others = [
+            session for session in self._load_indexed(user_id)
+            if session["device_id"] != keep_device_id
+        ]
+        if not others:
+            return []
+
+        pipe = self.redis.pipeline(transaction=False)
+        deleted = self._queue_delete(pipe, user_id, others)
+        pipe.execute()
         return deleted
 
-    # -----------------------------
-    # 5. Validación Obligatoria (3.1, 3.2, 3.6, 3.7)
-    # -----------------------------
-    def validate_session_for_refresh(self, user_id: int, device_id: str, jti: str, ip: str, user_agent: str):
-        key = self._session_key(user_id, device_id)
-        raw = self.redis.get(key)
-
-        # 1. Verificar si existe (si no = expirada/revocada) (3.2)
-        if not raw:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Sesión expirada o inexistente."
-            )
-
-        session = json.loads(raw)
-
-        # 2. Verificar correspondencia de JTI (Token replay)
-        if session.get("jti") != jti:
-            session["failed_refresh_attempts"] = session.get("failed_refresh_attempts", 0) + 1
-            session["session_quality_score"] = max(0, session.get("session_quality_score", 100) - 50)
-            self._save_session_changes(key, session)
-            self.delete_session(user_id, device_id)
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token comprometido o previamente usado. Sesión terminada por seguridad."
-            )
-
-        # 3. Detección de anomalías en rotación
-        changes_detected = False
-        if session.get("last_ip") != ip:
-            session["session_quality_score"] = max(0, session.get("session_quality_score", 100) - 20)
-            session["failed_refresh_attempts"] = session.get("failed_refresh_attempts", 0) + 1
-            changes_detected = True
-
-        if session.get("last_user_agent") != user_agent:
-            session["session_quality_score"] = max(0, session.get("session_quality_score", 100) - 40)
-            session["failed_refresh_attempts"] = session.get("failed_refresh_attempts", 0) + 1
-            changes_detected = True
-
-        if changes_detected:
-            self._save_session_changes(key, session)
-
-        return session
-
-    def _save_session_changes(self, key: str, session_data: dict):
-        """Helper para reguardar sesión cuando la mutamos durante validación."""
-        ttl = self.redis.ttl(key)
-        if ttl > 0:
-            self.redis.set(key, json.dumps(session_data), ex=ttl)
+    def close_all_sessions(self, user_id: int) -> list[str]:
+        """
+        Limpieza de todas las sesiones tras incrementar la token_version del
+        usuario. Si Redis falla no se propaga: la nueva versión ya invalida sus
+        tokens y las claves caducan por TTL.
+        """
+        try:
+            return self.delete_all_except(user_id, keep_device_id=None)
+        except RedisError:
+            logger.warning("No se pudieron borrar las sesiones del usuario %s", user_id, exc_info=True)
+            return []
 
     # -----------------------------
-    # 6. Actualizar JTI (Token rotation / Auditoría 3.4)
+    # 5. Rotación del refresh token (3.1, 3.2, 3.4, 3.6, 3.7)
     # -----------------------------
-    def update_jti_for_session(
+    def rotate_refresh_token(
         self,
         user_id: int,
         device_id: str,
@@ -225,99 +485,102 @@ class SessionService:
         new_expires_at: datetime,
         current_ip: str,
         current_user_agent: str
-    ):
-        key = self._session_key(user_id, device_id)
-
-        # Usamos try-except por si acaban de revocarla
-        try:
-            session = self.validate_session_for_refresh(user_id, device_id, old_jti, current_ip, current_user_agent)
-        except HTTPException:
-            return False
-
-        # Auditoría y actualización (3.4)
-        session["jti"] = new_jti
-        session["expires_at"] = new_expires_at.isoformat()
-        
-        now = datetime.now(timezone.utc).isoformat()
-        session["last_access"] = now
-        session["last_ip"] = current_ip
-        session["last_user_agent"] = current_user_agent
-        
-        # Auditoría 5.1
-        if not session.get("first_refresh_at"):
-            session["first_refresh_at"] = now
-        session["last_refresh_at"] = now
-        session["refresh_count"] = session.get("refresh_count", 0) + 1
-
-        ttl = int((new_expires_at - datetime.now(timezone.utc)).total_seconds())
-        if ttl <= 0: return False
-
-        self.redis.set(key, json.dumps(session), ex=ttl)
-
-        # Borrar JTI viejo y guardar el nuevo
-        self.redis.delete(self._jti_key(old_jti))
-        self.redis.set(self._jti_key(new_jti), device_id, ex=ttl)
-
-        return True
+    ) -> str:
+        """
+        Sustituye old_jti por new_jti en la sesión del dispositivo de forma atómica
+        (ROTATE_REFRESH_SCRIPT). Devuelve:
+          - "ok": rotado.
+          - "revoked": old_jti ya no es válido (revocado, expirado o rotado por otra petición).
+          - "no_session": la sesión expiró o se cerró.
+          - "reused": old_jti no es el de la sesión (replay); la sesión se termina.
+        Un cambio de IP o User-Agent penaliza session_quality_score (3.6, 3.7).
+        """
+        now = datetime.now(timezone.utc)
+        ttl = int((new_expires_at - now).total_seconds())
+        if ttl <= 0:
+            return "no_session"
+
+        return self._rotate_refresh(
+            keys=[
+                self._session_key(user_id, device_id),
+                refresh_token_key(old_jti),
+                refresh_token_key(new_jti),
+                self._index_key(user_id),
+            ],
+            args=[
+                old_jti,
+                new_jti,
+                device_id,
+                user_id,
+                current_ip,
+                current_user_agent,
+                int(now.timestamp()),
+                int(new_expires_at.timestamp()),
+                ttl,
+            ],
+        )
 
     # -----------------------------
     # Fase 5 - Auditoría y Métricas Empresariales
     # -----------------------------
     def get_metrics_for_user(self, user_id: int) -> dict:
-        """
-        Retorna un hash comprensible con toda la analítica consolidada de las sesiones
-        del usuario. Cumple la funcionalidad de Fase 5 para el dashboard de auditoría y admin.
-        """
-        sessions = self.get_sessions(user_id)
-        
-        metrics = {
-            "active_sessions_count": len(sessions),
-            "total_refreshes": 0,
-            "failed_refresh_attempts": 0,
-            "top_browsers": {},
-            "top_os": {},
-            "locations": {},
-            "suspicious_sessions": []
-        }
+        return self.summarize_metrics(self.get_sessions(user_id))
+
+
+class AsyncSessionService(BaseSessionService):
+    """
+    Lecturas y cierres de sesiones con redis.asyncio, para los endpoints async
+    (/auth/sessions*, /auth/logout): no ocupan un hilo del threadpool. Mismas
+    claves y formato que SessionService; crear y rotar sesiones siguen en
+    SessionService (login y refresh consultan la BD).
+    """
+
+    async def get_session(self, user_id: int, device_id: str) -> Optional[dict]:
+        fields = await self.redis.hgetall(self._session_key(user_id, device_id))
+        return self.expand(user_id, device_id, fields) if fields else None
+
+    async def _load_indexed(self, user_id: int) -> list[dict]:
+        index = self._index_key(user_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zremrangebyscore(index, "-inf", time.time())
+        pipe.zrange(index, 0, -1)
+        _, device_ids = await pipe.execute()
+        if not device_ids:
+            return []
+
+        pipe = self.redis.pipeline(transaction=False)
+        for device_id in device_ids:
+            pipe.hgetall(self._session_key(user_id, device_id))
+        sessions, missing = self._expand_indexed(user_id, device_ids, await pipe.execute())
+        if missing:
+            await self.redis.zrem(index, *missing)
+        return sessions
 
-        for s in sessions:
-            metrics["total_refreshes"] += s.get("refresh_count", 0)
-            metrics["failed_refresh_attempts"] += s.get("failed_refresh_attempts", 0)
-            
-            browser = s.get("browser", "Unknown")
-            metrics["top_browsers"][browser] = metrics["top_browsers"].get(browser, 0) + 1
-            
-            os = s.get("os", "Unknown")
-            metrics["top_os"][os] = metrics["top_os"].get(os, 0) + 1
-            
-            loc = s.get("country", "Unknown")
-            metrics["locations"][loc] = metrics["locations"].get(loc, 0) + 1
-            
-            # --- 5.3 Regla de Sesiones Sospechosas ---
-            reasons = []
-            if s.get("failed_refresh_attempts", 0) >= 3:
-                reasons.append("many_failed_refresh")
-            if s.get("device_trust_score", 100) <= 30:
-                reasons.append("low_trust_score")
-            if s.get("session_quality_score", 100) <= 40:
-                reasons.append("low_quality_score")
-            
-            if s.get("initial_ip") != s.get("last_ip"):
-                reasons.append("ip_changed_across_refreshes")
-            if s.get("initial_user_agent") != s.get("last_user_agent"):
-                reasons.append("user_agent_changed")
-                
-            # Flooding temporal (Ej: más de 20 refreshes en los primeros 10 minutos de vida)
-            created_at = datetime.fromisoformat(s.get("created_at"))
-            minutes_alive = max(1.0, (datetime.now(timezone.utc) - created_at).total_seconds() / 60.0)
-            refresh_rate = s.get("refresh_count", 0) / minutes_alive
-            if refresh_rate > 2.0:  # arbitrary threshold
-                reasons.append("high_token_refresh_rate (token-flood)")
+    async def get_sessions(self, user_id: int) -> list[dict]:
+        return await self._load_indexed(user_id)
 
-            if reasons:
-                metrics["suspicious_sessions"].append({
-                    "device_id": s.get("device_id"),
-                    "reasons": reasons
-                })
-                
-        return metrics
\ No newline at end of file
+    async def delete_session(self, user_id: int, device_id: str) -> bool:
+        jti = await self.redis.hget(self._session_key(user_id, device_id), SESSION_FIELDS["jti"])
+        if not jti:
+            return False
+
+        pipe = self.redis.pipeline(transaction=False)
+        self._queue_delete(pipe, user_id, [{"device_id": device_id, "jti": jti}])
+        await pipe.execute()
+        return True
+
+    async def delete_all_except(self, user_id: int, keep_device_id: Optional[str]) -> list[str]:
+        others = [
+            session for session in await self._load_indexed(user_id)
+            if session["device_id"] != keep_device_id
+        ]
+        if not others:
+            return []
+
+        pipe = self.redis.pipeline(transaction=False)
+        deleted = self._queue_delete(pipe, user_id, others)
+        await pipe.execute()
+        return deleted
+
+    async def get_metrics_for_user(self, user_id: int) -> dict:
+        return self.summarize_metrics(await self.get_sessions(user_id))
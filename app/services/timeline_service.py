@@ -0,0 +1,584 @@
+import heapq
+import logging
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis import redis_client, async_redis_client
+from app.db.session import SessionLocal, run_after_commit
+from app.repositories.post_repository import PostRepository
+from app.repositories.follower_repository import FollowerRepository
+
+logger = logging.getLogger(__name__)
+
+# Miembro centinela (score 0, por debajo de cualquier post):
+# - Hace que un sorted set vacío exista en Redis (caliente pero sin posts).
+# - Su presencia indica que el set está COMPLETO: contiene todos los posts de
+#   su fuente. Al superar la longitud máxima el recorte lo elimina primero y a
+#   partir de ahí lo que queda por debajo del set se sirve desde SQL.
+SENTINEL = "0"
+# Marcador de un set en reconstrucción (score -1, por debajo del centinela):
+# el set existe mientras se lee SQL, así el fan-out escribe en él los posts
+# que se confirman entretanto y _store los conserva al guardar. Caduca solo
+# si la reconstrucción se interrumpe.
+REBUILDING = "-1"
+REBUILDING_TTL = 30
+FAN_OUT_CHUNK = 500
+
+# Autores en modo "pull" (>= FEED_PULL_FOLLOWER_THRESHOLD seguidores). Es la
+# marca que consulta el fan-out; follow/unfollow la actualizan al cruzar el
+# umbral y refresh_pulled_authors la recalcula entera desde SQL.
+PULLED_AUTHORS_KEY = "feed:pulled_authors"
+
+
+class _Source:
+    """Una fuente ordenada (DESC) de ids para la mezcla del feed."""
+
+    def __init__(self, post_ids: list[int], complete: bool, requested: int):
+        self.post_ids = post_ids
+        # Recortada: devolvió menos de lo pedido pero hay posts más antiguos solo en SQL
+        self.truncated = not complete and len(post_ids) < requested
+
+
+class BaseTimelineService:
+    """Claves y lógica de lectura comunes a TimelineService y AsyncTimelineService (sin E/S)."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.max_length = settings.TIMELINE_MAX_LENGTH
+        self.ttl = settings.TIMELINE_TTL_SECONDS
+        self.pull_threshold = settings.FEED_PULL_FOLLOWER_THRESHOLD
+        self.merge_depth = settings.FEED_PULL_MERGE_DEPTH
+
+    def _timeline_key(self, user_id: int) -> str:
+        return f"timeline:{user_id}"
+
+    def _author_posts_key(self, author_id: int) -> str:
+        return f"author_posts:{author_id}"
+
+    def _following_key(self, user_id: int) -> str:
+        # A quién sigue el usuario, con SENTINEL si está completo: la lectura
+        # del feed cruza este set con PULLED_AUTHORS_KEY (SINTER) sin ir a SQL.
+        return f"following:{user_id}"
+
+    @staticmethod
+    def _read_bounds(page: int, size: int, after_id: int | None) -> tuple[str, int, int]:
+        """(max_score, start, requested) de una página del feed."""
+        max_score = f"({after_id}" if after_id is not None else "+inf"
+        start = 0 if after_id is not None else (page - 1) * size
+        return max_score, start, start + size + 1
+
+    def _queue_timeline_read(self, pipe, user_id: int, max_score: str, requested: int):
+        key = self._timeline_key(user_id)
+        pipe.exists(key)
+        pipe.zscore(key, SENTINEL)
+        pipe.zrevrangebyscore(key, max_score, f"({SENTINEL}", start=0, num=requested)
+        pipe.zcount(key, f"({SENTINEL}", "+inf")
+        pipe.expire(key, self.ttl)
+        following_key = self._following_key(user_id)
+        pipe.sismember(following_key, SENTINEL)
+        pipe.sinter(following_key, PULLED_AUTHORS_KEY)
+        pipe.expire(following_key, self.ttl)
+        return pipe
+
+    def _queue_author_reads(self, pipe, author_ids: list[int], max_score: str, requested: int):
+        for author_id in author_ids:
+            author_key = self._author_posts_key(author_id)
+            pipe.exists(author_key)
+            pipe.zscore(author_key, SENTINEL)
+            pipe.zrevrangebyscore(author_key, max_score, f"({SENTINEL}", start=0, num=requested)
+        return pipe
+
+    @classmethod
+    def _page_from_sources(
+        cls,
+        sources: list[_Source],
+        start: int,
+        size: int,
+        requested: int,
+        total: int | None
+    ) -> tuple[list[int], bool, int | None] | None:
+        merged = cls._merge(sources)
+        if len(merged) < requested and any(source.truncated for source in sources):
+            return None
+
+        page_ids = merged[start:start + size]
+        has_more = len(merged) > start + size
+        return page_ids, has_more, total
+
+    @staticmethod
+    def _slice_source(all_ids: list[int], complete: bool, after_id: int | None, requested: int) -> _Source:
+        if after_id is not None:
+            all_ids = [post_id for post_id in all_ids if post_id < after_id]
+        return _Source(all_ids[:requested], complete, requested)
+
+    @staticmethod
+    def _merge(sources: list[_Source]) -> list[int]:
+        """
+        k-way merge (heap) de las fuentes, descendente y sin duplicados (un autor
+        que pasó de push a pull puede tener posts en ambas). Se corta en el
+        primer hueco de una fuente recortada: por debajo de ese punto podrían
+        faltar posts que solo están en SQL.
+        """
+        floor = max(
+            (source.post_ids[-1] if source.post_ids else float("inf"))
+            for source in sources if source.truncated
+        ) if any(source.truncated for source in sources) else 0
+
+        merged = []
+        for post_id in heapq.merge(*[source.post_ids for source in sources], reverse=True):
+            if post_id < floor:
+                break
+            if not merged or merged[-1] != post_id:
+                merged.append(post_id)
+        return merged
+
+
+class TimelineService(BaseTimelineService):
+    """
+    Feed híbrido push/pull sobre Redis.
+
+    - timeline:{user_id}: sorted set con los posts "empujados" (fan-out on write)
+      de las cuentas que sigue el usuario, salvo los autores en modo pull.
+    - author_posts:{author_id}: posts recientes de cada autor
+      (FEED_PULL_MERGE_DEPTH). Los de autores con muchos seguidores se leen
+      al servir el feed y se mezclan (k-way merge) con el timeline.
+
+    score = id del post; el feed SQL ordena por la misma clave (ORDER_KEYS["feed"]),
+    así los cursores son compatibles entre ambas rutas.
+    """
+
+    def __init__(self, db: Session, redis=redis_client):
+        super().__init__(redis)
+        self.db = db
+        self.post_repository = PostRepository(db)
+        self.follower_repository = FollowerRepository(db)
+
+    # -----------------------------
+    # Escritura (fan-out)
+    # -----------------------------
+    # Las consultas SQL se hacen dentro de la transacción y las escrituras en
+    # Redis tras su commit: si se deshace, los timelines no cambian.
+    def _after_commit(self, write, failure: str, *args) -> None:
+        def run():
+            try:
+                write()
+            except RedisError:
+                logger.warning(failure, *args, exc_info=True)
+        run_after_commit(self.db, run)
+
+    def fan_out_post(self, author_id: int, post_id: int) -> None:
+        """
+        Registra un post nuevo. Siempre entra en la lista reciente del autor;
+        solo se empuja a los timelines de los seguidores si el autor no está
+        en modo pull (marca en PULLED_AUTHORS_KEY, sin contar seguidores).
+        """
+        try:
+            pulled = self.redis.sismember(PULLED_AUTHORS_KEY, author_id)
+        except RedisError:
+            logger.warning("Fan-out a timelines fallido", exc_info=True)
+            return
+        follower_ids = [] if pulled else self.follower_repository.get_follower_ids(author_id)
+        self._after_commit(
+            lambda: self._publish(author_id, post_id, follower_ids), "Fan-out a timelines fallido"
+        )
+
+    def _publish(self, author_id: int, post_id: int, follower_ids: list[int]) -> None:
+        self._append_author_post(author_id, post_id)
+        self._push(follower_ids, {str(post_id): post_id})
+
+    def remove_post(self, author_id: int, post_id: int) -> None:
+        try:
+            # Los posts de un autor en modo pull no están en los timelines (y los
+            # hidratados que falten se descartan al leer): sin ZREM por seguidor.
+            pulled = self.redis.sismember(PULLED_AUTHORS_KEY, author_id)
+        except RedisError:
+            logger.warning("No se pudo retirar el post %s de los timelines", post_id, exc_info=True)
+            return
+        follower_ids = [] if pulled else self.follower_repository.get_follower_ids(author_id)
+        self._after_commit(
+            lambda: self._unpublish(author_id, post_id, follower_ids),
+            "No se pudo retirar el post %s de los timelines", post_id,
+        )
+
+    def _unpublish(self, author_id: int, post_id: int, follower_ids: list[int]) -> None:
+        self.redis.zrem(self._author_posts_key(author_id), str(post_id))
+        for start in range(0, len(follower_ids), FAN_OUT_CHUNK):
+            pipe = self.redis.pipeline(transaction=False)
+            for follower_id in follower_ids[start:start + FAN_OUT_CHUNK]:
+                pipe.zrem(self._timeline_key(follower_id), str(post_id))
+            pipe.execute()
+
+    def add_author(self, follower_id: int, author_id: int) -> None:
+        """Nuevo follow: incorpora los posts recientes del autor al timeline del seguidor."""
+        key = self._timeline_key(follower_id)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.exists(key)
+            pipe.zscore(key, SENTINEL)
+            pipe.sismember(PULLED_AUTHORS_KEY, author_id)
+            exists, sentinel, pulled = pipe.execute()
+        except RedisError:
+            logger.warning("No se pudo actualizar el timeline de %s", follower_id, exc_info=True)
+            return
+        self._after_commit(
+            lambda: self._add_following(follower_id, author_id),
+            "No se pudo actualizar el timeline de %s", follower_id,
+        )
+        if not pulled and self.follower_repository.count_followers(author_id) >= self.pull_threshold:
+            # Cruza el umbral: pasa a modo pull. Sus posts ya empujados se
+            # quedan en los timelines (la mezcla descarta los duplicados).
+            self._after_commit(
+                lambda: self.redis.sadd(PULLED_AUTHORS_KEY, author_id),
+                "No se pudo pasar a modo pull al autor %s", author_id,
+            )
+            pulled = True
+        if not exists or pulled:
+            # Frío: se reconstruirá al leer. Pull: se mezcla al leer.
+            return
+        if sentinel is None:
+            # Timeline recortado: mezclar posts antiguos dejaría huecos bajo el
+            # recorte. Se descarta y se reconstruye en la siguiente lectura.
+            self._after_commit(lambda: self.redis.delete(key), "No se pudo actualizar el timeline de %s", follower_id)
+            return
+        post_ids = self.post_repository.get_recent_ids_by_authors([author_id], self.max_length)
+        if post_ids:
+            self._after_commit(
+                lambda: self._add_to_timeline(key, post_ids), "No se pudo actualizar el timeline de %s", follower_id
+            )
+
+    def _add_to_timeline(self, key: str, post_ids: list[int]) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zadd(key, {str(post_id): post_id for post_id in post_ids})
+        pipe.zremrangebyrank(key, 0, -(self.max_length + 2))
+        pipe.execute()
+
+    def _add_following(self, follower_id: int, author_id: int) -> None:
+        # Sin SENTINEL un set creado aquí cuenta como incompleto y se reconstruye
+        key = self._following_key(follower_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.sadd(key, author_id)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def remove_author(self, follower_id: int, author_id: int) -> None:
+        """Unfollow: retira del timeline del seguidor los posts del autor."""
+        try:
+            pulled = self.redis.sismember(PULLED_AUTHORS_KEY, author_id)
+        except RedisError:
+            logger.warning("No se pudo actualizar el timeline de %s", follower_id, exc_info=True)
+            return
+        self._after_commit(
+            lambda: self.redis.srem(self._following_key(follower_id), author_id),
+            "No se pudo actualizar el timeline de %s", follower_id,
+        )
+        if pulled and self.follower_repository.count_followers(author_id) < self.pull_threshold:
+            self._leave_pull_mode(author_id)
+
+        post_ids = self.post_repository.get_recent_ids_by_authors([author_id], self.max_length)
+        if not post_ids:
+            return
+        self._after_commit(
+            lambda: self.redis.zrem(self._timeline_key(follower_id), *[str(post_id) for post_id in post_ids]),
+            "No se pudo actualizar el timeline de %s", follower_id,
+        )
+
+    def _leave_pull_mode(self, author_id: int) -> None:
+        """
+        El autor baja del umbral y vuelve a modo push: sus posts de la etapa
+        pull no están en los timelines de sus seguidores, se empujan ahora.
+        """
+        post_ids = self.post_repository.get_recent_ids_by_authors([author_id], self.merge_depth)
+        follower_ids = self.follower_repository.get_follower_ids(author_id)
+
+        def publish():
+            self.redis.srem(PULLED_AUTHORS_KEY, author_id)
+            self._backfill(follower_ids, {str(post_id): post_id for post_id in post_ids})
+        self._after_commit(publish, "No se pudo pasar a modo push al autor %s", author_id)
+
+    def _backfill(self, user_ids: list[int], entries: dict) -> None:
+        """
+        Como _push para posts antiguos: solo caben en timelines completos. En
+        uno recortado quedarían bajo el recorte con un hueco encima (faltarían
+        los posts de otros autores entre medias); se descarta y se reconstruye
+        en la siguiente lectura, como en add_author.
+        """
+        for start in range(0, len(user_ids), FAN_OUT_CHUNK):
+            keys = [self._timeline_key(user_id) for user_id in user_ids[start:start + FAN_OUT_CHUNK]]
+            pipe = self.redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.exists(key)
+                pipe.zscore(key, SENTINEL)
+            results = pipe.execute()
+            pipe = self.redis.pipeline(transaction=False)
+            for index, key in enumerate(keys):
+                exists, sentinel = results[index * 2:index * 2 + 2]
+                if not exists:
+                    continue
+                if sentinel is None:
+                    pipe.delete(key)
+                    continue
+                pipe.zadd(key, entries)
+                pipe.zremrangebyrank(key, 0, -(self.max_length + 2))
+            pipe.execute()
+
+    def _push(self, user_ids: list[int], entries: dict) -> None:
+        # Solo se escribe en timelines existentes: uno frío (o expulsado) se
+        # reconstruye completo al leerlo, escribirle una entrada suelta lo
+        # haría parecer caliente con contenido incompleto.
+        for start in range(0, len(user_ids), FAN_OUT_CHUNK):
+            keys = [self._timeline_key(user_id) for user_id in user_ids[start:start + FAN_OUT_CHUNK]]
+            pipe = self.redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.exists(key)
+            warm = [key for key, exists in zip(keys, pipe.execute()) if exists]
+            if not warm:
+                continue
+            pipe = self.redis.pipeline(transaction=False)
+            for key in warm:
+                pipe.zadd(key, entries)
+                # Conserva max_length posts (+ centinela si aún cabe todo)
+                pipe.zremrangebyrank(key, 0, -(self.max_length + 2))
+            pipe.execute()
+
+    def _append_author_post(self, author_id: int, post_id: int) -> None:
+        key = self._author_posts_key(author_id)
+        if not self.redis.exists(key):
+            # Fría: se reconstruye desde SQL al leerla
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zadd(key, {str(post_id): post_id})
+        pipe.zremrangebyrank(key, 0, -(self.merge_depth + 2))
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    # -----------------------------
+    # Reconstrucción
+    # -----------------------------
+    def _begin_rebuild(self, key: str) -> None:
+        """Vacía `key` y deja el marcador REBUILDING antes de leer SQL."""
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
+        pipe.zadd(key, {REBUILDING: -1})
+        pipe.expire(key, REBUILDING_TTL)
+        pipe.execute()
+
+    def _store(self, key: str, post_ids: list[int], max_length: int) -> tuple[list[int], bool]:
+        """
+        Guarda los ids leídos de SQL mezclándolos (ZADD, sin DEL) con lo que
+        el fan-out haya escrito desde _begin_rebuild. Devuelve (post_ids en
+        orden DESC, completo).
+        """
+        entries = {str(post_id): post_id for post_id in post_ids[:max_length]}
+        if len(post_ids) <= max_length:
+            entries[SENTINEL] = 0
+
+        pipe = self.redis.pipeline()
+        pipe.zadd(key, entries)
+        pipe.zrem(key, REBUILDING)
+        # Conserva max_length posts (+ centinela si aún cabe todo), como _push
+        pipe.zremrangebyrank(key, 0, -(max_length + 2))
+        pipe.expire(key, self.ttl)
+        pipe.zscore(key, SENTINEL)
+        pipe.zrevrangebyscore(key, "+inf", f"({SENTINEL}")
+        *_, sentinel, members = pipe.execute()
+        return [int(member) for member in members], sentinel is not None
+
+    def rebuild(self, user_id: int) -> tuple[list[int], bool]:
+        """
+        Reconstruye timeline:{user_id} desde SQL con los posts de los autores en
+        modo push. Devuelve (post_ids en orden DESC, completo).
+        """
+        key = self._timeline_key(user_id)
+        self._begin_rebuild(key)
+        pulled = {int(author_id) for author_id in self.redis.smembers(PULLED_AUTHORS_KEY)}
+        followed_ids = [
+            followed_id for followed_id in self.follower_repository.get_followed_ids(user_id)
+            if followed_id not in pulled
+        ]
+        post_ids = self.post_repository.get_recent_ids_by_authors(followed_ids, self.max_length + 1)
+        return self._store(key, post_ids, self.max_length)
+
+    def rebuild_author_posts(self, author_id: int) -> tuple[list[int], bool]:
+        key = self._author_posts_key(author_id)
+        self._begin_rebuild(key)
+        post_ids = self.post_repository.get_recent_ids_by_authors([author_id], self.merge_depth + 1)
+        return self._store(key, post_ids, self.merge_depth)
+
+    def rebuild_following(self, user_id: int) -> list[int]:
+        """
+        Reconstruye following:{user_id} desde SQL. Devuelve los autores
+        seguidos que están en modo pull.
+        """
+        followed_ids = self.follower_repository.get_followed_ids(user_id)
+        key = self._following_key(user_id)
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
+        pipe.sadd(key, SENTINEL, *followed_ids)
+        pipe.expire(key, self.ttl)
+        pipe.sinter(key, PULLED_AUTHORS_KEY)
+        return sorted(int(author_id) for author_id in pipe.execute()[-1])
+
+    def refresh_pulled_authors(self) -> set[int]:
+        """
+        Recalcula desde SQL qué autores superan el umbral de modo pull (tras
+        cambiar FEED_PULL_FOLLOWER_THRESHOLD o perder los datos de Redis). Los
+        timelines de los que vuelven a push se completan al reconstruirlos.
+        """
+        author_ids = set(self.follower_repository.get_ids_with_min_followers(self.pull_threshold))
+        pipe = self.redis.pipeline()
+        pipe.delete(PULLED_AUTHORS_KEY)
+        if author_ids:
+            pipe.sadd(PULLED_AUTHORS_KEY, *author_ids)
+        pipe.execute()
+        return author_ids
+
+    # -----------------------------
+    # Lectura (push + pull)
+    # -----------------------------
+    def read_page(
+        self,
+        user_id: int,
+        page: int,
+        size: int,
+        after_id: int | None = None
+    ) -> tuple[list[int], bool, int | None] | None:
+        """
+        Lee una página del feed mezclando el timeline del usuario con las listas
+        recientes de los autores en modo pull que sigue (SINTER de
+        following:{user_id} y PULLED_AUTHORS_KEY: sin autores en común no se
+        lee ninguna lista).
+        Devuelve (post_ids, has_more, total) — total es None si no se conoce sin
+        SQL — o None si hay que servir la página desde SQL (Redis caído o página
+        más allá de lo que guardan los sets).
+        """
+        max_score, start, requested = self._read_bounds(page, size, after_id)
+        try:
+            pipe = self._queue_timeline_read(self.redis.pipeline(transaction=False), user_id, max_score, requested)
+            exists, sentinel, members, count, _, following_complete, pulled, _ = pipe.execute()
+
+            if exists:
+                complete = sentinel is not None
+                timeline = _Source([int(member) for member in members], complete, requested)
+            else:
+                all_ids, complete = self.rebuild(user_id)
+                count = len(all_ids)
+                timeline = self._slice_source(all_ids, complete, after_id, requested)
+
+            sources = [timeline]
+            if following_complete:
+                pulled_ids = sorted(int(author_id) for author_id in pulled)
+            else:
+                pulled_ids = self.rebuild_following(user_id)
+            if pulled_ids:
+                sources += self._read_author_sources(pulled_ids, max_score, after_id, requested)
+                count = None
+        except RedisError:
+            logger.warning("Redis no disponible, feed servido desde SQL", exc_info=True)
+            return None
+
+        # El total solo se conoce sin SQL si el timeline está completo y no hay mezcla
+        return self._page_from_sources(sources, start, size, requested, count if complete else None)
+
+    def _read_author_sources(
+        self,
+        author_ids: list[int],
+        max_score: str,
+        after_id: int | None,
+        requested: int
+    ) -> list[_Source]:
+        pipe = self._queue_author_reads(self.redis.pipeline(transaction=False), author_ids, max_score, requested)
+        results = pipe.execute()
+
+        sources = []
+        for index, author_id in enumerate(author_ids):
+            exists, sentinel, members = results[index * 3:index * 3 + 3]
+            if exists:
+                sources.append(_Source([int(member) for member in members], sentinel is not None, requested))
+            else:
+                all_ids, complete = self.rebuild_author_posts(author_id)
+                sources.append(self._slice_source(all_ids, complete, after_id, requested))
+        return sources
+
+
+class AsyncTimelineService(BaseTimelineService):
+    """
+    Lectura del feed para el stack async con el cliente async de Redis. Las
+    reconstrucciones desde SQL (timeline, lista de autor o seguidos fríos) son
+    poco frecuentes y reutilizan la versión síncrona en un hilo.
+    """
+
+    def __init__(self, db: AsyncSession, redis=async_redis_client):
+        super().__init__(redis)
+        self.db = db
+
+    async def read_page(
+        self,
+        user_id: int,
+        page: int,
+        size: int,
+        after_id: int | None = None
+    ) -> tuple[list[int], bool, int | None] | None:
+        """Igual que TimelineService.read_page."""
+        max_score, start, requested = self._read_bounds(page, size, after_id)
+        try:
+            pipe = self._queue_timeline_read(self.redis.pipeline(transaction=False), user_id, max_score, requested)
+            exists, sentinel, members, count, _, following_complete, pulled, _ = await pipe.execute()
+
+            if exists:
+                complete = sentinel is not None
+                timeline = _Source([int(member) for member in members], complete, requested)
+            else:
+                all_ids, complete = await run_in_threadpool(self._rebuild, user_id)
+                count = len(all_ids)
+                timeline = self._slice_source(all_ids, complete, after_id, requested)
+
+            sources = [timeline]
+            if following_complete:
+                pulled_ids = sorted(int(author_id) for author_id in pulled)
+            else:
+                pulled_ids = await run_in_threadpool(self._rebuild_following, user_id)
+            if pulled_ids:
+                sources += await self._read_author_sources(pulled_ids, max_score, after_id, requested)
+                count = None
+        except RedisError:
+            logger.warning("Redis no disponible, feed servido desde SQL", exc_info=True)
+            return None
+
+        return self._page_from_sources(sources, start, size, requested, count if complete else None)
+
+    async def _read_author_sources(
+        self,
+        author_ids: list[int],
+        max_score: str,
+        after_id: int | None,
+        requested: int
+    ) -> list[_Source]:
+        pipe = self._queue_author_reads(self.redis.pipeline(transaction=False), author_ids, max_score, requested)
+        results = await pipe.execute()
+
+        sources = []
+        for index, author_id in enumerate(author_ids):
+            exists, sentinel, members = results[index * 3:index * 3 + 3]
+            if exists:
+                sources.append(_Source([int(member) for member in members], sentinel is not None, requested))
+            else:
+                all_ids, complete = await run_in_threadpool(self._rebuild_author_posts, author_id)
+                sources.append(self._slice_source(all_ids, complete, after_id, requested))
+        return sources
+
+    @staticmethod
+    def _rebuild(user_id: int) -> tuple[list[int], bool]:
+        with SessionLocal() as db:
+            return TimelineService(db).rebuild(user_id)
+
+    @staticmethod
+    def _rebuild_following(user_id: int) -> list[int]:
+        with SessionLocal() as db:
+            return TimelineService(db).rebuild_following(user_id)
+
+    @staticmethod
+    def _rebuild_author_posts(author_id: int) -> tuple[list[int], bool]:
+        with SessionLocal() as db:
+            return TimelineService(db).rebuild_author_posts(author_id)
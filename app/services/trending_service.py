@@ -0,0 +1,312 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from redis.exceptions import RedisError, WatchError
+from app.core.config import settings
+from app.core.redis import redis_client, async_redis_client
+from app.db.session import SessionLocal, run_after_commit
+from app.models.post import Post
+from app.services.counter_service import CounterService
+
+logger = logging.getLogger(__name__)
+
+TRENDING_KEY = "trending:posts"
+# Instante de referencia de los scores. Mientras no exista el ranking está
+# "frío": las escrituras se ignoran y las lecturas caen a SQL.
+TRENDING_EPOCH_KEY = "trending:epoch"
+REBUILD_BATCH = 1000
+REBUILD_LOCK_KEY = "trending:rebuild_lock"
+
+# Página del ranking por keyset (score, id) en lugar de por posición: los
+# scores cambian con cada like, así que un offset duplica o salta posts entre
+# páginas. Devuelve {epoch, total (-1 si no se pide), id1, score1, ...} o nil
+# si el ranking está frío.
+# ARGV: count, skip, include_total, score del cursor ('' sin cursor), id del
+# cursor, epoch del cursor, vida media.
+# Si un rebuild cambió el epoch desde que se generó el cursor, su score se
+# reescala al nuevo epoch (todos los scores se multiplican por el mismo factor).
+# A igual score ZREVRANGEBYSCORE ordena por miembro descendente, así que los
+# empates con el cursor se filtran por id.
+PAGE_SCRIPT = """
+local epoch = redis.call('GET', KEYS[2])
+if not epoch then
+    return false
+end
+local count = tonumber(ARGV[1])
+local result = {epoch, -1}
+if ARGV[3] == '1' then
+    result[2] = redis.call('ZCARD', KEYS[1])
+end
+local max, bound = '+inf', nil
+if ARGV[4] ~= '' then
+    bound = tonumber(ARGV[4])
+    if ARGV[6] ~= epoch then
+        bound = bound * 2 ^ ((tonumber(ARGV[6]) - tonumber(epoch)) / tonumber(ARGV[7]))
+    end
+    max = string.format('%.17g', bound)
+end
+local offset, found = tonumber(ARGV[2]), 0
+while found < count do
+    local items = redis.call('ZREVRANGEBYSCORE', KEYS[1], max, '-inf', 'WITHSCORES', 'LIMIT', offset, count)
+    for i = 1, #items, 2 do
+        if not bound or tonumber(items[i + 1]) < bound or items[i] < ARGV[5] then
+            table.insert(result, items[i])
+            table.insert(result, items[i + 1])
+            found = found + 1
+            if found == count then
+                break
+            end
+        end
+    end
+    if #items < 2 * count then
+        break
+    end
+    offset = offset + count
+end
+return result
+"""
+
+
+class TrendingService:
+    """
+    Ranking "trending" precalculado en un sorted set de Redis.
+
+    score = (W_post + W_like * likes + W_comment * comentarios) * 2^((created_at - epoch) / vida_media)
+
+    Multiplicar por 2^(t/vida_media) en lugar de dividir por 2^(edad/vida_media)
+    da el mismo orden que el decaimiento por antigüedad, pero el score de un post
+    no cambia con el paso del tiempo: un like solo suma su parte (ZINCRBY) y no
+    hay que recalcular el resto del ranking. El job periódico (rebuild) mueve el
+    epoch hacia delante para que los scores no crezcan sin límite, descarta los
+    posts fuera de la ventana y corrige cualquier deriva respecto a SQL.
+    """
+
+    def __init__(self, db: Session | None, redis=redis_client, async_redis=async_redis_client):
+        self.db = db
+        self.redis = redis
+        self.async_redis = async_redis
+        self.half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+        self.max_posts = settings.TRENDING_MAX_POSTS
+
+    @staticmethod
+    def _timestamp(value: datetime) -> float:
+        # Las fechas de los posts se guardan como UTC naive (datetime.utcnow)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+
+    def _scale(self, created_at: datetime, epoch: float) -> float:
+        return 2 ** ((self._timestamp(created_at) - epoch) / self.half_life)
+
+    def score(self, post: Post, epoch: float) -> float:
+        engagement = (
+            settings.TRENDING_POST_WEIGHT
+            + settings.TRENDING_LIKE_WEIGHT * (post.likes_count or 0)
+            + settings.TRENDING_COMMENT_WEIGHT * (post.comments_count or 0)
+        )
+        return engagement * self._scale(post.created_at, epoch)
+
+    # -----------------------------
+    # Actualización incremental (tras el commit de la transacción de `db`)
+    # -----------------------------
+    def record_post(self, post: Post) -> None:
+        """Añade un post nuevo con su peso base."""
+        self._schedule(post, settings.TRENDING_POST_WEIGHT, create=True)
+
+    def record_like(self, post: Post, delta: int = 1) -> None:
+        self._schedule(post, settings.TRENDING_LIKE_WEIGHT * delta)
+
+    def record_comment(self, post: Post, delta: int = 1) -> None:
+        self._schedule(post, settings.TRENDING_COMMENT_WEIGHT * delta)
+
+    def remove_post(self, post_id: int) -> None:
+        run_after_commit(self.db, lambda: self._remove(post_id))
+
+    def _remove(self, post_id: int) -> None:
+        try:
+            self.redis.zrem(TRENDING_KEY, post_id)
+        except RedisError:
+            logger.warning("No se pudo quitar el post %s del ranking trending", post_id, exc_info=True)
+
+    def _schedule(self, post: Post, weight: float, create: bool = False) -> None:
+        # Si la transacción se deshace el ranking no cambia
+        post_id, created_at = post.id, post.created_at
+        run_after_commit(self.db, lambda: self._apply(post_id, created_at, weight, create))
+
+    def _apply(self, post_id: int, created_at: datetime, weight: float, create: bool = False) -> None:
+        """
+        Suma `weight` (escalado por la antigüedad del post) a su score.
+        WATCH sobre el epoch: si un rebuild lo cambia entre la lectura y la
+        escritura, se reintenta con el nuevo para no mezclar escalas.
+        """
+        def update(pipe):
+            epoch = pipe.get(TRENDING_EPOCH_KEY)
+            if epoch is None:
+                return
+            delta = weight * self._scale(created_at, float(epoch))
+            pipe.multi()
+            if create:
+                pipe.zadd(TRENDING_KEY, {str(post_id): delta})
+                # Mantener solo los `max_posts` con mayor score
+                pipe.zremrangebyrank(TRENDING_KEY, 0, -(self.max_posts + 1))
+            else:
+                # XX: un post que ya salió del ranking no vuelve con un score parcial
+                pipe.zadd(TRENDING_KEY, {str(post_id): delta}, xx=True, incr=True)
+
+        try:
+            self.redis.transaction(update, TRENDING_EPOCH_KEY)
+        except (RedisError, WatchError):
+            logger.warning("No se pudo actualizar el ranking trending del post %s", post_id, exc_info=True)
+
+    # -----------------------------
+    # Lectura
+    # -----------------------------
+    def read_page(self, count: int, skip: int = 0, after: tuple | None = None, include_total: bool = False):
+        """
+        Hasta `count` entradas (post_id, score) del ranking, a partir de la
+        posición `skip` o detrás de `after` = (score, post_id, epoch) de la
+        última entrada de la página anterior.
+
+        Devuelve (entradas, epoch, total o None), o None si el ranking no está
+        disponible (frío o Redis caído) para que el llamador use SQL.
+        """
+        try:
+            results = self.redis.register_script(PAGE_SCRIPT)(
+                keys=[TRENDING_KEY, TRENDING_EPOCH_KEY], args=self._page_args(count, skip, after, include_total)
+            )
+        except RedisError:
+            logger.warning("Ranking trending no disponible, usando SQL", exc_info=True)
+            return None
+        return self._parse_page(results, include_total)
+
+    async def read_page_async(self, count: int, skip: int = 0, after: tuple | None = None,
+                              include_total: bool = False):
+        """read_page con el cliente async (stack async)."""
+        try:
+            results = await self.async_redis.register_script(PAGE_SCRIPT)(
+                keys=[TRENDING_KEY, TRENDING_EPOCH_KEY], args=self._page_args(count, skip, after, include_total)
+            )
+        except RedisError:
+            logger.warning("Ranking trending no disponible, usando SQL", exc_info=True)
+            return None
+        return self._parse_page(results, include_total)
+
+    def _page_args(self, count: int, skip: int, after: tuple | None, include_total: bool) -> list:
+        score, post_id, epoch = after if after else ("", "", "")
+        return [count, 0 if after else skip, int(include_total), score, post_id, epoch, self.half_life]
+
+    @staticmethod
+    def _parse_page(results, include_total: bool):
+        if not results:
+            return None
+        epoch, total, items = results[0], results[1], results[2:]
+        entries = [(int(items[i]), items[i + 1]) for i in range(0, len(items), 2)]
+        return entries, epoch, total if include_total else None
+
+    def entries_after(self, entries: list, after: tuple | None, epoch: str) -> list:
+        """
+        Las entradas de una lista ya leída del ranking que van detrás de `after`;
+        mismo criterio que PAGE_SCRIPT (para las páginas con filtros).
+        """
+        if not after:
+            return entries
+        score, post_id, cursor_epoch = after
+        bound = float(score)
+        if cursor_epoch != epoch:
+            bound *= 2 ** ((float(cursor_epoch) - float(epoch)) / self.half_life)
+        last = str(post_id)
+        return [
+            (entry_id, entry_score) for entry_id, entry_score in entries
+            if float(entry_score) < bound or (float(entry_score) == bound and str(entry_id) < last)
+        ]
+
+    def ranking(self):
+        """Todo el ranking (acotado por TRENDING_MAX_POSTS) y su epoch, o None si no está disponible."""
+        page = self.read_page(self.max_posts)
+        return page[:2] if page is not None else None
+
+    async def ranking_async(self):
+        page = await self.read_page_async(self.max_posts)
+        return page[:2] if page is not None else None
+
+    # -----------------------------
+    # Job periódico
+    # -----------------------------
+    def rebuild(self) -> int:
+        """
+        Recalcula el ranking desde SQL con un epoch nuevo (ahora) y lo publica
+        de forma atómica (RENAME). Devuelve el número de posts en el ranking.
+        """
+        # Los contadores de la BD deben incluir los deltas write-behind pendientes
+        CounterService(self.db, redis=self.redis).flush()
+
+        epoch = time.time()
+        window_start = datetime.utcnow() - timedelta(hours=settings.TRENDING_WINDOW_HOURS)
+        query = (
+            self.db.query(Post.id, Post.created_at, Post.likes_count, Post.comments_count)
+            .filter(Post.created_at >= window_start)
+            .yield_per(REBUILD_BATCH)
+        )
+        scores = {str(row.id): self.score(row, epoch) for row in query}
+        top = dict(sorted(scores.items(), key=lambda item: item[1], reverse=True)[: self.max_posts])
+
+        tmp_key = f"{TRENDING_KEY}:rebuild"
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(tmp_key)
+        members = list(top.items())
+        for i in range(0, len(members), REBUILD_BATCH):
+            pipe.zadd(tmp_key, dict(members[i:i + REBUILD_BATCH]))
+        pipe.execute()
+
+        pipe = self.redis.pipeline(transaction=True)
+        if top:
+            pipe.rename(tmp_key, TRENDING_KEY)
+        else:
+            pipe.delete(TRENDING_KEY)
+        pipe.set(TRENDING_EPOCH_KEY, epoch)
+        pipe.execute()
+        return len(top)
+
+
+class TrendingRebuilder:
+    """
+    Hilo en segundo plano que recalcula el ranking al arrancar y cada
+    `interval` segundos. Con varios workers solo lo hace uno por intervalo: el
+    lock caduca con el intervalo y no se libera.
+    """
+
+    def __init__(self, interval: float = settings.TRENDING_REBUILD_INTERVAL_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="trending-rebuilder", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while True:
+            self._rebuild_once()
+            if self._stop.wait(self.interval):
+                return
+
+    def _rebuild_once(self) -> None:
+        try:
+            if not redis_client.set(REBUILD_LOCK_KEY, 1, nx=True, ex=max(int(self.interval), 1)):
+                return
+        except RedisError:
+            logger.warning("No se pudo tomar el lock del ranking trending", exc_info=True)
+            return
+        db = SessionLocal()
+        try:
+            TrendingService(db).rebuild()
+        except Exception:
+            db.rollback()
+            logger.exception("Error recalculando el ranking trending")
+        finally:
+            db.close()
@@ -0,0 +1,208 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from redis.exceptions import RedisError
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.redis import redis_client
+from app.db.session import SessionLocal, run_after_commit
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "user_cache:invalidate"
+# Campos del principal: si cambian en la BD hay que invalidar la entrada
+PRINCIPAL_FIELDS = ("email", "username", "role", "token_version")
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """
+    Usuario autenticado sin sesión ORM: lo único que usan los endpoints y
+    servicios (id, email, username, role) y la versión de sus tokens. Se
+    cachea por worker.
+    """
+    id: int
+    email: str
+    username: str
+    role: str
+    token_version: int = 0
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserPrincipal":
+        return cls(id=user.id, email=user.email, username=user.username, role=user.role,
+                   token_version=user.token_version or 0)
+
+    def load(self, db: Session) -> Optional[User]:
+        """Objeto ORM completo, para los endpoints que lo necesiten (identity map de la sesión)."""
+        return db.get(User, self.id)
+
+
+class UserCache:
+    """
+    Caché LRU con TTL de UserPrincipal por email (el `sub` del token), local a
+    cada worker. Evita la consulta a la BD de get_current_user en cada
+    petición autenticada.
+
+    Invalidación entre workers: los cambios de email/username/rol/versión de
+    tokens y los borrados de usuarios se publican en INVALIDATION_CHANNEL tras
+    el commit y un hilo de cada worker los aplica. Si la suscripción se cae se
+    vacía la caché (pudo perder mensajes); el TTL acota lo que quede
+    desactualizado.
+    """
+
+    def __init__(self, redis=redis_client, max_size: int = settings.USER_CACHE_SIZE,
+                 ttl: float = settings.USER_CACHE_TTL_SECONDS):
+        self.redis = redis
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, UserPrincipal]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Se incrementa con cada invalidación: una lectura de la BD que empezó
+        # antes no puede volver a guardar un usuario desactualizado.
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, email: str) -> Optional[UserPrincipal]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[email]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(email)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, principal: UserPrincipal, generation: int) -> None:
+        """Guarda el principal si no hubo invalidaciones desde `generation`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[principal.email] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(principal.email)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, emails) -> None:
+        """Invalida solo en este worker."""
+        with self._lock:
+            self.generation += 1
+            for email in emails:
+                if self._entries.pop(email, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def publish_invalidation(self, emails) -> None:
+        """Invalida en este worker y en el resto (vía pub/sub)."""
+        emails = list(emails)
+        self.invalidate(emails)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for email in emails:
+                pipe.publish(INVALIDATION_CHANNEL, email)
+            pipe.execute()
+        except RedisError:
+            logger.warning("No se pudo publicar la invalidación de usuarios", exc_info=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    # -----------------------------
+    # Suscripción a invalidaciones
+    # -----------------------------
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="user-cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Lo cacheado mientras no había suscripción pudo perder invalidaciones
+                self.clear()
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1)
+                    if message is not None:
+                        self.invalidate([message["data"]])
+            except RedisError:
+                logger.warning("Suscripción de invalidación de usuarios caída; reintentando", exc_info=True)
+                self.clear()
+                self._stop.wait(1)
+            finally:
+                try:
+                    pubsub.close()
+                except RedisError:
+                    pass
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _invalidate_changed_users(session: Session, flush_context) -> None:
+    """
+    Cualquier UPDATE de email/username/rol/token_version o DELETE de un User
+    (p. ej. PUT /admin/users/{id}/role) invalida su entrada en todos los workers
+    cuando la transacción se confirma.
+    """
+    emails = set()
+    for obj in session.dirty:
+        if not isinstance(obj, User):
+            continue
+        attrs = inspect(obj).attrs
+        if any(attrs[field].history.has_changes() for field in PRINCIPAL_FIELDS):
+            # Email anterior (clave de la entrada) y el actual
+            emails.update(attrs.email.history.deleted or ())
+            emails.add(obj.email)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            emails.add(obj.email)
+    if emails:
+        run_after_commit(session, lambda: user_cache.publish_invalidation(emails))
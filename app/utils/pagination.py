@@ -0,0 +1,32 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from app.exceptions.pagination_exceptions import InvalidCursor
+
+
+def encode_cursor(order: str, values: list) -> str:
+    """
+    Serializa la clave de ordenación del último elemento de la página en un
+    cursor opaco (base64url). El orden viaja dentro para rechazar cursores
+    reutilizados con otro `order`.
+    """
+    payload = [
+        order,
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: str, key_length: int) -> list:
+    """Decodifica un cursor generado por encode_cursor. Lanza InvalidCursor si no es válido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_order, values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor()
+
+    if cursor_order != order or not isinstance(values, list) or len(values) != key_length:
+        raise InvalidCursor()
+    return values
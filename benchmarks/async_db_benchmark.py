@@ -0,0 +1,207 @@
+"""
+Stack síncrono (Session + threadpool) frente al async (AsyncSession +
+aiosqlite/asyncpg) en GET /posts/, /posts/feed y /messages/conversations con
+muchas peticiones concurrentes.
+
+Uso:
+    python -m benchmarks.async_db_benchmark --url redis://localhost:6379/15
+    python -m benchmarks.async_db_benchmark --url redis://localhost:6379/15 --concurrency 500
+    python -m benchmarks.async_db_benchmark --url redis://localhost:6379/15 --busy-threads 36
+
+Necesita aiosqlite (o asyncpg con --database-url postgresql://...) y un Redis
+real, que se vacía (timelines del feed y contadores). Sin --database-url crea
+una BD SQLite temporal. Siembra --users usuarios que siguen a --follows
+cuentas, con --posts posts y --conversations conversaciones cada uno, y lanza
+--concurrency clientes en este proceso (ASGI, sin HTTP) contra cada endpoint
+y variante durante --duration segundos. --busy-threads mantiene ocupados ese
+número de hilos del threadpool de AnyIO (40 por defecto), como logins
+esperando a bcrypt o consultas lentas. Informa peticiones/s, p50/p99 y el
+máximo de hilos del threadpool que ocupan las peticiones.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+ENDPOINTS = {
+    "posts": "/posts/?size=20",
+    "feed": "/posts/feed?size=20",
+    "conversations": "/messages/conversations?size=20",
+}
+
+
+def _percentiles(samples: list[float]) -> dict:
+    if len(samples) < 2:
+        return {"requests": len(samples)}
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "requests": len(samples),
+        "p50_ms": round(q[49] * 1000, 2),
+        "p99_ms": round(q[98] * 1000, 2),
+    }
+
+
+def build_apps():
+    """Dos apps con las mismas rutas: routers síncronos y routers async."""
+    from fastapi import FastAPI
+    from app.routers import async_message_router, async_post_router, message_router, post_router
+
+    apps = {}
+    for name, routers in (("sync", (post_router, message_router)),
+                          ("async", (async_post_router, async_message_router))):
+        app = FastAPI()
+        for module in routers:
+            app.include_router(module.router)
+        apps[name] = app
+    return apps
+
+
+def seed(args) -> list[str]:
+    from app.auth.auth_handler import create_access_token, token_claims
+    from app.core.redis import redis_client
+    from app.db.base import Base
+    from app.db.search import install_post_search
+    from app.db.session import SessionLocal, engine
+    from app.models import conversation, follows, like, post, user  # noqa: F401
+    from app.models.conversation import Conversation, Message
+    from app.models.follows import Follow
+    from app.models.post import Post
+    from app.models.user import User
+
+    redis_client.flushdb()
+    Base.metadata.create_all(bind=engine)
+    install_post_search(engine)
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        users = [User(username=f"asyncdb{i}", email=f"asyncdb{i}@example.com", hashed_password="x", role="user")
+                 for i in range(args.users)]
+        db.add_all(users)
+        db.flush()
+        ids = [u.id for u in users]
+        db.add_all(
+            Post(title=f"post {p}", content="benchmark " * 20, image_url="https://example.com/image.png",
+                 author_id=author_id, created_at=now - timedelta(minutes=rng.randint(0, 60 * 24 * 7)))
+            for author_id in ids for p in range(args.posts)
+        )
+        for follower_id in ids:
+            for followed_id in rng.sample([i for i in ids if i != follower_id], min(args.follows, len(ids) - 1)):
+                db.add(Follow(follower_id=follower_id, followed_id=followed_id))
+        pairs = set()
+        for user_id in ids:
+            for other_id in rng.sample([i for i in ids if i != user_id], min(args.conversations, len(ids) - 1)):
+                pairs.add((min(user_id, other_id), max(user_id, other_id)))
+        for user1_id, user2_id in pairs:
+            sent_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+            conv = Conversation(user1_id=user1_id, user2_id=user2_id, created_at=sent_at, last_message_at=sent_at)
+            db.add(conv)
+            db.flush()
+            message = Message(conversation_id=conv.id, sender_id=user1_id, content="hola", created_at=sent_at)
+            db.add(message)
+            db.flush()
+            conv.last_message_id = message.id
+            conv.user2_unread_count = 1
+        db.commit()
+        return [create_access_token(token_claims(u)) for u in users]
+
+
+async def run_variant(app, path: str, tokens: list[str], args) -> dict:
+    import anyio.to_thread
+    import httpx
+    from fastapi.concurrency import run_in_threadpool
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    latencies: list[float] = []
+    errors = Counter()
+    peak_threads = 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://bench") as client:
+        # Calentamiento: caché de usuarios, timelines en Redis y pools de conexiones
+        for token in tokens:
+            (await client.get(path, headers={"Authorization": f"Bearer {token}"})).raise_for_status()
+
+        release = threading.Event()
+        busy = [asyncio.create_task(run_in_threadpool(release.wait)) for _ in range(args.busy_threads)]
+        await asyncio.sleep(0.1)
+        deadline = time.perf_counter() + args.duration
+
+        async def client_loop(i: int):
+            headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                if time.perf_counter() > deadline:
+                    break
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors[response.status_code] += 1
+
+        async def sample_threads():
+            nonlocal peak_threads
+            while time.perf_counter() < deadline:
+                peak_threads = max(peak_threads, int(limiter.borrowed_tokens))
+                await asyncio.sleep(0.005)
+
+        clients = [asyncio.create_task(client_loop(i)) for i in range(args.concurrency)]
+        sampler = asyncio.create_task(sample_threads())
+        await asyncio.sleep(args.duration)
+        # Libera los hilos ocupados para que terminen las peticiones en espera
+        release.set()
+        await asyncio.gather(*clients, *busy, sampler)
+
+    return {
+        "requests_per_second": round(len(latencies) / args.duration, 1),
+        **_percentiles(latencies),
+        "errors": dict(errors),
+        # Sin contar los de --busy-threads
+        "peak_request_threads": max(0, peak_threads - args.busy_threads),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True, help="Redis de pruebas (se vacía), p. ej. redis://localhost:6379/15")
+    parser.add_argument("--database-url", default=None, help="BD de pruebas (por defecto SQLite temporal)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=20, help="Posts por usuario")
+    parser.add_argument("--follows", type=int, default=30, help="Cuentas seguidas por usuario")
+    parser.add_argument("--conversations", type=int, default=10, help="Conversaciones por usuario")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=5, help="Segundos por endpoint y variante")
+    parser.add_argument("--busy-threads", type=int, default=0, help="Hilos del threadpool ocupados durante la medición")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    args = parser.parse_args()
+
+    # Los engines y clientes de Redis se crean al importar la app
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ["REDIS_URL"] = args.url
+    os.environ["DATABASE_URL"] = args.database_url or (
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'async_db_bench.db')}"
+    )
+    tokens = seed(args)
+    apps = build_apps()
+
+    async def run_all():
+        from app.db.async_session import async_engine
+        results = {}
+        for endpoint in args.endpoints:
+            results[endpoint] = {
+                name: await run_variant(app, ENDPOINTS[endpoint], tokens, args) for name, app in apps.items()
+            }
+        await async_engine.dispose()
+        return results
+
+    results = asyncio.run(run_all())
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Coste de autenticación por petición: get_current_user con y sin caché de usuarios.
+
+Uso:
+    python -m benchmarks.auth_benchmark --fake-redis
+    python -m benchmarks.auth_benchmark --requests 20000 --users 500
+
+Llama a la dependencia get_current_user como lo haría FastAPI (token -> JWT +
+revocación -> usuario) con tokens de --users usuarios en round robin,
+primero con la caché desactivada (una consulta a la BD por petición) y luego
+activada. Mide la latencia de la dependencia, las sentencias SQL por petición
+y la tasa de aciertos de la caché.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'auth_bench.db')}")
+
+
+def _percentiles(samples: list[float]) -> dict:
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "mean_us": round(statistics.fmean(samples) * 1e6, 1),
+        "p50_us": round(q[49] * 1e6, 1),
+        "p95_us": round(q[94] * 1e6, 1),
+        "p99_us": round(q[98] * 1e6, 1),
+    }
+
+
+def run_mode(mode: str, tokens: list[str], args) -> dict:
+    from app.core.dependencies import get_current_user
+    from app.db.session import SessionLocal, engine
+    from app.services.user_cache import user_cache
+    from benchmarks.statement_counts import StatementCounter
+
+    # max_size = 0 desactiva la caché
+    user_cache.max_size = args.cache_size if mode == "cache" else 0
+    user_cache.clear()
+    user_cache.hits = user_cache.misses = 0
+    counter = StatementCounter(engine)
+    latencies = []
+    for i in range(args.requests):
+        token = tokens[i % len(tokens)]
+        db = SessionLocal()
+        started = time.perf_counter()
+        get_current_user(token=token, db=db)
+        latencies.append(time.perf_counter() - started)
+        db.close()
+    stats = user_cache.stats()
+    return {
+        **_percentiles(latencies),
+        "statements_per_request": round(counter.statements / args.requests, 3),
+        "hit_rate": stats["hit_rate"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--cache-size", type=int, default=10000)
+    parser.add_argument("--fake-redis", action="store_true", help="Usar fakeredis en lugar de REDIS_URL")
+    args = parser.parse_args()
+
+    if args.fake_redis:
+        # Debe sustituirse antes de importar la app (el cliente se crea al importar)
+        import fakeredis
+        import redis
+
+        fake = fakeredis.FakeRedis(decode_responses=True)
+        redis.Redis.from_url = classmethod(lambda cls, *a, **k: fake)
+
+    from app.auth.auth_handler import create_access_token
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    from app.models import User
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    users = [User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="x", role="user")
+             for i in range(args.users)]
+    db.add_all(users)
+    db.commit()
+    tokens = [create_access_token({"sub": u.email, "user_id": u.id}) for u in users]
+    db.close()
+
+    results = {mode: run_mode(mode, tokens, args) for mode in ("no_cache", "cache")}
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Benchmark de concurrencia de likes sobre un único post "viral".
+
+Compara tres caminos de escritura del contador likes_count:
+    legacy        -> el anterior: commit del like + SELECT ... FOR UPDATE + commit del contador
+    sql           -> UPDATE atómico en la petición (COUNTERS_WRITE_BEHIND=false)
+    write_behind  -> HINCRBY en Redis + volcado por lotes (CounterService.flush)
+
+Uso:
+    python -m benchmarks.counter_benchmark --likes 1000 --workers 32
+    python -m benchmarks.counter_benchmark --fake-redis   # sin servidor Redis (fakeredis)
+
+Tras cada modo verifica que likes_count == número de likes == filas en `likes`.
+Después comprueba CounterService.reconcile con deriva simulada: deltas perdidos
+(filas sin HINCRBY), un lote de volcado interrumpido y deltas aún pendientes;
+columna + pendientes debe coincidir con las filas.
+En SQLite el FOR UPDATE del modo legacy no bloquea nada y pierde incrementos;
+el script sale con código 1 si los caminos nuevos (sql, write_behind) no son exactos.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'counter_bench.db')}")
+
+from sqlalchemy import func, text  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models import Like, Post  # noqa: E402
+from app.services.counter_service import (  # noqa: E402
+    FLUSHING_ID_KEY, FLUSHING_KEY, PENDING_KEY, TAKE_BATCH_SCRIPT, CounterService,
+)
+from app.services.like_service import LikeService  # noqa: E402
+from app.services.notification_service import NotificationService  # noqa: E402
+from app.services.user_cache import UserPrincipal  # noqa: E402
+
+
+def seed(users: int) -> int:
+    with engine.begin() as conn:
+        for table in ("notifications", "likes", "posts", "users"):
+            conn.execute(text(f"DELETE FROM {table}"))
+        conn.execute(
+            text("INSERT INTO users (id, username, email, hashed_password, role) VALUES (:id, :u, :e, 'x', 'user')"),
+            [{"id": i, "u": f"user{i}", "e": f"user{i}@example.com"} for i in range(1, users + 1)],
+        )
+        conn.execute(text(
+            "INSERT INTO posts (id, title, content, image_url, created_at, updated_at, likes_count, comments_count, author_id) "
+            "VALUES (1, 'viral', 'viral post', 'https://example.com/i.png', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 0, 0, 1)"
+        ))
+    return 1
+
+
+def _principal(user_id: int) -> UserPrincipal:
+    """Usuario sembrado por seed() como lo pasa el router (get_current_user)."""
+    return UserPrincipal(id=user_id, email=f"user{user_id}@example.com", username=f"user{user_id}", role="user")
+
+
+def _legacy_like(db, post_id: int, user_id: int) -> None:
+    """Réplica del camino anterior de LikeService.like_post."""
+    post = db.query(Post).filter(Post.id == post_id).first()
+    db.query(Like).filter(Like.post_id == post_id, Like.user_id == user_id).first()
+    db.add(Like(user_id=user_id, post_id=post_id))
+    db.commit()
+    po = db.query(Post).filter(Post.id == post_id).with_for_update().first()
+    po.likes_count += 1
+    db.commit()
+    db.refresh(po)
+    NotificationService(db).notify_like(post=post, actor=_principal(user_id))
+
+
+def run_mode(mode: str, redis, args) -> dict:
+    post_id = seed(args.likes)
+    settings.COUNTERS_WRITE_BEHIND = mode == "write_behind"
+    redis.flushdb()
+
+    def like(user_id: int) -> None:
+        db = SessionLocal()
+        try:
+            if mode == "legacy":
+                _legacy_like(db, post_id, user_id)
+            else:
+                service = LikeService(db)
+                service.counter_service.redis = redis
+                service.trending_service.redis = redis
+                service.like_post(post_id, _principal(user_id))
+                db.commit()
+        finally:
+            db.close()
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(like, range(1, args.likes + 1)))
+    elapsed = time.perf_counter() - t0
+
+    db = SessionLocal()
+    try:
+        flush_t0 = time.perf_counter()
+        CounterService(db, redis=redis).flush()
+        flush_seconds = time.perf_counter() - flush_t0
+        likes_count = db.query(Post.likes_count).filter(Post.id == post_id).scalar()
+        like_rows = db.query(func.count(Like.id)).filter(Like.post_id == post_id).scalar()
+    finally:
+        db.close()
+
+    return {
+        "seconds": round(elapsed, 3),
+        "likes_per_second": round(args.likes / elapsed, 1),
+        "flush_ms": round(flush_seconds * 1000, 3),
+        "likes_count": likes_count,
+        "like_rows": like_rows,
+        "exact": likes_count == like_rows == args.likes,
+    }
+
+
+def check_reconcile(redis, likes: int) -> dict:
+    """reconcile() con deriva: columna + pendientes debe ser igual a las filas."""
+    post_id = seed(likes)
+    settings.COUNTERS_WRITE_BEHIND = True
+    redis.flushdb()
+
+    def like(user_id: int) -> None:
+        with SessionLocal() as db:
+            service = LikeService(db)
+            service.counter_service.redis = redis
+            service.trending_service.redis = redis
+            service.like_post(post_id, _principal(user_id))
+            db.commit()
+
+    third = likes // 3
+    for user_id in range(1, third + 1):
+        like(user_id)
+    # Lote interrumpido: tomado por un flusher que murió antes del UPDATE
+    redis.register_script(TAKE_BATCH_SCRIPT)(keys=[PENDING_KEY, FLUSHING_KEY, FLUSHING_ID_KEY], args=["dead"])
+    for user_id in range(third + 1, 2 * third + 1):
+        like(user_id)
+    # Deltas perdidos: filas confirmadas cuyo HINCRBY nunca llegó
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO likes (user_id, post_id) VALUES (:u, :p)"),
+            [{"u": user_id, "p": post_id} for user_id in range(2 * third + 1, likes + 1)],
+        )
+
+    db = SessionLocal()
+    try:
+        service = CounterService(db, redis=redis)
+        reconciled = service.reconcile()
+        # Deltas que llegan después de la reconciliación (sin volcar)
+        db.execute(text("DELETE FROM likes WHERE post_id = :p AND user_id <= 10"), {"p": post_id})
+        db.commit()
+        for _ in range(10):
+            service.increment(post_id, "likes_count", -1)
+        db.commit()
+        post = db.get(Post, post_id)
+        db.refresh(post)
+        like_rows = db.query(func.count(Like.id)).filter(Like.post_id == post_id).scalar()
+        with_pending = service.current(post, "likes_count")
+        service.flush()
+        db.refresh(post)
+        flushed = post.likes_count
+    finally:
+        db.close()
+
+    return {
+        "reconciled": reconciled,
+        "like_rows": like_rows,
+        "column_plus_pending": with_pending,
+        "after_flush": flushed,
+        "exact": reconciled and with_pending == flushed == like_rows == likes - 10,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--likes", type=int, default=1000, help="Likes en paralelo (uno por usuario)")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--fake-redis", action="store_true")
+    args = parser.parse_args()
+
+    if args.fake_redis:
+        import fakeredis
+        redis = fakeredis.FakeRedis(decode_responses=True)
+    else:
+        from app.core.redis import redis_client as redis
+
+    Base.metadata.create_all(bind=engine)
+    results = {mode: run_mode(mode, redis, args) for mode in ("legacy", "sql", "write_behind")}
+    legacy = results["legacy"]["likes_per_second"]
+    for result in results.values():
+        result["speedup_vs_legacy"] = round(result["likes_per_second"] / legacy, 2)
+    reconcile = check_reconcile(redis, args.likes)
+    print(json.dumps({"config": vars(args), "results": results, "reconcile": reconcile}, indent=2))
+    if not (results["sql"]["exact"] and results["write_behind"]["exact"] and reconcile["exact"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark del feed con distribución de seguidores sesgada (ley de potencias).
+
+Compara tres modos de TimelineService:
+    push    -> fan-out on write para todos (umbral infinito)
+    pull    -> sin fan-out, todo se mezcla al leer (umbral 0)
+    hybrid  -> push salvo autores con >= --threshold seguidores
+
+Uso:
+    python -m benchmarks.feed_benchmark --users 2000 --posts 2000 --reads 500
+    python -m benchmarks.feed_benchmark --fake-redis   # sin servidor Redis (fakeredis)
+
+Mide latencia de creación de posts (coste del fan-out), número de escrituras
+en timelines y latencia de lectura de la primera página del feed.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'feed_bench.db')}")
+
+from sqlalchemy import text  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models import Post  # noqa: E402,F401  (registra todos los modelos)
+from app.services import timeline_service as timeline_module  # noqa: E402
+from app.services.timeline_service import TimelineService  # noqa: E402
+from app.repositories.post_repository import PostRepository  # noqa: E402
+
+
+def _percentiles(samples: list[float]) -> dict:
+    q = statistics.quantiles(sorted(samples), n=100)
+    return {
+        "p50_ms": round(q[49] * 1000, 3),
+        "p95_ms": round(q[94] * 1000, 3),
+        "p99_ms": round(q[98] * 1000, 3),
+    }
+
+
+def seed_graph(users: int, follows_per_user: int, skew: float, seed: int = 42) -> list[int]:
+    """Cada usuario sigue a `follows_per_user` cuentas elegidas con probabilidad ∝ 1/rank^skew."""
+    rng = random.Random(seed)
+    weights = [1 / (rank ** skew) for rank in range(1, users + 1)]
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM follows"))
+        conn.execute(text("DELETE FROM posts"))
+        conn.execute(text("DELETE FROM users"))
+        conn.execute(
+            text("INSERT INTO users (id, username, email, hashed_password, role) VALUES (:id, :u, :e, 'x', 'user')"),
+            [{"id": i, "u": f"user{i}", "e": f"user{i}@example.com"} for i in range(1, users + 1)],
+        )
+        rows = []
+        for follower in range(1, users + 1):
+            followed = set(rng.choices(range(1, users + 1), weights=weights, k=follows_per_user))
+            followed.discard(follower)
+            rows += [{"a": follower, "b": f} for f in followed]
+        conn.execute(text("INSERT INTO follows (follower_id, followed_id) VALUES (:a, :b)"), rows)
+    return weights
+
+
+class _CountingPipeline:
+    def __init__(self, pipe, counter):
+        self._pipe, self._counter = pipe, counter
+
+    def zadd(self, *args, **kwargs):
+        self._counter["zadds"] += 1
+        return self._pipe.zadd(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._pipe, name)
+
+
+def run_mode(mode: str, redis, args, weights) -> dict:
+    threshold = {"push": 10 ** 12, "pull": 0, "hybrid": args.threshold}[mode]
+    settings.FEED_PULL_FOLLOWER_THRESHOLD = threshold
+    settings.FEED_PULL_MERGE_DEPTH = args.merge_depth
+    redis.flushdb()
+
+    rng = random.Random(7)
+    db = SessionLocal()
+    counter = {"zadds": 0}
+    counting_redis = type("CountingRedis", (), {
+        "pipeline": lambda self, *a, **k: _CountingPipeline(redis.pipeline(*a, **k), counter),
+        "__getattr__": lambda self, name: getattr(redis, name),
+    })()
+    service = TimelineService(db, redis=counting_redis)
+    service.refresh_pulled_authors()
+    repo = PostRepository(db)
+
+    # Calentar timelines de todos los lectores
+    for user_id in range(1, args.users + 1):
+        service.read_page(user_id, 1, 10)
+    counter["zadds"] = 0
+
+    write_samples = []
+    authors = rng.choices(range(1, args.users + 1), weights=weights, k=args.posts)
+    for author_id in authors:
+        t = time.perf_counter()
+        post = repo.create(title="bench", content="benchmark content", image_url="https://example.com/i.png", author_id=author_id)
+        service.fan_out_post(author_id, post.id)
+        # Como en una petición: el fan-out a Redis se hace tras el commit
+        db.commit()
+        write_samples.append(time.perf_counter() - t)
+
+    read_samples = []
+    for _ in range(args.reads):
+        user_id = rng.randint(1, args.users)
+        t = time.perf_counter()
+        service.read_page(user_id, 1, 10)
+        read_samples.append(time.perf_counter() - t)
+
+    pulled = len(redis.smembers(timeline_module.PULLED_AUTHORS_KEY))
+    db.close()
+    return {
+        "threshold": threshold,
+        "pulled_authors": pulled,
+        "zadd_per_post": round(counter["zadds"] / args.posts, 2),
+        "create_post": _percentiles(write_samples),
+        "read_feed": _percentiles(read_samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--follows-per-user", type=int, default=50)
+    parser.add_argument("--skew", type=float, default=1.1, help="Exponente de la ley de potencias")
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--threshold", type=int, default=200)
+    parser.add_argument("--merge-depth", type=int, default=settings.FEED_PULL_MERGE_DEPTH)
+    parser.add_argument("--fake-redis", action="store_true")
+    args = parser.parse_args()
+
+    if args.fake_redis:
+        import fakeredis
+        redis = fakeredis.FakeRedis(decode_responses=True)
+    else:
+        from app.core.redis import redis_client as redis
+
+    Base.metadata.create_all(bind=engine)
+    weights = seed_graph(args.users, args.follows_per_user, args.skew)
+    results = {mode: run_mode(mode, redis, args, weights) for mode in ("push", "pull", "hybrid")}
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Pruebas de carga reproducibles en proceso: generador de datos sintéticos
+(datagen), escenarios scriptados (scenarios) y el runner
+(`python -m benchmarks.loadtest`).
+"""
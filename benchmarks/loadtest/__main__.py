@@ -0,0 +1,138 @@
+"""
+Pruebas de carga reproducibles en proceso, con datos sintéticos a escala.
+
+Uso:
+    python -m benchmarks.loadtest --fake-redis
+    python -m benchmarks.loadtest --fake-redis --scenarios feed_scroll inbox_poll --users 10000 --concurrency 64
+    python -m benchmarks.loadtest --url redis://localhost:6379/15 --duration 30 > resultados.json
+
+Crea una BD SQLite temporal (o usa DATABASE_URL, que debe estar vacía), la
+llena con benchmarks/loadtest/datagen.py (usuarios, grafo de seguidores con
+ley de potencias, posts, likes, comentarios, notificaciones y
+conversaciones) y registra como autores "pull" del feed híbrido los que
+superan --pull-threshold seguidores. Después ejecuta cada escenario de
+benchmarks/loadtest/scenarios.py con --concurrency usuarios virtuales en
+este proceso (ASGI, sin HTTP) durante --duration segundos, tras una
+iteración de calentamiento por usuario virtual que no se mide.
+
+Imprime un JSON con la configuración, el commit, el tamaño de los datos y,
+por escenario y endpoint, peticiones/s, códigos de estado y p50/p95/p99 de
+las respuestas 2xx. Con la misma semilla y los mismos parámetros los datos
+y las secuencias de peticiones se repiten: dos ejecuciones en commits
+distintos se pueden comparar con un diff.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+
+from benchmarks.loadtest import datagen
+from benchmarks.loadtest.scenarios import SCENARIOS, Recorder, VirtualUser
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare(args) -> tuple[datagen.Dataset, dict]:
+    from app.auth.password_hasher import password_hasher
+    from app.core.redis import redis_client
+    from app.db.base import Base
+    from app.db.search import install_post_search
+    from app.db.session import SessionLocal, engine
+    from app.services.timeline_service import TimelineService
+
+    redis_client.flushdb()
+    Base.metadata.create_all(bind=engine)
+    install_post_search(engine)
+    # Un solo hash para todos: misma contraseña y mismas rondas que en producción
+    dataset = datagen.generate(engine, args, password_hasher.hash(datagen.PASSWORD))
+    with SessionLocal() as db:
+        pulled = TimelineService(db).refresh_pulled_authors()
+    summary = datagen.summary(dataset, engine)
+    summary["pull_authors"] = len(pulled)
+    return dataset, summary
+
+
+async def run_scenario(app_client, scenario, dataset: datagen.Dataset, args) -> dict:
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    users = rng.sample(dataset.user_ids, min(args.concurrency, len(dataset.user_ids)))
+    vus = [VirtualUser(i, user_id, app_client, recorder, dataset, args.seed) for i, user_id in enumerate(users)]
+
+    await asyncio.gather(*(scenario(vu) for vu in vus))
+    recorder.enabled = True
+    deadline = time.perf_counter() + args.duration
+
+    async def loop(vu: VirtualUser):
+        while time.perf_counter() < deadline:
+            await scenario(vu)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(loop(vu) for vu in vus))
+    return recorder.report(time.perf_counter() - started)
+
+
+async def run(args, dataset: datagen.Dataset) -> dict:
+    import httpx
+    from app.main import app
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                     timeout=60) as client:
+            for name in args.scenarios:
+                results[name] = await run_scenario(client, SCENARIOS[name], dataset, args)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--fake-redis", action="store_true", help="Usar fakeredis en lugar de un Redis real")
+    target.add_argument("--url", help="Redis de pruebas (se vacía), p. ej. redis://localhost:6379/15")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=32, help="Usuarios virtuales por escenario")
+    parser.add_argument("--duration", type=float, default=10, help="Segundos por escenario")
+    parser.add_argument("--pull-threshold", type=int, default=200,
+                        help="Seguidores a partir de los que un autor pasa a modo pull (FEED_PULL_FOLLOWER_THRESHOLD)")
+    datagen.add_arguments(parser)
+    args = parser.parse_args()
+
+    # La configuración y los clientes de Redis se crean al importar la app
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}")
+    os.environ["FEED_PULL_FOLLOWER_THRESHOLD"] = str(args.pull_threshold)
+    if args.fake_redis:
+        import fakeredis
+        import redis
+        import redis.asyncio
+        from fakeredis import aioredis
+
+        # Un mismo servidor para los clientes síncrono y async, como con un Redis real
+        server = fakeredis.FakeServer()
+        fake = fakeredis.FakeRedis(server=server, decode_responses=True)
+        redis.Redis.from_url = classmethod(lambda cls, *a, **k: fake)
+        async_fake = aioredis.FakeRedis(server=server, decode_responses=True)
+        redis.asyncio.BlockingConnectionPool.from_url = classmethod(lambda cls, *a, **k: async_fake.connection_pool)
+    else:
+        os.environ["REDIS_URL"] = args.url
+
+    dataset, summary = prepare(args)
+    results = asyncio.run(run(args, dataset))
+    print(json.dumps({"config": vars(args), "commit": git_commit(), "dataset": summary, "results": results},
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Datos sintéticos a escala para las pruebas de carga.
+
+Reproducibles con la misma semilla. La popularidad sigue una ley de potencias:
+a la cuenta con rango r (orden aleatorio de los usuarios) la elige como
+seguida cada usuario con peso 1 / r^zipf, así que unas pocas cuentas tienen
+casi todos los seguidores y la mayoría muy pocos. Los likes y comentarios
+van sobre todo a los posts de las cuentas populares, y cada like, comentario
+y follow genera su notificación, como en la app. Se inserta con Core en
+bloque, sin pasar por los servicios, y los contadores (likes_count,
+comments_count, no leídos de las conversaciones) quedan coherentes con las
+filas.
+"""
+import bisect
+import itertools
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+PASSWORD = "loadtest-password"
+CHUNK = 5000
+
+
+@dataclass
+class Dataset:
+    """Lo que los escenarios necesitan saber de los datos generados."""
+
+    user_ids: list[int]
+    # Usuarios ordenados por número de seguidores, de más a menos
+    popular_ids: list[int]
+    followers: dict[int, int]
+    posts_by_author: dict[int, list[int]] = field(default_factory=dict)
+    conversations_by_user: dict[int, list[int]] = field(default_factory=dict)
+
+
+def email(user_id: int) -> str:
+    return f"load{user_id}@example.com"
+
+
+def add_arguments(parser) -> None:
+    """Opciones de escala del generador (compartidas por el runner)."""
+    group = parser.add_argument_group("datos sintéticos")
+    group.add_argument("--users", type=int, default=2000)
+    group.add_argument("--follows", type=int, default=50, help="Cuentas seguidas por usuario (media)")
+    group.add_argument("--zipf", type=float, default=1.0, help="Exponente de la popularidad (ley de potencias)")
+    group.add_argument("--posts", type=int, default=10, help="Posts por usuario (media)")
+    group.add_argument("--likes", type=int, default=30, help="Likes por usuario")
+    group.add_argument("--comments", type=int, default=10, help="Comentarios por usuario")
+    group.add_argument("--conversations", type=int, default=5, help="Conversaciones por usuario")
+    group.add_argument("--messages", type=int, default=20, help="Mensajes por conversación")
+    group.add_argument("--seed", type=int, default=42)
+
+
+def _insert(conn, model, rows: list[dict]) -> None:
+    from sqlalchemy import insert
+
+    for start in range(0, len(rows), CHUNK):
+        conn.execute(insert(model), rows[start:start + CHUNK])
+
+
+def generate(engine, args, hashed_password: str) -> Dataset:
+    """Llena una BD vacía con el esquema ya creado; devuelve el resumen para los escenarios."""
+    from sqlalchemy import text
+    from app.models import Comment, Conversation, Follow, Like, Message, Notification, Post, User
+    from app.models.notification import NotificationType
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    user_ids = list(range(1, args.users + 1))
+
+    def ago(max_minutes: int) -> datetime:
+        return now - timedelta(minutes=rng.randint(0, max_minutes))
+
+    def count(mean: float) -> int:
+        # Actividad por usuario con cola larga: la mayoría poco, algunos mucho
+        return min(int(rng.expovariate(1 / mean)) if mean > 0 else 0, 10 * int(mean) + 1)
+
+    # Popularidad: rango aleatorio por usuario y pesos 1/r^zipf acumulados
+    ranked = user_ids[:]
+    rng.shuffle(ranked)
+    cum_weights = list(itertools.accumulate(1 / (rank ** args.zipf) for rank in range(1, len(ranked) + 1)))
+
+    def popular_sample(user_id: int, k: int) -> set[int]:
+        chosen: set[int] = set()
+        k = min(k, len(ranked) - 1)
+        for _ in range(k * 4):
+            if len(chosen) >= k:
+                break
+            target = ranked[bisect.bisect_left(cum_weights, rng.random() * cum_weights[-1])]
+            if target != user_id:
+                chosen.add(target)
+        return chosen
+
+    follows = [(u, f) for u in user_ids for f in popular_sample(u, max(count(args.follows), 1))]
+    followers = dict.fromkeys(user_ids, 0)
+    for _, followed in follows:
+        followers[followed] += 1
+    following: dict[int, list[int]] = {u: [] for u in user_ids}
+    for follower, followed in follows:
+        following[follower].append(followed)
+
+    posts = []
+    for author in user_ids:
+        for _ in range(count(args.posts)):
+            posts.append({"id": len(posts) + 1, "author_id": author, "created_at": ago(60 * 24 * 30)})
+    # Likes y comentarios: posts de cuentas populares con más probabilidad
+    post_weights = list(itertools.accumulate(followers[p["author_id"]] + 1 for p in posts))
+
+    def pick_posts(k: int) -> set[int]:
+        if not posts:
+            return set()
+        return {bisect.bisect_left(post_weights, rng.random() * post_weights[-1]) + 1 for _ in range(k)}
+
+    likes = [(u, p) for u in user_ids for p in pick_posts(args.likes)]
+    comments = [(u, p, ago(60 * 24 * 30)) for u in user_ids for p in pick_posts(args.comments)]
+    likes_count = dict.fromkeys(range(1, len(posts) + 1), 0)
+    comments_count = dict.fromkeys(range(1, len(posts) + 1), 0)
+    for _, post_id in likes:
+        likes_count[post_id] += 1
+    for _, post_id, _ in comments:
+        comments_count[post_id] += 1
+
+    notifications = []
+
+    def notify(recipient: int, actor: int, kind, post_id: int | None) -> None:
+        if recipient != actor:
+            notifications.append({"recipient_id": recipient, "actor_id": actor, "type": kind, "post_id": post_id,
+                                  "is_read": rng.random() < 0.8, "created_at": ago(60 * 24 * 30)})
+
+    for follower, followed in follows:
+        notify(followed, follower, NotificationType.follow, None)
+    for user_id, post_id in likes:
+        notify(posts[post_id - 1]["author_id"], user_id, NotificationType.like, post_id)
+    for user_id, post_id, _ in comments:
+        notify(posts[post_id - 1]["author_id"], user_id, NotificationType.comment, post_id)
+
+    # Conversaciones con cuentas seguidas; los últimos mensajes quedan sin leer
+    pairs = sorted({
+        tuple(sorted((u, other)))
+        for u in user_ids
+        for other in rng.sample(following[u], min(args.conversations, len(following[u])))
+    })
+    conversations, messages = [], []
+    conversations_by_user: dict[int, list[int]] = {u: [] for u in user_ids}
+    for conversation_id, (user1, user2) in enumerate(pairs, start=1):
+        unread = {user1: 0, user2: 0}
+        sent_at = ago(60 * 24 * 30)
+        for n in range(args.messages):
+            sender = rng.choice((user1, user2))
+            recipient = user2 if sender == user1 else user1
+            is_read = n < args.messages - 3 or rng.random() < 0.5
+            unread[recipient] += not is_read
+            sent_at += timedelta(minutes=rng.randint(1, 60))
+            messages.append({"id": len(messages) + 1, "conversation_id": conversation_id, "sender_id": sender,
+                             "content": "hola, ¿qué tal?", "is_read": is_read, "created_at": sent_at})
+        conversations.append({
+            "id": conversation_id, "user1_id": user1, "user2_id": user2, "created_at": now - timedelta(days=31),
+            "last_message_at": sent_at, "last_message_id": len(messages) if args.messages else None,
+            "user1_unread_count": unread[user1], "user2_unread_count": unread[user2],
+        })
+        conversations_by_user[user1].append(conversation_id)
+        conversations_by_user[user2].append(conversation_id)
+
+    with engine.begin() as conn:
+        _insert(conn, User, [
+            {"id": u, "username": f"load{u}", "email": email(u), "hashed_password": hashed_password,
+             "role": "user", "token_version": 0, "created_at": now - timedelta(days=60)}
+            for u in user_ids
+        ])
+        _insert(conn, Follow, [{"follower_id": u, "followed_id": f} for u, f in follows])
+        _insert(conn, Post, [
+            {**p, "title": f"Post {p['id']} de load{p['author_id']}", "content": "contenido de prueba de carga " * 8,
+             "image_url": "https://example.com/image.png", "likes_count": likes_count[p["id"]],
+             "comments_count": comments_count[p["id"]]}
+            for p in posts
+        ])
+        _insert(conn, Like, [{"user_id": u, "post_id": p} for u, p in likes])
+        _insert(conn, Comment, [
+            {"content": "buen post", "author_id": u, "post_id": p, "created_at": created_at}
+            for u, p, created_at in comments
+        ])
+        _insert(conn, Notification, notifications)
+        _insert(conn, Conversation, conversations)
+        _insert(conn, Message, messages)
+        if engine.dialect.name == "sqlite":
+            # Estadísticas para el planificador, como en una BD con datos reales
+            conn.execute(text("ANALYZE"))
+
+    posts_by_author: dict[int, list[int]] = {u: [] for u in user_ids}
+    for p in sorted(posts, key=lambda p: p["created_at"], reverse=True):
+        posts_by_author[p["author_id"]].append(p["id"])
+    return Dataset(
+        user_ids=user_ids,
+        popular_ids=sorted(user_ids, key=followers.__getitem__, reverse=True),
+        followers=followers,
+        posts_by_author=posts_by_author,
+        conversations_by_user=conversations_by_user,
+    )
+
+
+def summary(dataset: Dataset, engine) -> dict:
+    """Filas por tabla y forma del grafo, para el informe."""
+    from sqlalchemy import func, select
+    from app.models import Comment, Conversation, Follow, Like, Message, Notification, Post, User
+
+    with engine.connect() as conn:
+        rows = {model.__tablename__: conn.execute(select(func.count()).select_from(model)).scalar_one()
+                for model in (User, Follow, Post, Like, Comment, Notification, Conversation, Message)}
+    counts = sorted(dataset.followers.values(), reverse=True)
+    return {
+        "rows": rows,
+        "followers": {
+            "max": counts[0] if counts else 0,
+            "p99": counts[len(counts) // 100] if counts else 0,
+            "median": counts[len(counts) // 2] if counts else 0,
+        },
+    }
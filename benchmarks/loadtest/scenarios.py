@@ -0,0 +1,207 @@
+"""
+Escenarios de carga. Cada uno es una corrutina que ejecuta una iteración
+(una "visita") de un usuario virtual; el runner la repite sin pausas durante
+la duración del escenario.
+
+- feed_scroll: primera página del feed, tres páginas más con next_cursor,
+  los comentarios de un post y las estadísticas de su autor.
+- like_burst: todos los usuarios virtuales abren el post más reciente de la
+  cuenta más seguida y le dan (o quitan) like: escrituras concurrentes sobre
+  la misma fila y el mismo contador.
+- inbox_poll: sondeo de no leídos de notificaciones y mensajes; de vez en
+  cuando abre la bandeja, lee una conversación con mensajes sin leer, la
+  marca como leída y responde.
+- login_storm: login en bucle (bcrypt), respetando Retry-After en los 503
+  del control de admisión.
+- refresh_storm: rotación de refresh tokens en bucle (script Lua en Redis).
+
+En las dos tormentas uno de cada cuatro usuarios virtuales lee el feed en
+lugar de autenticarse: el informe muestra cómo afecta la tormenta al resto
+de endpoints.
+"""
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+
+from benchmarks.loadtest.datagen import PASSWORD, Dataset, email
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) Firefox/121.0"
+
+
+class Recorder:
+    """Latencias y códigos de estado por endpoint (plantilla de la ruta) de un escenario."""
+
+    def __init__(self):
+        self.enabled = False
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, endpoint: str, status: int, elapsed: float) -> None:
+        if not self.enabled:
+            return
+        self.statuses[endpoint][status] += 1
+        if 200 <= status < 300:
+            self.latencies[endpoint].append(elapsed)
+
+    def report(self, duration: float) -> dict:
+        """Peticiones/s por endpoint y p50/p95/p99 de las respuestas 2xx."""
+        endpoints = {}
+        for endpoint in sorted(self.statuses):
+            statuses = self.statuses[endpoint]
+            requests = sum(statuses.values())
+            result = {
+                "requests": requests,
+                "throughput_rps": round(requests / duration, 1),
+                "status": {str(code): n for code, n in sorted(statuses.items())},
+            }
+            samples = self.latencies[endpoint]
+            if len(samples) >= 2:
+                q = statistics.quantiles(samples, n=100, method="inclusive")
+                result.update({
+                    "p50_ms": round(q[49] * 1000, 2),
+                    "p95_ms": round(q[94] * 1000, 2),
+                    "p99_ms": round(q[98] * 1000, 2),
+                    "max_ms": round(max(samples) * 1000, 2),
+                })
+            endpoints[endpoint] = result
+        requests = sum(e["requests"] for e in endpoints.values())
+        return {"requests": requests, "throughput_rps": round(requests / duration, 1), "endpoints": endpoints}
+
+
+class VirtualUser:
+    """Un cliente que actúa como `user_id`; guarda el estado entre iteraciones (p. ej. su refresh token)."""
+
+    def __init__(self, index: int, user_id: int, client, recorder: Recorder, dataset: Dataset, seed: int):
+        from app.auth.auth_handler import create_access_token
+
+        self.index = index
+        self.user_id = user_id
+        self.client = client
+        self.recorder = recorder
+        self.dataset = dataset
+        self.rng = random.Random(seed * 100_003 + index)
+        self.device_id = f"loadtest-{index}"
+        claims = {"sub": email(user_id), "user_id": user_id, "ver": 0}
+        self.headers = {
+            "Authorization": f"Bearer {create_access_token(claims)}",
+            "X-Device-ID": self.device_id,
+            "User-Agent": USER_AGENT,
+        }
+        self.refresh_token: str | None = None
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs):
+        """Petición autenticada registrada bajo `endpoint` (la plantilla, no la URL)."""
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        started = time.perf_counter()
+        response = await self.client.request(method, url, headers=headers, **kwargs)
+        self.recorder.record(endpoint, response.status_code, time.perf_counter() - started)
+        return response
+
+
+async def _feed_page(vu: VirtualUser, cursor: str | None = None) -> dict:
+    if cursor is None:
+        response = await vu.request("GET /posts/feed", "GET", "/posts/feed", params={"size": 20})
+    else:
+        response = await vu.request("GET /posts/feed?cursor", "GET", "/posts/feed",
+                                    params={"size": 20, "cursor": cursor})
+    return response.json() if response.status_code == 200 else {}
+
+
+async def feed_scroll(vu: VirtualUser) -> None:
+    page = await _feed_page(vu)
+    items = list(page.get("items", []))
+    for _ in range(3):
+        if not page.get("next_cursor"):
+            break
+        page = await _feed_page(vu, page["next_cursor"])
+        items.extend(page.get("items", []))
+    if items:
+        post = vu.rng.choice(items)
+        await vu.request("GET /comments/post/{post_id}", "GET", f"/comments/post/{post['id']}")
+        await vu.request("GET /users/{user_id}/stats", "GET", f"/users/{post['author']['id']}/stats")
+
+
+async def like_burst(vu: VirtualUser) -> None:
+    author_id = next(a for a in vu.dataset.popular_ids if vu.dataset.posts_by_author[a])
+    response = await vu.request("GET /posts/?author_id", "GET", "/posts/", params={"author_id": author_id, "size": 5})
+    if response.status_code != 200 or not response.json()["items"]:
+        return
+    post = response.json()["items"][0]
+    if post["liked_by_me"]:
+        await vu.request("DELETE /posts/{post_id}/like", "DELETE", f"/posts/{post['id']}/like")
+    else:
+        await vu.request("POST /posts/{post_id}/like", "POST", f"/posts/{post['id']}/like")
+
+
+async def inbox_poll(vu: VirtualUser) -> None:
+    await vu.request("GET /notifications/unread-count", "GET", "/notifications/unread-count")
+    await vu.request("GET /messages/unread-count", "GET", "/messages/unread-count")
+    if vu.rng.random() >= 0.25:
+        return
+    await vu.request("GET /notifications/", "GET", "/notifications/", params={"size": 20})
+    response = await vu.request("GET /messages/conversations", "GET", "/messages/conversations",
+                                params={"size": 20})
+    if response.status_code != 200:
+        return
+    unread = [c for c in response.json()["items"] if c["unread_count"]]
+    if not unread:
+        return
+    conversation_id = unread[0]["id"]
+    await vu.request("GET /messages/conversations/{conv_id}/messages", "GET",
+                     f"/messages/conversations/{conversation_id}/messages", params={"size": 20})
+    await vu.request("PATCH /messages/conversations/{conv_id}/read", "PATCH",
+                     f"/messages/conversations/{conversation_id}/read")
+    if vu.rng.random() < 0.5:
+        # La respuesta deja mensajes sin leer al otro usuario: la bandeja no se vacía
+        await vu.request("POST /messages/conversations/{conv_id}/send", "POST",
+                         f"/messages/conversations/{conversation_id}/send", json={"content": "¡De acuerdo!"})
+
+
+async def login_storm(vu: VirtualUser) -> None:
+    if vu.index % 4 == 3:
+        await _feed_page(vu)
+        return
+    response = await vu.request("POST /auth/login", "POST", "/auth/login",
+                                json={"email": email(vu.user_id), "password": PASSWORD})
+    if response.status_code == 503:
+        await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+
+
+def _open_session(vu: VirtualUser) -> str:
+    """Sesión inicial con refresh token, sin pasar por bcrypt (como tras un login)."""
+    from datetime import datetime, timedelta, timezone
+    from app.auth.auth_handler import issue_refresh_token
+    from app.core.redis import redis_client
+    from app.services.session_service import SessionService
+
+    refresh_token, jti = issue_refresh_token({"sub": email(vu.user_id), "user_id": vu.user_id, "ver": 0})
+    SessionService(redis_client).create_session(
+        vu.user_id, vu.device_id, jti, "127.0.0.1", USER_AGENT,
+        datetime.now(timezone.utc) + timedelta(days=7),
+    )
+    return refresh_token
+
+
+async def refresh_storm(vu: VirtualUser) -> None:
+    if vu.index % 4 == 3:
+        await _feed_page(vu)
+        return
+    if vu.refresh_token is None:
+        vu.refresh_token = _open_session(vu)
+    response = await vu.request("POST /auth/refresh", "POST", "/auth/refresh",
+                                json={"refresh_token": vu.refresh_token})
+    if response.status_code == 200:
+        vu.refresh_token = response.json()["refresh_token"]
+    else:
+        vu.refresh_token = None
+
+
+SCENARIOS = {
+    "feed_scroll": feed_scroll,
+    "like_burst": like_burst,
+    "inbox_poll": inbox_poll,
+    "login_storm": login_storm,
+    "refresh_storm": refresh_storm,
+}
@@ -0,0 +1,136 @@
+"""
+Prueba de carga: ráfagas de login mezcladas con lecturas del feed.
+
+Uso (contra un servidor en marcha, p. ej. `uvicorn app.main:app`):
+    python -m benchmarks.login_storm_benchmark --url http://localhost:8000
+    python -m benchmarks.login_storm_benchmark --url http://localhost:8000 --storm-clients 64
+
+Registra --users usuarios con posts y seguidores, y lanza --feed-clients
+clientes que leen GET /posts/feed sin pausa. Mide la latencia del feed en dos
+fases: solo feed (línea base) y feed + --storm-clients clientes haciendo
+POST /auth/login en bucle (respetando Retry-After salvo con
+--ignore-retry-after). Informa p50/p99 del feed en cada fase y los logins
+completados/rechazados (503) por segundo.
+
+Para comparar con bcrypt en línea en el threadpool (comportamiento anterior)
+arrancar el servidor con BCRYPT_WORKERS=0 BCRYPT_QUEUE_SIZE=100000.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+PASSWORD = "benchmark-password"
+
+
+def _percentiles(samples: list[float]) -> dict:
+    if len(samples) < 2:
+        return {"requests": len(samples)}
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "requests": len(samples),
+        "p50_ms": round(q[49] * 1000, 1),
+        "p99_ms": round(q[98] * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1),
+    }
+
+
+def seed(client: httpx.Client, users: int, posts: int) -> list[dict]:
+    """Usuarios que se siguen en anillo, con posts; devuelve sus headers de auth."""
+    run = uuid.uuid4().hex[:8]
+    accounts = []
+    for i in range(users):
+        email = f"storm{run}_{i}@example.com"
+        response = client.post("/auth/register", json={"username": f"storm{run}_{i}", "email": email,
+                                                        "password": PASSWORD})
+        response.raise_for_status()
+        response = client.post("/auth/login", json={"email": email, "password": PASSWORD},
+                               headers={"X-Device-ID": f"seed-{i}"})
+        response.raise_for_status()
+        token = response.json()["access_token"]
+        accounts.append({"email": email, "headers": {"Authorization": f"Bearer {token}"}})
+    for i, account in enumerate(accounts):
+        me = client.get("/auth/me", headers=account["headers"]).json()
+        account["id"] = me["id"]
+        for p in range(posts):
+            client.post("/posts/", json={"title": f"post {p}", "content": "load test " * 10,
+                                         "image_url": "https://example.com/image.png"},
+                        headers=account["headers"]).raise_for_status()
+    for i, account in enumerate(accounts):
+        target = accounts[(i + 1) % len(accounts)]
+        client.post(f"/users/{target['id']}/follow", headers=account["headers"])
+    return accounts
+
+
+def run_phase(url: str, accounts: list[dict], args, storm: bool) -> dict:
+    stop = threading.Event()
+    feed_latencies: list[float] = []
+    feed_errors = Counter()
+    logins = Counter()
+
+    def feed_reader(i: int):
+        headers = accounts[i % len(accounts)]["headers"]
+        with httpx.Client(base_url=url, timeout=60) as client:
+            while not stop.is_set():
+                started = time.perf_counter()
+                response = client.get("/posts/feed", params={"size": 20}, headers=headers)
+                elapsed = time.perf_counter() - started
+                if response.status_code == 200:
+                    feed_latencies.append(elapsed)
+                else:
+                    feed_errors[response.status_code] += 1
+
+    def login_storm(i: int):
+        account = accounts[i % len(accounts)]
+        with httpx.Client(base_url=url, timeout=60) as client:
+            while not stop.is_set():
+                response = client.post("/auth/login", json={"email": account["email"], "password": PASSWORD},
+                                       headers={"X-Device-ID": f"storm-{i}"})
+                logins[response.status_code] += 1
+                if response.status_code == 503 and not args.ignore_retry_after:
+                    stop.wait(float(response.headers.get("Retry-After", 1)))
+
+    threads = [threading.Thread(target=feed_reader, args=(i,)) for i in range(args.feed_clients)]
+    if storm:
+        threads += [threading.Thread(target=login_storm, args=(i,)) for i in range(args.storm_clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    result = {"feed": _percentiles(feed_latencies), "feed_errors": dict(feed_errors)}
+    if storm:
+        result["logins_per_second"] = {str(code): round(count / args.duration, 1) for code, count in logins.items()}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True, help="Servidor a probar, p. ej. http://localhost:8000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--posts", type=int, default=5, help="Posts por usuario")
+    parser.add_argument("--feed-clients", type=int, default=8)
+    parser.add_argument("--storm-clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10, help="Segundos por fase")
+    parser.add_argument("--ignore-retry-after", action="store_true",
+                        help="Los clientes del storm reintentan sin esperar (cliente hostil)")
+    args = parser.parse_args()
+
+    with httpx.Client(base_url=args.url, timeout=60) as client:
+        accounts = seed(client, args.users, args.posts)
+    results = {
+        "feed_only": run_phase(args.url, accounts, args, storm=False),
+        "feed_with_login_storm": run_phase(args.url, accounts, args, storm=True),
+    }
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
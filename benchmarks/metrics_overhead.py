@@ -0,0 +1,201 @@
+"""
+Latencia añadida por las métricas Prometheus (METRICS_ENABLED) por endpoint.
+
+Uso:
+    python -m benchmarks.metrics_overhead --fake-redis
+    python -m benchmarks.metrics_overhead --url redis://localhost:6379/15 --blocks 60 --concurrency 8
+
+Carga la app completa con METRICS_ENABLED=true y PROMETHEUS_MULTIPROC_DIR
+(el modo más caro: ficheros mmap) sobre una BD SQLite temporal con --posts
+posts, y compara en el mismo proceso dos pilas ASGI de la misma app: con
+MetricsMiddleware y sin él. En la variante "off" también se retira la
+instrumentación de Redis y del pool de conexiones. Las variantes se alternan
+en --blocks bloques de --block-requests peticiones por endpoint, con
+--concurrency clientes (ASGI, sin HTTP), para que el ruido de la máquina
+afecte a las dos por igual. Por endpoint informa la mediana de la latencia
+media de los bloques de cada variante, el sobrecoste de "on" en µs y en % y
+el ruido de la medida (rango intercuartílico de los bloques "off" en % de su
+mediana): un sobrecoste menor que el ruido no es distinguible de cero; subir
+--blocks lo reduce.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+ENDPOINTS = {
+    "root": "/",
+    "posts": "/posts/?size=20",
+    "comments": "/comments/post/{post_id}",
+    "me": "/auth/me",
+}
+
+
+def seed(args) -> tuple[dict, int]:
+    from app.auth.auth_handler import create_access_token, token_claims
+    from app.core.redis import redis_client
+    from app.db.base import Base
+    from app.db.search import install_post_search
+    from app.db.session import SessionLocal, engine
+    from app.models import Comment, Post, User
+
+    redis_client.flushdb()
+    Base.metadata.create_all(bind=engine)
+    install_post_search(engine)
+    with SessionLocal() as db:
+        users = [User(username=f"metrics{i}", email=f"metrics{i}@example.com", hashed_password="x", role="user")
+                 for i in range(10)]
+        db.add_all(users)
+        db.flush()
+        posts = [Post(title=f"post {p}", content="benchmark " * 20, image_url="https://example.com/image.png",
+                      author_id=users[p % len(users)].id) for p in range(args.posts)]
+        db.add_all(posts)
+        db.flush()
+        db.add_all(Comment(content="comentario", author_id=users[c % len(users)].id, post_id=posts[0].id)
+                   for c in range(20))
+        db.commit()
+        return {"Authorization": f"Bearer {create_access_token(token_claims(users[0]))}"}, posts[0].id
+
+
+class Instrumentation:
+    """Activa o retira la instrumentación de Redis y del pool (atributos de instancia sobre los de la clase)."""
+
+    def __init__(self):
+        from app.core.redis import async_redis_client, redis_client
+        from app.db.session import engine
+
+        self.redis_client = redis_client
+        self.async_redis_client = async_redis_client
+        self.engine = engine
+        self.enabled = True
+
+    def set(self, enabled: bool) -> None:
+        from app.core.metrics import instrument_async_redis, instrument_engine, instrument_redis
+
+        if enabled == self.enabled:
+            return
+        if enabled:
+            instrument_engine(self.engine, "sync")
+            instrument_redis(self.redis_client, "sync")
+            instrument_async_redis(self.async_redis_client, "async")
+        else:
+            for target, names in ((self.engine.pool, ("connect",)),
+                                  (self.redis_client, ("execute_command", "pipeline")),
+                                  (self.async_redis_client, ("execute_command", "pipeline"))):
+                for name in names:
+                    vars(target).pop(name, None)
+        self.enabled = enabled
+
+
+def build_stacks(app) -> dict:
+    """La misma app (rutas, estado, resto de middlewares) con y sin MetricsMiddleware."""
+    from app.core.metrics import MetricsMiddleware
+
+    with_metrics = app.build_middleware_stack()
+    user_middleware = app.user_middleware
+    app.user_middleware = [m for m in user_middleware if m.cls is not MetricsMiddleware]
+    try:
+        without_metrics = app.build_middleware_stack()
+    finally:
+        app.user_middleware = user_middleware
+    return {"on": with_metrics, "off": without_metrics}
+
+
+async def run(args) -> dict:
+    import httpx
+    from app.main import app
+
+    headers, post_id = seed(args)
+    instrumentation = Instrumentation()
+    stacks = build_stacks(app)
+    results = {}
+
+    async with app.router.lifespan_context(app):
+        clients = {
+            variant: httpx.AsyncClient(transport=httpx.ASGITransport(app=stack), base_url="http://bench")
+            for variant, stack in stacks.items()
+        }
+        for name in args.endpoints:
+            path = ENDPOINTS[name].format(post_id=post_id)
+            block_means = {"on": [], "off": []}
+
+            async def block(variant: str) -> float:
+                client = clients[variant]
+                remaining = args.block_requests
+
+                async def client_loop():
+                    nonlocal remaining
+                    while remaining > 0:
+                        remaining -= 1
+                        (await client.get(path, headers=headers)).raise_for_status()
+
+                started = time.perf_counter()
+                await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+                return (time.perf_counter() - started) / args.block_requests
+
+            for variant in ("off", "on"):
+                instrumentation.set(variant == "on")
+                for _ in range(args.warmup):
+                    (await clients[variant].get(path, headers=headers)).raise_for_status()
+            for number in range(args.blocks):
+                # Orden alterno: ninguna variante va siempre primero
+                for variant in (("off", "on") if number % 2 == 0 else ("on", "off")):
+                    instrumentation.set(variant == "on")
+                    block_means[variant].append(await block(variant))
+
+            off = statistics.median(block_means["off"])
+            on = statistics.median(block_means["on"])
+            quartiles = statistics.quantiles(block_means["off"], n=4)
+            results[name] = {
+                "off_ms": round(off * 1000, 3),
+                "on_ms": round(on * 1000, 3),
+                "overhead_us": round((on - off) * 1e6, 1),
+                "overhead_pct": round((on / off - 1) * 100, 2),
+                "noise_pct": round((quartiles[2] - quartiles[0]) / off * 100, 2),
+            }
+        for client in clients.values():
+            await client.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--fake-redis", action="store_true", help="Usar fakeredis en lugar de un Redis real")
+    target.add_argument("--url", help="Redis de pruebas (se vacía), p. ej. redis://localhost:6379/15")
+    parser.add_argument("--blocks", type=int, default=40, help="Bloques por variante y endpoint")
+    parser.add_argument("--block-requests", type=int, default=100, help="Peticiones por bloque")
+    parser.add_argument("--warmup", type=int, default=100, help="Peticiones de calentamiento por variante")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    args = parser.parse_args()
+
+    # La configuración y los clientes de Redis se crean al importar la app
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("BCRYPT_WORKERS", "0")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'metrics_bench.db')}"
+    os.environ["METRICS_ENABLED"] = "true"
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp())
+    if args.fake_redis:
+        import fakeredis
+        import redis
+        import redis.asyncio
+        from fakeredis import aioredis
+
+        fake = fakeredis.FakeRedis(decode_responses=True)
+        redis.Redis.from_url = classmethod(lambda cls, *a, **k: fake)
+        async_fake = aioredis.FakeRedis(decode_responses=True)
+        redis.asyncio.BlockingConnectionPool.from_url = classmethod(lambda cls, *a, **k: async_fake.connection_pool)
+    else:
+        os.environ["REDIS_URL"] = args.url
+
+    results = asyncio.run(run(args))
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
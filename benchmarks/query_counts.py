@@ -0,0 +1,384 @@
+"""
+Regresión de número de consultas: sentencias SQL y round trips a Redis por
+llamada a cada método de servicio, con una cota que no depende del tamaño
+del resultado.
+
+Uso:
+    python -m benchmarks.query_counts
+    python -m benchmarks.query_counts --large 100 --verbose
+
+Crea una BD SQLite temporal (esquema de los modelos) y usa fakeredis. Siembra
+dos usuarios con los mismos datos a distinta escala: el pequeño con --small
+seguidores, seguidos, posts, comentarios y likes en su post, guardados,
+notificaciones, conversaciones (de --small mensajes) y sesiones; el grande
+con --large de cada cosa (más que una página). Ejecuta cada caso de _cases()
+(la llamada al servicio y, si la hay, el mapeo del router a la respuesta)
+para los dos, con una sesión y un commit por llamada como get_db, y cuenta
+las sentencias SQL (las estadísticas de app/db/query_stats.py) y los round
+trips a Redis (cada comando suelto o pipeline; los comandos dentro de los
+pipelines se muestran con --verbose).
+
+Un caso falla si supera su cota o si el usuario grande necesita más
+sentencias o round trips que el pequeño: una consulta por elemento (N+1)
+hace fallar el script con código 1.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'query_counts.db')}")
+os.environ["SQL_INSTRUMENTATION_ENABLED"] = "true"
+os.environ["BCRYPT_WORKERS"] = "0"
+
+
+class RedisCounter:
+    """Cuenta los round trips (comando suelto o pipeline) y comandos de un cliente de Redis síncrono."""
+
+    def __init__(self, client):
+        self.round_trips = 0
+        self.commands = 0
+        execute_command = client.execute_command
+        pipeline_factory = client.pipeline
+
+        def counted_execute_command(*args, **options):
+            self.round_trips += 1
+            self.commands += 1
+            return execute_command(*args, **options)
+
+        def pipeline(*args, **kwargs):
+            pipe = pipeline_factory(*args, **kwargs)
+            execute = pipe.execute
+
+            def counted_execute(*exec_args, **exec_kwargs):
+                if pipe.command_stack:
+                    self.round_trips += 1
+                    self.commands += len(pipe.command_stack)
+                return execute(*exec_args, **exec_kwargs)
+
+            pipe.execute = counted_execute
+            return pipe
+
+        client.execute_command = counted_execute_command
+        client.pipeline = pipeline
+
+    def reset(self) -> None:
+        self.round_trips = 0
+        self.commands = 0
+
+
+class Subject:
+    """Un usuario sembrado a escala `n` y los ids que necesitan los casos."""
+
+    def __init__(self, n: int):
+        self.n = n
+        self.principal = None
+        self.other_ids: list[int] = []
+        self.own_post_ids: list[int] = []
+        self.other_post_ids: list[int] = []
+        self.conversation_ids: list[int] = []
+        self.notification_ids: list[int] = []
+        self.comment_ids: list[int] = []
+        self.device_ids: list[str] = []
+        self.refresh_jti: str | None = None
+
+
+def seed_subject(db, redis_client, n: int, label: str) -> Subject:
+    """Usuario con `n` elementos de cada relación; todas las relaciones con usuarios distintos."""
+    from app.models import Comment, Conversation, Follow, Like, Message, Notification, Post, SavedPost, User
+    from app.models.notification import NotificationType
+    from app.services.session_service import SessionService
+    from app.services.user_cache import UserPrincipal
+
+    subject = Subject(n)
+    now = datetime.utcnow()
+    user = User(username=f"{label}", email=f"{label}@example.com", hashed_password="x", role="user")
+    others = [User(username=f"{label}_{i}", email=f"{label}_{i}@example.com", hashed_password="x", role="user")
+              for i in range(n)]
+    db.add_all([user, *others])
+    db.flush()
+    subject.principal = UserPrincipal(id=user.id, email=user.email, username=user.username, role="user")
+    subject.other_ids = [o.id for o in others]
+
+    # Seguidores y seguidos: relación mutua con cada uno de los otros
+    db.add_all(Follow(follower_id=o.id, followed_id=user.id) for o in others)
+    db.add_all(Follow(follower_id=user.id, followed_id=o.id) for o in others)
+
+    own_posts = [Post(title=f"post {label} {i}", content="query counts " * 5, image_url="https://example.com/i.png",
+                      author_id=user.id, created_at=now - timedelta(minutes=i)) for i in range(n + 1)]
+    other_posts = [Post(title=f"post {o.username}", content="query counts " * 5, image_url="https://example.com/i.png",
+                        author_id=o.id, created_at=now - timedelta(minutes=i)) for i, o in enumerate(others)]
+    db.add_all([*own_posts, *other_posts])
+    db.flush()
+    subject.own_post_ids = [p.id for p in own_posts]
+    subject.other_post_ids = [p.id for p in other_posts]
+
+    # Su primer post: un comentario y un like de cada uno de los otros (autores distintos)
+    post = own_posts[0]
+    db.add_all(Comment(content="comentario", author_id=o.id, post_id=post.id) for o in others)
+    db.add_all(Like(user_id=o.id, post_id=post.id) for o in others)
+    own_comments = [Comment(content="mi comentario", author_id=user.id, post_id=post.id) for _ in range(2)]
+    db.add_all(own_comments)
+    post.likes_count = n
+    post.comments_count = n + 2
+    # Guardados: un post de cada uno de los otros
+    db.add_all(SavedPost(user_id=user.id, post_id=p.id, saved_at=now) for p in other_posts[1:])
+
+    notifications = [
+        Notification(recipient_id=user.id, actor_id=o.id, type=NotificationType.like, post_id=p.id,
+                     is_read=False, created_at=now - timedelta(minutes=i))
+        for i, (o, p) in enumerate(zip(others, own_posts))
+    ]
+    db.add_all(notifications)
+
+    conversations = [Conversation(user1_id=user.id, user2_id=o.id, created_at=now, last_message_at=now)
+                     for o in others]
+    db.add_all(conversations)
+    db.flush()
+    for conversation, other in zip(conversations, others):
+        messages = [
+            Message(conversation_id=conversation.id, sender_id=(other.id if i % 2 else user.id),
+                    content="hola", is_read=False, created_at=now - timedelta(minutes=n - i))
+            for i in range(n)
+        ]
+        db.add_all(messages)
+        db.flush()
+        conversation.last_message_id = messages[-1].id
+        conversation.last_message_at = messages[-1].created_at
+        conversation.user1_unread_count = sum(1 for m in messages if m.sender_id == other.id)
+    db.commit()
+    subject.conversation_ids = [c.id for c in conversations]
+    subject.notification_ids = [notification.id for notification in notifications]
+    subject.comment_ids = [c.id for c in own_comments]
+
+    sessions = SessionService(redis_client)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    for i in range(n):
+        device_id = f"device-{i}"
+        sessions.create_session(user.id, device_id, f"jti-{label}-{i}", "10.0.0.1",
+                                "Mozilla/5.0 (X11; Linux x86_64) Firefox/121.0", expires_at)
+        subject.device_ids.append(device_id)
+    subject.refresh_jti = f"jti-{label}-0"
+    return subject
+
+
+def _post_data(title: str):
+    from app.schemas import PostCreate
+
+    return PostCreate(title=title, content="contenido del post de prueba", image_url="https://example.com/i.png")
+
+
+def _feed_sql(db, s: Subject):
+    from app.core.config import settings
+    from app.services.post_service import PostService
+
+    settings.FEED_TIMELINES_ENABLED = False
+    try:
+        PostService(db).get_feed(s.principal.id, 1, 20)
+    finally:
+        settings.FEED_TIMELINES_ENABLED = True
+
+
+def _rotate(db, s: Subject):
+    from app.core.redis import redis_client
+    from app.services.session_service import SessionService
+
+    new_jti = f"{s.refresh_jti}-rotated"
+    result = SessionService(redis_client).rotate_refresh_token(
+        s.principal.id, s.device_ids[0], s.refresh_jti, new_jti,
+        datetime.now(timezone.utc) + timedelta(days=7), "10.0.0.1", "Mozilla/5.0 (X11; Linux x86_64) Firefox/121.0",
+    )
+    assert result == "ok", result
+    s.refresh_jti = new_jti
+
+
+def _sessions():
+    from app.core.redis import redis_client
+    from app.services.session_service import SessionService
+
+    return SessionService(redis_client)
+
+
+def _comments(service, post_id: int, size: int, include_total: bool = False, pages: int = 1) -> list:
+    """Páginas de comentarios con el mapeo del router, siguiendo next_cursor."""
+    from app.mappers.comment_mapper import map_comment_to_response
+
+    cursor, items = None, []
+    for _ in range(pages):
+        page = service.get_comments_by_post(post_id, size, cursor, include_total)
+        items += [map_comment_to_response(c) for c in page["items"]]
+        cursor = page["next_cursor"]
+    return items
+
+
+def _cases():
+    """
+    (servicio.método, máx. sentencias SQL, máx. round trips a Redis, calentar,
+    llamada). Si el servicio devuelve modelos ORM la llamada incluye el mapeo
+    que hace el router: ahí es donde se cargan las relaciones perezosas.
+    """
+    from app.mappers.comment_mapper import map_comment_to_response
+    from app.schemas import CommentCreate, CommentUpdate, UserPublicResponse
+    from app.services.comment_service import CommentService
+    from app.services.follower_service import FollowerService
+    from app.services.like_service import LikeService
+    from app.services.message_service import MessageService
+    from app.services.notification_service import NotificationService
+    from app.services.post_service import PostService
+    from app.services.saved_service import SavedService
+
+    return [
+        # Lecturas
+        ("PostService.get_posts (autor)", 4, 1, False,
+         lambda db, s: PostService(db).get_posts(1, 20, None, s.principal.id, None, None, None, s.principal)),
+        ("PostService.get_posts (cursor)", 3, 1, False,
+         lambda db, s: PostService(db).get_posts(1, 20, None, s.principal.id, None, None, None, s.principal,
+                                                 include_total=False)),
+        ("PostService.get_post", 4, 1, False,
+         lambda db, s: PostService(db).get_post(s.own_post_ids[0], s.principal)),
+        ("PostService.get_feed (timeline)", 3, 2, True,
+         lambda db, s: PostService(db).get_feed(s.principal.id, 1, 20)),
+        ("PostService.get_feed (SQL)", 5, 1, False, _feed_sql),
+        ("MessageService.get_conversations", 1, 0, False,
+         lambda db, s: MessageService(db).get_conversations(s.principal, 20)),
+        ("MessageService.get_messages", 6, 0, False,
+         lambda db, s: MessageService(db).get_messages(s.conversation_ids[0], s.principal, 1, 20)),
+        ("MessageService.get_unread_count", 1, 0, False,
+         lambda db, s: MessageService(db).get_unread_count(s.principal)),
+        ("NotificationService.get_my_notifications", 4, 0, False,
+         lambda db, s: NotificationService(db).get_my_notifications(s.principal, 1, 20)),
+        ("NotificationService.get_unread_count", 1, 0, False,
+         lambda db, s: NotificationService(db).get_unread_count(s.principal)),
+        ("SavedService.get_saved_posts", 5, 1, False,
+         lambda db, s: SavedService(db).get_saved_posts(s.principal, 1, 20)),
+        ("SavedService.check_saved", 1, 0, False,
+         lambda db, s: SavedService(db).check_saved(s.other_post_ids[1], s.principal)),
+        ("CommentService.get_comments_by_post", 3, 0, False,
+         lambda db, s: _comments(CommentService(db), s.own_post_ids[0], 20)),
+        ("CommentService.get_comments_by_post (total)", 3, 1, False,
+         lambda db, s: _comments(CommentService(db), s.own_post_ids[0], 20, include_total=True)),
+        ("CommentService.get_comments_by_post (2 páginas)", 6, 0, False,
+         lambda db, s: _comments(CommentService(db), s.own_post_ids[0], 2, pages=2)),
+        ("FollowerService.get_followers", 1, 0, False,
+         lambda db, s: [UserPublicResponse.model_validate(u) for u in FollowerService(db).get_followers(s.principal.id)]),
+        ("FollowerService.get_following", 1, 0, False,
+         lambda db, s: [UserPublicResponse.model_validate(u) for u in FollowerService(db).get_following(s.principal.id)]),
+        ("SessionService.get_sessions", 0, 2, False,
+         lambda db, s: _sessions().get_sessions(s.principal.id)),
+        ("SessionService.get_metrics_for_user", 0, 2, False,
+         lambda db, s: _sessions().get_metrics_for_user(s.principal.id)),
+        # Escrituras (una vez por usuario, en este orden)
+        ("PostService.create_post", 5, 4, False,
+         lambda db, s: PostService(db).create_post(_post_data("nuevo post"), s.principal)),
+        ("PostService.update_post", 4, 1, False,
+         lambda db, s: PostService(db).update_post(s.own_post_ids[0], _post_data("post editado"), s.principal)),
+        ("PostService.delete_post", 6, 4, False,
+         lambda db, s: PostService(db).delete_post(s.own_post_ids[-1], s.principal)),
+        ("MessageService.get_or_create_conversation", 4, 0, False,
+         lambda db, s: MessageService(db).get_or_create_conversation(s.principal, s.other_ids[0])),
+        ("MessageService.send_message", 5, 1, False,
+         lambda db, s: MessageService(db).send_message(s.conversation_ids[0], s.principal, "¿qué tal?")),
+        ("MessageService.mark_as_read", 5, 0, False,
+         lambda db, s: MessageService(db).mark_as_read(s.conversation_ids[0], s.principal)),
+        ("NotificationService.mark_as_read", 4, 0, False,
+         lambda db, s: NotificationService(db).mark_as_read(s.notification_ids[0], s.principal)),
+        ("NotificationService.mark_all_as_read", 1, 0, False,
+         lambda db, s: NotificationService(db).mark_all_as_read(s.principal)),
+        ("SavedService.save_post", 3, 0, False,
+         lambda db, s: SavedService(db).save_post(s.other_post_ids[0], s.principal)),
+        ("SavedService.unsave_post", 2, 0, False,
+         lambda db, s: SavedService(db).unsave_post(s.other_post_ids[0], s.principal)),
+        ("LikeService.like_post", 4, 3, False,
+         lambda db, s: LikeService(db).like_post(s.other_post_ids[0], s.principal)),
+        ("FollowerService.unfollow_user", 3, 3, False,
+         lambda db, s: FollowerService(db).unfollow_user(s.principal, s.other_ids[0])),
+        ("FollowerService.follow_user", 6, 4, False,
+         lambda db, s: FollowerService(db).follow_user(s.principal, s.other_ids[0])),
+        ("CommentService.create_comment", 5, 2, False,
+         lambda db, s: map_comment_to_response(CommentService(db).create_comment(
+             s.other_post_ids[0], CommentCreate(content="¡Buen post!"), s.principal))),
+        ("CommentService.update_comment", 3, 0, False,
+         lambda db, s: map_comment_to_response(CommentService(db).update_comment(
+             s.comment_ids[0], CommentUpdate(content="editado"), s.principal))),
+        ("CommentService.delete_comment", 3, 1, False,
+         lambda db, s: CommentService(db).delete_comment(s.comment_ids[1], s.principal)),
+        ("SessionService.rotate_refresh_token", 0, 1, False, _rotate),
+        ("SessionService.delete_session", 0, 2, False,
+         lambda db, s: _sessions().delete_session(s.principal.id, s.device_ids[-1])),
+        ("SessionService.delete_all_except", 0, 3, False,
+         lambda db, s: _sessions().delete_all_except(s.principal.id, s.device_ids[0])),
+    ]
+
+
+def measure(fn, subject: Subject, redis_counter: RedisCounter) -> tuple[int, int, int, list]:
+    """Una llamada en su propia sesión y con commit (como get_db): (sentencias, round trips, comandos, repetidas)."""
+    from app.db.query_stats import RequestQueryStats, current_query_stats
+    from app.db.session import SessionLocal
+
+    stats = RequestQueryStats()
+    token = current_query_stats.set(stats)
+    redis_counter.reset()
+    try:
+        with SessionLocal() as db:
+            fn(db, subject)
+            db.commit()
+    finally:
+        current_query_stats.reset(token)
+    return stats.statements, redis_counter.round_trips, redis_counter.commands, stats.suspected_n_plus_one(2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--small", type=int, default=3, help="Elementos por relación del usuario pequeño")
+    parser.add_argument("--large", type=int, default=40, help="Elementos por relación del usuario grande")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar todos los casos y las sentencias repetidas")
+    args = parser.parse_args()
+
+    # Debe sustituirse antes de importar la app (los clientes se crean al importar)
+    import fakeredis
+    import redis
+
+    fake = fakeredis.FakeRedis(decode_responses=True)
+    redis.Redis.from_url = classmethod(lambda cls, *a, **k: fake)
+
+    import app.models  # noqa: F401
+    from app.core.redis import redis_client
+    from app.db.base import Base
+    from app.db.search import install_post_search
+    from app.db.session import SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    install_post_search(engine)
+    with SessionLocal() as db:
+        subjects = [seed_subject(db, redis_client, args.small, "small"), seed_subject(db, redis_client, args.large, "large")]
+    redis_counter = RedisCounter(redis_client)
+
+    failures = 0
+    for name, max_sql, max_redis, warm, fn in _cases():
+        counts = []
+        for subject in subjects:
+            if warm:
+                measure(fn, subject, redis_counter)
+            counts.append(measure(fn, subject, redis_counter))
+        (small_sql, small_rt, small_cmds, _), (large_sql, large_rt, large_cmds, repeated) = counts
+        problems = []
+        if large_sql > max_sql or large_rt > max_redis:
+            problems.append(f"cota {max_sql} SQL / {max_redis} Redis")
+        if large_sql > small_sql or large_rt > small_rt:
+            problems.append(f"crece con el resultado ({small_sql} SQL / {small_rt} Redis con {args.small})")
+        failures += bool(problems)
+        if problems or args.verbose:
+            status = "FALLO" if problems else "ok"
+            print(f"{status:5} {name}: {large_sql} SQL, {large_rt} round trips a Redis ({large_cmds} comandos)"
+                  + (f" — {'; '.join(problems)}" if problems else ""))
+            for statement, count in repeated if (problems or args.verbose) else ():
+                print(f"        {count}x {statement[:160]}")
+    print(f"{len(_cases())} casos, {failures} con fallos")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Comprueba con EXPLAIN QUERY PLAN que las consultas calientes usan índices.
+
+Uso:
+    python -m benchmarks.query_plans --fake-redis
+    python -m benchmarks.query_plans --fake-redis --users 5000 --verbose
+
+Crea una BD SQLite temporal con las migraciones de Alembic (`upgrade head`),
+la llena con datos a escala (--users usuarios y, por usuario, posts,
+seguidos, likes, comentarios, guardados, notificaciones y conversaciones),
+ejecuta ANALYZE y recorre los endpoints de lectura y escritura habituales
+con TestClient. Cada SELECT/UPDATE/DELETE emitido se vuelve a planificar con
+EXPLAIN QUERY PLAN y sus mismos parámetros: un "SCAN <tabla>" sin índice sobre
+una tabla que crece con el uso es un recorrido completo y el script sale con
+código 1. Los recorridos de un índice completo (p. ej. COUNT(*) de todos los
+posts, o el orden por created_at con LIMIT) no cuentan como fallo; los
+ordenamientos en B-tree temporal se muestran con --verbose.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'query_plans.db')}")
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+# Tablas cuyo tamaño crece con el uso: recorrerlas enteras no escala
+LARGE_TABLES = {
+    "users", "posts", "comments", "likes", "follows", "notifications", "saved_posts", "conversations", "messages",
+}
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+PLANNED = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+class QueryCapture:
+    """Guarda (sentencia, parámetros) de cada consulta emitida, agrupadas por etiqueta."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.label = None
+        self.queries = defaultdict(list)
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.label and not executemany and statement.lstrip().upper().startswith(PLANNED):
+            self.queries[self.label].append((statement, parameters))
+
+
+def migrate() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(ALEMBIC_INI), "head")
+
+
+def seed(engine, args) -> None:
+    """Datos sintéticos con inserciones masivas (Core), sin pasar por los servicios."""
+    from sqlalchemy import insert, text
+    from app.models import Comment, Conversation, Follow, Like, Message, Notification, Post, SavedPost, User
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    user_ids = list(range(1, args.users + 1))
+
+    def ago(max_minutes: int) -> datetime:
+        return now - timedelta(minutes=rng.randint(0, max_minutes))
+
+    def sample_others(user_id: int, k: int) -> list[int]:
+        others = rng.sample(user_ids, min(k + 1, len(user_ids)))
+        return [o for o in others if o != user_id][:k]
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "username": f"plan{i}", "email": f"plan{i}@example.com", "hashed_password": "x",
+             "role": "user", "token_version": 0, "created_at": now}
+            for i in user_ids
+        ])
+        posts = [
+            {"title": f"post {i}-{p}", "content": "query plan benchmark " * 5, "image_url": "https://example.com/i.png",
+             "author_id": i, "created_at": ago(60 * 24 * 90), "likes_count": 0, "comments_count": 0}
+            for i in user_ids for p in range(args.posts)
+        ]
+        conn.execute(insert(Post), posts)
+        post_count = len(posts)
+        conn.execute(insert(Follow), [
+            {"follower_id": i, "followed_id": f} for i in user_ids for f in sample_others(i, args.follows)
+        ])
+        conn.execute(insert(Like), [
+            {"user_id": i, "post_id": p}
+            for i in user_ids for p in rng.sample(range(1, post_count + 1), min(args.likes, post_count))
+        ])
+        conn.execute(insert(Comment), [
+            {"content": "comentario", "author_id": i, "post_id": rng.randint(1, post_count), "created_at": ago(60 * 24 * 90)}
+            for i in user_ids for _ in range(args.comments)
+        ])
+        conn.execute(insert(SavedPost), [
+            {"user_id": i, "post_id": p, "saved_at": ago(60 * 24 * 90)}
+            for i in user_ids for p in rng.sample(range(1, post_count + 1), min(args.saved, post_count))
+        ])
+        conn.execute(insert(Notification), [
+            {"recipient_id": i, "actor_id": rng.choice(user_ids), "type": "like", "post_id": rng.randint(1, post_count),
+             "is_read": rng.random() < 0.8, "created_at": ago(60 * 24 * 90)}
+            for i in user_ids for _ in range(args.notifications)
+        ])
+        pairs = {tuple(sorted((i, o))) for i in user_ids for o in sample_others(i, args.conversations)}
+        conversations = [
+            {"id": n, "user1_id": a, "user2_id": b, "created_at": now, "last_message_at": ago(60 * 24 * 30),
+             "user1_unread_count": 0, "user2_unread_count": 0}
+            for n, (a, b) in enumerate(sorted(pairs), start=1)
+        ]
+        conn.execute(insert(Conversation), conversations)
+        conn.execute(insert(Message), [
+            {"conversation_id": c["id"], "sender_id": rng.choice((c["user1_id"], c["user2_id"])), "content": "hola",
+             "is_read": rng.random() < 0.8, "created_at": ago(60 * 24 * 30)}
+            for c in conversations for _ in range(args.messages)
+        ])
+        conn.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+        # Estadísticas para el planificador, como en una BD con datos reales
+        conn.execute(text("ANALYZE"))
+
+
+def walk(client, capture: QueryCapture, headers: dict, other_id: int, own_post_id: int, post_id: int) -> None:
+    """Recorrido típico de la API; cada petición queda etiquetada con su endpoint."""
+    from app.core.config import settings
+
+    def call(label: str, method: str, url: str, **kwargs):
+        capture.label = label
+        response = client.request(method, url, headers=headers, **kwargs)
+        capture.label = None
+        if response.status_code >= 400:
+            raise SystemExit(f"{label}: {response.status_code} {response.text}")
+        return response.json() if response.content else None
+
+    call("GET /posts/", "GET", "/posts/")
+    page = call("GET /posts/?cursor", "GET", "/posts/", params={"size": 10})
+    call("GET /posts/?cursor (2ª página)", "GET", "/posts/", params={"size": 10, "cursor": page["next_cursor"]})
+    call("GET /posts/?order=most_liked", "GET", "/posts/", params={"order": "most_liked"})
+    call("GET /posts/?author_id", "GET", "/posts/", params={"author_id": other_id})
+    call("GET /posts/?search", "GET", "/posts/", params={"search": "benchmark"})
+    call("GET /posts/?since_hours", "GET", "/posts/", params={"since_hours": 24})
+    # Feed: consulta SQL (sin timelines) y reconstrucción de la timeline en Redis
+    settings.FEED_TIMELINES_ENABLED = False
+    call("GET /posts/feed (SQL)", "GET", "/posts/feed")
+    settings.FEED_TIMELINES_ENABLED = True
+    call("GET /posts/feed (timeline)", "GET", "/posts/feed")
+    # El detalle solo lo ve el autor (o un admin)
+    call("GET /posts/{id}", "GET", f"/posts/{own_post_id}")
+    call("POST /posts/{id}/like", "POST", f"/posts/{post_id}/like")
+    call("DELETE /posts/{id}/like", "DELETE", f"/posts/{post_id}/like")
+    comment = call("POST /comments/{post_id}", "POST", f"/comments/{post_id}", json={"content": "Buen post"})
+    call("GET /comments/post/{post_id}", "GET", f"/comments/post/{post_id}")
+    call("DELETE /comments/{id}", "DELETE", f"/comments/{comment['id']}")
+    call("GET /users/{id}/stats", "GET", f"/users/{other_id}/stats")
+    call("POST /saved/{post_id}", "POST", f"/saved/{post_id}")
+    call("GET /saved/", "GET", "/saved/")
+    call("GET /saved/{post_id}/check", "GET", f"/saved/{post_id}/check")
+    call("DELETE /saved/{post_id}", "DELETE", f"/saved/{post_id}")
+    call("GET /notifications/", "GET", "/notifications/")
+    call("GET /notifications/unread-count", "GET", "/notifications/unread-count")
+    call("PATCH /notifications/read-all", "PATCH", "/notifications/read-all")
+    call("GET /messages/conversations", "GET", "/messages/conversations")
+    call("GET /messages/unread-count", "GET", "/messages/unread-count")
+    conversation = call("POST /messages/conversations/{user_id}", "POST", f"/messages/conversations/{other_id}")
+    call("POST /messages/conversations/{id}/send", "POST", f"/messages/conversations/{conversation['id']}/send",
+         json={"content": "Hola!"})
+    call("GET /messages/conversations/{id}/messages", "GET", f"/messages/conversations/{conversation['id']}/messages")
+    call("PATCH /messages/conversations/{id}/read", "PATCH", f"/messages/conversations/{conversation['id']}/read")
+
+
+def explain(engine, statement: str, parameters) -> list[str]:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fake-redis", action="store_true", help="Usar fakeredis en lugar de REDIS_URL")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--posts", type=int, default=10, help="Posts por usuario")
+    parser.add_argument("--follows", type=int, default=50, help="Cuentas seguidas por usuario")
+    parser.add_argument("--likes", type=int, default=30, help="Likes por usuario")
+    parser.add_argument("--comments", type=int, default=10, help="Comentarios por usuario")
+    parser.add_argument("--saved", type=int, default=10, help="Posts guardados por usuario")
+    parser.add_argument("--notifications", type=int, default=50, help="Notificaciones por usuario")
+    parser.add_argument("--conversations", type=int, default=5, help="Conversaciones por usuario")
+    parser.add_argument("--messages", type=int, default=20, help="Mensajes por conversación")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar el plan de cada consulta")
+    args = parser.parse_args()
+
+    if args.fake_redis:
+        # Debe sustituirse antes de importar la app (el cliente se crea al importar)
+        import fakeredis
+        import redis
+
+        fake = fakeredis.FakeRedis(decode_responses=True)
+        redis.Redis.from_url = classmethod(lambda cls, *a, **k: fake)
+
+    from fastapi.testclient import TestClient
+    from app.auth.auth_handler import create_access_token, token_claims
+    from app.db.session import SessionLocal, engine
+    from app.main import app
+    from app.models import Post, User
+
+    migrate()
+    seed(engine, args)
+    with SessionLocal() as db:
+        user = db.get(User, 1)
+        headers = {"Authorization": f"Bearer {create_access_token(token_claims(user))}"}
+        other_id = db.query(User.id).filter(User.id != user.id).first()[0]
+        own_post_id = db.query(Post.id).filter(Post.author_id == user.id).first()[0]
+        post_id = db.query(Post.id).filter(Post.author_id == other_id).first()[0]
+
+    capture = QueryCapture(engine)
+    walk(TestClient(app), capture, headers, other_id, own_post_id, post_id)
+
+    failures = 0
+    for label, queries in capture.queries.items():
+        print(f"{label} ({len(queries)} consultas)")
+        for statement, parameters in queries:
+            plan = explain(engine, statement, parameters)
+            scans = [m.group(1) for m in map(FULL_SCAN.match, plan) if m and m.group(1) in LARGE_TABLES]
+            if scans:
+                failures += 1
+                print(f"  FULL SCAN {', '.join(scans)}: {' '.join(statement.split())[:200]}")
+            if scans or args.verbose:
+                for detail in plan:
+                    print(f"      {detail}")
+    print(f"{failures} consultas con recorrido completo")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
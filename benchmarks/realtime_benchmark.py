@@ -0,0 +1,165 @@
+"""
+Prueba de carga del gateway en tiempo real: conexiones por worker y latencia de fan-out.
+
+Dos modos:
+    --fake-redis      -> N hubs (uno por "worker") en este proceso sobre un
+                         fakeredis compartido; mide el reparto pub/sub -> cola
+                         de cada conexión sin servidor.
+    --url ws://...    -> contra un servidor real con varios workers
+                         (requiere `pip install websockets`, Redis y el mismo
+                         SECRET_KEY/REDIS_URL que el servidor).
+
+Uso:
+    python -m benchmarks.realtime_benchmark --fake-redis --workers 4 --connections 2000
+    uvicorn app.main:app --workers 4 &
+    python -m benchmarks.realtime_benchmark --url ws://localhost:8000 --connections 2000
+
+Cada conexión pertenece a un usuario (--users, repartidos en round robin). Se
+publican --events eventos a todos los usuarios con RealtimePublisher y se mide
+la latencia publicación -> recepción por conexión y el tiempo hasta que el
+evento llega a todas (fan-out). El reparto por worker sale del mensaje
+"hello" que envía el servidor al conectar.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'realtime_bench.db')}")
+
+from app.services.realtime_service import RealtimeHub, RealtimePublisher  # noqa: E402
+
+
+def _percentiles(samples: list[float]) -> dict:
+    if len(samples) < 2:
+        return {}
+    q = statistics.quantiles(sorted(samples), n=100, method="inclusive")
+    return {
+        "p50_ms": round(q[49] * 1000, 3),
+        "p95_ms": round(q[94] * 1000, 3),
+        "p99_ms": round(q[98] * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+async def _open_fake(args):
+    """Conexiones simuladas: colas de N hubs independientes (una suscripción pub/sub cada uno)."""
+    import fakeredis
+    from fakeredis import aioredis
+
+    server = fakeredis.FakeServer()
+    hubs = [RealtimeHub(redis=aioredis.FakeRedis(server=server, decode_responses=True), queue_size=args.events + 10)
+            for _ in range(args.workers)]
+    connections = []
+    for i in range(args.connections):
+        hub = hubs[i % len(hubs)]
+        queue = await hub.connect(i % args.users + 1)
+        connections.append((hub.worker_id, queue.get))
+
+    async def close():
+        for hub in hubs:
+            await hub.stop()
+
+    publisher = RealtimePublisher(redis=fakeredis.FakeRedis(server=server, decode_responses=True))
+    return connections, publisher, close
+
+
+async def _open_server(args):
+    """Conexiones WebSocket reales contra --url."""
+    import websockets
+
+    from app.auth.auth_handler import create_access_token
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def open_one(i):
+        user_id = i % args.users + 1
+        token = create_access_token({"sub": f"bench{user_id}@example.com", "user_id": user_id})
+        async with semaphore:
+            ws = await websockets.connect(f"{args.url}/realtime/ws?token={token}", max_queue=None)
+            hello = json.loads(await ws.recv())
+        return hello["data"]["worker"], ws
+
+    opened = await asyncio.gather(*(open_one(i) for i in range(args.connections)))
+    connections = [(worker, ws.recv) for worker, ws in opened]
+
+    async def close():
+        await asyncio.gather(*(ws.close() for _, ws in opened), return_exceptions=True)
+
+    return connections, RealtimePublisher(), close
+
+
+async def run(args) -> dict:
+    started = time.perf_counter()
+    connections, publisher, close = await (_open_fake(args) if args.fake_redis else _open_server(args))
+    connect_seconds = time.perf_counter() - started
+
+    latencies = []
+    received = {}  # seq -> [recepciones, última llegada]
+
+    async def consume(recv):
+        got = 0
+        while got < args.events:
+            event = json.loads(await recv())
+            if event.get("type") != "bench":
+                continue
+            now = time.time()
+            data = event["data"]
+            latencies.append(now - data["sent_at"])
+            entry = received.setdefault(data["seq"], [0, 0.0])
+            entry[0] += 1
+            entry[1] = max(entry[1], now - data["sent_at"])
+            got += 1
+
+    consumers = [asyncio.create_task(consume(recv)) for _, recv in connections]
+    user_ids = list(range(1, args.users + 1))
+    # Deja que los hubs procesen las suscripciones antes de publicar
+    await asyncio.sleep(0.5)
+    for seq in range(args.events):
+        data = {"seq": seq, "sent_at": time.time()}
+        await asyncio.to_thread(publisher.publish, user_ids, "bench", data)
+        await asyncio.sleep(args.interval)
+
+    _, pending = await asyncio.wait(consumers, timeout=args.timeout)
+    for task in pending:
+        task.cancel()
+    await close()
+
+    expected = len(connections) * args.events
+    return {
+        "connections": len(connections),
+        "connections_per_worker": dict(Counter(worker for worker, _ in connections)),
+        "connect_seconds": round(connect_seconds, 3),
+        "events": args.events,
+        "delivered": len(latencies),
+        "lost": expected - len(latencies),
+        "delivery_latency": _percentiles(latencies),
+        "fanout_latency": _percentiles([entry[1] for entry in received.values()]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--fake-redis", action="store_true", help="Hubs simulados en proceso con fakeredis")
+    target.add_argument("--url", help="Servidor a probar, p. ej. ws://localhost:8000")
+    parser.add_argument("--workers", type=int, default=4, help="Hubs simulados (solo --fake-redis)")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.05, help="Segundos entre eventos")
+    parser.add_argument("--concurrency", type=int, default=100, help="Conexiones abriéndose a la vez (--url)")
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
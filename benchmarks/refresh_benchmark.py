@@ -0,0 +1,166 @@
+"""
+Benchmark de la rotación de refresh tokens (POST /auth/refresh) en Redis.
+
+Compara dos caminos:
+    legacy  -> el anterior: GET/DEL/SETEX del refresh token + GET/SET de la
+               sesión + DEL/SET del jti, cada uno en su propio round trip
+    atomic  -> SessionService.rotate_refresh_token (un único EVALSHA)
+
+Uso:
+    python -m benchmarks.refresh_benchmark --sessions 200 --rotations 20
+    python -m benchmarks.refresh_benchmark --fake-redis --rtt-ms 0.3   # fakeredis (requiere lupa para Lua)
+
+Mide refresh/s en serie y lanza "tormentas": --storm-workers hilos refrescan a
+la vez el mismo token. Cada tormenta debe tener exactamente un ganador; si hay
+más, el mismo refresh token se canjeó por varios tokens válidos (race).
+fakeredis no tiene latencia de red: --rtt-ms añade una espera por comando para
+simular el round trip (y las intercalaciones entre hilos que provoca).
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from app.auth.auth_handler import refresh_token_key  # noqa: E402
+from app.services.session_service import SessionService  # noqa: E402
+
+IP = "10.0.0.1"
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) Chrome/120.0"
+
+
+def _with_rtt(redis, rtt: float) -> None:
+    """Cada comando espera `rtt` segundos antes de ejecutarse (libera el GIL, como un socket)."""
+    execute = redis.execute_command
+
+    def execute_command(*args, **options):
+        time.sleep(rtt)
+        return execute(*args, **options)
+
+    redis.execute_command = execute_command
+
+
+def _legacy_rotate(service: SessionService, user_id: int, device_id: str, old_jti: str, new_jti: str,
+                   expires_at: datetime) -> str:
+    """Réplica de la secuencia anterior de /auth/refresh (sin los chequeos de IP/UA)."""
+    redis = service.redis
+    ttl = int((expires_at - datetime.now(timezone.utc)).total_seconds())
+    if not redis.get(refresh_token_key(old_jti)):                     # decode_refresh_token
+        return "revoked"
+    redis.delete(refresh_token_key(old_jti))                         # revoke_refresh_token
+    redis.setex(refresh_token_key(new_jti), ttl, str(user_id))       # create_refresh_token
+    key = service._session_key(user_id, device_id)
+    raw = redis.get(key)                                             # update_jti_for_session
+    if not raw:
+        redis.delete(refresh_token_key(new_jti))
+        return "no_session"
+    session = json.loads(raw)
+    if session.get("jti") != old_jti:
+        redis.delete(key)
+        redis.delete(refresh_token_key(new_jti))
+        return "reused"
+    now = datetime.now(timezone.utc).isoformat()
+    session.update(jti=new_jti, expires_at=expires_at.isoformat(), last_access=now, last_refresh_at=now,
+                   refresh_count=session.get("refresh_count", 0) + 1)
+    redis.set(key, json.dumps(session), ex=ttl)
+    redis.delete(f"refresh_jti:{old_jti}")
+    redis.set(f"refresh_jti:{new_jti}", device_id, ex=ttl)
+    return "ok"
+
+
+def rotate(mode: str, service: SessionService, user_id: int, device_id: str, old_jti: str) -> tuple[str, str]:
+    new_jti = str(uuid.uuid4())
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    if mode == "legacy":
+        return _legacy_rotate(service, user_id, device_id, old_jti, new_jti, expires_at), new_jti
+    result = service.rotate_refresh_token(user_id, device_id, old_jti, new_jti, expires_at, IP, USER_AGENT)
+    return result, new_jti
+
+
+def _login(mode: str, service: SessionService, user_id: int, device_id: str) -> str:
+    jti = str(uuid.uuid4())
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    if mode == "legacy":
+        # Sesión en el formato anterior (string JSON)
+        ttl = int((expires_at - datetime.now(timezone.utc)).total_seconds())
+        session = service.expand(user_id, device_id, {"j": jti})
+        service.redis.set(service._session_key(user_id, device_id), json.dumps(session), ex=ttl)
+        service.redis.set(refresh_token_key(jti), str(user_id), ex=ttl)
+        service.redis.set(f"refresh_jti:{jti}", device_id, ex=ttl)
+        return jti
+    service.create_session(user_id, device_id, jti, IP, USER_AGENT, expires_at)
+    return jti
+
+
+def run_mode(mode: str, redis, args) -> dict:
+    redis.flushdb()
+    service = SessionService(redis)
+
+    # Throughput: cada sesión rota su token --rotations veces
+    jtis = {user_id: _login(mode, service, user_id, "device") for user_id in range(1, args.sessions + 1)}
+    started = time.perf_counter()
+    for _ in range(args.rotations):
+        for user_id, jti in jtis.items():
+            result, jtis[user_id] = rotate(mode, service, user_id, "device", jti)
+            assert result == "ok", result
+    elapsed = time.perf_counter() - started
+    total = args.sessions * args.rotations
+
+    # Tormentas: varios hilos canjean a la vez el mismo refresh token
+    double_issued = 0
+    for storm in range(args.storms):
+        user_id = 1_000_000 + storm
+        jti = _login(mode, service, user_id, "device")
+        barrier = threading.Barrier(args.storm_workers)
+        winners = []
+
+        def refresh():
+            barrier.wait()
+            result, new_jti = rotate(mode, service, user_id, "device", jti)
+            if result == "ok":
+                winners.append(new_jti)
+
+        threads = [threading.Thread(target=refresh) for _ in range(args.storm_workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if len(winners) > 1:
+            double_issued += 1
+
+    return {
+        "refresh_per_second": round(total / elapsed, 1),
+        "avg_ms": round(elapsed / total * 1000, 3),
+        "storms": args.storms,
+        "storms_with_multiple_winners": double_issued,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--rotations", type=int, default=20)
+    parser.add_argument("--storms", type=int, default=200)
+    parser.add_argument("--storm-workers", type=int, default=8)
+    parser.add_argument("--fake-redis", action="store_true")
+    parser.add_argument("--rtt-ms", type=float, default=0, help="Latencia simulada por comando (con --fake-redis)")
+    args = parser.parse_args()
+
+    if args.fake_redis:
+        import fakeredis
+        redis = fakeredis.FakeRedis(decode_responses=True)
+        if args.rtt_ms:
+            _with_rtt(redis, args.rtt_ms / 1000)
+    else:
+        from app.core.redis import redis_client as redis
+
+    results = {mode: run_mode(mode, redis, args) for mode in ("legacy", "atomic")}
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Coste de la comprobación de revocación de access tokens (decode_access_token).
+
+Compara tres caminos:
+    legacy      -> el anterior: EXISTS blacklist:{token} antes de verificar la firma
+    redis_jti   -> EXISTS revoked:{jti} en cada petición (copia local desactivada
+                   o sin sincronizar)
+    local       -> copia local sincronizada por pub/sub: sin Redis en el caso
+                   habitual
+
+Uso:
+    python -m benchmarks.revocation_benchmark --fake-redis --rtt-ms 0.3
+    python -m benchmarks.revocation_benchmark --url redis://localhost:6379/15
+
+Mide la latencia por petición y los comandos Redis por petición. Con un Redis
+real (--url, MEMORY USAGE no existe en fakeredis) mide además la memoria por
+token revocado con cada esquema de clave; vacía la base indicada.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from jose import jwt  # noqa: E402
+
+from app.auth import auth_handler  # noqa: E402
+from app.auth.revocation import RevocationList  # noqa: E402
+
+
+class _CountingRedis:
+    """Cuenta comandos y simula `rtt` segundos de round trip por comando o pipeline."""
+
+    def __init__(self, redis, rtt: float):
+        self.rtt = rtt
+        self.commands = 0
+        execute = redis.execute_command
+
+        def execute_command(*args, **options):
+            self.commands += 1
+            if self.rtt:
+                time.sleep(self.rtt)
+            return execute(*args, **options)
+
+        redis.execute_command = execute_command
+
+
+def _legacy_decode(redis, token: str) -> dict:
+    """Réplica del decode_access_token anterior."""
+    if redis.exists(f"blacklist:{token}"):
+        raise ValueError("revoked")
+    return jwt.decode(token, auth_handler.SECRET_KEY, algorithms=[auth_handler.ALGORITHM])
+
+
+def _percentiles(samples: list[float]) -> dict:
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "mean_us": round(statistics.fmean(samples) * 1e6, 1),
+        "p50_us": round(q[49] * 1e6, 1),
+        "p95_us": round(q[94] * 1e6, 1),
+    }
+
+
+def run_mode(mode: str, redis, counting: _CountingRedis, tokens: list[str], args) -> dict:
+    revocations = RevocationList(redis=redis, enabled=mode == "local")
+    revocations.start()
+    while mode == "local" and not revocations.synced:
+        time.sleep(0.01)
+    auth_handler.revocation_list = revocations
+
+    counting.commands = 0
+    latencies = []
+    for i in range(args.requests):
+        token = tokens[i % len(tokens)]
+        started = time.perf_counter()
+        if mode == "legacy":
+            _legacy_decode(redis, token)
+        else:
+            auth_handler.decode_access_token(token)
+        latencies.append(time.perf_counter() - started)
+    revocations.stop()
+    return {**_percentiles(latencies), "redis_commands_per_request": round(counting.commands / args.requests, 3)}
+
+
+def measure_memory(redis, args) -> dict:
+    """Bytes por token revocado con blacklist:{token} frente a revoked:{jti}."""
+    results = {}
+    exp = datetime.now(timezone.utc) + timedelta(minutes=auth_handler.ACCESS_TOKEN_EXPIRE_MINUTES)
+    for scheme in ("blacklist_token", "revoked_jti"):
+        redis.flushdb()
+        revocations = RevocationList(redis=redis, enabled=False)
+        pipe = redis.pipeline(transaction=False)
+        for i in range(args.revoked):
+            if scheme == "blacklist_token":
+                token = auth_handler.create_access_token({"sub": f"user{i}@example.com", "user_id": i})
+                pipe.set(f"blacklist:{token}", "revoked", ex=3600)
+            else:
+                revocations.revoke(uuid.uuid4().hex, int(exp.timestamp()))
+        pipe.execute()
+        total = sum(redis.memory_usage(key, samples=0) or 0 for key in redis.scan_iter(count=1000))
+        results[scheme] = {
+            "bytes_per_revoked_token": round(total / args.revoked, 1),
+            "mb_per_million": round(total / args.revoked * 1_000_000 / 1024 ** 2, 1),
+        }
+    redis.flushdb()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--revoked", type=int, default=10000, help="Tokens revocados para medir memoria (--url)")
+    parser.add_argument("--fake-redis", action="store_true")
+    parser.add_argument("--url", help="Redis real para medir también la memoria")
+    parser.add_argument("--rtt-ms", type=float, default=0, help="Latencia simulada por comando (con --fake-redis)")
+    args = parser.parse_args()
+
+    if args.fake_redis:
+        import fakeredis
+        redis = fakeredis.FakeRedis(decode_responses=True)
+    else:
+        from redis import Redis
+        redis = Redis.from_url(args.url or auth_handler.settings.REDIS_URL, decode_responses=True)
+    counting = _CountingRedis(redis, args.rtt_ms / 1000 if args.fake_redis else 0)
+
+    tokens = [auth_handler.create_access_token({"sub": f"user{i}@example.com", "user_id": i}) for i in range(100)]
+    # Algunas revocaciones vivas, como en producción
+    revocations = RevocationList(redis=redis, enabled=False)
+    for _ in range(100):
+        revocations.revoke(uuid.uuid4().hex, int(time.time()) + 3600)
+
+    results = {mode: run_mode(mode, redis, counting, tokens, args) for mode in ("legacy", "redis_jti", "local")}
+    if not args.fake_redis:
+        results["memory"] = measure_memory(redis, args)
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark de búsqueda de posts: ILIKE (ruta anterior) vs índice full-text.
+
+Uso:
+    python -m benchmarks.search_benchmark --posts 1000000 --queries 200
+
+Genera una BD SQLite temporal con posts sintéticos, instala el índice FTS5
+y mide la latencia (p50/p95/p99) de la primera página de resultados.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, or_, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.search import install_post_search
+from app.models import Post  # noqa: F401  (registra todos los modelos)
+from app.repositories.post_repository import PostRepository
+
+VOCABULARY = (
+    "python fastapi redis sqlalchemy docker kubernetes rust golang typescript angular "
+    "react vue postgres sqlite async await thread pool cache index query latency "
+    "deploy backend frontend api rest graphql websocket jwt token session bcrypt "
+    "microservicios arquitectura despliegue rendimiento pruebas seguridad comunidad"
+).split()
+
+
+def _random_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def seed(engine, posts: int, batch: int = 10_000) -> None:
+    rng = random.Random(42)
+    base_date = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, username, email, hashed_password, role) "
+            "VALUES (1, 'bench', 'bench@example.com', 'x', 'user')"
+        ))
+        for start in range(0, posts, batch):
+            rows = [
+                {
+                    "title": _random_text(rng, 6),
+                    "content": _random_text(rng, rng.randint(30, 300)),
+                    "image_url": "https://example.com/img.png",
+                    "created_at": base_date + timedelta(seconds=i),
+                }
+                for i in range(start, min(start + batch, posts))
+            ]
+            conn.execute(text(
+                "INSERT INTO posts (title, content, image_url, created_at, updated_at, "
+                "likes_count, comments_count, author_id) "
+                "VALUES (:title, :content, :image_url, :created_at, :created_at, 0, 0, 1)"
+            ), rows)
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    q = statistics.quantiles(ordered, n=100)
+    return {
+        "p50_ms": round(q[49] * 1000, 3),
+        "p95_ms": round(q[94] * 1000, 3),
+        "p99_ms": round(q[98] * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+    }
+
+
+def run(posts: int, queries: int, size: int) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "search_bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    t0 = time.perf_counter()
+    seed(engine, posts)
+    install_post_search(engine)
+    build_seconds = time.perf_counter() - t0
+
+    Session = sessionmaker(bind=engine)
+    rng = random.Random(7)
+    terms = [rng.choice(VOCABULARY)[: rng.randint(3, 6)] for _ in range(queries)]
+
+    ilike_samples, fts_samples = [], []
+    with Session() as db:
+        repo = PostRepository(db)
+        for term in terms:
+            t = time.perf_counter()
+            query = db.query(Post).filter(
+                or_(Post.title.ilike(f"%{term}%"), Post.content.ilike(f"%{term}%"))
+            )
+            query.count()
+            query.order_by(Post.created_at.desc()).limit(size).all()
+            ilike_samples.append(time.perf_counter() - t)
+
+            t = time.perf_counter()
+            repo.get_paginated_posts(page=1, size=size, search=term, order="relevance")
+            fts_samples.append(time.perf_counter() - t)
+
+    return {
+        "posts": posts,
+        "queries": queries,
+        "page_size": size,
+        "seed_and_index_seconds": round(build_seconds, 2),
+        "ilike": _percentiles(ilike_samples),
+        "fulltext": _percentiles(fts_samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--size", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.posts, args.queries, args.size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Memoria de Redis por sesión: formato JSON anterior vs hash compacto.
+
+Uso:
+    python -m benchmarks.session_memory --sessions 10000
+    python -m benchmarks.session_memory --url redis://localhost:6380/0
+
+Necesita un Redis real (MEMORY USAGE no existe en fakeredis) y vacía la base
+indicada: usar una instancia o db de pruebas. Crea --sessions sesiones con el
+formato anterior (JSON + refresh_token:{jti} + refresh_jti:{jti}), mide, las
+convierte con app.commands.migrate_sessions, vuelve a medir, y repite con
+sesiones creadas directamente por SessionService.create_session tras una
+rotación (campos de auditoría rellenos). Extrapola a un millón de sesiones.
+
+Los hashes con valores de más de hash-max-listpack-value bytes (64 por
+defecto; los User-Agent suelen pasar de 100) dejan de ser listpack; el
+informe incluye la codificación resultante y la configuración del servidor.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from redis import Redis  # noqa: E402
+
+from app.commands.migrate_sessions import migrate  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.services.session_service import SessionService  # noqa: E402
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36",
+]
+
+
+def _sample(rng: random.Random, i: int) -> dict:
+    ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+    user_agent = rng.choice(USER_AGENTS)
+    return {
+        "user_id": i // 3 + 1,
+        "device_id": hashlib.sha256(f"{ip}-{user_agent}-{i}".encode()).hexdigest(),
+        "jti": str(uuid.uuid4()),
+        "ip": ip,
+        "user_agent": user_agent,
+    }
+
+
+def _legacy_write(redis, service: SessionService, sample: dict, expires_at: datetime) -> None:
+    """Réplica del create_session anterior: JSON completo + dos claves por jti."""
+    session = service.expand(sample["user_id"], sample["device_id"], {})
+    now = datetime.now(timezone.utc).isoformat()
+    session.update(
+        jti=sample["jti"], os="Windows", browser="Chrome", device_type="desktop", trust_level="medium",
+        initial_ip=sample["ip"], initial_user_agent=sample["user_agent"],
+        last_ip=sample["ip"], last_user_agent=sample["user_agent"], last_access=now,
+        device_trust_score=50, created_at=now, expires_at=expires_at.isoformat(),
+    )
+    ttl = int((expires_at - datetime.now(timezone.utc)).total_seconds())
+    redis.set(f"session:{sample['user_id']}:{sample['device_id']}", json.dumps(session), ex=ttl)
+    redis.set(f"refresh_token:{sample['jti']}", str(sample["user_id"]), ex=ttl)
+    redis.set(f"refresh_jti:{sample['jti']}", sample["device_id"], ex=ttl)
+
+
+def measure(redis, sessions: int) -> dict:
+    totals = {}
+    encodings = {}
+    for key in redis.scan_iter(count=1000):
+        prefix = key.split(":", 1)[0]
+        totals[prefix] = totals.get(prefix, 0) + (redis.memory_usage(key, samples=0) or 0)
+        if prefix == "session" and prefix not in encodings:
+            encodings[prefix] = redis.object("encoding", key)
+    per_session = sum(totals.values()) / sessions
+    return {
+        "bytes_per_session": round(per_session, 1),
+        "by_prefix_per_session": {prefix: round(total / sessions, 1) for prefix, total in sorted(totals.items())},
+        "mb_per_million_sessions": round(per_session * 1_000_000 / 1024 ** 2, 1),
+        "session_encoding": encodings.get("session"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.REDIS_URL)
+    parser.add_argument("--sessions", type=int, default=10000)
+    args = parser.parse_args()
+
+    redis = Redis.from_url(args.url, decode_responses=True)
+    service = SessionService(redis)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    rng = random.Random(42)
+    samples = [_sample(rng, i) for i in range(args.sessions)]
+    results = {}
+
+    redis.flushdb()
+    pipe = redis.pipeline(transaction=False)
+    for sample in samples:
+        _legacy_write(pipe, service, sample, expires_at)
+    pipe.execute()
+    results["json"] = measure(redis, args.sessions)
+
+    migrate(service, batch_size=1000)
+    results["json_migrated_to_hash"] = measure(redis, args.sessions)
+
+    redis.flushdb()
+    for sample in samples:
+        service.create_session(sample["user_id"], sample["device_id"], sample["jti"], sample["ip"],
+                               sample["user_agent"], expires_at)
+        service.rotate_refresh_token(sample["user_id"], sample["device_id"], sample["jti"], str(uuid.uuid4()),
+                                     expires_at, sample["ip"], sample["user_agent"])
+    results["hash_after_refresh"] = measure(redis, args.sessions)
+    redis.flushdb()
+
+    config = {**redis.config_get("hash-max-*-value"), **redis.config_get("hash-max-*-entries")}
+    print(json.dumps({"config": {**vars(args), "server": config}, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
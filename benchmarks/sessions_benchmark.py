@@ -0,0 +1,171 @@
+"""
+GET /auth/sessions con peticiones concurrentes: endpoint async (redis.asyncio,
+sin hilos del threadpool) frente al camino síncrono anterior (`def` +
+get_current_user + SessionService, todo en el threadpool).
+
+Uso:
+    python -m benchmarks.sessions_benchmark --url redis://localhost:6379/15
+    python -m benchmarks.sessions_benchmark --url redis://localhost:6379/15 --concurrency 200
+    python -m benchmarks.sessions_benchmark --url redis://localhost:6379/15 --busy-threads 36
+
+Necesita un Redis real (la ventaja del cliente async es no bloquear un hilo
+mientras espera la red) y vacía la base indicada. Crea --users usuarios con
+--sessions sesiones cada uno y lanza --concurrency clientes en este proceso
+(ASGI, sin HTTP) contra cada variante durante --duration segundos.
+--busy-threads mantiene ocupados ese número de hilos del threadpool de AnyIO
+(40 por defecto) durante la medición, como logins esperando a bcrypt o
+consultas lentas. Informa peticiones/s, p50/p99 y el máximo de hilos del
+threadpool que llegan a ocupar las peticiones.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'sessions_bench.db')}")
+
+
+def _percentiles(samples: list[float]) -> dict:
+    if len(samples) < 2:
+        return {"requests": len(samples)}
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "requests": len(samples),
+        "p50_ms": round(q[49] * 1000, 2),
+        "p99_ms": round(q[98] * 1000, 2),
+    }
+
+
+def build_apps():
+    """Dos apps con la misma ruta: el endpoint async actual y una réplica del síncrono anterior."""
+    from fastapi import Depends, FastAPI, Request
+    from app.auth import auth_routes
+    from app.core.dependencies import get_current_user
+    from app.models.session import SessionOut
+    from app.services.user_cache import UserPrincipal
+    from app.utils.device import generate_device_id
+
+    def get_sessions_sync(request: Request, current_user: UserPrincipal = Depends(get_current_user)):
+        current_device_id = generate_device_id(request)
+        sessions = auth_routes.session_service.get_sessions(current_user.id)
+        return {"sessions": [SessionOut.from_redis_hash(s, current_device_id) for s in sessions]}
+
+    sync_app = FastAPI()
+    sync_app.add_api_route("/auth/sessions", get_sessions_sync)
+    async_app = FastAPI()
+    async_app.add_api_route("/auth/sessions", auth_routes.get_sessions)
+    return {"sync": sync_app, "async": async_app}
+
+
+def seed(args) -> list[str]:
+    from app.auth.auth_handler import create_access_token, token_claims
+    from app.core.redis import redis_client
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    from app.models import user  # noqa: F401
+    from app.models.user import User
+    from app.services.session_service import SessionService
+
+    redis_client.flushdb()
+    Base.metadata.create_all(bind=engine)
+    service = SessionService(redis_client)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    tokens = []
+    with SessionLocal() as db:
+        users = [User(username=f"sessions{i}", email=f"sessions{i}@example.com", hashed_password="x", role="user")
+                 for i in range(args.users)]
+        db.add_all(users)
+        db.commit()
+        for u in users:
+            for d in range(args.sessions):
+                service.create_session(u.id, f"device-{d}", f"jti-{u.id}-{d}", "10.0.0.1",
+                                       "Mozilla/5.0 (X11; Linux x86_64) Firefox/121.0", expires_at)
+            tokens.append(create_access_token(token_claims(u)))
+    return tokens
+
+
+async def run_variant(app, tokens: list[str], args) -> dict:
+    import anyio.to_thread
+    import httpx
+    from fastapi.concurrency import run_in_threadpool
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    latencies: list[float] = []
+    errors = Counter()
+    peak_threads = 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        # Calentamiento: caché de usuarios y conexiones de los pools
+        for token in tokens:
+            (await client.get("/auth/sessions", headers={"Authorization": f"Bearer {token}"})).raise_for_status()
+
+        release = threading.Event()
+        busy = [asyncio.create_task(run_in_threadpool(release.wait)) for _ in range(args.busy_threads)]
+        await asyncio.sleep(0.1)
+        deadline = time.perf_counter() + args.duration
+
+        async def client_loop(i: int):
+            headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}", "X-Device-ID": "device-0"}
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get("/auth/sessions", headers=headers)
+                if time.perf_counter() > deadline:
+                    break
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors[response.status_code] += 1
+
+        async def sample_threads():
+            nonlocal peak_threads
+            while time.perf_counter() < deadline:
+                peak_threads = max(peak_threads, int(limiter.borrowed_tokens))
+                await asyncio.sleep(0.005)
+
+        clients = [asyncio.create_task(client_loop(i)) for i in range(args.concurrency)]
+        sampler = asyncio.create_task(sample_threads())
+        await asyncio.sleep(args.duration)
+        # Libera los hilos ocupados para que terminen las peticiones en espera
+        release.set()
+        await asyncio.gather(*clients, *busy, sampler)
+
+    return {
+        "requests_per_second": round(len(latencies) / args.duration, 1),
+        **_percentiles(latencies),
+        "errors": dict(errors),
+        # Sin contar los de --busy-threads
+        "peak_request_threads": max(0, peak_threads - args.busy_threads),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True, help="Redis de pruebas (se vacía), p. ej. redis://localhost:6379/15")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=3, help="Sesiones por usuario")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=5, help="Segundos por variante")
+    parser.add_argument("--busy-threads", type=int, default=0, help="Hilos del threadpool ocupados durante la medición")
+    args = parser.parse_args()
+
+    # Los clientes de Redis se crean al importar la app
+    os.environ["REDIS_URL"] = args.url
+    tokens = seed(args)
+    apps = build_apps()
+
+    async def run_all():
+        return {name: await run_variant(app, tokens, args) for name, app in apps.items()}
+
+    results = asyncio.run(run_all())
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Lecturas y escrituras concurrentes sobre SQLite con cada configuración:
+    default       -> sin PRAGMAs (journal de rollback, synchronous=FULL)
+    performance   -> SQLITE_PROFILE=performance (WAL, synchronous=NORMAL, busy_timeout...)
+    write_queue   -> performance + cola de un solo escritor (SQLITE_WRITE_QUEUE_ENABLED)
+
+Uso:
+    python -m benchmarks.sqlite_profile_benchmark --url redis://localhost:6379/15
+    python -m benchmarks.sqlite_profile_benchmark --url redis://localhost:6379/15 --writers 32 --sql-counters
+
+Cada configuración usa una BD nueva con --users usuarios y --posts posts.
+Durante --duration segundos, --readers hilos listan GET /posts/ (PostService)
+y --writers hilos alternan like/unlike y comentarios sobre los --hot-posts
+posts más recientes, cada operación con su sesión y su commit como en get_db.
+--sql-counters aplica likes_count/comments_count en SQL (sin write-behind),
+con lo que cada escritura actualiza además la fila del post. Informa
+operaciones/s, p50/p99 y errores (p. ej. "database is locked") por tipo.
+Necesita un Redis real, que se vacía (contadores, trending, notificaciones).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+VARIANTS = {
+    "default": ("default", False),
+    "performance": ("performance", False),
+    "write_queue": ("performance", True),
+}
+
+
+def _percentiles(samples: list[float]) -> dict:
+    if len(samples) < 2:
+        return {"operations": len(samples)}
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "operations": len(samples),
+        "p50_ms": round(q[49] * 1000, 2),
+        "p99_ms": round(q[98] * 1000, 2),
+    }
+
+
+def build_engine(url: str, profile: str):
+    from sqlalchemy import create_engine
+    from app.db.sqlite import engine_options, install_sqlite_profile
+
+    engine = create_engine(url, **engine_options(url))
+    install_sqlite_profile(engine, profile)
+    return engine
+
+
+def seed(engine, args) -> tuple[list, list[int]]:
+    from app.db.base import Base
+    from app.db.search import install_post_search
+    from app.db.session import SessionLocal
+    from app.models import comment, follows, like, notification, post, user  # noqa: F401
+    from app.models.post import Post
+    from app.models.user import User
+    from app.services.user_cache import UserPrincipal
+
+    Base.metadata.create_all(bind=engine)
+    install_post_search(engine)
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        users = [User(username=f"sqlite{i}", email=f"sqlite{i}@example.com", hashed_password="x", role="user")
+                 for i in range(args.users)]
+        db.add_all(users)
+        db.flush()
+        posts = [Post(title=f"post {p}", content="benchmark " * 20, image_url="https://example.com/image.png",
+                      author_id=rng.choice(users).id, created_at=now - timedelta(minutes=p))
+                 for p in range(args.posts)]
+        db.add_all(posts)
+        db.commit()
+        principals = [UserPrincipal(id=u.id, username=u.username, email=u.email, role=u.role) for u in users]
+        return principals, [p.id for p in posts[:args.hot_posts]]
+
+
+def run_variant(name: str, args) -> dict:
+    import app.db.write_queue as write_queue_module
+    from app.core.redis import redis_client
+    from app.db.session import SessionLocal
+    from app.db.write_queue import SQLiteWriteQueue
+    from app.schemas import CommentCreate
+    from app.services.comment_service import CommentService
+    from app.services.like_service import LikeService
+    from app.services.post_service import PostService
+
+    profile, use_queue = VARIANTS[name]
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), f'{name}.db')}"
+    engine = build_engine(url, profile)
+    # Los servicios abren sus sesiones con SessionLocal
+    SessionLocal.configure(bind=engine)
+    redis_client.flushdb()
+    users, hot_posts = seed(engine, args)
+
+    queue = None
+    if use_queue:
+        queue = SQLiteWriteQueue(url, profile=profile)
+        queue.start()
+    write_queue_module.write_queue = queue
+
+    latencies = {"read": [], "write": []}
+    errors = Counter()
+    stop = threading.Event()
+
+    def request(kind: str, operation) -> None:
+        # Como get_db: una sesión y un commit por operación
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            operation(db)
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            if getattr(exc, "status_code", None) in (400, 404):
+                # Like repetido o ya quitado: respuesta normal de la API
+                latencies[kind].append(time.perf_counter() - started)
+            else:
+                errors[f"{kind}: {type(exc).__name__}: {str(exc).splitlines()[0][:80]}"] += 1
+            return
+        finally:
+            db.close()
+        latencies[kind].append(time.perf_counter() - started)
+
+    def reader(i: int) -> None:
+        user = users[i % len(users)]
+        while not stop.is_set():
+            request("read", lambda db: PostService(db).get_posts(
+                page=1, limit=20, search=None, author_id=None, from_date=None, to_date=None,
+                since_hours=None, current_user=user,
+            ))
+
+    def writer(i: int) -> None:
+        rng = random.Random(i)
+        user = users[i % len(users)]
+        liked = set()
+        while not stop.is_set():
+            post_id = rng.choice(hot_posts)
+            if rng.random() < args.comment_ratio:
+                request("write", lambda db: CommentService(db).create_comment(
+                    post_id, CommentCreate(content="benchmark"), user))
+            elif post_id in liked:
+                liked.discard(post_id)
+                request("write", lambda db: LikeService(db).unlike_post(post_id, user))
+            else:
+                liked.add(post_id)
+                request("write", lambda db: LikeService(db).like_post(post_id, user))
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    if queue:
+        queue.stop()
+    write_queue_module.write_queue = None
+    engine.dispose()
+
+    return {
+        "reads_per_second": round(len(latencies["read"]) / args.duration, 1),
+        "writes_per_second": round(len(latencies["write"]) / args.duration, 1),
+        "reads": _percentiles(latencies["read"]),
+        "writes": _percentiles(latencies["write"]),
+        "errors": dict(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True, help="Redis de pruebas (se vacía), p. ej. redis://localhost:6379/15")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--hot-posts", type=int, default=20, help="Posts que reciben las escrituras")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--comment-ratio", type=float, default=0.3, help="Fracción de escrituras que son comentarios")
+    parser.add_argument("--duration", type=float, default=5, help="Segundos por configuración")
+    parser.add_argument("--sql-counters", action="store_true", help="Contadores en SQL (COUNTERS_WRITE_BEHIND=false)")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    args = parser.parse_args()
+
+    # Los clientes de Redis se crean al importar la app
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ["REDIS_URL"] = args.url
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'sqlite_bench.db')}"
+    from app.core.config import settings
+    settings.COUNTERS_WRITE_BEHIND = not args.sql_counters
+
+    results = {name: run_variant(name, args) for name in args.variants}
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Sentencias SQL y commits por endpoint en un recorrido típico de la API.
+
+Uso:
+    python -m benchmarks.statement_counts --fake-redis
+    python -m benchmarks.statement_counts --fake-redis --json > counts.json
+
+Ejecuta cada endpoint una vez con TestClient sobre una BD SQLite temporal y
+cuenta, por petición, las sentencias enviadas al motor y los COMMIT. Sirve para
+comparar el coste en round trips antes y después de un cambio en la capa de datos.
+"""
+import argparse
+import json
+import os
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'statements_bench.db')}")
+
+
+class StatementCounter:
+    """Cuenta sentencias y commits emitidos por un engine entre reset() y snapshot()."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, *args, **kwargs):
+        self.statements += 1
+
+    def _on_commit(self, *args, **kwargs):
+        self.commits += 1
+
+    def reset(self):
+        self.statements = 0
+        self.commits = 0
+
+    def snapshot(self) -> dict:
+        return {"statements": self.statements, "commits": self.commits}
+
+
+def run() -> dict:
+    from fastapi.testclient import TestClient
+
+    from app.auth.auth_handler import create_access_token
+    from app.db.base import Base
+    from app.db.search import install_post_search
+    from app.db.session import SessionLocal, engine
+    from app.main import app
+    from app.models.user import User
+
+    Base.metadata.create_all(bind=engine)
+    install_post_search(engine)
+    db = SessionLocal()
+    users = [User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="x", role="user") for i in (1, 2)]
+    db.add_all(users)
+    db.commit()
+    alice, bob = ({"Authorization": "Bearer " + create_access_token({"sub": u.email, "user_id": u.id})} for u in users)
+    alice_id = users[0].id
+    db.close()
+
+    client = TestClient(app)
+    counter = StatementCounter(engine)
+    results = {}
+
+    def call(name: str, method: str, url: str, headers=None, **kwargs):
+        counter.reset()
+        response = client.request(method, url, headers=headers, **kwargs)
+        results[name] = {"status": response.status_code, **counter.snapshot()}
+        return response.json() if response.content else None
+
+    post = {"title": "Hola mundo", "content": "Contenido del post de prueba", "image_url": "https://example.com/i.png"}
+    call("POST /auth/register", "POST", "/auth/register",
+         json={"username": "user3", "email": "user3@example.com", "password": "supersecret"})
+    post_id = call("POST /posts/", "POST", "/posts/", alice, json=post)["id"]
+    call("PUT /posts/{id}", "PUT", f"/posts/{post_id}", alice, json={**post, "title": "Hola de nuevo"})
+    call("GET /posts/{id}", "GET", f"/posts/{post_id}", alice)
+    call("POST /users/{id}/follow", "POST", f"/users/{alice_id}/follow", bob)
+    call("GET /posts/", "GET", "/posts/", bob)
+    call("GET /posts/feed", "GET", "/posts/feed", bob)
+    call("POST /posts/{id}/like", "POST", f"/posts/{post_id}/like", bob)
+    call("DELETE /posts/{id}/like", "DELETE", f"/posts/{post_id}/like", bob)
+    comment_id = call("POST /comments/{post_id}", "POST", f"/comments/{post_id}", bob, json={"content": "Buen post"})["id"]
+    call("PUT /comments/{id}", "PUT", f"/comments/{comment_id}", bob, json={"content": "Muy buen post"})
+    call("GET /comments/post/{post_id}", "GET", f"/comments/post/{post_id}", bob)
+    call("DELETE /comments/{id}", "DELETE", f"/comments/{comment_id}", bob)
+    call("POST /saved/{post_id}", "POST", f"/saved/{post_id}", bob)
+    call("GET /saved/", "GET", "/saved/", bob)
+    conv_id = call("POST /messages/conversations/{user_id}", "POST", f"/messages/conversations/{alice_id}", bob)["id"]
+    call("POST /messages/conversations/{id}/send", "POST", f"/messages/conversations/{conv_id}/send", bob,
+         json={"content": "Hola!"})
+    call("GET /messages/conversations", "GET", "/messages/conversations", alice)
+    call("PATCH /messages/conversations/{id}/read", "PATCH", f"/messages/conversations/{conv_id}/read", alice)
+    call("GET /notifications/", "GET", "/notifications/", alice)
+    call("PATCH /notifications/read-all", "PATCH", "/notifications/read-all", alice)
+    call("DELETE /users/{id}/follow", "DELETE", f"/users/{alice_id}/follow", bob)
+    call("DELETE /posts/{id}", "DELETE", f"/posts/{post_id}", alice)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fake-redis", action="store_true", help="Usar fakeredis en lugar de REDIS_URL")
+    parser.add_argument("--json", action="store_true", help="Salida JSON en lugar de tabla")
+    args = parser.parse_args()
+
+    if args.fake_redis:
+        # Debe sustituirse antes de importar la app (el cliente se crea al importar)
+        import fakeredis
+        import redis
+
+        fake = fakeredis.FakeRedis(decode_responses=True)
+        redis.Redis.from_url = classmethod(lambda cls, *a, **k: fake)
+
+    results = run()
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'endpoint':45} {'status':>6} {'stmts':>6} {'commits':>8}")
+    for name, row in results.items():
+        print(f"{name:45} {row['status']:>6} {row['statements']:>6} {row['commits']:>8}")
+
+
+if __name__ == "__main__":
+    main()
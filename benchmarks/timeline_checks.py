@@ -0,0 +1,168 @@
+"""
+Comprobaciones de consistencia de los timelines del feed en Redis frente a
+SQL, en los cruces entre escrituras concurrentes que el resto de benchmarks
+no reproducen.
+
+Uso:
+    python -m benchmarks.timeline_checks
+
+Crea una BD SQLite temporal (esquema de los modelos) y usa fakeredis. Cada
+caso de _checks() siembra sus datos, provoca el cruce y compara el timeline
+resultante con lo que devolvería SQL. Sale con código 1 si alguno falla.
+
+- rebuild_race: un post se confirma (y hace fan-out) mientras rebuild() está
+  leyendo SQL; el timeline reconstruido debe contenerlo.
+- leave_pull_truncated: un autor vuelve de modo pull a push y sus posts
+  recientes se añaden a un timeline recortado al que le faltan posts más
+  nuevos de otros autores; la página del feed no debe tener huecos.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'timeline_checks.db')}")
+os.environ["BCRYPT_WORKERS"] = "0"
+
+
+def _reset(db, redis_client, users: int) -> None:
+    from sqlalchemy import text
+    from app.models import User
+
+    for table in ("follows", "posts", "users"):
+        db.execute(text(f"DELETE FROM {table}"))
+    db.add_all(
+        User(id=i, username=f"user{i}", email=f"user{i}@example.com", hashed_password="x", role="user")
+        for i in range(1, users + 1)
+    )
+    db.commit()
+    redis_client.flushdb()
+
+
+def _post(author_id: int) -> int:
+    """Crea un post y hace su fan-out como una petición (Redis tras el commit)."""
+    from app.db.session import SessionLocal
+    from app.repositories.post_repository import PostRepository
+    from app.services.timeline_service import TimelineService
+
+    with SessionLocal() as db:
+        post = PostRepository(db).create(
+            title="check", content="timeline check", image_url="https://example.com/i.png", author_id=author_id
+        )
+        TimelineService(db).fan_out_post(author_id, post.id)
+        db.commit()
+        return post.id
+
+
+def _follow(follower_id: int, followed_id: int, unfollow: bool = False) -> None:
+    from app.db.session import SessionLocal
+    from app.services.follower_service import FollowerService
+    from app.services.user_cache import UserPrincipal
+
+    follower = UserPrincipal(id=follower_id, email=f"user{follower_id}@example.com",
+                             username=f"user{follower_id}", role="user")
+    with SessionLocal() as db:
+        service = FollowerService(db)
+        (service.unfollow_user if unfollow else service.follow_user)(follower, followed_id)
+        db.commit()
+
+
+def check_rebuild_race(db, redis_client) -> tuple[bool, str]:
+    from app.services.timeline_service import TimelineService
+
+    _reset(db, redis_client, 2)
+    _follow(1, 2)
+    existing = [_post(2) for _ in range(3)]
+
+    service = TimelineService(db)
+    repository = service.post_repository
+    read_ids = repository.get_recent_ids_by_authors
+    concurrent = []
+
+    def read_then_post(*args, **kwargs):
+        # El SELECT ya se hizo; el post se confirma antes de que _store escriba
+        post_ids = read_ids(*args, **kwargs)
+        concurrent.append(_post(2))
+        return post_ids
+
+    repository.get_recent_ids_by_authors = read_then_post
+    try:
+        service.rebuild(1)
+    finally:
+        repository.get_recent_ids_by_authors = read_ids
+
+    page = TimelineService(db).read_page(1, 1, 10)
+    expected = sorted(existing + concurrent, reverse=True)
+    ok = page is not None and page[0] == expected
+    return ok, f"timeline {page[0] if page else None}, SQL {expected}"
+
+
+def check_leave_pull_truncated(db, redis_client) -> tuple[bool, str]:
+    from app.core.config import settings
+    from app.services.timeline_service import PULLED_AUTHORS_KEY, TimelineService
+
+    original = (settings.TIMELINE_MAX_LENGTH, settings.FEED_PULL_FOLLOWER_THRESHOLD, settings.FEED_PULL_MERGE_DEPTH)
+    settings.TIMELINE_MAX_LENGTH, settings.FEED_PULL_FOLLOWER_THRESHOLD, settings.FEED_PULL_MERGE_DEPTH = 6, 2, 10
+    try:
+        # 1 lee el feed; 2 está en modo pull (seguido por 1 y 5); 3 y 4 en push
+        _reset(db, redis_client, 5)
+        for followed_id in (2, 3, 4):
+            _follow(1, followed_id)
+        _follow(5, 2)
+        TimelineService(db).read_page(1, 1, 10)
+        pulled_posts = [_post(2) for _ in range(4)]
+        pushed_posts = [_post(3) for _ in range(4)]
+        for _ in range(6):
+            _post(4)
+        # Timeline recortado (4 empujó más de TIMELINE_MAX_LENGTH) y después
+        # sin los posts de 4: solo queda el más reciente de 3
+        _follow(1, 4, unfollow=True)
+        # 2 baja del umbral: vuelve a push y sus posts se añaden a los timelines
+        _follow(5, 2, unfollow=True)
+
+        page = TimelineService(db).read_page(1, 1, 2)
+        expected = sorted(pulled_posts + pushed_posts, reverse=True)[:2]
+        ok = page is not None and page[0] == expected and not redis_client.sismember(PULLED_AUTHORS_KEY, 2)
+        return ok, f"primera página {page[0] if page else None}, SQL {expected}"
+    finally:
+        settings.TIMELINE_MAX_LENGTH, settings.FEED_PULL_FOLLOWER_THRESHOLD, settings.FEED_PULL_MERGE_DEPTH = original
+
+
+def _checks():
+    return [
+        ("rebuild_race", check_rebuild_race),
+        ("leave_pull_truncated", check_leave_pull_truncated),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    # Debe sustituirse antes de importar la app (los clientes se crean al importar)
+    import fakeredis
+    import redis
+
+    fake = fakeredis.FakeRedis(decode_responses=True)
+    redis.Redis.from_url = classmethod(lambda cls, *a, **k: fake)
+
+    import app.models  # noqa: F401
+    from app.core.redis import redis_client
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    failures = 0
+    for name, check in _checks():
+        with SessionLocal() as db:
+            ok, detail = check(db, redis_client)
+        failures += not ok
+        print(f"{'ok' if ok else 'FALLO':5} {name}: {detail}")
+    print(f"{len(_checks())} casos, {failures} con fallos")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""initial schema
+
+Esquema creado hasta ahora por Base.metadata.create_all al arrancar la app,
+más el índice full-text de posts (app.db.search). Una BD creada por una
+versión anterior con create_all ya tiene las tablas, pero no necesariamente
+todo lo que se añadió después (users.token_version, las columnas de la
+bandeja de entrada, índices, full-text): en ella esta revisión solo añade lo
+que falta y recalcula la bandeja de entrada. Basta con `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 15:12:20.089651
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.db.search import create_post_search, drop_post_search
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table('users'):
+        _upgrade_legacy_schema()
+        return
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('role', sa.String(), nullable=True),
+    sa.Column('token_version', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+
+    op.create_table('conversations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user1_id', sa.Integer(), nullable=False),
+    sa.Column('user2_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_message_at', sa.DateTime(), nullable=False),
+    sa.Column('last_message_id', sa.Integer(), nullable=True),
+    sa.Column('user1_unread_count', sa.Integer(), nullable=False),
+    sa.Column('user2_unread_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user1_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user2_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user1_id', 'user2_id', name='unique_conversation_users')
+    )
+    op.create_index(op.f('ix_conversations_id'), 'conversations', ['id'], unique=False)
+    op.create_index('ix_conversations_user1_last_message', 'conversations', ['user1_id', 'last_message_at', 'id'], unique=False)
+    op.create_index('ix_conversations_user2_last_message', 'conversations', ['user2_id', 'last_message_at', 'id'], unique=False)
+
+    op.create_table('follows',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('follower_id', sa.Integer(), nullable=True),
+    sa.Column('followed_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['followed_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['follower_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('follower_id', 'followed_id', name='unique_follow')
+    )
+    op.create_index(op.f('ix_follows_id'), 'follows', ['id'], unique=False)
+
+    op.create_table('posts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('image_url', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('likes_count', sa.Integer(), nullable=False),
+    sa.Column('comments_count', sa.Integer(), nullable=False),
+    sa.Column('author_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['author_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_posts_comments_count_created_at_id', 'posts', ['comments_count', 'created_at', 'id'], unique=False)
+    op.create_index('ix_posts_created_at_id', 'posts', ['created_at', 'id'], unique=False)
+    op.create_index(op.f('ix_posts_id'), 'posts', ['id'], unique=False)
+    op.create_index('ix_posts_likes_count_created_at_id', 'posts', ['likes_count', 'created_at', 'id'], unique=False)
+
+    op.create_table('comments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.String(), nullable=False),
+    sa.Column('author_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['author_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_comments_id'), 'comments', ['id'], unique=False)
+
+    op.create_table('likes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('post_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'post_id', name='unique_like')
+    )
+    op.create_index(op.f('ix_likes_id'), 'likes', ['id'], unique=False)
+
+    op.create_table('messages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('conversation_id', sa.Integer(), nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('is_read', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['conversation_id'], ['conversations.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['sender_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_messages_id'), 'messages', ['id'], unique=False)
+
+    op.create_table('notifications',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipient_id', sa.Integer(), nullable=False),
+    sa.Column('actor_id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.Enum('like', 'comment', 'follow', name='notificationtype'), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=True),
+    sa.Column('is_read', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['actor_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['recipient_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_notifications_id'), 'notifications', ['id'], unique=False)
+
+    op.create_table('saved_posts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('saved_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'post_id', name='unique_saved_post')
+    )
+    op.create_index(op.f('ix_saved_posts_id'), 'saved_posts', ['id'], unique=False)
+
+    create_post_search(op.get_bind())
+
+
+
+def _legacy_columns() -> dict:
+    # Los NOT NULL llevan server_default: ALTER TABLE ADD COLUMN necesita un
+    # valor para las filas existentes
+    return {
+        'users': [sa.Column('token_version', sa.Integer(), server_default='0', nullable=False)],
+        'conversations': [
+            sa.Column('last_message_id', sa.Integer(), nullable=True),
+            sa.Column('user1_unread_count', sa.Integer(), server_default='0', nullable=False),
+            sa.Column('user2_unread_count', sa.Integer(), server_default='0', nullable=False),
+        ],
+    }
+
+
+LEGACY_INDEXES = [
+    ('ix_conversations_user1_last_message', 'conversations', ['user1_id', 'last_message_at', 'id']),
+    ('ix_conversations_user2_last_message', 'conversations', ['user2_id', 'last_message_at', 'id']),
+    ('ix_posts_comments_count_created_at_id', 'posts', ['comments_count', 'created_at', 'id']),
+    ('ix_posts_created_at_id', 'posts', ['created_at', 'id']),
+    ('ix_posts_likes_count_created_at_id', 'posts', ['likes_count', 'created_at', 'id']),
+]
+
+# Último mensaje y no leídos de cada participante, desde la tabla de mensajes
+BACKFILL_CONVERSATIONS = """
+UPDATE conversations SET
+    last_message_id = (
+        SELECT m.id FROM messages m WHERE m.conversation_id = conversations.id
+        ORDER BY m.created_at DESC, m.id DESC LIMIT 1
+    ),
+    user1_unread_count = (
+        SELECT COUNT(*) FROM messages m WHERE m.conversation_id = conversations.id
+        AND m.sender_id != conversations.user1_id AND NOT m.is_read
+    ),
+    user2_unread_count = (
+        SELECT COUNT(*) FROM messages m WHERE m.conversation_id = conversations.id
+        AND m.sender_id != conversations.user2_id AND NOT m.is_read
+    )
+"""
+
+
+def _upgrade_legacy_schema() -> None:
+    """Completa una BD creada por create_all hasta el esquema de esta revisión."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    added = set()
+    for table, columns in _legacy_columns().items():
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        for column in columns:
+            if column.name not in existing:
+                op.add_column(table, column)
+                added.add(table)
+    for name, table, columns in LEGACY_INDEXES:
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=False)
+    if 'conversations' in added:
+        op.execute(BACKFILL_CONVERSATIONS)
+    create_post_search(bind)
+
+
+def downgrade() -> None:
+    drop_post_search(op.get_bind())
+
+    op.drop_index(op.f('ix_saved_posts_id'), table_name='saved_posts')
+    op.drop_table('saved_posts')
+
+    op.drop_index(op.f('ix_notifications_id'), table_name='notifications')
+    op.drop_table('notifications')
+    # En PostgreSQL el Enum es un tipo propio
+    sa.Enum(name='notificationtype').drop(op.get_bind(), checkfirst=True)
+
+    op.drop_index(op.f('ix_messages_id'), table_name='messages')
+    op.drop_table('messages')
+
+    op.drop_index(op.f('ix_likes_id'), table_name='likes')
+    op.drop_table('likes')
+
+    op.drop_index(op.f('ix_comments_id'), table_name='comments')
+    op.drop_table('comments')
+
+    op.drop_index('ix_posts_likes_count_created_at_id', table_name='posts')
+    op.drop_index(op.f('ix_posts_id'), table_name='posts')
+    op.drop_index('ix_posts_created_at_id', table_name='posts')
+    op.drop_index('ix_posts_comments_count_created_at_id', table_name='posts')
+    op.drop_table('posts')
+
+    op.drop_index(op.f('ix_follows_id'), table_name='follows')
+    op.drop_table('follows')
+
+    op.drop_index('ix_conversations_user2_last_message', table_name='conversations')
+    op.drop_index('ix_conversations_user1_last_message', table_name='conversations')
+    op.drop_index(op.f('ix_conversations_id'), table_name='conversations')
+    op.drop_table('conversations')
+
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
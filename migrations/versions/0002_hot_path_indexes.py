@@ -0,0 +1,39 @@
+"""hot path indexes
+
+Índices compuestos de las consultas calientes que hasta ahora recorrían la
+tabla entera: posts de un autor, likes de un post, seguidores, comentarios,
+guardados, notificaciones y mensajes. Se comprueban con
+`python -m benchmarks.query_plans`.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 15:12:59.100814
+"""
+from alembic import op
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_posts_author_id_created_at_id', 'posts', ['author_id', 'created_at', 'id']),
+    ('ix_likes_post_id', 'likes', ['post_id']),
+    ('ix_follows_followed_id', 'follows', ['followed_id']),
+    ('ix_comments_post_id_created_at', 'comments', ['post_id', 'created_at']),
+    ('ix_saved_posts_user_id_saved_at', 'saved_posts', ['user_id', 'saved_at']),
+    ('ix_notifications_recipient_id_is_read_created_at', 'notifications', ['recipient_id', 'is_read', 'created_at']),
+    ('ix_messages_conversation_id_created_at', 'messages', ['conversation_id', 'created_at']),
+    ('ix_messages_conversation_id_sender_id_is_read', 'messages', ['conversation_id', 'sender_id', 'is_read']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,33 @@
+"""comments keyset index
+
+El listado de comentarios de un post pagina por cursor sobre (created_at,
+id): el índice de comentarios incluye `id` para que la clave completa se
+resuelva en el índice, como ix_posts_author_id_created_at_id.
+
+En SQLite, los created_at generados con CURRENT_TIMESTAMP se guardaban sin
+microsegundos, a diferencia de los parámetros que envía SQLAlchemy: se
+completan para que la comparación de la clave del cursor sea correcta.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 19:40:12.512337
+"""
+from alembic import op
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("UPDATE comments SET created_at = created_at || '.000000' WHERE length(created_at) = 19")
+    op.drop_index('ix_comments_post_id_created_at', table_name='comments')
+    op.create_index('ix_comments_post_id_created_at_id', 'comments', ['post_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_post_id_created_at_id', table_name='comments')
+    op.create_index('ix_comments_post_id_created_at', 'comments', ['post_id', 'created_at'], unique=False)
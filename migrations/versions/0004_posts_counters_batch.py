@@ -0,0 +1,26 @@
+"""posts counters batch
+
+Id del último lote de contadores write-behind aplicado a cada post: hace
+idempotente el volcado de CounterService.flush y permite a las lecturas no
+sumar dos veces un lote ya confirmado en la BD.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 21:05:41.208113
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('counters_batch', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'counters_batch')
@@ -0,0 +1,25 @@
+"""posts feed index
+
+El feed cronológico (SQL y reconstrucción de timelines) ordena por id, la
+misma clave que los scores de los timelines de Redis: índice (author_id, id)
+para los posts de los autores seguidos en ese orden.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 21:48:03.774120
+"""
+from alembic import op
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_posts_author_id_id', 'posts', ['author_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_author_id_id', table_name='posts')